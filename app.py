@@ -12,25 +12,32 @@ from src.logging_config import setup_logging, get_logger
 setup_logging(log_level=os.getenv('LOG_LEVEL', 'INFO'))
 logger = get_logger(__name__)
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, g, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, send_file, g, jsonify
 from werkzeug.middleware.proxy_fix import ProxyFix  # 🆕 Para proxies/load balancers (Render.com)
 from src.odoo_manager import OdooManager
 from src.supabase_manager import SupabaseManager
 from src.analytics_supabase import AnalyticsSupabase
 from src.permissions_manager import PermissionsManager
 from src.audit_logger import AuditLogger
+from src.concurrent_loader import ConcurrentLoader
+from src.dashboard_widgets import WIDGETS as DASHBOARD_WIDGETS, DashboardWidgets, dashboard_period
+from src.excel_export import DETALLE_COLUMNS, XLSX_MIMETYPE, build_xlsx, iter_file_chunks, raw_columns, write_xlsx
+from src.export_jobs import ExportJobs, count_rows
+from src.stream_export import EXPORT_FORMATS, PYARROW_AVAILABLE, build_parquet, iter_csv, iter_ndjson
+from src.sales_aggregation import empty_linea_totals
+from src.sales_feed import decode_cursor, encode_cursor, iter_changes_ndjson
 from src.utils import get_meses_del_año, normalizar_linea_comercial, limpiar_nombre_producto, limpiar_nombre_atrevia
 from authlib.integrations.flask_client import OAuth
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from functools import wraps
-import pandas as pd
 import json
 import io
 import calendar
+import hmac
+import itertools
+import tempfile
 from datetime import datetime, timedelta
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-from openpyxl.utils import get_column_letter
 import pytz
 
 app = Flask(__name__)
@@ -280,12 +287,129 @@ except Exception as e:
             return []
         def get_commercial_lines_stacked_data(self, *args, **kwargs):
             return {'yAxis': [], 'series': [], 'legend': []}
+        def get_sales_lines_page(self, *args, **kwargs):
+            return {'data': [], 'total': 0}
+        def get_dashboard_aggregates(self, *args, **kwargs):
+            return OdooManager.aggregate_dashboard_rows([])
+        def get_dashboard_lines(self, *args, **kwargs):
+            return []
+        def iter_sales_lines(self, *args, **kwargs):
+            return iter([])
+        def get_sales_changes(self, after=None, *args, **kwargs):
+            return {'moves': [], 'next': after, 'has_more': False}
+        def get_sales_trend(self, *args, **kwargs):
+            return {'actual': {}, 'anterior': {}, 'variacion': {'total': [], 'ipn': []}}
+        def get_cache_stats(self):
+            return {}
     data_manager = _StubManager()
     logger.warning(f"⚠️ data_manager en modo stub: {type(data_manager).__name__}")
 
 # Inicializar Supabase Manager para metas de 2026
 supabase_manager = SupabaseManager()
 
+# Timeouts de las cargas en paralelo de los dashboards (0 = sin límite)
+SUPABASE_LOAD_TIMEOUT = int(os.getenv('SUPABASE_LOAD_TIMEOUT_SECONDS', '10'))
+ODOO_LOAD_TIMEOUT = int(os.getenv('ODOO_LOAD_TIMEOUT_SECONDS', '90'))
+
+# Máximo de líneas de venta por exportación a Excel
+EXPORT_MAX_ROWS = int(os.getenv('EXPORT_MAX_ROWS', '10000'))
+# Máximo de las exportaciones en segundo plano (un año completo); por defecto cabe en una hoja de Excel
+EXPORT_JOB_MAX_ROWS = int(os.getenv('EXPORT_JOB_MAX_ROWS', '1000000'))
+
+# Feed incremental de ventas (/api/sales/changes): facturas por página y tokens de servicio
+SALES_FEED_PAGE_SIZE = int(os.getenv('SALES_FEED_PAGE_SIZE', '500'))
+SALES_FEED_TOKENS = [t.strip() for t in os.getenv('SALES_FEED_TOKENS', '').split(',') if t.strip()]
+
+
+def file_download(output, filename, mimetype=XLSX_MIMETYPE):
+    """Respuesta de descarga que envía por trozos un archivo temporal (build_xlsx, build_parquet)."""
+    output.seek(0, io.SEEK_END)
+    size = output.tell()
+    output.seek(0)
+    return Response(
+        iter_file_chunks(output),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Content-Length': str(size),
+        },
+        direct_passthrough=True
+    )
+
+
+def export_sales_params(args):
+    """Filtros de las exportaciones de /sales (date_from, date_to, linea_id, partner_id)."""
+    params = {'date_from': args.get('date_from'), 'date_to': args.get('date_to')}
+    for name in ('linea_id', 'partner_id'):
+        try:
+            params[name] = int(args.get(name)) if args.get(name) else None
+        except (ValueError, TypeError):
+            params[name] = None
+    return params
+
+
+def export_sales_rows(params, limit=EXPORT_MAX_ROWS):
+    """Líneas de venta de los filtros, recorridas por páginas (sin cargarlas todas en memoria)."""
+    return itertools.chain.from_iterable(data_manager.iter_sales_lines(
+        date_from=params['date_from'],
+        date_to=params['date_to'],
+        partner_id=params['partner_id'],
+        linea_id=params['linea_id'],
+        limit=limit,
+        national_only=True  # Sin VENTA INTERNACIONAL (exportaciones), filtrado en Odoo
+    ))
+
+
+def export_ventas_spec(params, limit=EXPORT_MAX_ROWS):
+    """Filas, columnas, hoja y estilo de /export/excel/sales: todas las columnas de las líneas, tal cual."""
+    sales_rows = export_sales_rows(params, limit)
+    # Columnas en el orden de la primera línea
+    primera = next(sales_rows, None)
+    if primera is None:
+        return iter([]), [], 'Ventas', False
+    return itertools.chain([primera], sales_rows), raw_columns(primera.keys()), 'Ventas', False
+
+
+def export_detalle_spec(params, limit=EXPORT_MAX_ROWS):
+    """Filas, columnas, hoja y estilo de /export/dashboard/details (columnas traducidas y con formato)."""
+    # Las columnas traducidas, sus formatos (moneda, cantidad, fecha) y anchos están en DETALLE_COLUMNS
+    sales_rows = itertools.chain.from_iterable(data_manager.iter_sales_lines(
+        date_from=params['fecha_inicio'],
+        date_to=params['fecha_fin'],
+        limit=limit,
+        national_only=True  # Sin VENTA INTERNACIONAL (exportaciones), igual que en el dashboard
+    ))
+    return sales_rows, DETALLE_COLUMNS, f"Detalle Ventas {params['mes']}", True
+
+
+def export_job_runner(spec, params):
+    """
+    Función de ExportJobs.submit: arma la exportación en el worker y la escribe en disco.
+
+    En segundo plano no aplica EXPORT_MAX_ROWS (pensado para descargas directas)
+    sino EXPORT_JOB_MAX_ROWS; si se alcanza, la página lo avisa (ver export_job_json).
+    """
+    def run(path, progress):
+        rows, columns, hoja, estilo = spec(params, limit=EXPORT_JOB_MAX_ROWS)
+        return write_xlsx(path, count_rows(rows, progress), columns, hoja, header_style=estilo)
+    return run
+
+
+# Exportaciones largas en segundo plano (pool propio, no usa los hilos de los dashboards)
+export_jobs = ExportJobs(
+    export_dir=os.getenv('EXPORT_JOBS_DIR') or os.path.join(tempfile.gettempdir(), 'dashboard_ventas_exports'),
+    max_workers=int(os.getenv('EXPORT_JOB_WORKERS', '2')),
+    ttl_seconds=int(os.getenv('EXPORT_JOB_TTL_SECONDS', '1800'))
+)
+
+# Widgets de /dashboard cacheados por separado (TTL 0 desactiva la caché)
+dashboard_widgets = DashboardWidgets(
+    data_manager, supabase_manager,
+    ttl_seconds=int(os.getenv('DASHBOARD_WIDGET_TTL_SECONDS', '120')),
+    supabase_timeout=SUPABASE_LOAD_TIMEOUT,
+    odoo_timeout=ODOO_LOAD_TIMEOUT
+)
+
 # Inicializar sistema de analytics (Supabase)
 analytics_db = AnalyticsSupabase()
 
@@ -770,6 +894,19 @@ def admin_audit_log():
         flash(f'Error al cargar historial de auditoría: {str(e)}', 'danger')
         return redirect(url_for('admin_users'))
 
+@app.route('/admin/cache-stats')
+@require_admin_full
+def admin_cache_stats():
+    """
+    Estadísticas de las cachés de consultas a Odoo (aciertos, fallos, memoria).
+    Solo accesible por admin_full.
+    """
+    stats = data_manager.get_cache_stats()
+    stats['dashboard_widgets'] = dashboard_widgets.stats()
+    stats['supabase'] = supabase_manager.cache_stats()
+    stats['export_jobs'] = export_jobs.stats()
+    return jsonify(stats)
+
 # --- Funciones Auxiliares ---
 
 # Las funciones auxiliares han sido movidas a src/utils/ para mejor organización
@@ -1026,565 +1163,191 @@ def sales():
     is_admin = permissions_manager.is_admin(username)
     # --- Fin Verificación ---
     
-    try:
-        # Obtener opciones de filtro
-        filter_options = data_manager.get_filter_options()
-        
-        if request.method == 'POST':
-            # For POST, get filters from the form
-            selected_filters = {
-                'date_from': request.form.get('date_from') or None,
-                'date_to': request.form.get('date_to') or None,
-                'search_term': request.form.get('search_term') or None
-            }
-        else:
-            # For GET, start with no filters, so defaults will be used
-            selected_filters = {
-                'date_from': request.args.get('date_from') or None,
-                'date_to': request.args.get('date_to') or None,
-                'search_term': request.args.get('search_term') or None
-            }
+    if request.method == 'POST':
+        # For POST, get filters from the form
+        selected_filters = {
+            'date_from': request.form.get('date_from') or None,
+            'date_to': request.form.get('date_to') or None,
+            'search_term': request.form.get('search_term') or None
+        }
+    else:
+        # For GET, start with no filters, so defaults will be used
+        selected_filters = {
+            'date_from': request.args.get('date_from') or None,
+            'date_to': request.args.get('date_to') or None,
+            'search_term': request.args.get('search_term') or None
+        }
 
-        # Create a clean copy for the database query
-        query_filters = selected_filters.copy()
+    # Las líneas se cargan por página desde /api/sales/lines (DataTables server-side)
+    return render_template('sales.html',
+                         selected_filters=selected_filters,
+                         fecha_actual=datetime.now(),
+                         parquet_disponible=PYARROW_AVAILABLE,
+                         is_admin=is_admin) # Pasar el flag a la plantilla
 
-        # Clean up filter values for the query
-        for key, value in query_filters.items():
-            if not value:  # Handles empty strings and None
-                query_filters[key] = None
-        
-        # Fetch data on every page load (GET and POST)
-        # On GET, filters are None, so odoo_manager will use defaults (last 30 days)
-        logger.info(f"🔍 Obteniendo líneas de venta completas...")
-        logger.info(f"   Filtros: date_from={query_filters.get('date_from')}, date_to={query_filters.get('date_to')}")
-        sales_data = data_manager.get_sales_lines(
-            date_from=query_filters.get('date_from'),
-            date_to=query_filters.get('date_to'),
-            partner_id=None,
-            search=query_filters.get('search_term'),
-            linea_id=None,
-            limit=1000
-        )
-        logger.info(f"📊 Obtenidas {len(sales_data)} líneas de ventas desde Odoo")
-        
-        # Filtrar VENTA INTERNACIONAL (exportaciones)
-        sales_data_filtered = []
-        for sale in sales_data:
-            linea_comercial = sale.get('commercial_line_national_id')
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                nombre_linea = linea_comercial[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_linea:
-                    continue
-            
-            # También filtrar por canal de ventas
-            canal_ventas = sale.get('sales_channel_id')
-            if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                nombre_canal = canal_ventas[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                    continue
-            
-            sales_data_filtered.append(sale)
-        
-        return render_template('sales.html', 
-                             sales_data=sales_data_filtered,
-                             filter_options=filter_options,
-                             selected_filters=selected_filters,
-                             fecha_actual=datetime.now(),
-                             is_admin=is_admin) # Pasar el flag a la plantilla
-    
-    except Exception as e:
-        logger.error(f"Error al obtener datos de ventas: {e}", exc_info=True)
-        flash('No se pudieron cargar los datos de ventas. Intente nuevamente más tarde.', 'danger')
-        return render_template('sales.html', 
-                             sales_data=[],
-                             filter_options={'lineas': [], 'clientes': []},
-                             selected_filters={},
-                             fecha_actual=datetime.now(),
-                             is_admin=is_admin) # Pasar el flag a la plantilla
+@app.route('/api/sales/lines')
+def api_sales_lines():
+    """
+    Página de líneas de venta para DataTables en modo server-side.
 
-@app.route('/dashboard', methods=['GET', 'POST'])
-def dashboard():
+    Parámetros DataTables: draw, start, length, order[0][column], order[0][dir], columns[i][data].
+    Filtros: date_from, date_to, search_term.
+    """
     if 'username' not in session:
-        return redirect(url_for('login'))
-    
-    try:
-        # --- Lógica de Permisos de Administrador ---
-        username = session.get('username')
-        is_admin = permissions_manager.is_admin(username)
-
-        # Obtener año seleccionado (parámetro o año actual por defecto)
-        fecha_actual = datetime.now()
-        año_seleccionado = request.args.get('año', str(fecha_actual.year))
-        try:
-            año_seleccionado = int(año_seleccionado)
-        except (ValueError, TypeError):
-            año_seleccionado = fecha_actual.year
-        
-        # Generar lista de años disponibles (desde 2025 hasta año actual)
-        años_disponibles = list(range(2025, fecha_actual.year + 1))
-        
-        # Obtener mes seleccionado
-        mes_seleccionado = request.args.get('mes', f"{año_seleccionado}-{fecha_actual.month:02d}" if año_seleccionado == fecha_actual.year else f"{año_seleccionado}-01")
-        
-        # --- NUEVA LÓGICA DE FILTRADO POR DÍA ---
-        # Obtener el día final del filtro, si existe
-        dia_fin_param = request.args.get('dia_fin')
+        return jsonify({'error': 'Sesión expirada'}), 401
 
-        # Crear todos los meses del año seleccionado
-        meses_disponibles = get_meses_del_año(año_seleccionado)
-        
-        # Obtener nombre del mes seleccionado
-        mes_obj = next((m for m in meses_disponibles if m['key'] == mes_seleccionado), None)
-        mes_nombre = mes_obj['nombre'] if mes_obj else "Mes Desconocido"
-        
-        año_sel, mes_sel = mes_seleccionado.split('-')
-        
-        # Determinar el día a usar para los cálculos y la fecha final
-        if dia_fin_param:
-            try:
-                dia_actual = int(dia_fin_param)
-                fecha_fin = f"{año_sel}-{mes_sel}-{str(dia_actual).zfill(2)}"
-            except (ValueError, TypeError):
-                # Si el parámetro no es un número válido, usar el comportamiento por defecto
-                dia_fin_param = None # Resetear para que entre al siguiente bloque
-        
-        if not dia_fin_param:
-            # Comportamiento original si no hay filtro de día
-            if mes_seleccionado == fecha_actual.strftime('%Y-%m'):
-                # Mes actual: usar día actual
-                dia_actual = fecha_actual.day
-            else:
-                # Mes pasado: usar último día del mes
-                ultimo_dia_mes = calendar.monthrange(int(año_sel), int(mes_sel))[1]
-                dia_actual = ultimo_dia_mes
-            fecha_fin = f"{año_sel}-{mes_sel}-{str(dia_actual).zfill(2)}"
+    username = session.get('username')
+    if not permissions_manager.has_permission(username, 'view_analytics'):
+        return jsonify({'error': 'No tiene permisos para acceder a este recurso'}), 403
 
-        fecha_inicio = f"{año_sel}-{mes_sel}-01"
-        # --- FIN DE LA NUEVA LÓGICA ---
+    draw = request.args.get('draw', 0, type=int)
+    start = max(0, request.args.get('start', 0, type=int))
+    length = request.args.get('length', 50, type=int)
+    length = min(max(1, length), 500)
 
-        # Obtener metas del mes seleccionado desde la sesión
-        metas_historicas = supabase_manager.read_metas_por_linea()
-        metas_del_mes_raw = metas_historicas.get(mes_seleccionado, {}).get('metas', {})
-        metas_ipn_del_mes_raw = metas_historicas.get(mes_seleccionado, {}).get('metas_ipn', {})
-        
-        # Normalizar claves a minúsculas para coincidir con los IDs de líneas
-        metas_del_mes_raw = {k.lower(): v for k, v in metas_del_mes_raw.items()}
-        metas_ipn_del_mes_raw = {k.lower(): v for k, v in metas_ipn_del_mes_raw.items()}
-        
-        # Consolidar metas de GENVET con TERCEROS
-        metas_del_mes = {}
-        metas_ipn_del_mes = {}
-        
-        for linea_id, valor in metas_del_mes_raw.items():
-            if linea_id == 'genvet':
-                # Sumar la meta de genvet a terceros
-                metas_del_mes['terceros'] = metas_del_mes.get('terceros', 0) + valor
-            else:
-                metas_del_mes[linea_id] = valor
-        
-        for linea_id, valor in metas_ipn_del_mes_raw.items():
-            if linea_id == 'genvet':
-                # Sumar la meta IPN de genvet a terceros
-                metas_ipn_del_mes['terceros'] = metas_ipn_del_mes.get('terceros', 0) + valor
-            else:
-                metas_ipn_del_mes[linea_id] = valor
-        
-        # Las líneas comerciales se generan dinámicamente más adelante.
-        
-        # Obtener datos reales de ventas desde Odoo
-        try:
-            # Las fechas de inicio y fin ahora se calculan más arriba
-            
-            # Obtener datos de ventas reales desde Odoo
-            sales_data = data_manager.get_sales_lines(
-                date_from=fecha_inicio,
-                date_to=fecha_fin,
-                limit=10000
-            )
-            
-            logger.info(f"Obtenidas {len(sales_data)} líneas de ventas para el dashboard")
-            
-        except Exception as e:
-            logger.error(f"Error obteniendo datos de Odoo: {e}", exc_info=True)
-            sales_data = []
-        
-        # Procesar datos de ventas por línea comercial
-        datos_lineas = []
-        total_venta = 0
-        total_vencimiento = 0
-        total_venta_pn = 0
-        
-        # --- CÁLCULO DE TOTALES ---
-        # Calcular totales de metas ANTES de filtrar las líneas para la tabla.
-        # Esto asegura que ECOMMERCE se incluya en el total general del KPI.
-        total_meta = sum(metas_del_mes.values())
-        total_meta_pn = sum(metas_ipn_del_mes.values())
-        
-        # Mapeo de líneas comerciales de Odoo a IDs locales
-        mapeo_lineas = {
-            'PETMEDICA': 'petmedica',
-            'AGROVET': 'agrovet', 
-            'PET NUTRISCIENCE': 'pet_nutriscience',
-            'AVIVET': 'avivet',
-            'OTROS': 'otros',
-            'TERCEROS': 'terceros',
-            'INTERPET': 'interpet',
-        }
-        
-        # Calcular ventas reales por línea comercial
-        ventas_por_linea = {}
-        ventas_por_ruta = {}
-        ventas_ipn_por_linea = {} # Nueva variable para ventas de productos nuevos
-        ventas_por_producto = {}
-        ciclo_vida_por_producto = {}
-        ventas_por_ciclo_vida = {}
-        ventas_por_forma = {}
-        for sale in sales_data:
-            # Excluir VENTA INTERNACIONAL (exportaciones)
-            linea_comercial = sale.get('commercial_line_national_id')
-            nombre_linea_actual = None
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                nombre_linea_original = linea_comercial[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_linea_original:
-                    continue
-                # Aplicar normalización para agrupar GENVET y MARCA BLANCA como TERCEROS
-                nombre_linea_actual = normalizar_linea_comercial(nombre_linea_original)
-            
-            # También filtrar por canal de ventas
-            canal_ventas = sale.get('sales_channel_id')
-            if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                nombre_canal = canal_ventas[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                    continue
-            
-            # Procesar el balance de la venta
-            balance_float = float(sale.get('balance', 0))
-            if balance_float != 0:
-                
-                # Sumar a ventas totales por línea
-                if nombre_linea_actual:
-                    ventas_por_linea[nombre_linea_actual] = ventas_por_linea.get(nombre_linea_actual, 0) + balance_float
-                
-                # LÓGICA FINAL: Sumar si la RUTA (route_id) coincide con los valores especificados
-                ruta = sale.get('route_id')
-                # Se cambia la comparación al ID de la ruta (ruta[0]) para evitar problemas con traducciones.
-                if isinstance(ruta, list) and len(ruta) > 0 and ruta[0] in [18, 19]:
-                    if nombre_linea_actual:
-                        ventas_por_ruta[nombre_linea_actual] = ventas_por_ruta.get(nombre_linea_actual, 0) + balance_float
-                
-                # Sumar a ventas de productos nuevos (IPN) - Lógica restaurada
-                ciclo_vida = sale.get('product_life_cycle')
-                if ciclo_vida and ciclo_vida == 'nuevo':
-                    if nombre_linea_actual:
-                        ventas_ipn_por_linea[nombre_linea_actual] = ventas_ipn_por_linea.get(nombre_linea_actual, 0) + balance_float
-                
-                # Agrupar por producto para Top 7 (excluir GENVET, MARCA BLANCA y TERCEROS)
-                producto_nombre = sale.get('name', '').strip()
-                if producto_nombre and nombre_linea_actual not in ['GENVET', 'MARCA BLANCA', 'TERCEROS']:
-                    # Limpiar nombres de ATREVIA eliminando indicadores de tamaño/presentación
-                    producto_nombre_limpio = limpiar_nombre_atrevia(producto_nombre)
-                    ventas_por_producto[producto_nombre_limpio] = ventas_por_producto.get(producto_nombre_limpio, 0) + balance_float
-                    if producto_nombre_limpio not in ciclo_vida_por_producto:
-                        ciclo_vida_por_producto[producto_nombre_limpio] = ciclo_vida
-                
-                # Agrupar por ciclo de vida para el gráfico de dona
-                ciclo_vida_grafico = ciclo_vida if ciclo_vida else 'No definido'
-                ventas_por_ciclo_vida[ciclo_vida_grafico] = ventas_por_ciclo_vida.get(ciclo_vida_grafico, 0) + balance_float
-
-        print(f"💰 Ventas por línea comercial: {ventas_por_linea}")
-        print(f"📦 Ventas por Vencimiento (Ciclo de Vida): {ventas_por_ruta}")
-        print(f"✨ Ventas IPN (Productos Nuevos): {ventas_ipn_por_linea}")
-
-        # --- Procesamiento de datos para gráficos (después del bucle) ---
-
-        # 1. Procesar datos para la tabla principal
-        # Generar dinámicamente las líneas comerciales a partir de ventas y metas
-        all_lines = {}  # Usar un dict para evitar duplicados, con el id como clave
-
-        # Añadir líneas desde las ventas reales
-        for nombre_linea_venta in ventas_por_linea.keys():
-            linea_id = nombre_linea_venta.lower().replace(' ', '_')
-            all_lines[linea_id] = {'nombre': nombre_linea_venta.upper(), 'id': linea_id}
-
-        # Añadir líneas desde las metas (para aquellas que no tuvieron ventas)
-        # IMPORTANTE: Normalizar las claves de metas_del_mes a minúsculas para evitar duplicados
-        for linea_id_meta_raw in metas_del_mes.keys():
-            # Normalizar a minúsculas
-            linea_id_meta = linea_id_meta_raw.lower()
-            
-            # Convertir genvet a terceros si existe en las metas
-            if linea_id_meta == 'genvet':
-                linea_id_meta = 'terceros'
-            
-            if linea_id_meta not in all_lines:
-                # Reconstruir el nombre desde el ID de la meta
-                nombre_reconstruido = linea_id_meta.replace('_', ' ').upper()
-                all_lines[linea_id_meta] = {'nombre': nombre_reconstruido, 'id': linea_id_meta}
-        
-        # Convertir el diccionario de líneas a una lista ordenada por nombre
-        lineas_comerciales_dinamicas = sorted(all_lines.values(), key=lambda x: x['nombre'])
-
-        # Excluir líneas no deseadas que pueden venir de los datos
-        lineas_a_excluir = ['LICITACION', 'NINGUNO', 'ECOMMERCE', 'GENVET', 'MARCA BLANCA']
-        lineas_comerciales_filtradas = [
-            linea for linea in lineas_comerciales_dinamicas
-            if linea['nombre'].upper() not in lineas_a_excluir
-        ]
+    order_column = request.args.get('order[0][column]', type=int)
+    order_by = request.args.get(f'columns[{order_column}][data]') if order_column is not None else None
+    order_dir = request.args.get('order[0][dir]', 'desc')
 
-        # Pre-calcular la venta total para el cálculo de porcentajes
-        total_venta = sum(ventas_por_linea.values())
-        total_venta_calculado = total_venta # Renombrar para claridad en el bucle
-        
-        print(f"🔍 DEBUG: lineas_comerciales_filtradas = {[l['nombre'] for l in lineas_comerciales_filtradas]}")
-        print(f"🔍 DEBUG: total_venta = {total_venta}")
+    try:
+        page = data_manager.get_sales_lines_page(
+            offset=start,
+            limit=length,
+            order_by=order_by or 'invoice_date',
+            order_dir=order_dir,
+            date_from=request.args.get('date_from') or None,
+            date_to=request.args.get('date_to') or None,
+            search=request.args.get('search_term') or None
+        )
+    except Exception as e:
+        logger.error(f"❌ Error al obtener página de líneas de venta (start={start}): {e}", exc_info=True)
+        return jsonify({'error': 'No se pudieron consultar las líneas de venta en Odoo'}), 502
 
-        for linea in lineas_comerciales_filtradas:
-            meta = metas_del_mes.get(linea['id'], 0)
-            nombre_linea = linea['nombre'].upper()
-            
-            # Usar ventas reales de Odoo
-            venta = ventas_por_linea.get(nombre_linea, 0)
-            print(f"🔍 DEBUG BUCLE: {nombre_linea} - meta={meta}, venta={venta}")
-            
-            # Usar la meta IPN registrada por el usuario
-            meta_pn = metas_ipn_del_mes.get(linea['id'], 0)
-            venta_pn = ventas_ipn_por_linea.get(nombre_linea, 0) # Usar el cálculo real de ventas de productos nuevos
-            vencimiento = ventas_por_ruta.get(nombre_linea, 0) # Usamos el nuevo cálculo
-            
-            porcentaje_total = (venta / meta * 100) if meta > 0 else 0
-            porcentaje_pn = (venta_pn / meta_pn * 100) if meta_pn > 0 else 0
-            porcentaje_sobre_total = (venta / total_venta_calculado * 100) if total_venta_calculado > 0 else 0
+    return jsonify({
+        'draw': draw,
+        'recordsTotal': page['total'],
+        'recordsFiltered': page['total'],
+        'data': page['data']
+    })
 
-            datos_lineas.append({
-                'nombre': linea['nombre'],
-                'meta': meta,
-                'venta': venta, # Ahora es positivo
-                'porcentaje_total': porcentaje_total,
-                'porcentaje_sobre_total': porcentaje_sobre_total,
-                'meta_pn': meta_pn,
-                'venta_pn': venta_pn,
-                'porcentaje_pn': porcentaje_pn,
-                'vencimiento_6_meses': vencimiento
-            })
-            
-            # Los totales de metas ya se calcularon. Aquí solo sumamos los totales de ventas.
-            total_venta_pn += venta_pn
-            total_vencimiento += vencimiento
-        
-        # --- 2. Calcular KPIs ---
-        # Días laborables restantes (Lunes a Sábado)
-        dias_restantes = 0
-        ritmo_diario_requerido = 0
-        if mes_seleccionado == fecha_actual.strftime('%Y-%m'):
-            hoy = fecha_actual.day
-            ultimo_dia_mes = calendar.monthrange(año_seleccionado, fecha_actual.month)[1]
-            for dia in range(hoy, ultimo_dia_mes + 1):
-                # weekday() -> Lunes=0, Domingo=6
-                if datetime(año_seleccionado, fecha_actual.month, dia).weekday() < 6:
-                    dias_restantes += 1
-            
-            porcentaje_restante = 100 - ((total_venta / total_meta * 100) if total_meta > 0 else 100)
-            if porcentaje_restante > 0 and dias_restantes > 0:
-                ritmo_diario_requerido = porcentaje_restante / dias_restantes
+@app.route('/api/sales/by_month')
+def api_sales_by_month():
+    """
+    Series mensuales de ventas con comparación contra el año anterior.
 
-        # Calcular KPIs
-        kpis = {
-            'meta_total': total_meta,
-            'venta_total': total_venta,
-            'porcentaje_avance': (total_venta / total_meta * 100) if total_meta > 0 else 0,
-            'meta_ipn': total_meta_pn,
-            'venta_ipn': total_venta_pn,
-            'porcentaje_avance_ipn': (total_venta_pn / total_meta_pn * 100) if total_meta_pn > 0 else 0,
-            'vencimiento_6_meses': total_vencimiento,
-            'avance_diario_total': ((total_venta / total_meta * 100) / dia_actual) if total_meta > 0 and dia_actual > 0 else 0,
-            'avance_diario_ipn': ((total_venta_pn / total_meta_pn * 100) / dia_actual) if total_meta_pn > 0 and dia_actual > 0 else 0,
-            'ritmo_diario_requerido': ritmo_diario_requerido
-        }
+    Parámetros: date_to (YYYY-MM-DD, por defecto hoy), months (1-36, por defecto 12), linea_id.
+    """
+    if 'username' not in session:
+        return jsonify({'error': 'Sesión expirada'}), 401
 
-        # --- Avance lineal: proyección de cierre y faltante ---
-        # Proyección mensual lineal: proyectar ventas actuales al mes completo
+    date_to = request.args.get('date_to') or None
+    if date_to:
         try:
-            dias_en_mes = calendar.monthrange(int(año_sel), int(mes_sel))[1]
-        except Exception:
-            dias_en_mes = 30
+            datetime.strptime(date_to, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'date_to debe tener formato YYYY-MM-DD'}), 400
+    months = min(max(1, request.args.get('months', 12, type=int)), 36)
+
+    return jsonify(data_manager.get_sales_trend(
+        date_to=date_to, months=months, linea_id=request.args.get('linea_id', type=int)
+    ))
+
+def sales_feed_authorized():
+    """Sesión con permiso export_data, o token de servicio (Authorization: Bearer) de SALES_FEED_TOKENS."""
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        token = auth[len('Bearer '):].strip().encode('utf-8')
+        return any(hmac.compare_digest(token, t.encode('utf-8')) for t in SALES_FEED_TOKENS)
+    username = session.get('username')
+    return bool(username) and permissions_manager.has_permission(username, 'export_data')
 
-        if dia_actual > 0:
-            proyeccion_mensual = (total_venta / dia_actual) * dias_en_mes
-        else:
-            proyeccion_mensual = 0
+@app.route('/api/sales/changes')
+def api_sales_changes():
+    """
+    Feed incremental: facturas y notas de crédito modificadas desde un cursor, en NDJSON.
 
-        avance_lineal_pct = (proyeccion_mensual / total_meta * 100) if total_meta > 0 else 0
-        faltante_meta = max(total_meta - total_venta, 0)
+    Parámetros: cursor (X-Next-Cursor de la consulta anterior; vacío = desde el
+    inicio), nacional=1 para excluir VENTA INTERNACIONAL.
+    Cada línea del cuerpo es una factura con todas sus líneas de venta actuales
+    (lines=[] si se canceló). Páginas de SALES_FEED_PAGE_SIZE facturas; con
+    X-Has-More: true se pide de inmediato la siguiente con X-Next-Cursor.
+    """
+    if not sales_feed_authorized():
+        return jsonify({'error': 'No autorizado'}), 401
 
-        # Cálculos específicos para IPN (usando las variables ya calculadas)
-        # total_meta_pn ya está calculado arriba
-        # total_venta_pn ya está calculado arriba
-        
-        # Proyección lineal IPN
-        if dia_actual > 0:
-            promedio_diario_ipn = total_venta_pn / dia_actual
-            proyeccion_mensual_ipn = promedio_diario_ipn * dias_en_mes
-        else:
-            proyeccion_mensual_ipn = 0
+    cursor = request.args.get('cursor') or ''
+    try:
+        after = decode_cursor(cursor)
+    except ValueError:
+        return jsonify({'error': 'Cursor inválido'}), 400
 
-        avance_lineal_ipn_pct = (proyeccion_mensual_ipn / total_meta_pn * 100) if total_meta_pn > 0 else 0
-        faltante_meta_ipn = max(total_meta_pn - total_venta_pn, 0)
+    try:
+        page = data_manager.get_sales_changes(
+            after=after, limit=SALES_FEED_PAGE_SIZE, national_only=request.args.get('nacional') == '1'
+        )
+    except Exception as e:
+        logger.error(f"❌ Error en el feed de ventas (cursor={cursor!r}): {e}", exc_info=True)
+        return jsonify({'error': 'No se pudo consultar Odoo'}), 502
+
+    return Response(
+        iter_changes_ndjson(page['moves']),
+        mimetype='application/x-ndjson',
+        headers={
+            'X-Next-Cursor': encode_cursor(*page['next']) if page['next'] else '',
+            'X-Has-More': 'true' if page['has_more'] else 'false',
+            'Cache-Control': 'no-store',
+        }
+    )
 
-        
-        # 3. Ordenar productos para el gráfico Top 7
-        # Ordenar productos por ventas y tomar los top 7
-        productos_ordenados = sorted(ventas_por_producto.items(), key=lambda x: x[1], reverse=True)[:7]
-        
-        datos_productos = []
-        for nombre_producto, venta in productos_ordenados:
-            datos_productos.append({
-                'nombre': nombre_producto,
-                'venta': venta,
-                'ciclo_vida': ciclo_vida_por_producto.get(nombre_producto, 'No definido')
-            })
-        
-        print(f"🏆 Top 7 productos por ventas: {[p['nombre'] for p in datos_productos]}")
-        
-        # 4. Ordenar datos para el gráfico de Ciclo de Vida
-        # Convertir a lista ordenada por ventas
-        datos_ciclo_vida = []
-        for ciclo, venta in sorted(ventas_por_ciclo_vida.items(), key=lambda x: x[1], reverse=True):
-            datos_ciclo_vida.append({
-                'ciclo': ciclo,
-                'venta': venta
-            })
-        
-        print(f"📈 Ventas por Ciclo de Vida: {datos_ciclo_vida}")
-        
-        # --- INICIO: LÓGICA PARA LA TABLA DEL EQUIPO ECOMMERCE ---
-        datos_ecommerce = []
-        kpis_ecommerce = {'meta_total': 0, 'venta_total': 0, 'porcentaje_avance': 0}
+@app.route('/dashboard', methods=['GET', 'POST'])
+def dashboard():
+    """
+    Marco del dashboard mensual: encabezado, selectores de mes/día y contenedores.
 
-        # 1. Obtener miembros y metas del equipo ECOMMERCE
-        equipos_guardados = supabase_manager.read_equipos()        
-        ecommerce_vendor_ids = [str(vid) for vid in equipos_guardados.get('ecommerce', [])]
-        
-        if ecommerce_vendor_ids:
-            # 2. Obtener la meta total de ECOMMERCE desde las metas por línea
-            meta_ecommerce = metas_del_mes.get('ecommerce', 0)
-            kpis_ecommerce['meta_total'] = meta_ecommerce
-
-            # 3. Calcular ventas del equipo ECOMMERCE, agrupadas por LÍNEA COMERCIAL
-            ventas_por_linea_ecommerce = {}
-            for sale in sales_data:
-                user_info = sale.get('invoice_user_id')
-                if user_info and isinstance(user_info, list) and len(user_info) > 1:
-                    vendedor_id = str(user_info[0])
-                    # Si la venta pertenece a un vendedor de ECOMMERCE
-                    if vendedor_id in ecommerce_vendor_ids:
-                        balance = float(sale.get('balance', 0))
-                        
-                        # Agrupar por línea comercial con normalización
-                        linea_info = sale.get('commercial_line_national_id')
-                        linea_nombre = 'N/A'
-                        if linea_info and isinstance(linea_info, list) and len(linea_info) > 1:
-                            linea_nombre_original = linea_info[1].upper()
-                            # Aplicar normalización para agrupar GENVET y MARCA BLANCA como TERCEROS
-                            linea_nombre = normalizar_linea_comercial(linea_nombre_original)
-                        
-                        ventas_por_linea_ecommerce[linea_nombre] = ventas_por_linea_ecommerce.get(linea_nombre, 0) + balance
-
-            # 4. Construir la tabla de datos para la plantilla
-            for linea, venta in ventas_por_linea_ecommerce.items():
-                datos_ecommerce.append({
-                    'nombre': linea, # Ahora es el nombre de la línea comercial
-                    'venta': venta
-                })
-                kpis_ecommerce['venta_total'] += venta
-
-            # 5. Calcular el porcentaje de avance total del equipo
-            if kpis_ecommerce['meta_total'] > 0:
-                kpis_ecommerce['porcentaje_avance'] = (kpis_ecommerce['venta_total'] / kpis_ecommerce['meta_total']) * 100
-
-            # 6. Calcular el porcentaje de participación de cada línea sobre el total del equipo
-            if kpis_ecommerce['venta_total'] > 0:
-                for linea_data in datos_ecommerce:
-                    linea_data['porcentaje_sobre_total'] = (linea_data['venta'] / kpis_ecommerce['venta_total']) * 100
-            else:
-                for linea_data in datos_ecommerce:
-                    linea_data['porcentaje_sobre_total'] = 0
+    Los datos de cada widget (KPIs, tabla de líneas, Top productos, ciclo de vida,
+    ECOMMERCE y gráfico apilado) se cargan en paralelo desde /api/dashboard/<widget>,
+    así la página se muestra sin esperar a Odoo ni a Supabase.
+    """
+    if 'username' not in session:
+        return redirect(url_for('login'))
 
-            # Ordenar las líneas por venta descendente
-            datos_ecommerce = sorted(datos_ecommerce, key=lambda x: x['venta'], reverse=True)
+    username = session.get('username')
+    is_admin = permissions_manager.is_admin(username)
+    fecha_actual = datetime.now()
+    periodo = dashboard_period(
+        request.args.get('año'), request.args.get('mes'), request.args.get('dia_fin'), now=fecha_actual
+    )
 
-        # --- FIN: LÓGICA PARA LA TABLA DEL EQUIPO ECOMMERCE ---
+    return render_template('dashboard_clean.html',
+                         meses_disponibles=get_meses_del_año(periodo['año']),
+                         mes_seleccionado=periodo['mes'],
+                         mes_nombre=periodo['mes_nombre'],
+                         dia_actual=periodo['dia_actual'],
+                         # Años disponibles: desde 2025 hasta el año actual
+                         años_disponibles=list(range(2025, fecha_actual.year + 1)),
+                         año_seleccionado=periodo['año'],
+                         fecha_actual=fecha_actual,
+                         is_admin=is_admin) # Pasar el flag a la plantilla
 
-        # Ordenar los datos de la tabla por venta descendente
-        datos_lineas_tabla_sorted = sorted(datos_lineas, key=lambda x: x['venta'], reverse=True)
-        
-        print(f"🔍 DEBUG: datos_lineas tiene {len(datos_lineas)} elementos")
-        print(f"🔍 DEBUG: datos_lineas_tabla_sorted tiene {len(datos_lineas_tabla_sorted)} elementos")
-        if len(datos_lineas_tabla_sorted) > 0:
-            print(f"🔍 DEBUG: Primera línea: {datos_lineas_tabla_sorted[0]}")
 
-        return render_template('dashboard_clean.html',
-                             meses_disponibles=meses_disponibles,
-                             mes_seleccionado=mes_seleccionado,
-                             mes_nombre=mes_nombre,
-                             dia_actual=dia_actual,
-                             años_disponibles=años_disponibles,
-                             año_seleccionado=año_seleccionado,
-                             kpis=kpis,
-                             datos_lineas=datos_lineas, # Para gráficos, mantener el orden original (alfabético por nombre)
-                             datos_lineas_tabla=datos_lineas_tabla_sorted, # Para la tabla, usar los datos ordenados por venta
-                             datos_productos=datos_productos,
-                             datos_ciclo_vida=datos_ciclo_vida if 'datos_ciclo_vida' in locals() else [],
-                             fecha_actual=fecha_actual,
-                             avance_lineal_pct=avance_lineal_pct,
-                             faltante_meta=faltante_meta,
-                             avance_lineal_ipn_pct=avance_lineal_ipn_pct,
-                             faltante_meta_ipn=faltante_meta_ipn,
-                             datos_ecommerce=datos_ecommerce,
-                             kpis_ecommerce=kpis_ecommerce,
-                             is_admin=is_admin) # Pasar el flag a la plantilla
-    
+@app.route('/api/dashboard/<widget>')
+def api_dashboard_widget(widget):
+    """
+    Datos JSON de un widget de /dashboard (ver src/dashboard_widgets.py).
+
+    Parámetros: año, mes (YYYY-MM), dia_fin. Cada widget se cachea por separado.
+    """
+    if 'username' not in session:
+        return jsonify({'error': 'Sesión expirada'}), 401
+    if widget not in DASHBOARD_WIDGETS:
+        return jsonify({'error': f'Widget desconocido: {widget}'}), 404
+
+    periodo = dashboard_period(request.args.get('año'), request.args.get('mes'), request.args.get('dia_fin'))
+    try:
+        return jsonify(dashboard_widgets.widget(widget, periodo))
     except Exception as e:
-        # Log completo para debugging (solo en logs, no visible al usuario)
-        logger.error(f"Error al obtener datos del dashboard: {type(e).__name__}: {e}", exc_info=True)
-        
-        # Mensaje genérico para el usuario (sin exponer detalles técnicos)
-        flash('No se pudieron cargar los datos del dashboard. Por favor, intente nuevamente.', 'danger')
-        
-        # Crear datos por defecto para evitar errores
-        fecha_actual = datetime.now()
-        kpis_default = {
-            'meta_total': 0,
-            'venta_total': 0,
-            'porcentaje_avance': 0,
-            'meta_ipn': 0,
-            'venta_ipn': 0,
-            'porcentaje_avance_ipn': 0,
-            'vencimiento_6_meses': 0,
-            'avance_diario_total': 0,
-            'avance_diario_ipn': 0
-        }
-        
-        return render_template('dashboard_clean.html',
-                             meses_disponibles=[{
-                                 'key': fecha_actual.strftime('%Y-%m'),
-                                 'nombre': f"{fecha_actual.strftime('%B')} {fecha_actual.year}"
-                             }],
-                             mes_seleccionado=fecha_actual.strftime('%Y-%m'),
-                             mes_nombre=f"{fecha_actual.strftime('%B').upper()} {fecha_actual.year}",
-                             dia_actual=fecha_actual.day,
-                             años_disponibles=list(range(2025, fecha_actual.year + 1)),
-                             año_seleccionado=fecha_actual.year,
-                             kpis=kpis_default,
-                             datos_lineas=[], # Se mantiene vacío en caso de error
-                             datos_lineas_tabla=[],
-                             datos_productos=[],
-                             datos_ciclo_vida=[],
-                             fecha_actual=fecha_actual,
-                             avance_lineal_pct=0,
-                             faltante_meta=0,
-                             datos_ecommerce=[],
-                             kpis_ecommerce={},
-                             is_admin=is_admin) # Pasar el flag a la plantilla
+        logger.error(f"Error cargando el widget {widget} del dashboard: {type(e).__name__}: {e}", exc_info=True)
+        return jsonify({'error': 'No se pudieron cargar los datos del widget'}), 502
 
 
 @app.route('/dashboard_linea')
@@ -1645,99 +1408,47 @@ def dashboard_linea():
             ultimo_dia = calendar.monthrange(int(año_sel), int(mes_sel))[1]
             fecha_fin = f"{año_sel}-{mes_sel}-{ultimo_dia}"
 
+        # Metas, equipos y vendedores (Supabase/Odoo) y ventas del mes son independientes:
+        # se piden a la vez. Si falla una fuente secundaria la página sale sin ese dato;
+        # sin ventas no hay dashboard.
+        cargas = ConcurrentLoader(timeout_seconds=SUPABASE_LOAD_TIMEOUT)
+        # Metas solo del mes (y, las de vendedores, de la línea) que se muestra
+        cargas.submit('metas_vendedores', supabase_manager.read_metas, mes_desde=mes_seleccionado,
+                      mes_hasta=mes_seleccionado, linea_comercial=linea_seleccionada_id, default={})
+        cargas.submit('metas_por_linea', supabase_manager.read_metas_por_linea, mes_desde=mes_seleccionado,
+                      mes_hasta=mes_seleccionado, default={})
+        cargas.submit('equipos', supabase_manager.read_equipos, default={})
+        cargas.submit('vendedores', data_manager.get_all_sellers, default=[], timeout=ODOO_LOAD_TIMEOUT)
+        # Totales de todas las líneas del periodo (en caché: cambiar de línea no consulta Odoo)
+        cargas.submit('ventas', dashboard_widgets.agregados_por_linea, fecha_inicio, fecha_fin,
+                      required=True, timeout=ODOO_LOAD_TIMEOUT)
+
         # Cargar metas de vendedores para el mes y línea seleccionados
         # La estructura es metas[equipo_id][vendedor_id][mes_key]
-        metas_vendedores_historicas_raw = supabase_manager.read_metas()
+        metas_vendedores_historicas_raw = cargas.result('metas_vendedores')
         # Normalizar las claves de equipo_id a minúsculas para que coincidan con linea_seleccionada_id
         metas_vendedores_historicas = {k.lower(): v for k, v in metas_vendedores_historicas_raw.items()}
         # 1. Obtener todas las metas del equipo/línea
         metas_del_equipo = metas_vendedores_historicas.get(linea_seleccionada_id, {})
 
         # Obtener todos los vendedores de Odoo
-        todos_los_vendedores = {str(v['id']): v['name'] for v in data_manager.get_all_sellers()}
+        todos_los_vendedores = {str(v['id']): v['name'] for v in cargas.result('vendedores')}
 
-        # Obtener ventas del mes
-        sales_data = data_manager.get_sales_lines(
-            date_from=fecha_inicio,
-            date_to=fecha_fin,
-            limit=10000
-        )
-
-        # --- PRE-FILTRAR VENTAS INTERNACIONALES PARA EFICIENCIA ---
-        sales_data_processed = []
-        for sale in sales_data:
-            # Excluir VENTA INTERNACIONAL (exportaciones) por línea comercial
-            linea_comercial = sale.get('commercial_line_national_id')
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                if 'VENTA INTERNACIONAL' in linea_comercial[1].upper():
-                    continue
-            
-            # Excluir VENTA INTERNACIONAL por canal de ventas
-            canal_ventas = sale.get('sales_channel_id')
-            if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                nombre_canal = canal_ventas[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                    continue
-            
-            sales_data_processed.append(sale)
+        agregados_lineas = cargas.result('ventas')
 
         # --- 3. PROCESAR Y AGREGAR DATOS POR VENDEDOR ---
-        ventas_por_vendedor = {}
-        ventas_ipn_por_vendedor = {}
-        ventas_vencimiento_por_vendedor = {}
-        ventas_por_producto = {}
-        ventas_por_ciclo_vida = {}
-        ventas_por_forma = {}
-        ajustes_sin_vendedor = 0 # Para notas de crédito sin vendedor
-        nombres_vendedores_con_ventas = {} # BUGFIX: Guardar nombres de vendedores con ventas
-
-        for sale in sales_data_processed: # Usar los datos pre-filtrados
-            linea_comercial = sale.get('commercial_line_national_id')
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                nombre_linea_original = linea_comercial[1].upper()
-                # Aplicar normalización para agrupar GENVET y MARCA BLANCA como TERCEROS
-                nombre_linea_actual = normalizar_linea_comercial(nombre_linea_original)
-
-                # Filtrar por la línea comercial seleccionada
-                if nombre_linea_actual == linea_seleccionada_nombre.upper():
-                    balance = float(sale.get('balance', 0))
-                    user_info = sale.get('invoice_user_id')
-
-                    # Si hay un vendedor asignado, se procesa normalmente
-                    if user_info and isinstance(user_info, list) and len(user_info) > 1:
-                        vendedor_id = str(user_info[0])
-                        nombres_vendedores_con_ventas[vendedor_id] = user_info[1] # Guardar el nombre
-
-                        # Agrupar ventas totales
-                        ventas_por_vendedor[vendedor_id] = ventas_por_vendedor.get(vendedor_id, 0) + balance
-
-                        # Agrupar ventas IPN
-                        if sale.get('product_life_cycle') == 'nuevo':
-                            ventas_ipn_por_vendedor[vendedor_id] = ventas_ipn_por_vendedor.get(vendedor_id, 0) + balance
-                        
-                        # Agrupar ventas por vencimiento < 6 meses
-                        ruta = sale.get('route_id')
-                        if isinstance(ruta, list) and len(ruta) > 0 and ruta[0] in [18, 19]:
-                            ventas_vencimiento_por_vendedor[vendedor_id] = ventas_vencimiento_por_vendedor.get(vendedor_id, 0) + balance
-                    
-                    # Si NO hay vendedor, se agrupa como un ajuste (ej. Nota de Crédito)
-                    else:
-                        ajustes_sin_vendedor += balance
-
-                    # Agrupar para gráficos (Top Productos, Ciclo Vida, Forma Farmacéutica)
-                    # Esto se hace para todas las transacciones de la línea, con o sin vendedor
-                    producto_nombre = sale.get('name', '').strip()
-                    if producto_nombre:
-                        # Limpiar nombres de ATREVIA eliminando indicadores de tamaño/presentación
-                        producto_nombre_limpio = limpiar_nombre_atrevia(producto_nombre)
-                        ventas_por_producto[producto_nombre_limpio] = ventas_por_producto.get(producto_nombre_limpio, 0) + balance
-
-                    ciclo_vida = sale.get('product_life_cycle', 'No definido')
-                    ventas_por_ciclo_vida[ciclo_vida] = ventas_por_ciclo_vida.get(ciclo_vida, 0) + balance
-
-                    forma_farma = sale.get('pharmaceutical_forms_id')
-                    nombre_forma = forma_farma[1] if forma_farma and len(forma_farma) > 1 else 'Instrumental'
-                    ventas_por_forma[nombre_forma] = ventas_por_forma.get(nombre_forma, 0) + balance
+        # Totales por vendedor, producto, ciclo de vida y forma farmacéutica (sin VENTA
+        # INTERNACIONAL) ya calculados para todas las líneas; se toma la seleccionada.
+        totales_linea = (agregados_lineas['por_linea'].get(linea_seleccionada_nombre.upper())
+                         or empty_linea_totals())
+        ventas_por_vendedor = totales_linea['ventas_por_vendedor']
+        ventas_ipn_por_vendedor = totales_linea['ventas_ipn_por_vendedor']
+        ventas_vencimiento_por_vendedor = totales_linea['ventas_vencimiento_por_vendedor']
+        ventas_por_producto = totales_linea['ventas_por_producto']
+        ventas_por_ciclo_vida = totales_linea['ventas_por_ciclo_vida']
+        ventas_por_forma = totales_linea['ventas_por_forma']
+        ajustes_sin_vendedor = totales_linea['ajustes_sin_vendedor'] # Para notas de crédito sin vendedor
+        nombres_vendedores_con_ventas = totales_linea['nombres_vendedores']
 
         # --- 4. CONSTRUIR ESTRUCTURA DE DATOS PARA LA PLANTILLA ---
         datos_vendedores = []
@@ -1751,7 +1462,7 @@ def dashboard_linea():
         # Combinar los vendedores oficiales del equipo con los que tuvieron ventas reales en la línea.
         # Esto asegura que mostremos a todos los miembros del equipo (incluso con 0 ventas)
         # y también a cualquier otra persona que haya vendido en esta línea sin ser miembro oficial.
-        equipos_guardados = supabase_manager.read_equipos()
+        equipos_guardados = cargas.result('equipos')
         miembros_oficiales_ids = {str(vid) for vid in equipos_guardados.get(linea_seleccionada_id, [])}
         vendedores_con_ventas_ids = set(ventas_por_vendedor.keys())
         
@@ -1890,21 +1601,15 @@ def dashboard_linea():
         # Replicar la misma lógica del dashboard principal para consistencia.
         
         # 1. Obtener metas del mes para incluir líneas con metas pero sin ventas.
-        metas_historicas = supabase_manager.read_metas_por_linea()
+        metas_historicas = cargas.result('metas_por_linea')
         metas_del_mes = metas_historicas.get(mes_seleccionado, {}).get('metas', {})
         
         # 2. Unificar líneas desde ventas y metas.
         all_lines_dict = {}
 
-        # Desde ventas (aplicando normalización)
-        for sale in sales_data_processed: # Usar datos ya filtrados de ventas internacionales
-            linea_obj = sale.get('commercial_line_national_id')
-            if linea_obj and isinstance(linea_obj, list) and len(linea_obj) > 1:
-                linea_nombre_original = linea_obj[1].upper()
-                # Aplicar normalización para agrupar GENVET y MARCA BLANCA como TERCEROS
-                linea_nombre = normalizar_linea_comercial(linea_nombre_original)
-                if linea_nombre not in all_lines_dict:
-                    all_lines_dict[linea_nombre] = linea_nombre
+        # Desde ventas (ya normalizadas y sin ventas internacionales)
+        for linea_nombre in agregados_lineas['lineas_con_ventas']:
+            all_lines_dict[linea_nombre] = linea_nombre
 
         # Desde metas
         for linea_id_meta in metas_del_mes.keys():
@@ -1916,6 +1621,9 @@ def dashboard_linea():
         lineas_a_excluir = ['LICITACION', 'NINGUNO', 'ECOMMERCE', 'VENTA INTERNACIONAL']
         lineas_disponibles = sorted([nombre for nombre in all_lines_dict.values() if nombre not in lineas_a_excluir])
         # --- FIN DE LA LÓGICA MEJORADA ---
+        if cargas.errors:
+            flash('Algunos datos no se pudieron cargar (' + ', '.join(sorted(cargas.errors)) +
+                  '). Se muestran datos parciales.', 'warning')
         return render_template('dashboard_linea.html',
                                linea_nombre=linea_seleccionada_nombre,
                                mes_seleccionado=mes_seleccionado,
@@ -2076,14 +1784,16 @@ def meta():
                 }
             }
             supabase_manager.write_metas_por_linea(metas_solo_mes_actual)
+            dashboard_widgets.invalidate()
             
             flash(f'Metas guardadas exitosamente para {mes_nombre_formulario}. Total: S/ {total_meta:,.0f}', 'success')
             
             # Actualizar mes seleccionado después de guardar
             mes_seleccionado = mes_formulario
         
-        # Obtener todas las metas históricas
-        metas_historicas = supabase_manager.read_metas_por_linea()
+        # Metas de los meses del selector (año actual) y del mes seleccionado
+        meses_mostrados = [m['key'] for m in meses_año] + [mes_seleccionado]
+        metas_historicas = supabase_manager.read_metas_por_linea(min(meses_mostrados), max(meses_mostrados))
         
         # Obtener metas y total del mes seleccionado
         metas_mes_seleccionado = metas_historicas.get(mes_seleccionado, {})
@@ -2159,77 +1869,76 @@ def export_excel_sales():
     
     try:
         # Obtener filtros de la URL
-        date_from = request.args.get('date_from')
-        date_to = request.args.get('date_to')
-        linea_id = request.args.get('linea_id')
-        partner_id = request.args.get('partner_id')
-        
-        # Convertir a tipos apropiados
-        if linea_id:
-            try:
-                linea_id = int(linea_id)
-            except (ValueError, TypeError):
-                linea_id = None
-        
-        if partner_id:
-            try:
-                partner_id = int(partner_id)
-            except (ValueError, TypeError):
-                partner_id = None
-        
-        # Obtener datos
-        sales_data = data_manager.get_sales_lines(
-            date_from=date_from,
-            date_to=date_to,
-            partner_id=partner_id,
-            linea_id=linea_id,
-            limit=10000  # Más datos para export
-        )
-        
-        # Filtrar VENTA INTERNACIONAL (exportaciones)
-        sales_data_filtered = []
-        for sale in sales_data:
-            linea_comercial = sale.get('commercial_line_national_id')
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                nombre_linea = linea_comercial[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_linea:
-                    continue
-            
-            # También filtrar por canal de ventas
-            canal_ventas = sale.get('sales_channel_id')
-            if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                nombre_canal = canal_ventas[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                    continue
-            
-            sales_data_filtered.append(sale)
-        
-        # Crear DataFrame
-        df = pd.DataFrame(sales_data_filtered)
-        
-        # Crear archivo Excel en memoria
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Ventas', index=False)
-        
-        output.seek(0)
-        
+        params = export_sales_params(request.args)
+
         # Generar nombre de archivo con timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f'ventas_farmaceuticas_{timestamp}.xlsx'
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+
+        # background=1: se encola y la página consulta el progreso (ver /api/export/jobs/<id>)
+        if request.args.get('background') == '1':
+            job = export_jobs.submit('ventas', params, export_job_runner(export_ventas_spec, params), filename)
+            return jsonify(export_job_json(job)), 202
+
+        rows, columns, hoja, estilo = export_ventas_spec(params)
+        output, _ = build_xlsx(rows, columns, hoja, header_style=estilo)
+        return file_download(output, filename)
         
     except Exception as e:
         logger.error(f"Error al exportar datos: {e}", exc_info=True)
         flash('Error al exportar los datos. Verifique los filtros e intente nuevamente.', 'danger')
         return redirect(url_for('sales'))
 
+@app.route('/export/sales/<formato>')
+def export_sales_format(formato):
+    """
+    Exporta las líneas de venta de los filtros de /sales en CSV, NDJSON o Parquet.
+
+    Mismas columnas (traducidas y en el mismo orden) que /export/dashboard/details.
+    CSV y NDJSON se envían a medida que se leen las líneas; Parquet (requiere
+    pyarrow) se arma por grupos de filas en un archivo temporal.
+    """
+    if 'username' not in session:
+        return redirect(url_for('login'))
+
+    # --- Verificación de Permisos ---
+    username = session.get('username')
+    if not permissions_manager.has_permission(username, 'export_data'):
+        flash('No tienes permiso para exportar datos.', 'warning')
+        return redirect(url_for('sales'))
+    # --- Fin Verificación ---
+
+    if formato not in EXPORT_FORMATS:
+        return jsonify({'error': f'Formato no soportado: {formato}'}), 404
+    if formato == 'parquet' and not PYARROW_AVAILABLE:
+        flash('La exportación a Parquet no está disponible en este servidor.', 'warning')
+        return redirect(url_for('sales'))
+
+    try:
+        params = export_sales_params(request.args)
+        mimetype, extension = EXPORT_FORMATS[formato]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f'ventas_farmaceuticas_{timestamp}.{extension}'
+
+        # Leer la primera línea antes de responder: si Odoo falla se informa con flash
+        sales_rows = export_sales_rows(params)
+        primera = next(sales_rows, None)
+        if primera is not None:
+            sales_rows = itertools.chain([primera], sales_rows)
+
+        if formato == 'parquet':
+            output, _ = build_parquet(sales_rows, DETALLE_COLUMNS)
+            return file_download(output, filename, mimetype)
+
+        chunks = iter_csv(sales_rows, DETALLE_COLUMNS) if formato == 'csv' else iter_ndjson(sales_rows, DETALLE_COLUMNS)
+        return Response(chunks, mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+    except Exception as e:
+        logger.error(f"Error al exportar ventas en {formato}: {e}", exc_info=True)
+        flash('Error al exportar los datos. Verifique los filtros e intente nuevamente.', 'danger')
+        return redirect(url_for('sales'))
+
 @app.route('/metas_vendedor', methods=['GET', 'POST'])
 def metas_vendedor():
     if 'username' not in session:
@@ -2286,6 +1995,7 @@ def metas_vendedor():
                 else:
                     equipos_guardados[equipo['id']] = []
         supabase_manager.write_equipos(equipos_guardados, todos_los_vendedores_para_guardar)
+        dashboard_widgets.invalidate()
 
         # --- 2. GUARDAR SOLO LAS METAS DEL MES SELECCIONADO ---
         # Crear estructura nueva solo con el mes actual, no cargar el histórico completo
@@ -2361,8 +2071,8 @@ def metas_vendedor():
             'vendedores': sorted(vendedores_de_equipo, key=lambda v: v['name']) # Para la tabla
         })
 
-    # Para la vista, pasamos todas las metas cargadas
-    metas_guardadas = supabase_manager.read_metas()
+    # Para la vista, las metas de los meses disponibles (año actual)
+    metas_guardadas = supabase_manager.read_metas(meses_disponibles[0]['key'], meses_disponibles[-1]['key'])
 
     return render_template('metas_vendedor.html',
                            meses_disponibles=meses_disponibles,
@@ -2407,159 +2117,22 @@ def export_dashboard_details():
             ultimo_dia = calendar.monthrange(int(año_sel), int(mes_sel))[1]
             fecha_fin = f"{año_sel}-{mes_sel}-{ultimo_dia}"
 
-        # Obtener datos de ventas reales desde Odoo para ese mes
-        sales_data = data_manager.get_sales_lines(
-            date_from=fecha_inicio,
-            date_to=fecha_fin,
-            limit=10000  # Límite alto para exportación
-        )
-
-        # Filtrar VENTA INTERNACIONAL (exportaciones), igual que en el dashboard
-        sales_data_filtered = []
-        for sale in sales_data:
-            linea_comercial = sale.get('commercial_line_national_id')
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                if 'VENTA INTERNACIONAL' in linea_comercial[1].upper():
-                    continue
-            
-            canal_ventas = sale.get('sales_channel_id')
-            if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                nombre_canal = canal_ventas[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                    continue
-            
-            sales_data_filtered.append(sale)
-
-        # --- Procesar datos para un formato legible en Excel ---
-        processed_for_excel = []
-        for record in sales_data_filtered:
-            processed_record = {}
-            for key, value in record.items():
-                # Si el valor es una lista como [id, 'nombre'], extrae solo el nombre
-                if isinstance(value, list) and len(value) > 1:
-                    processed_record[key] = value[1]
-                else:
-                    processed_record[key] = value
-            
-            # Asegurar que el balance sea un número para el formato de moneda
-            if 'balance' in processed_record:
-                try:
-                    processed_record['balance'] = float(processed_record['balance'])
-                except (ValueError, TypeError):
-                    processed_record['balance'] = 0.0
-            
-            processed_for_excel.append(processed_record)
-
-        # Crear DataFrame de Pandas con los datos ya procesados
-        df = pd.DataFrame(processed_for_excel)
-
-        # --- TRADUCCIÓN Y ORDEN DE COLUMNAS ---
-        column_translations = {
-            'invoice_date': 'Fecha Factura',
-            'l10n_latam_document_type_id': 'Tipo Documento',
-            'move_name': 'Número Documento',
-            'partner_name': 'Cliente',
-            'vat': 'RUC/DNI Cliente',
-            'invoice_user_id': 'Vendedor',
-            'default_code': 'Código Producto',
-            'name': 'Descripción Producto',
-            'quantity': 'Cantidad',
-            'price_unit': 'Precio Unitario',
-            'balance': 'Importe Total',
-            'commercial_line_national_id': 'Línea Comercial',
-            'sales_channel_id': 'Canal de Venta',
-            'payment_state': 'Estado de Pago',
-            'invoice_origin': 'Documento Origen',
-            'product_life_cycle': 'Ciclo de Vida Producto',
-            'pharmacological_classification_id': 'Clasificación Farmacológica',
-            'pharmaceutical_forms_id': 'Forma Farmacéutica',
-            'administration_way_id': 'Vía de Administración',
-            'production_line_id': 'Línea de Producción',
-            'categ_id': 'Categoría de Producto',
-            'route_id': 'Ruta de Venta'
-        }
-
-        # Filtrar el DataFrame para mantener solo las columnas que vamos a usar
-        df = df[list(column_translations.keys())]
-
-        # Renombrar las columnas
-        df.rename(columns=column_translations, inplace=True)
-        
-        # El orden de las columnas en el Excel será el mismo que en el diccionario
-        # --- FIN DE TRADUCCIÓN Y ORDEN ---
-
-        # --- Creación y Formateo del Archivo Excel ---
-        # Crear archivo Excel en memoria
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            sheet_name = f'Detalle Ventas {mes_seleccionado}'
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-            # Obtener el workbook y la worksheet para aplicar estilos
-            workbook = writer.book
-            worksheet = writer.sheets[sheet_name]
-
-            # --- Definir Estilos ---
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="875A7B", end_color="875A7B", fill_type="solid")
-            currency_format = 'S/ #,##0.00;[Red]-S/ #,##0.00'
-            date_format = 'YYYY-MM-DD'
-            number_format = '#,##0'
-
-            # --- Aplicar Estilos al Encabezado ---
-            for cell in worksheet[1]:
-                cell.font = header_font
-                cell.fill = header_fill
-
-            # --- Aplicar Formato a Columnas y Ajustar Ancho ---
-            for col_idx, column in enumerate(df.columns, 1):
-                col_letter = get_column_letter(col_idx)
-                max_length = 0
-                
-                # Encontrar el ancho máximo
-                if len(df[column]) > 0:
-                    max_length = max(df[column].astype(str).map(len).max(), len(column)) + 2
-                else:
-                    max_length = len(column) + 2
-                
-                worksheet.column_dimensions[col_letter].width = max_length
-
-                # Aplicar formato a celdas específicas
-                if column.lower() == 'balance':
-                    for cell in worksheet[col_letter][1:]:
-                        cell.number_format = currency_format
-                elif column.lower() == 'price_unit':
-                    for cell in worksheet[col_letter][1:]:
-                        cell.number_format = currency_format
-                elif column.lower() == 'quantity':
-                    for cell in worksheet[col_letter][1:]:
-                        cell.number_format = number_format
-                elif 'date' in column.lower():
-                    for cell in worksheet[col_letter][1:]:
-                        # Convertir texto a objeto datetime si es necesario
-                        if isinstance(cell.value, str):
-                            try:
-                                cell.value = datetime.strptime(cell.value, '%Y-%m-%d')
-                            except ValueError:
-                                pass # Dejar como texto si no se puede convertir
-                        cell.number_format = date_format
-
-            # --- Congelar Panel Superior ---
-            worksheet.freeze_panes = 'A2'
-
-        # Mover el cursor al inicio del stream para enviarlo
-        output.seek(0)
-        # --- Fin del Formateo ---
+        params = {'mes': mes_seleccionado, 'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin}
 
         # Generar nombre de archivo
         filename = f'detalle_ventas_{mes_seleccionado}.xlsx'
 
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        # background=1: se encola y la página consulta el progreso (ver /api/export/jobs/<id>)
+        if request.args.get('background') == '1':
+            job = export_jobs.submit('detalle', params, export_job_runner(export_detalle_spec, params), filename)
+            return jsonify(export_job_json(job)), 202
+
+        # Ventas del mes por páginas, escritas directo al Excel
+        rows, columns, hoja, estilo = export_detalle_spec(params)
+        output, filas = build_xlsx(rows, columns, hoja, header_style=estilo)
+        logger.info(f"📤 Exportación de detalle {mes_seleccionado}: {filas} líneas")
+
+        return file_download(output, filename)
 
     except Exception as e:
         logger.error(f"Error al exportar detalles del dashboard: {e}", exc_info=True)
@@ -2567,6 +2140,50 @@ def export_dashboard_details():
         return redirect(url_for('dashboard'))
 
 
+def export_job_json(job):
+    """Estado de un trabajo de exportación para la página (con la URL de descarga si está listo)."""
+    return {
+        'id': job['id'],
+        'estado': job['estado'],
+        'filas': job['filas'],
+        'max_filas': EXPORT_JOB_MAX_ROWS,
+        # El archivo llegó al máximo: puede faltar información, la página lo avisa
+        'truncado': job['estado'] == 'listo' and job['filas'] >= EXPORT_JOB_MAX_ROWS,
+        'archivo': job['archivo'],
+        'error': job['error'],
+        'descarga': url_for('export_job_download', job_id=job['id']) if job['estado'] == 'listo' else None,
+    }
+
+
+@app.route('/api/export/jobs/<job_id>')
+def export_job_status(job_id):
+    """Progreso de una exportación en segundo plano (la página lo consulta cada pocos segundos)."""
+    if 'username' not in session:
+        return jsonify({'error': 'Sesión expirada'}), 401
+    if not permissions_manager.has_permission(session.get('username'), 'export_data'):
+        return jsonify({'error': 'Sin permiso para exportar'}), 403
+    job = export_jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Exportación no encontrada o expirada'}), 404
+    return jsonify(export_job_json(job))
+
+
+@app.route('/export/jobs/<job_id>/download')
+def export_job_download(job_id):
+    """Descarga el archivo de una exportación en segundo plano terminada."""
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    if not permissions_manager.has_permission(session.get('username'), 'export_data'):
+        flash('No tienes permiso para exportar datos.', 'warning')
+        return redirect(url_for('dashboard'))
+    download = export_jobs.open_file(job_id)
+    if download is None:
+        flash('La exportación no está disponible o ya expiró. Vuelva a generarla.', 'warning')
+        return redirect(url_for('dashboard'))
+    archivo, nombre = download
+    return send_file(archivo, as_attachment=True, download_name=nombre, mimetype=XLSX_MIMETYPE)
+
+
 # --- Ruta de Analytics ---
 @app.route('/analytics')
 def analytics():
@@ -0,0 +1,187 @@
+"""
+benchmark_dashboard_aggregation.py - Compara la agregación de KPIs en bucle vs pandas
+
+Genera líneas de venta sintéticas (10k y 100k por defecto) con la forma que
+retorna OdooManager.get_sales_lines y mide:
+
+- Bucle original de /dashboard_linea (dict por vendedor, producto, ciclo y forma)
+- Versión vectorizada de src/sales_aggregation.py (DataFrame + group-bys)
+
+También verifica que ambos calculen los mismos totales.
+
+Uso:
+    python benchmark_dashboard_aggregation.py [n_lineas ...]
+"""
+
+import random
+import sys
+import time
+
+from src.sales_aggregation import (
+    sales_lines_to_frame, add_dashboard_columns, dashboard_totals, linea_totals
+)
+from src.utils import normalizar_linea_comercial, limpiar_nombre_atrevia
+
+LINEAS = ['PETMEDICA', 'AGROVET', 'PET NUTRISCIENCE', 'AVIVET', 'OTROS', 'GENVET', 'MARCA BLANCA',
+          'INTERPET', 'VENTA INTERNACIONAL']
+FORMAS = ['Tableta', 'Inyectable', 'Suspensión', None]
+CICLOS = ['nuevo', 'maduro', 'declive', False]
+
+
+def generar_lineas(n, seed=42):
+    """Líneas de venta sintéticas con ~300 productos y ~40 vendedores."""
+    rnd = random.Random(seed)
+    productos = [f'PRODUCTO {i} {rnd.choice(["MEDIUM", "LARGE", "50 ML"])}' for i in range(300)]
+    lineas = []
+    for _ in range(n):
+        user = rnd.randint(1, 40)
+        ruta = rnd.choice([18, 19, 5, None, None])
+        forma = rnd.choice(FORMAS)
+        lineas.append({
+            'commercial_line_national_id': [1, rnd.choice(LINEAS)],
+            'sales_channel_id': [1, 'NACIONAL'],
+            'name': rnd.choice(productos),
+            'balance': round(rnd.uniform(-50, 500), 2),
+            'invoice_user_id': [user, f'Vendedor {user}'] if user % 10 else False,
+            'product_life_cycle': rnd.choice(CICLOS),
+            'route_id': [ruta, 'Ruta'] if ruta else False,
+            'pharmaceutical_forms_id': [1, forma] if forma else False,
+        })
+    return lineas
+
+
+def bucle_linea(sales_data, linea_seleccionada):
+    """Bucle original de /dashboard_linea (con filtro de ventas internacionales)."""
+    ventas_por_vendedor, ventas_ipn, ventas_venc = {}, {}, {}
+    ventas_por_producto, ventas_por_ciclo_vida, ventas_por_forma = {}, {}, {}
+    ajustes = 0
+    for sale in sales_data:
+        linea = sale.get('commercial_line_national_id')
+        if not (linea and isinstance(linea, list) and len(linea) > 1):
+            continue
+        if 'VENTA INTERNACIONAL' in linea[1].upper():
+            continue
+        if normalizar_linea_comercial(linea[1].upper()) != linea_seleccionada:
+            continue
+        balance = float(sale.get('balance', 0))
+        user = sale.get('invoice_user_id')
+        if user and isinstance(user, list) and len(user) > 1:
+            vid = str(user[0])
+            ventas_por_vendedor[vid] = ventas_por_vendedor.get(vid, 0) + balance
+            if sale.get('product_life_cycle') == 'nuevo':
+                ventas_ipn[vid] = ventas_ipn.get(vid, 0) + balance
+            ruta = sale.get('route_id')
+            if isinstance(ruta, list) and ruta and ruta[0] in [18, 19]:
+                ventas_venc[vid] = ventas_venc.get(vid, 0) + balance
+        else:
+            ajustes += balance
+        nombre = sale.get('name', '').strip()
+        if nombre:
+            nombre = limpiar_nombre_atrevia(nombre)
+            ventas_por_producto[nombre] = ventas_por_producto.get(nombre, 0) + balance
+        ciclo = sale.get('product_life_cycle') or 'No definido'
+        ventas_por_ciclo_vida[ciclo] = ventas_por_ciclo_vida.get(ciclo, 0) + balance
+        forma = sale.get('pharmaceutical_forms_id')
+        forma = forma[1] if forma and len(forma) > 1 else 'Instrumental'
+        ventas_por_forma[forma] = ventas_por_forma.get(forma, 0) + balance
+    return {
+        'ventas_por_vendedor': ventas_por_vendedor, 'ventas_ipn_por_vendedor': ventas_ipn,
+        'ventas_vencimiento_por_vendedor': ventas_venc, 'ajustes_sin_vendedor': ajustes,
+        'ventas_por_producto': ventas_por_producto, 'ventas_por_ciclo_vida': ventas_por_ciclo_vida,
+        'ventas_por_forma': ventas_por_forma,
+    }
+
+
+def bucle_dashboard(sales_data, ecommerce_ids):
+    """Bucle original de /dashboard sobre líneas de detalle (ventas por línea, ruta, IPN y Top productos)."""
+    ventas_por_linea, ventas_por_ruta, ventas_ipn, ventas_por_producto, ventas_ecommerce = {}, {}, {}, {}, {}
+    for sale in sales_data:
+        linea = sale.get('commercial_line_national_id')
+        nombre_linea = linea[1].upper() if isinstance(linea, list) and len(linea) > 1 else None
+        if nombre_linea and 'VENTA INTERNACIONAL' in nombre_linea:
+            continue
+        nombre_linea = normalizar_linea_comercial(nombre_linea) if nombre_linea else None
+        balance = float(sale.get('balance', 0) or 0)
+        user = sale.get('invoice_user_id')
+        if isinstance(user, list) and user and user[0] in ecommerce_ids:
+            clave = nombre_linea or 'N/A'
+            ventas_ecommerce[clave] = ventas_ecommerce.get(clave, 0) + balance
+        if balance == 0:
+            continue
+        if nombre_linea:
+            ventas_por_linea[nombre_linea] = ventas_por_linea.get(nombre_linea, 0) + balance
+            ruta = sale.get('route_id')
+            if isinstance(ruta, list) and ruta and ruta[0] in [18, 19]:
+                ventas_por_ruta[nombre_linea] = ventas_por_ruta.get(nombre_linea, 0) + balance
+            if sale.get('product_life_cycle') == 'nuevo':
+                ventas_ipn[nombre_linea] = ventas_ipn.get(nombre_linea, 0) + balance
+        producto = (sale.get('name') or '').strip()
+        if producto and nombre_linea not in ['GENVET', 'MARCA BLANCA', 'TERCEROS']:
+            producto = limpiar_nombre_atrevia(producto)
+            ventas_por_producto[producto] = ventas_por_producto.get(producto, 0) + balance
+    return {
+        'ventas_por_linea': ventas_por_linea, 'ventas_por_ruta': ventas_por_ruta,
+        'ventas_ipn_por_linea': ventas_ipn, 'ventas_por_producto': ventas_por_producto,
+        'ventas_por_linea_ecommerce': ventas_ecommerce,
+    }
+
+
+def vectorizado_todas(sales_data, lineas_comerciales):
+    """DataFrame una sola vez + group-bys para cada línea comercial."""
+    df = sales_lines_to_frame(sales_data)
+    return [linea_totals(df, linea) for linea in lineas_comerciales]
+
+
+def iguales(a, b):
+    """Compara dicts de totales con tolerancia de redondeo."""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(iguales(a[k], b[k]) for k in a)
+    return abs(a - b) < 1e-6
+
+
+def medir(fn, *args, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main(tamaños):
+    print("\n" + "=" * 60)
+    print("⏱️  BENCHMARK AGREGACIÓN DE KPIs (bucle vs pandas)")
+    print("=" * 60)
+    lineas_comerciales = ['PETMEDICA', 'AGROVET', 'PET NUTRISCIENCE', 'AVIVET', 'OTROS', 'TERCEROS', 'INTERPET']
+    for n in tamaños:
+        lineas = generar_lineas(n)
+        t_frame, df = medir(sales_lines_to_frame, lineas)
+
+        # /dashboard_linea: una línea comercial
+        t_bucle, r_bucle = medir(bucle_linea, lineas, 'PETMEDICA')
+        t_agg, r_vec = medir(linea_totals, df, 'PETMEDICA')
+        ok = all(iguales(r_bucle[k], r_vec[k]) for k in r_bucle)
+
+        # Todas las líneas comerciales: el bucle recorre las ventas una vez por línea,
+        # la versión vectorizada construye el DataFrame una sola vez
+        t_bucle_todas, _ = medir(lambda: [bucle_linea(lineas, l) for l in lineas_comerciales])
+        t_vec_todas, _ = medir(vectorizado_todas, lineas, lineas_comerciales)
+
+        # /dashboard sobre líneas de detalle
+        t_bucle_dash, d_bucle = medir(bucle_dashboard, lineas, {1, 2, 3})
+        t_vec_dash, d_vec = medir(lambda: dashboard_totals(add_dashboard_columns(df, [1, 2, 3])))
+        ok_dash = all(iguales(d_bucle[k], d_vec[k]) for k in d_bucle)
+
+        print(f"\n📊 {n:,} líneas")
+        print(f"   Construir DataFrame:                    {t_frame * 1000:8.1f} ms")
+        print(f"   /dashboard_linea bucle:                 {t_bucle * 1000:8.1f} ms")
+        print(f"   /dashboard_linea group-by (DF listo):   {t_agg * 1000:8.1f} ms")
+        print(f"   {len(lineas_comerciales)} líneas bucle:                        {t_bucle_todas * 1000:8.1f} ms")
+        print(f"   {len(lineas_comerciales)} líneas DF + group-by:                {t_vec_todas * 1000:8.1f} ms")
+        print(f"   /dashboard bucle:                       {t_bucle_dash * 1000:8.1f} ms")
+        print(f"   /dashboard group-by (DF listo):         {t_vec_dash * 1000:8.1f} ms")
+        print(f"   {'✅' if ok and ok_dash else '❌'} Totales {'idénticos' if ok and ok_dash else 'DIFERENTES'}")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
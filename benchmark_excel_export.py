@@ -0,0 +1,112 @@
+"""
+benchmark_excel_export.py - Exportación del detalle de ventas a Excel: DataFrame vs streaming
+
+Compara, para n líneas sintéticas con las columnas del detalle del dashboard:
+
+- Camino anterior de /export/dashboard/details: lista de dicts procesados,
+  DataFrame, to_excel a un BytesIO y recorrido de cada celda para formatos,
+  fechas y anchos de columna
+- Motor en streaming (src/excel_export.py): filas desde un generador, openpyxl
+  write-only y archivo temporal
+
+Mide tiempo total y, en otra corrida, pico de memoria Python (tracemalloc) de cada uno.
+
+Uso:
+    python benchmark_excel_export.py [n_lineas]
+"""
+
+import io
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from src.excel_export import DETALLE_COLUMNS, build_xlsx
+
+
+def generar_lineas(n):
+    """Líneas de venta como las de get_sales_lines (generador: no se guardan en memoria)."""
+    for i in range(n):
+        producto, vendedor = i % 300 + 1, i % 40 + 1
+        yield {
+            'invoice_date': f'2026-03-{i % 28 + 1:02d}', 'l10n_latam_document_type_id': [1, 'Factura'],
+            'move_name': f'F001-{i // 4:06d}', 'partner_name': f'CLIENTE {i % 900} S.A.C.', 'vat': f'20{i % 900:09d}',
+            'invoice_user_id': [vendedor, f'Vendedor {vendedor}'], 'default_code': f'P{producto:04d}',
+            'name': f'PRODUCTO {producto} TABLETAS X 100', 'quantity': float(i % 12 + 1), 'price_unit': 12.5,
+            'balance': float(i % 500 + 1), 'commercial_line_national_id': [producto % 8 + 1, f'LÍNEA {producto % 8}'],
+            'sales_channel_id': [1, 'NACIONAL'], 'payment_state': 'paid', 'invoice_origin': f'S{i // 4:06d}',
+            'product_life_cycle': 'nuevo' if producto % 10 == 0 else False,
+            'pharmacological_classification_id': [3, 'ANTIBIÓTICO'], 'pharmaceutical_forms_id': [2, 'TABLETA'],
+            'administration_way_id': [1, 'ORAL'], 'production_line_id': [4, 'SÓLIDOS'],
+            'categ_id': [5, 'All / Saleable'], 'route_id': [18, 'Vencimiento'] if i % 25 == 0 else False,
+        }
+
+
+def exportar_con_dataframe(sales_data):
+    """El camino anterior de export_dashboard_details (sin Flask)."""
+    processed_for_excel = []
+    for record in sales_data:
+        processed_record = {k: v[1] if isinstance(v, list) and len(v) > 1 else v for k, v in record.items()}
+        processed_record['balance'] = float(processed_record['balance'])
+        processed_for_excel.append(processed_record)
+    df = pd.DataFrame(processed_for_excel)
+    df = df[[key for key, _, _, _ in DETALLE_COLUMNS]]
+    df.rename(columns={key: header for key, header, _, _ in DETALLE_COLUMNS}, inplace=True)
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Detalle', index=False)
+        worksheet = writer.sheets['Detalle']
+        for cell in worksheet[1]:
+            cell.font = Font(bold=True, color="FFFFFF")
+            cell.fill = PatternFill(start_color="875A7B", end_color="875A7B", fill_type="solid")
+        for col_idx, column in enumerate(df.columns, 1):
+            col_letter = get_column_letter(col_idx)
+            worksheet.column_dimensions[col_letter].width = max(df[column].astype(str).map(len).max(), len(column)) + 2
+            if 'fecha' in column.lower():
+                for cell in worksheet[col_letter][1:]:
+                    if isinstance(cell.value, str):
+                        cell.value = datetime.strptime(cell.value, '%Y-%m-%d')
+                    cell.number_format = 'YYYY-MM-DD'
+        worksheet.freeze_panes = 'A2'
+    return output.getbuffer().nbytes
+
+
+def exportar_en_streaming(n):
+    output, _ = build_xlsx(generar_lineas(n), DETALLE_COLUMNS, 'Detalle')
+    output.seek(0, io.SEEK_END)
+    size = output.tell()
+    output.close()
+    return size
+
+
+def medir(fn):
+    """Tiempo (sin tracemalloc, que lo distorsiona) y pico de memoria en una segunda corrida."""
+    inicio = time.perf_counter()
+    size = fn()
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 1024 / 1024, size / 1024 / 1024
+
+
+def main(n):
+    print("\n" + "=" * 72)
+    print(f"📤 BENCHMARK EXPORTACIÓN A EXCEL ({n:,} líneas, {len(DETALLE_COLUMNS)} columnas)")
+    print("=" * 72)
+    print(f"\n   {'Camino':<34} {'tiempo s':>9} {'pico MB':>9} {'xlsx MB':>9}")
+    # El camino anterior recibía la lista completa de get_sales_lines
+    anterior = medir(lambda: exportar_con_dataframe(list(generar_lineas(n))))
+    print(f"   {'DataFrame + BytesIO + formato':<34} {anterior[0]:9.2f} {anterior[1]:9.1f} {anterior[2]:9.1f}")
+    streaming = medir(lambda: exportar_en_streaming(n))
+    print(f"   {'Streaming (openpyxl write-only)':<34} {streaming[0]:9.2f} {streaming[1]:9.1f} {streaming[2]:9.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
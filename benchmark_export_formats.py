@@ -0,0 +1,82 @@
+"""
+benchmark_export_formats.py - Exportación del detalle de ventas por formato
+
+Mide, para n líneas sintéticas con las columnas del detalle del dashboard
+(DETALLE_COLUMNS), cada formato de /export/sales/<formato> y el Excel:
+
+- xlsx: openpyxl write-only a archivo temporal (src/excel_export.py)
+- csv / ndjson: generadores de bytes de src/stream_export.py (se consumen y descartan,
+  como haría la respuesta)
+- parquet: grupos de filas con pyarrow (solo si está instalado)
+
+Cada formato corre en un proceso aparte para que el pico de RSS
+(ru_maxrss) sea solo el suyo. Reporta filas/s, pico de RSS y tamaño.
+
+Uso:
+    python benchmark_export_formats.py [n_lineas]
+"""
+
+import io
+import multiprocessing
+import resource
+import sys
+import time
+
+from benchmark_excel_export import generar_lineas
+from src.excel_export import DETALLE_COLUMNS, build_xlsx
+from src.stream_export import PYARROW_AVAILABLE, build_parquet, iter_csv, iter_ndjson
+
+
+def _tamano_archivo(output):
+    output.seek(0, io.SEEK_END)
+    size = output.tell()
+    output.close()
+    return size
+
+
+def exportar(formato, n):
+    """Exporta n líneas en el formato y retorna los bytes generados."""
+    rows = generar_lineas(n)
+    if formato == 'xlsx':
+        return _tamano_archivo(build_xlsx(rows, DETALLE_COLUMNS, 'Detalle')[0])
+    if formato == 'parquet':
+        return _tamano_archivo(build_parquet(rows, DETALLE_COLUMNS)[0])
+    chunks = iter_csv(rows, DETALLE_COLUMNS) if formato == 'csv' else iter_ndjson(rows, DETALLE_COLUMNS)
+    return sum(len(chunk) for chunk in chunks)
+
+
+def _medir(formato, n, queue):
+    inicio = time.perf_counter()
+    size = exportar(formato, n)
+    segundos = time.perf_counter() - inicio
+    # ru_maxrss está en KB en Linux
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((segundos, pico_mb, size / 1024 / 1024))
+
+
+def medir(formato, n):
+    """Tiempo, pico de RSS y tamaño de una exportación en un proceso nuevo."""
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proceso = ctx.Process(target=_medir, args=(formato, n, queue))
+    proceso.start()
+    resultado = queue.get()
+    proceso.join()
+    return resultado
+
+
+def main(n):
+    formatos = ['xlsx', 'csv', 'ndjson'] + (['parquet'] if PYARROW_AVAILABLE else [])
+    print("\n" + "=" * 72)
+    print(f"📤 BENCHMARK EXPORTACIÓN POR FORMATO ({n:,} líneas, {len(DETALLE_COLUMNS)} columnas)")
+    print("=" * 72)
+    print(f"\n   {'Formato':<10} {'tiempo s':>9} {'filas/s':>10} {'pico RSS MB':>12} {'archivo MB':>11}")
+    for formato in formatos:
+        segundos, pico, size = medir(formato, n)
+        print(f"   {formato:<10} {segundos:9.2f} {n / segundos:10,.0f} {pico:12.1f} {size:11.1f}")
+    if not PYARROW_AVAILABLE:
+        print("\n   ℹ️ parquet omitido: pyarrow no está instalado")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
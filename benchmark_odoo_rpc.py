@@ -0,0 +1,197 @@
+"""
+benchmark_odoo_rpc.py - Latencia por llamada: XML-RPC vs JSON-RPC con pool keep-alive
+
+Levanta un servidor Odoo falso en localhost (/xmlrpc/2/common, /xmlrpc/2/object
+y /jsonrpc) que responde a search_read con N registros de líneas de venta, y
+mide la latencia por llamada de:
+
+- XML-RPC (xmlrpc.client.ServerProxy, como OdooManager por defecto)
+- JSON-RPC sin pool (requests.post por llamada, transporte anterior del cliente)
+- JSON-RPC con pool (OdooJSONRPCClient: Session keep-alive + gzip)
+
+--handshake-ms simula el costo de abrir una conexión (TCP + TLS contra
+Odoo en la nube): el servidor espera ese tiempo al aceptar cada conexión nueva.
+También se mide el caso con varios hilos (como las consultas en paralelo de
+get_sales_lines).
+
+Nota: xmlrpc.client envía encabezados y cuerpo en dos escrituras sin
+TCP_NODELAY, así que en conexiones reutilizadas sufre la espera de Nagle + ACK
+retardado del kernel (~40 ms en Linux) además del costo de serializar XML.
+
+Uso:
+    python benchmark_odoo_rpc.py [--calls 200] [--records 200] [--handshake-ms 0 30] [--threads 4]
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.odoo_jsonrpc_client import OdooJSONRPCClient
+
+
+def generar_registros(n):
+    """Registros tipo account.move.line como los retorna search_read."""
+    return [{
+        'id': i,
+        'move_id': [i // 5, f'F001-{i // 5:06d}'],
+        'partner_id': [i % 900, f'Cliente {i % 900}'],
+        'product_id': [i % 300, f'[P{i % 300:04d}] PRODUCTO {i % 300}'],
+        'balance': -round(i * 1.37, 2),
+        'quantity': float(i % 20),
+        'price_unit': 25.5,
+        'move_name': f'F001-{i // 5:06d}',
+        'invoice_date': '2026-01-15',
+        'tax_ids': [1],
+    } for i in range(n)]
+
+
+class FakeOdooHandler(BaseHTTPRequestHandler):
+    """Odoo falso: autentica con uid 2 y responde cualquier execute_kw con los registros"""
+
+    protocol_version = 'HTTP/1.1'
+    # TCP_NODELAY como nginx/Odoo: sin esto, Nagle + ACK retardado agrega ~40 ms
+    # a cada respuesta en conexiones reutilizadas
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Costo de establecer la conexión (solo una vez por conexión keep-alive)
+        if self.server.handshake_s:
+            time.sleep(self.server.handshake_s)
+        with self.server.lock:
+            self.server.connections += 1
+        super().setup()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.path == '/jsonrpc':
+            payload = json.loads(body)
+            result = 2 if payload['params']['method'] == 'authenticate' else self.server.records
+            data = json.dumps({'jsonrpc': '2.0', 'id': payload['id'], 'result': result}).encode()
+            content_type = 'application/json'
+        else:
+            _, method = xmlrpc.client.loads(body)
+            result = 2 if method == 'authenticate' else self.server.records
+            data = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True).encode()
+            content_type = 'text/xml'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and len(data) > 1024:
+            data = gzip.compress(data, compresslevel=5)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.lock:
+            self.server.bytes_sent += len(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor(n_registros, handshake_ms):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FakeOdooHandler)
+    httpd.daemon_threads = True
+    httpd.records = generar_registros(n_registros)
+    httpd.handshake_s = handshake_ms / 1000
+    httpd.lock = threading.Lock()
+    httpd.connections = 0
+    httpd.bytes_sent = 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}'
+    return httpd
+
+
+def llamada_xmlrpc(url):
+    """Una consulta por hilo con su propio ServerProxy (como _worker_models)."""
+    local = threading.local()
+
+    def call():
+        proxy = getattr(local, 'proxy', None)
+        if proxy is None:
+            proxy = local.proxy = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object', allow_none=True)
+        return proxy.execute_kw('db', 2, 'pwd', 'account.move.line', 'search_read', [[]], {'limit': 0})
+    return call
+
+
+def llamada_jsonrpc_sin_pool(url):
+    """Transporte anterior de OdooJSONRPCClient: requests.post abre una conexión por llamada."""
+    def call():
+        payload = {'jsonrpc': '2.0', 'method': 'call', 'id': 1, 'params': {
+            'service': 'object', 'method': 'execute_kw',
+            'args': ['db', 2, 'pwd', 'account.move.line', 'search_read', [[]], {'limit': 0}]}}
+        return requests.post(f'{url}/jsonrpc', json=payload, timeout=30).json()['result']
+    return call
+
+
+def llamada_jsonrpc_pool(url, pool_size):
+    client = OdooJSONRPCClient(url, 'db', 'user', 'pwd', pool_size=pool_size)
+
+    def call():
+        return client.search_read('account.move.line', [], limit=0)
+    call.client = client
+    return call
+
+
+def medir(server, call, calls, threads):
+    """Latencias por llamada (ms), conexiones abiertas y bytes recibidos."""
+    call()  # calentamiento (autenticación / primera conexión)
+    server.connections, server.bytes_sent = 0, 0
+
+    def timed(_):
+        inicio = time.perf_counter()
+        registros = call()
+        assert len(registros) == len(server.records)
+        return (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencias = list(pool.map(timed, range(calls)))
+    total = time.perf_counter() - inicio
+    return latencias, total, server.connections, server.bytes_sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--records', type=int, default=200)
+    parser.add_argument('--handshake-ms', type=float, nargs='+', default=[0, 30])
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    print("\n" + "=" * 72)
+    print("🔌 BENCHMARK RPC ODOO (XML-RPC vs JSON-RPC con pool keep-alive)")
+    print("=" * 72)
+    print(f"   {args.calls} llamadas search_read de {args.records} registros (servidor local)")
+
+    for handshake_ms in args.handshake_ms:
+        server = iniciar_servidor(args.records, handshake_ms)
+        for threads in sorted({1, args.threads}):
+            print(f"\n📊 Handshake simulado {handshake_ms:g} ms | {threads} hilo(s)")
+            print(f"   {'Transporte':<26} {'p50 ms':>8} {'p95 ms':>8} {'total s':>8} {'conex. nuevas':>14} {'KB/llamada':>11}")
+            transportes = [
+                ('XML-RPC ServerProxy', llamada_xmlrpc(server.url)),
+                ('JSON-RPC sin pool', llamada_jsonrpc_sin_pool(server.url)),
+                ('JSON-RPC pool keep-alive', llamada_jsonrpc_pool(server.url, pool_size=threads)),
+            ]
+            for nombre, call in transportes:
+                latencias, total, conexiones, enviados = medir(server, call, args.calls, threads)
+                p95 = statistics.quantiles(latencias, n=20)[-1]
+                print(f"   {nombre:<26} {statistics.median(latencias):8.2f} {p95:8.2f} {total:8.2f} "
+                      f"{conexiones:14d} {enviados / args.calls / 1024:11.1f}")
+                if hasattr(call, 'client'):
+                    call.client.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
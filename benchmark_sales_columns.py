@@ -0,0 +1,121 @@
+"""
+benchmark_sales_columns.py - Memoria de las líneas de venta: lista de dicts vs SalesLinesTable
+
+Genera líneas sintéticas con las mismas columnas que OdooManager.get_sales_lines
+(~40 claves, many2one repetidos) y mide con tracemalloc la memoria real de:
+
+- La lista de dicts que retorna get_sales_lines
+- La misma información en SalesLinesTable (get_sales_lines(columnar=True))
+
+Reporta MB por cada 10.000 líneas y los tiempos de construcción e iteración.
+
+Uso:
+    python benchmark_sales_columns.py [n_lineas ...]
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from src.sales_columns import SalesLinesTable
+
+
+def generar_lineas(n, seed=7):
+    """Líneas sintéticas: ~5 líneas por factura, 300 productos, 900 clientes, 40 vendedores."""
+    rnd = random.Random(seed)
+    lineas = []
+    for i in range(n):
+        move = i // 5 + 1
+        cliente = move % 900 + 1
+        producto = rnd.randint(1, 300)
+        vendedor = rnd.randint(1, 40)
+        linea_id = rnd.randint(1, 8)
+        # Las cadenas se construyen por fila, como llegan deserializadas de XML-RPC
+        lineas.append({
+            'payment_state': 'paid' if i % 3 else 'not_paid',
+            'sales_channel_id': [5, 'AGROVET'],
+            'commercial_line_national_id': [linea_id, f'LÍNEA {linea_id}'],
+            'invoice_user_id': [vendedor, f'Vendedor {vendedor}'],
+            'partner_name': f'Cliente {cliente}',
+            'vat': f'20{cliente:09d}',
+            'invoice_origin': f'S{move:05d}',
+            'move_name': f'F001-{move:06d}',
+            'move_ref': False,
+            'move_state': 'posted',
+            'order_name': f'S{move:05d}',
+            'order_origin': False,
+            'client_order_ref': False,
+            'name': f'PRODUCTO {producto}',
+            'default_code': f'P{producto:04d}',
+            'product_id': [producto, f'[P{producto:04d}] PRODUCTO {producto}'],
+            'invoice_date': f'2025-{move % 12 + 1:02d}-{move % 28 + 1:02d}',
+            'l10n_latam_document_type_id': [1, 'Factura'],
+            'origin_number': False,
+            'balance': round(rnd.uniform(10, 5000), 2),
+            'pharmacological_classification_id': [producto % 12 + 1, f'Clasificación {producto % 12}'],
+            'delivery_observations': False,
+            'order_date': f'2025-{move % 12 + 1:02d}-{move % 28 + 1:02d} 10:00:00',
+            'order_state': 'sale',
+            'commitment_date': False,
+            'order_user_id': [vendedor, f'Vendedor {vendedor}'],
+            'partner_supplying_agency_id': False,
+            'pharmaceutical_forms_id': [producto % 6 + 1, f'Forma {producto % 6}'],
+            'administration_way_id': [producto % 4 + 1, f'Vía {producto % 4}'],
+            'categ_id': [producto % 9 + 1, f'Categoría {producto % 9}'],
+            'production_line_id': [producto % 5 + 1, f'Producción {producto % 5}'],
+            'quantity': float(rnd.randint(1, 20)),
+            'price_unit': round(rnd.uniform(10, 250), 2),
+            'partner_shipping_id': [cliente, f'Dirección {cliente}'],
+            'route_id': [18, 'Vencimiento'] if i % 7 == 0 else False,
+            'product_life_cycle': rnd.choice(['nuevo', 'maduro', False]),
+            'tax_id': 'IGV',
+            'move_id': [move, f'F001-{move:06d}'],
+            'partner_id': [cliente, f'Cliente {cliente}'],
+        })
+    return lineas
+
+
+def memoria(fn):
+    """Ejecuta fn y retorna (resultado, bytes retenidos)."""
+    gc.collect()
+    tracemalloc.start()
+    resultado = fn()
+    retenidos, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, retenidos
+
+
+def main(tamaños):
+    print("\n" + "=" * 60)
+    print("🧮 BENCHMARK MEMORIA LÍNEAS DE VENTA (dicts vs columnar)")
+    print("=" * 60)
+    for n in tamaños:
+        lineas, bytes_dicts = memoria(lambda: generar_lineas(n))
+        tabla, bytes_tabla = memoria(lambda: SalesLinesTable.from_records(lineas))
+
+        # Tiempos sin tracemalloc (agrega mucho costo por asignación)
+        inicio = time.perf_counter()
+        tabla = SalesLinesTable.from_records(lineas)
+        t_build = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        total = sum(fila['balance'] for fila in tabla)
+        t_iter = time.perf_counter() - inicio
+        assert abs(total - sum(l['balance'] for l in lineas)) < 1e-6
+        reporte = tabla.memory_report()
+
+        por_10k = lambda b: b * 10000 / n / 1024 / 1024
+        print(f"\n📊 {n:,} líneas")
+        print(f"   Lista de dicts (tracemalloc):   {por_10k(bytes_dicts):7.1f} MB por 10k")
+        print(f"   SalesLinesTable (tracemalloc):  {por_10k(bytes_tabla):7.1f} MB por 10k  "
+              f"({bytes_dicts / bytes_tabla:.0f}x menos)")
+        print(f"   memory_report(): columnar {reporte['columnar_bytes_per_10k'] / 1024 / 1024:.1f} MB, "
+              f"dicts (estimado) {reporte['dict_bytes_per_10k'] / 1024 / 1024:.1f} MB por 10k")
+        print(f"   Construir tabla: {t_build * 1000:.0f} ms | iterar filas: {t_iter * 1000:.0f} ms")
+        del lineas, tabla
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
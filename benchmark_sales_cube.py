@@ -0,0 +1,119 @@
+"""
+benchmark_sales_cube.py - Cubo diario de ventas: armado, refresco y consultas sobre un año sintético
+
+Genera un año de líneas de venta (20k por defecto, ~4 por factura, 300
+productos, 40 vendedores) en un SalesLineStore temporal y mide:
+
+- Armado inicial: replace_moves por trozos de SYNC_CHUNK_SIZE facturas (como la
+  primera sincronización), con el cubo mantenido en cada escritura
+- Reconstrucción completa del cubo desde las líneas guardadas
+- Refresco incremental: se re-escriben 50 facturas del último día
+- Totales del dashboard (mes a la fecha, hasta dia_fin y año completo):
+  celdas del cubo vs líneas de detalle del almacén
+- Serie mensual del año (get_sales_by_month: total, IPN, líneas y vendedores)
+
+Uso:
+    python benchmark_sales_cube.py [n_lineas]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from src import sales_cube
+from src.odoo_manager import OdooManager
+from src.sales_store import SYNC_CHUNK_SIZE, SalesLineStore
+
+
+def generar_lineas(n):
+    """Un año de facturas: ~4 líneas por factura, un día de factura cada n/365 líneas."""
+    por_dia = max(1, n // 365)
+    moves = {}
+    for i in range(n):
+        move, product = i // 4 + 1, i % 300 + 1
+        dia = (date(2025, 1, 1) + timedelta(days=min(i // por_dia, 364))).isoformat()
+        vendedor = move % 40 + 1
+        moves.setdefault(move, []).append({
+            'move_id': [move, f'F001-{move:06d}'], 'move_name': f'F001-{move:06d}', 'invoice_date': dia,
+            'partner_id': [move % 900 + 1, f'Cliente {move % 900 + 1}'], 'partner_name': f'Cliente {move % 900 + 1}',
+            'product_id': [product, f'[P{product:04d}] PRODUCTO {product}'], 'name': f'PRODUCTO {product}',
+            'default_code': f'P{product:04d}', 'commercial_line_national_id': [product % 8 + 1, f'LÍNEA {product % 8}'],
+            'product_life_cycle': 'nuevo' if product % 10 == 0 else False,
+            'pharmaceutical_forms_id': [product % 6 + 1, f'FORMA {product % 6}'],
+            'invoice_user_id': [vendedor, f'Vendedor {vendedor}'],
+            'route_id': [18, 'Vencimiento'] if i % 25 == 0 else False,
+            'sales_channel_id': [move % 3 + 1, f'CANAL {move % 3}'],
+            'balance': float(i % 500 + 1), 'quantity': 2.0, 'price_unit': 10.0,
+        })
+    return moves
+
+
+def cronometrar(fn, repeticiones=1):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = fn()
+    return resultado, (time.perf_counter() - inicio) / repeticiones
+
+
+def redondear(valor):
+    if isinstance(valor, dict):
+        return {k: redondear(v) for k, v in valor.items()}
+    return round(valor, 4) if isinstance(valor, float) else valor
+
+
+def main(n):
+    moves = generar_lineas(n)
+    move_ids = sorted(moves)
+    print("\n" + "=" * 72)
+    print(f"🧊 BENCHMARK CUBO DIARIO DE VENTAS ({n:,} líneas, {len(move_ids):,} facturas)")
+    print("=" * 72)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SalesLineStore(db_path=os.path.join(tmp, 'ventas.db'), start_date='2025-01-01')
+
+        def armar():
+            for i in range(0, len(move_ids), SYNC_CHUNK_SIZE):
+                chunk = move_ids[i:i + SYNC_CHUNK_SIZE]
+                store.replace_moves(chunk, [l for m in chunk for l in moves[m]])
+        _, segundos = cronometrar(armar)
+        store.mark_synced('2026-01-01 00:00:00')
+        celdas = store.stats()['cube_cells']
+        print(f"\n   Armado inicial (replace_moves de {SYNC_CHUNK_SIZE} facturas): {segundos:7.2f}s "
+              f"| {celdas:,} celdas en sales_cube")
+
+        def reconstruir():
+            with store.get_connection() as conn:
+                return sales_cube.rebuild_days(conn)
+        escritas, segundos = cronometrar(reconstruir)
+        print(f"   Reconstrucción completa del cubo:              {segundos:7.2f}s | {escritas:,} celdas")
+
+        ultimas = move_ids[-50:]
+        _, segundos = cronometrar(lambda: store.replace_moves(ultimas, [l for m in ultimas for l in moves[m]]), 5)
+        print(f"   Refresco incremental (50 facturas del último día): {segundos * 1000:7.1f} ms")
+
+        rangos = [
+            ('Mes a la fecha (1-18 jun)', '2025-06-01', '2025-06-18'),
+            ('Mes completo (jun)', '2025-06-01', '2025-06-30'),
+            ('Año completo', '2025-01-01', '2025-12-31'),
+        ]
+        print(f"\n   {'Totales del dashboard':<28} {'líneas ms':>10} {'cubo ms':>9} {'filas':>8} {'celdas':>8}")
+        for nombre, desde, hasta in rangos:
+            lineas, ms_lineas = cronometrar(lambda: store.query(date_from=desde, date_to=hasta), 3)
+            celdas, ms_cubo = cronometrar(lambda: store.query_cube(desde, hasta), 3)
+            total_lineas, agg_lineas = cronometrar(lambda: OdooManager.aggregate_dashboard_lines(lineas, ['7']), 3)
+            total_cubo, agg_cubo = cronometrar(lambda: OdooManager.aggregate_dashboard_lines(celdas, ['7']), 3)
+            ok = '✅' if redondear(total_lineas) == redondear(total_cubo) else '❌'
+            print(f"   {nombre:<28} {(ms_lineas + agg_lineas) * 1000:10.1f} {(ms_cubo + agg_cubo) * 1000:9.1f} "
+                  f"{len(lineas):8,} {len(celdas):8,}  {ok}")
+
+        manager = OdooManager.__new__(OdooManager)
+        manager.sales_store = store
+        serie, segundos = cronometrar(lambda: manager.get_sales_by_month('2025-01-01', '2025-12-31'), 3)
+        print(f"\n   Serie mensual del año desde el cubo: {segundos * 1000:7.1f} ms "
+              f"| {len(serie['por_linea'])} líneas, {len(serie['por_vendedor'])} vendedores")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,163 @@
+"""
+benchmark_sales_fetch_chunks.py - Memoria pico de get_sales_lines: una consulta vs páginas y trozos
+
+Simula un año de ventas (20k líneas base por defecto) con un proxy XML-RPC
+falso en proceso: cada llamada serializa la petición y la respuesta con
+xmlrpc.client, como el transporte real. Mide con tracemalloc:
+
+- Una sola consulta (ODOO_BASE_PAGE_SIZE=0, ODOO_ID_CHUNK_SIZE=0, comportamiento anterior)
+- Páginas de 5000 líneas base y trozos de 1000 ids (get_sales_lines retorna la lista completa)
+- iter_sales_lines agregando por página (como obtener_totales_2025.py)
+
+Reporta el tiempo, la memoria pico y el payload XML-RPC más grande.
+
+Uso:
+    python benchmark_sales_fetch_chunks.py [n_lineas]
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import xmlrpc.client
+from unittest.mock import patch
+
+os.environ.update({
+    'ODOO_URL': 'https://benchmark.local', 'ODOO_DB': 'bench', 'ODOO_USER': 'bench',
+    'ODOO_PASSWORD': 'bench', 'SALES_CACHE_TTL_SECONDS': '0', 'ODOO_PARALLEL_FETCH': 'false',
+    'ODOO_RPC_PROTOCOL': 'xmlrpc', 'SALES_STORE_ENABLED': 'false',
+})
+
+from src.odoo_manager import OdooManager
+
+
+def generar_odoo(n):
+    """Registros de un año: ~4 líneas por factura, 300 productos, 900 clientes."""
+    lines, moves = [], {}
+    for i in range(n):
+        move, product, partner = i // 4 + 1, i % 300 + 1, (i // 4) % 900 + 1
+        lines.append({
+            'id': i + 1, 'move_id': [move, f'F001-{move:06d}'], 'partner_id': [partner, f'Cliente {partner}'],
+            'product_id': [product, f'[P{product:04d}] PRODUCTO {product}'], 'balance': -float(i % 500 + 1),
+            'move_name': f'F001-{move:06d}', 'quantity': 2.0, 'price_unit': 10.0, 'tax_ids': [7],
+        })
+        moves[move] = {
+            'id': move, 'name': f'F001-{move:06d}', 'payment_state': 'paid', 'team_id': [5, 'AGROVET'],
+            'invoice_user_id': [move % 40 + 1, f'Vendedor {move % 40 + 1}'], 'invoice_origin': f'S{move:05d}',
+            'invoice_date': f'2025-{move % 12 + 1:02d}-15', 'l10n_latam_document_type_id': [1, 'Factura'],
+            'origin_number': False, 'order_id': [move, f'S{move:05d}'], 'ref': False, 'state': 'posted',
+        }
+    return {
+        'account.move.line': lines,
+        'account.move': moves,
+        'product.product': {p: {'id': p, 'name': f'PRODUCTO {p}', 'default_code': f'P{p:04d}',
+                                'commercial_line_national_id': [p % 8 + 1, f'LÍNEA {p % 8}']}
+                            for p in range(1, 301)},
+        'res.partner': {p: {'id': p, 'name': f'Cliente {p}', 'vat': f'20{p:09d}'} for p in range(1, 901)},
+        'account.tax': {7: {'id': 7, 'name': 'IGV'}},
+        'sale.order': {m: {'id': m, 'name': f'S{m:05d}', 'state': 'sale'} for m in moves},
+        'sale.order.line': {},
+        'crm.team': {},
+        'product.commercial.line': {},
+    }
+
+
+class ProxyXMLRPCEnProceso:
+    """Responde execute_kw sobre los registros generados pasando por la serialización XML-RPC."""
+
+    def __init__(self, data):
+        self.data = data
+        self.max_request = 0
+        self.max_response = 0
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        request = xmlrpc.client.dumps((db, uid, password, model, method, args, kwargs or {}),
+                                      'execute_kw', allow_none=True)
+        self.max_request = max(self.max_request, len(request))
+        kwargs = kwargs or {}
+        if method == 'fields_get':
+            return {'commercial_line_national_id': {'relation': 'product.commercial.line'}}
+        if model == 'account.move.line':
+            offset = kwargs.get('offset', 0)
+            limit = kwargs.get('limit')
+            result = self.data[model][offset:offset + limit if limit else None]
+        else:
+            condition = args[0][0]
+            table = self.data[model]
+            result = [table[i] for i in condition[2] if i in table]
+        response = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True)
+        self.max_response = max(self.max_response, len(response))
+        del request, result
+        return xmlrpc.client.loads(response)[0][0]
+
+
+class ProxyComun:
+    def authenticate(self, db, username, password, context):
+        return 2
+
+
+def crear_manager(data, page_size, chunk_size):
+    os.environ['ODOO_BASE_PAGE_SIZE'] = str(page_size)
+    os.environ['ODOO_ID_CHUNK_SIZE'] = str(chunk_size)
+    proxy = ProxyXMLRPCEnProceso(data)
+    fake = lambda url, allow_none=False: ProxyComun() if url.endswith('/common') else proxy
+    with patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake):
+        return OdooManager(), proxy
+
+
+def medir(fn):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = fn()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico
+
+
+def main(n):
+    data = generar_odoo(n)
+    print("\n" + "=" * 72)
+    print(f"📦 BENCHMARK get_sales_lines POR PÁGINAS ({n:,} líneas base, XML-RPC en proceso)")
+    print("=" * 72)
+
+    def totales_por_pagina(om):
+        total, lineas = 0.0, 0
+        for pagina in om.iter_sales_lines(date_from='2025-01-01', date_to='2025-12-31', limit=None):
+            total += sum(l['balance'] for l in pagina)
+            lineas += len(pagina)
+        return lineas, total
+
+    casos = [
+        ('Una consulta (anterior)', 0, 0,
+         lambda om: om.get_sales_lines(date_from='2025-01-01', date_to='2025-12-31', limit=None)),
+        ('Páginas 5000 / trozos 1000', 5000, 1000,
+         lambda om: om.get_sales_lines(date_from='2025-01-01', date_to='2025-12-31', limit=None)),
+        ('iter_sales_lines + totales', 5000, 1000, totales_por_pagina),
+    ]
+    print(f"\n   {'Modo':<28} {'tiempo s':>9} {'pico MB':>9} {'petición máx KB':>16} {'respuesta máx MB':>17}")
+    referencia = None
+    stdout = sys.stdout
+    for nombre, page_size, chunk_size, fn in casos:
+        om, proxy = crear_manager(data, page_size, chunk_size)
+        sys.stdout = open(os.devnull, 'w')  # get_sales_lines imprime progreso por etapa
+        try:
+            resultado, segundos, pico = medir(lambda: fn(om))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        if isinstance(resultado, list):
+            resumen = (len(resultado), sum(l['balance'] for l in resultado))
+            del resultado
+        else:
+            resumen = resultado
+        referencia = referencia or resumen
+        ok = '✅' if resumen[0] == referencia[0] and abs(resumen[1] - referencia[1]) < 1e-6 else '❌'
+        print(f"   {nombre:<28} {segundos:9.2f} {pico / 1024 / 1024:9.1f} "
+              f"{proxy.max_request / 1024:16.1f} {proxy.max_response / 1024 / 1024:17.1f}  {ok}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
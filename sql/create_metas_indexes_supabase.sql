@@ -0,0 +1,29 @@
+-- ============================================
+-- ÍNDICES PARA CONSULTAS DE METAS POR MES
+-- ============================================
+-- Tablas: metas_ventas_2026 (metas por línea) y metas_vendedor_2026 (metas por vendedor)
+--
+-- Las páginas piden a PostgREST solo los meses que muestran
+-- (SupabaseManager._query_metas):
+--   /dashboard, /dashboard_linea:  mes = 'YYYY-MM'  (y linea_comercial = X en vendedores)
+--   /meta, /metas_vendedor:         mes BETWEEN 'YYYY-01' AND 'YYYY-12'
+-- Con estos índices cada consulta lee solo las filas de esos meses, sin importar
+-- cuántos años de historial acumulen las tablas.
+-- ============================================
+
+-- Metas por línea: filtro por rango de meses, orden por mes y línea.
+-- (El upsert usa on_conflict 'mes,linea_comercial'; si esa restricción única ya
+-- existe con otro nombre, este índice es redundante y puede omitirse.)
+CREATE INDEX IF NOT EXISTS idx_metas_ventas_2026_mes_linea
+ON metas_ventas_2026(mes, linea_comercial);
+
+-- Metas por vendedor de una línea en un mes o rango de meses (/dashboard_linea)
+CREATE INDEX IF NOT EXISTS idx_metas_vendedor_2026_linea_mes
+ON metas_vendedor_2026(linea_comercial, mes);
+
+-- Metas de todos los vendedores de un rango de meses (/metas_vendedor): las sirve
+-- la restricción única (mes, vendedor_id, linea_comercial) del upsert, que empieza por mes.
+
+-- Actualizar estadísticas para que el planificador use los índices nuevos
+ANALYZE metas_ventas_2026;
+ANALYZE metas_vendedor_2026;
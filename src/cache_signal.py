@@ -0,0 +1,136 @@
+"""
+cache_signal.py - Señal de invalidación de cachés entre workers
+
+Cada worker de gunicorn tiene su propia caché en memoria: cuando uno guarda
+metas o equipos, los demás deben enterarse para no servir datos viejos. La
+señal es una versión compartida que el worker que escribe cambia (bump) y que
+los lectores comparan con la última que vieron antes de usar su caché.
+
+- FileCacheSignal: archivo en disco local (workers del mismo servidor)
+- RedisCacheSignal: clave en Redis (varias instancias); se usa si REDIS_URL
+  apunta a Redis y el paquete redis está instalado. Si Redis no responde usa
+  el archivo local por unos segundos antes de reintentar
+
+Leer la versión cuesta microsegundos (un archivo de pocos bytes o un GET), muy
+por debajo de una consulta a Supabase.
+
+Uso:
+    signal = make_cache_signal('supabase')
+    version = signal.version()   # comparar con la última vista
+    signal.bump()                # después de escribir
+"""
+
+import os
+import tempfile
+import time
+import uuid
+from typing import Optional
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# redis es opcional: sin él la señal es un archivo local
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+
+class FileCacheSignal:
+    """
+    Versión compartida en un archivo: bump lo reescribe de forma atómica.
+
+    Args:
+        path: Ruta del archivo de versión
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def version(self) -> Optional[str]:
+        """Versión actual (None si nadie escribió todavía)."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def bump(self):
+        """Publica una versión nueva para que los demás workers descarten su caché."""
+        tmp = f'{self.path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(f'{time.time_ns()}-{os.getpid()}')
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo publicar la invalidación de caché en {self.path}: {e}")
+
+
+class RedisCacheSignal:
+    """
+    Versión compartida en una clave de Redis (INCR en cada bump).
+
+    Si Redis no responde, durante retry_seconds no se vuelve a consultar (cada
+    intento puede esperar el timeout de conexión) y se usa la señal en archivo
+    `fallback`: los workers del mismo servidor siguen invalidándose entre sí.
+    bump() también actualiza el archivo para que esté al día si Redis cae.
+
+    Args:
+        url: URL de Redis (redis://...)
+        key: Clave de la versión
+        fallback: Señal local para cuando Redis no está disponible
+        retry_seconds: Espera antes de volver a intentar con Redis tras un error
+    """
+
+    def __init__(self, url: str, key: str, fallback: FileCacheSignal, retry_seconds: float = 5.0):
+        self.key = key
+        self.fallback = fallback
+        self.retry_seconds = retry_seconds
+        self._retry_at = 0.0
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def _redis_down(self) -> bool:
+        return time.monotonic() < self._retry_at
+
+    def _redis_failed(self, e: Exception):
+        self._retry_at = time.monotonic() + self.retry_seconds
+        logger.warning(f"⚠️ Redis no disponible para la señal de caché, se usa {self.fallback.path} "
+                       f"durante {self.retry_seconds:g}s: {e}")
+
+    def version(self) -> Optional[str]:
+        if not self._redis_down():
+            try:
+                value = self._client.get(self.key)
+                return value.decode() if value is not None else None
+            except Exception as e:
+                self._redis_failed(e)
+        return f'local:{self.fallback.version()}'
+
+    def bump(self):
+        self.fallback.bump()
+        if self._redis_down():
+            return
+        try:
+            self._client.incr(self.key)
+        except Exception as e:
+            self._redis_failed(e)
+
+
+def make_cache_signal(name: str):
+    """
+    Señal de invalidación para la caché `name`.
+
+    Usa Redis si REDIS_URL apunta a Redis y el paquete está instalado; si no, el
+    archivo CACHE_SIGNAL_DIR/<name>.version (por defecto en la carpeta temporal),
+    que también es el respaldo de Redis cuando no responde.
+    """
+    redis_url = os.getenv('REDIS_URL') or ''
+    signal_dir = os.getenv('CACHE_SIGNAL_DIR') or os.path.join(tempfile.gettempdir(), 'dashboard_ventas_cache')
+    file_signal = FileCacheSignal(os.path.join(signal_dir, f'{name}.version'))
+    if redis_url.startswith(('redis://', 'rediss://')) and REDIS_AVAILABLE:
+        return RedisCacheSignal(redis_url, f'dashboard_ventas:cache:{name}', fallback=file_signal)
+    return file_signal
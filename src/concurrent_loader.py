@@ -0,0 +1,125 @@
+"""
+concurrent_loader.py - Carga en paralelo de las fuentes independientes de una petición
+
+Los dashboards leen metas y equipos de Supabase y ventas de Odoo; son llamadas
+de red independientes. ConcurrentLoader las lanza a la vez en un pool de hilos
+compartido por todas las peticiones, así la latencia de la página es la de la
+llamada más lenta y no la suma de todas.
+
+Cada llamada tiene su propio timeout (contado desde que se lanza) y un valor
+por defecto: si falla o no responde a tiempo se registra en `errors`, se usa
+el valor por defecto y la página se muestra con datos parciales. Las llamadas
+marcadas como requeridas propagan su error.
+
+Uso:
+    loader = ConcurrentLoader(timeout_seconds=10)
+    loader.submit('metas', supabase_manager.read_metas, default={})
+    loader.submit('ventas', data_manager.get_dashboard_lines, desde, hasta, required=True, timeout=60)
+    metas = loader.result('metas')
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """Pool de hilos compartido por todas las peticiones (DASHBOARD_LOAD_WORKERS hilos)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(os.getenv('DASHBOARD_LOAD_WORKERS', '8'))),
+                    thread_name_prefix='dashboard-load'
+                )
+    return _executor
+
+
+class ConcurrentLoader:
+    """
+    Llamadas independientes de una petición lanzadas en paralelo.
+
+    Args:
+        timeout_seconds: Timeout por defecto de cada llamada (0 o None: sin límite)
+        executor: Pool donde se ejecutan (por defecto shared_executor())
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = None, executor: Optional[ThreadPoolExecutor] = None):
+        self.timeout_seconds = timeout_seconds
+        self.executor = executor if executor is not None else shared_executor()
+        self.errors: Dict[str, BaseException] = {}
+        self._calls: Dict[str, tuple] = {}
+        self._results: Dict[str, Any] = {}
+
+    def submit(self, name: str, fn: Callable, *args, default: Any = None, required: bool = False,
+               timeout: Optional[float] = None, **kwargs) -> 'ConcurrentLoader':
+        """
+        Lanza fn(*args, **kwargs) en el pool.
+
+        Args:
+            name: Nombre de la llamada (clave en result y errors)
+            fn: Función a ejecutar
+            default: Valor si la llamada falla o vence su timeout
+            required: Si True, result() propaga el error en lugar de usar default
+            timeout: Segundos para esta llamada (por defecto timeout_seconds)
+
+        Returns:
+            ConcurrentLoader: self, para encadenar llamadas
+        """
+        timeout = self.timeout_seconds if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        future = self.executor.submit(self._timed, name, fn, args, kwargs)
+        self._calls[name] = (future, deadline, default, required)
+        return self
+
+    @staticmethod
+    def _timed(name, fn, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            logger.debug(f"Carga '{name}': {time.perf_counter() - start:.2f}s")
+
+    def result(self, name: str) -> Any:
+        """
+        Espera el resultado de una llamada, como mucho hasta su timeout.
+
+        Raises:
+            Exception: El error de una llamada requerida (TimeoutError si venció)
+        """
+        if name in self._results:
+            return self._results[name]
+        future, deadline, default, required = self._calls[name]
+        try:
+            wait = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            value = future.result(timeout=wait)
+        except FutureTimeoutError:
+            # El hilo sigue hasta que la llamada termine; la página no lo espera
+            error = TimeoutError(f"'{name}' no respondió a tiempo")
+            value = self._failed(name, error, default, required)
+        except Exception as e:
+            value = self._failed(name, e, default, required)
+        self._results[name] = value
+        return value
+
+    def _failed(self, name, error, default, required):
+        self.errors[name] = error
+        if required:
+            logger.error(f"❌ Carga '{name}' falló: {error}")
+            raise error
+        logger.warning(f"⚠️ Carga '{name}' falló, se usa el valor por defecto: {error}")
+        return default
+
+    def results(self) -> Dict[str, Any]:
+        """Espera todas las llamadas y devuelve nombre -> resultado."""
+        return {name: self.result(name) for name in self._calls}
@@ -0,0 +1,366 @@
+"""
+dashboard_widgets.py - Widgets del dashboard mensual (/dashboard) cargados por separado
+
+/dashboard esperaba a Odoo y a Supabase antes de devolver la página completa.
+Ahora la página es solo el marco (encabezado y selectores de mes y día) y cada
+widget se pide en paralelo a /api/dashboard/<widget>:
+
+- kpis: tarjetas de meta, venta, IPN, avance diario y brecha comercial
+- lineas: tabla de líneas comerciales (y gráfico de meta vs venta)
+- productos: Top 7 de productos
+- ciclo_vida: donut de venta por tipo de producto
+- ecommerce: tabla del equipo ECOMMERCE
+- apilado: cantidades por línea comercial y categoría de producto
+
+Cada widget se cachea por separado, así un widget lento no retiene a los
+demás. Las fuentes compartidas (agregados de Odoo, metas y equipos de
+Supabase) tienen su propia entrada en la misma caché: como la caché
+deduplica las consultas concurrentes, los widgets que se piden a la vez
+esperan una sola consulta de cada fuente. Dentro de un widget, las metas
+de Supabase y los agregados de Odoo se piden a la vez (ConcurrentLoader).
+
+La misma caché guarda los totales de /dashboard_linea de todas las líneas
+comerciales por periodo (agregados_por_linea).
+"""
+
+import calendar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.concurrent_loader import ConcurrentLoader
+from src.logging_config import get_logger
+from src.sales_aggregation import lineas_con_ventas, lineas_totals, sales_lines_to_frame
+from src.sales_cache import SalesLinesCache
+from src.utils import get_meses_del_año
+
+logger = get_logger(__name__)
+
+WIDGETS = ('kpis', 'lineas', 'productos', 'ciclo_vida', 'ecommerce', 'apilado')
+
+# Líneas que no se muestran en la tabla principal
+LINEAS_EXCLUIDAS = ['LICITACION', 'NINGUNO', 'ECOMMERCE', 'GENVET', 'MARCA BLANCA']
+
+
+def dashboard_period(año=None, mes: Optional[str] = None, dia_fin=None,
+                     now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Mes y rango de fechas del dashboard a partir de los parámetros de la URL.
+
+    Args:
+        año: Año seleccionado (por defecto el actual)
+        mes: Mes seleccionado 'YYYY-MM' (por defecto el mes actual, o enero de otro año)
+        dia_fin: Último día del rango; por defecto hoy en el mes en curso o el fin de mes
+        now: Fecha y hora actuales
+
+    Returns:
+        dict: año, mes, mes_nombre, dia_actual, fecha_inicio, fecha_fin
+    """
+    now = now or datetime.now()
+    try:
+        año = int(año) if año else now.year
+    except (ValueError, TypeError):
+        año = now.year
+    default_mes = f"{año}-{now.month:02d}" if año == now.year else f"{año}-01"
+    try:
+        datetime.strptime(mes or '', '%Y-%m')
+    except ValueError:
+        mes = default_mes
+
+    año_sel, mes_sel = (int(v) for v in mes.split('-'))
+    ultimo_dia_mes = calendar.monthrange(año_sel, mes_sel)[1]
+    try:
+        dia_actual = min(max(int(dia_fin), 1), ultimo_dia_mes)
+    except (ValueError, TypeError):
+        dia_actual = now.day if mes == now.strftime('%Y-%m') else ultimo_dia_mes
+
+    mes_obj = next((m for m in get_meses_del_año(año_sel) if m['key'] == mes), None)
+    return {
+        'año': año,
+        'mes': mes,
+        'mes_nombre': mes_obj['nombre'] if mes_obj else "Mes Desconocido",
+        'dia_actual': dia_actual,
+        'fecha_inicio': f"{mes}-01",
+        'fecha_fin': f"{mes}-{dia_actual:02d}",
+    }
+
+
+def consolidar_metas(metas_historicas: Dict[str, Any], mes: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Metas y metas IPN del mes por id de línea (minúsculas), con GENVET sumada a TERCEROS.
+
+    Args:
+        metas_historicas: Resultado de SupabaseManager.read_metas_por_linea
+        mes: Mes 'YYYY-MM'
+
+    Returns:
+        tuple: (metas, metas_ipn)
+    """
+    del_mes = metas_historicas.get(mes, {})
+    result = []
+    for clave in ('metas', 'metas_ipn'):
+        metas = {}
+        for linea_id, valor in del_mes.get(clave, {}).items():
+            linea_id = linea_id.lower()
+            if linea_id == 'genvet':
+                linea_id = 'terceros'
+            metas[linea_id] = metas.get(linea_id, 0) + valor
+        result.append(metas)
+    return result[0], result[1]
+
+
+def datos_lineas(agregados: Dict[str, Dict], metas: Dict[str, float], metas_ipn: Dict[str, float]) -> List[Dict[str, Any]]:
+    """
+    Filas de la tabla de líneas comerciales, en orden alfabético.
+
+    Las líneas salen de las ventas y de las metas (las que no tuvieron ventas),
+    sin las de LINEAS_EXCLUIDAS.
+    """
+    ventas_por_linea = agregados['ventas_por_linea']
+    all_lines = {}
+    for nombre in ventas_por_linea:
+        all_lines[nombre.lower().replace(' ', '_')] = nombre.upper()
+    for linea_id in metas:
+        all_lines.setdefault(linea_id, linea_id.replace('_', ' ').upper())
+
+    total_venta = sum(ventas_por_linea.values())
+    filas = []
+    for linea_id, nombre in sorted(all_lines.items(), key=lambda x: x[1]):
+        if nombre in LINEAS_EXCLUIDAS:
+            continue
+        meta = metas.get(linea_id, 0)
+        venta = ventas_por_linea.get(nombre, 0)
+        meta_pn = metas_ipn.get(linea_id, 0)
+        venta_pn = agregados['ventas_ipn_por_linea'].get(nombre, 0)
+        filas.append({
+            'nombre': nombre,
+            'meta': meta,
+            'venta': venta,
+            'porcentaje_total': (venta / meta * 100) if meta > 0 else 0,
+            'porcentaje_sobre_total': (venta / total_venta * 100) if total_venta > 0 else 0,
+            'meta_pn': meta_pn,
+            'venta_pn': venta_pn,
+            'porcentaje_pn': (venta_pn / meta_pn * 100) if meta_pn > 0 else 0,
+            'vencimiento_6_meses': agregados['ventas_por_ruta'].get(nombre, 0),
+        })
+    return filas
+
+
+def calcular_kpis(agregados: Dict[str, Dict], filas: List[Dict[str, Any]], metas: Dict[str, float],
+                  metas_ipn: Dict[str, float], periodo: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    KPIs del dashboard: avance contra la meta, avance diario, proyección lineal y brecha.
+
+    La venta total incluye todas las líneas (también ECOMMERCE y las excluidas
+    de la tabla); la venta IPN y el vencimiento suman las filas de la tabla.
+
+    Returns:
+        dict: Claves de las tarjetas (meta_total, venta_total, porcentaje_avance, ...,
+              avance_lineal_pct, faltante_meta, avance_lineal_ipn_pct, faltante_meta_ipn)
+    """
+    now = now or datetime.now()
+    total_meta = sum(metas.values())
+    total_meta_pn = sum(metas_ipn.values())
+    total_venta = sum(agregados['ventas_por_linea'].values())
+    total_venta_pn = sum(f['venta_pn'] for f in filas)
+    total_vencimiento = sum(f['vencimiento_6_meses'] for f in filas)
+    dia_actual = periodo['dia_actual']
+    año_sel, mes_sel = (int(v) for v in periodo['mes'].split('-'))
+    dias_en_mes = calendar.monthrange(año_sel, mes_sel)[1]
+
+    # Días laborables restantes (lunes a sábado) en el mes en curso
+    ritmo_diario_requerido = 0
+    if periodo['mes'] == now.strftime('%Y-%m'):
+        dias_restantes = sum(1 for dia in range(now.day, dias_en_mes + 1)
+                             if datetime(año_sel, mes_sel, dia).weekday() < 6)
+        porcentaje_restante = 100 - ((total_venta / total_meta * 100) if total_meta > 0 else 100)
+        if porcentaje_restante > 0 and dias_restantes > 0:
+            ritmo_diario_requerido = porcentaje_restante / dias_restantes
+
+    # Proyección lineal de la venta acumulada al mes completo
+    proyeccion_mensual = (total_venta / dia_actual) * dias_en_mes if dia_actual > 0 else 0
+    proyeccion_mensual_ipn = (total_venta_pn / dia_actual) * dias_en_mes if dia_actual > 0 else 0
+
+    return {
+        'meta_total': total_meta,
+        'venta_total': total_venta,
+        'porcentaje_avance': (total_venta / total_meta * 100) if total_meta > 0 else 0,
+        'meta_ipn': total_meta_pn,
+        'venta_ipn': total_venta_pn,
+        'porcentaje_avance_ipn': (total_venta_pn / total_meta_pn * 100) if total_meta_pn > 0 else 0,
+        'vencimiento_6_meses': total_vencimiento,
+        'avance_diario_total': ((total_venta / total_meta * 100) / dia_actual) if total_meta > 0 and dia_actual > 0 else 0,
+        'avance_diario_ipn': ((total_venta_pn / total_meta_pn * 100) / dia_actual) if total_meta_pn > 0 and dia_actual > 0 else 0,
+        'ritmo_diario_requerido': ritmo_diario_requerido,
+        'avance_lineal_pct': (proyeccion_mensual / total_meta * 100) if total_meta > 0 else 0,
+        'faltante_meta': max(total_meta - total_venta, 0),
+        'avance_lineal_ipn_pct': (proyeccion_mensual_ipn / total_meta_pn * 100) if total_meta_pn > 0 else 0,
+        'faltante_meta_ipn': max(total_meta_pn - total_venta_pn, 0),
+    }
+
+
+def top_productos(agregados: Dict[str, Dict], n: int = 7) -> List[Dict[str, Any]]:
+    """Los n productos con más ventas y su ciclo de vida."""
+    ordenados = sorted(agregados['ventas_por_producto'].items(), key=lambda x: x[1], reverse=True)[:n]
+    return [
+        {'nombre': nombre, 'venta': venta,
+         'ciclo_vida': agregados['ciclo_vida_por_producto'].get(nombre, 'No definido')}
+        for nombre, venta in ordenados
+    ]
+
+
+def ventas_ciclo_vida(agregados: Dict[str, Dict]) -> List[Dict[str, Any]]:
+    """Venta por ciclo de vida, de mayor a menor."""
+    return [
+        {'ciclo': ciclo, 'venta': venta}
+        for ciclo, venta in sorted(agregados['ventas_por_ciclo_vida'].items(), key=lambda x: x[1], reverse=True)
+    ]
+
+
+def tabla_ecommerce(agregados: Dict[str, Dict], metas: Dict[str, float], ecommerce_ids: List[str]) -> Dict[str, Any]:
+    """
+    Ventas del equipo ECOMMERCE por línea comercial y avance contra su meta.
+
+    Returns:
+        dict: lineas (nombre, venta, porcentaje_sobre_total; de mayor a menor venta)
+              y kpis (meta_total, venta_total, porcentaje_avance); vacío sin equipo
+    """
+    kpis = {'meta_total': 0, 'venta_total': 0, 'porcentaje_avance': 0}
+    if not ecommerce_ids:
+        return {'lineas': [], 'kpis': kpis}
+
+    kpis['meta_total'] = metas.get('ecommerce', 0)
+    ventas = agregados['ventas_por_linea_ecommerce']
+    kpis['venta_total'] = sum(ventas.values())
+    if kpis['meta_total'] > 0:
+        kpis['porcentaje_avance'] = kpis['venta_total'] / kpis['meta_total'] * 100
+    lineas = [
+        {'nombre': linea, 'venta': venta,
+         'porcentaje_sobre_total': (venta / kpis['venta_total'] * 100) if kpis['venta_total'] > 0 else 0}
+        for linea, venta in ventas.items()
+    ]
+    return {'lineas': sorted(lineas, key=lambda x: x['venta'], reverse=True), 'kpis': kpis}
+
+
+class DashboardWidgets:
+    """
+    Calcula y cachea cada widget de /dashboard por separado.
+
+    Args:
+        data_manager: OdooManager (get_dashboard_aggregates, get_commercial_lines_stacked_data,
+                      get_dashboard_lines)
+        supabase_manager: SupabaseManager (read_metas_por_linea, read_equipos y, si lo
+                          tiene, cache_version para ver los guardados de otros workers)
+        ttl_seconds: Segundos de vida de cada widget y fuente (0 desactiva la caché)
+        supabase_timeout: Segundos para leer metas (None: sin límite)
+        odoo_timeout: Segundos para los agregados de Odoo (None: sin límite)
+    """
+
+    def __init__(self, data_manager, supabase_manager, ttl_seconds: int = 120,
+                 supabase_timeout: Optional[float] = None, odoo_timeout: Optional[float] = None):
+        self.data_manager = data_manager
+        self.supabase_manager = supabase_manager
+        self.supabase_timeout = supabase_timeout
+        self.odoo_timeout = odoo_timeout
+        self.cache = SalesLinesCache(ttl_seconds=ttl_seconds, max_bytes=64 * 1024 * 1024, name='dashboard_widgets')
+
+    def widget(self, name: str, periodo: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Datos JSON de un widget para el periodo (ver dashboard_period).
+
+        Raises:
+            KeyError: Si el widget no existe
+        """
+        if name not in WIDGETS:
+            raise KeyError(name)
+        key = ('widget', name, periodo['fecha_inicio'], periodo['fecha_fin'], self._supabase_version())
+        return self.cache.get_or_load(key, lambda: getattr(self, f'_{name}')(periodo))
+
+    def agregados_por_linea(self, fecha_inicio: str, fecha_fin: str) -> Dict[str, Any]:
+        """
+        Totales de /dashboard_linea de todas las líneas comerciales del periodo.
+
+        Se calculan en una sola pasada sobre las ventas y quedan en caché por
+        fecha_inicio y fecha_fin (mes y dia_fin): cambiar de línea no consulta Odoo.
+
+        Returns:
+            dict: por_linea (ver lineas_totals) y lineas_con_ventas
+        """
+        def cargar():
+            # Celdas del cubo diario si el almacén local cubre el rango,
+            # si no líneas de Odoo con solo las columnas del DataFrame (sin sale.order)
+            ventas_df = sales_lines_to_frame(self.data_manager.get_dashboard_lines(fecha_inicio, fecha_fin, limit=10000))
+            return {'por_linea': lineas_totals(ventas_df), 'lineas_con_ventas': lineas_con_ventas(ventas_df)}
+        return self.cache.get_or_load(('fuente', 'lineas', fecha_inicio, fecha_fin), cargar)
+
+    def invalidate(self):
+        """Descarta widgets y fuentes (por ejemplo, al guardar metas o equipos)."""
+        self.cache.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    # --- Fuentes compartidas entre widgets ---
+
+    def _supabase_version(self):
+        """Versión de metas y equipos (SupabaseManager.cache_version): cambia al guardar en cualquier worker."""
+        cache_version = getattr(self.supabase_manager, 'cache_version', None)
+        return cache_version() if cache_version is not None else None
+
+    def _ecommerce_ids(self) -> List[str]:
+        equipos = self.cache.get_or_load(('fuente', 'equipos', self._supabase_version()),
+                                         self.supabase_manager.read_equipos)
+        return [str(vid) for vid in equipos.get('ecommerce', [])]
+
+    def _metas(self, periodo) -> Tuple[Dict[str, float], Dict[str, float]]:
+        # Solo el mes del periodo: la consulta no crece con el historial de metas
+        mes = periodo['mes']
+        metas = self.cache.get_or_load(
+            ('fuente', 'metas', mes, self._supabase_version()),
+            lambda: self.supabase_manager.read_metas_por_linea(mes_desde=mes, mes_hasta=mes)
+        )
+        return consolidar_metas(metas, mes)
+
+    def _agregados(self, periodo) -> Dict[str, Dict]:
+        ecommerce_ids = self._ecommerce_ids()
+        key = ('fuente', 'agregados', periodo['fecha_inicio'], periodo['fecha_fin'], tuple(ecommerce_ids))
+        return self.cache.get_or_load(key, lambda: self.data_manager.get_dashboard_aggregates(
+            periodo['fecha_inicio'], periodo['fecha_fin'], ecommerce_user_ids=ecommerce_ids
+        ))
+
+    def _agregados_y_metas(self, periodo):
+        # Un widget sin metas o sin ventas no se cachea: ambas fuentes son requeridas
+        cargas = ConcurrentLoader()
+        cargas.submit('agregados', self._agregados, periodo, required=True, timeout=self.odoo_timeout)
+        cargas.submit('metas', self._metas, periodo, required=True, timeout=self.supabase_timeout)
+        return cargas.result('agregados'), cargas.result('metas')
+
+    # --- Widgets ---
+
+    def _kpis(self, periodo):
+        agregados, (metas, metas_ipn) = self._agregados_y_metas(periodo)
+        return calcular_kpis(agregados, datos_lineas(agregados, metas, metas_ipn), metas, metas_ipn, periodo)
+
+    def _lineas(self, periodo):
+        agregados, (metas, metas_ipn) = self._agregados_y_metas(periodo)
+        filas = datos_lineas(agregados, metas, metas_ipn)
+        return {
+            # Gráfico en orden alfabético; tabla de mayor a menor venta con fila de totales
+            'lineas': filas,
+            'tabla': sorted(filas, key=lambda x: x['venta'], reverse=True),
+            'totales': calcular_kpis(agregados, filas, metas, metas_ipn, periodo),
+        }
+
+    def _productos(self, periodo):
+        return {'productos': top_productos(self._agregados(periodo))}
+
+    def _ciclo_vida(self, periodo):
+        return {'ciclo_vida': ventas_ciclo_vida(self._agregados(periodo))}
+
+    def _ecommerce(self, periodo):
+        agregados, (metas, _) = self._agregados_y_metas(periodo)
+        return tabla_ecommerce(agregados, metas, self._ecommerce_ids())
+
+    def _apilado(self, periodo):
+        return self.data_manager.get_commercial_lines_stacked_data(
+            date_from=periodo['fecha_inicio'], date_to=periodo['fecha_fin']
+        )
@@ -0,0 +1,203 @@
+"""
+excel_export.py - Exportación a Excel en streaming con memoria constante
+
+Las exportaciones armaban un DataFrame completo, lo escribían a un BytesIO y
+luego recorrían cada celda para aplicar formatos y convertir fechas. Aquí las
+filas se escriben una a una con openpyxl en modo write-only (las filas van a un
+archivo temporal, no a memoria), los tipos se convierten una sola vez por
+celda y los formatos y anchos se definen por columna.
+
+El libro se arma en un archivo temporal antes de responder (los errores se
+siguen reportando con flash/redirect) y se envía por trozos.
+
+Columnas: tuplas (clave, encabezado, tipo, ancho). Tipos:
+- 'texto': many2one [id, nombre] -> nombre; False -> celda vacía
+- 'moneda': float (0.0 si no es numérico), formato de soles
+- 'numero': formato de miles
+- 'fecha': 'YYYY-MM-DD' -> fecha de Excel
+- 'crudo': valor tal cual (listas como texto, igual que pandas)
+"""
+
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# "S/" entre comillas: sin ellas Excel lee la S como segundos (formato de hora)
+CURRENCY_FORMAT = '"S/" #,##0.00;[Red]-"S/" #,##0.00'
+NUMBER_FORMAT = '#,##0'
+DATE_FORMAT = 'YYYY-MM-DD'
+
+# Formato de Excel por tipo de columna
+_FORMATS = {'moneda': CURRENCY_FORMAT, 'numero': NUMBER_FORMAT, 'fecha': DATE_FORMAT}
+
+# El archivo temporal queda en memoria hasta este tamaño y luego pasa a disco
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Bytes por trozo de la descarga
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+Column = Tuple[str, str, str, Optional[float]]
+
+# Detalle de ventas del dashboard (/export/dashboard/details), en el orden del Excel
+DETALLE_COLUMNS: Tuple[Column, ...] = (
+    ('invoice_date', 'Fecha Factura', 'fecha', 14),
+    ('l10n_latam_document_type_id', 'Tipo Documento', 'texto', 18),
+    ('move_name', 'Número Documento', 'texto', 20),
+    ('partner_name', 'Cliente', 'texto', 40),
+    ('vat', 'RUC/DNI Cliente', 'texto', 16),
+    ('invoice_user_id', 'Vendedor', 'texto', 30),
+    ('default_code', 'Código Producto', 'texto', 16),
+    ('name', 'Descripción Producto', 'texto', 45),
+    ('quantity', 'Cantidad', 'numero', 11),
+    ('price_unit', 'Precio Unitario', 'moneda', 16),
+    ('balance', 'Importe Total', 'moneda', 18),
+    ('commercial_line_national_id', 'Línea Comercial', 'texto', 22),
+    ('sales_channel_id', 'Canal de Venta', 'texto', 18),
+    ('payment_state', 'Estado de Pago', 'texto', 15),
+    ('invoice_origin', 'Documento Origen', 'texto', 18),
+    ('product_life_cycle', 'Ciclo de Vida Producto', 'texto', 22),
+    ('pharmacological_classification_id', 'Clasificación Farmacológica', 'texto', 28),
+    ('pharmaceutical_forms_id', 'Forma Farmacéutica', 'texto', 20),
+    ('administration_way_id', 'Vía de Administración', 'texto', 22),
+    ('production_line_id', 'Línea de Producción', 'texto', 22),
+    ('categ_id', 'Categoría de Producto', 'texto', 28),
+    ('route_id', 'Ruta de Venta', 'texto', 18),
+)
+
+_HEADER_FONT = Font(bold=True, color="FFFFFF")
+_HEADER_FILL = PatternFill(start_color="875A7B", end_color="875A7B", fill_type="solid")
+
+
+def _to_text(value):
+    if isinstance(value, list):
+        return value[1] if len(value) > 1 else None
+    return None if value is False else value
+
+
+def _to_currency(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _to_number(value):
+    return None if value is False else value
+
+
+def _to_date(value):
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            return value
+    return None if value is False else value
+
+
+def _to_raw(value):
+    return str(value) if isinstance(value, (list, tuple)) else value
+
+
+_CONVERTERS = {
+    'texto': _to_text, 'moneda': _to_currency, 'numero': _to_number, 'fecha': _to_date, 'crudo': _to_raw,
+}
+
+
+def raw_columns(keys: Iterable[str]) -> List[Column]:
+    """Columnas sin traducción ni formato: una por clave de las líneas, con el valor tal cual."""
+    return [(key, key, 'crudo', None) for key in keys]
+
+
+def write_xlsx(fileobj, rows: Iterable[Dict[str, Any]], columns: Sequence[Column], sheet_name: str,
+               header_style: bool = True) -> int:
+    """
+    Escribe las filas en un libro de una hoja en modo write-only.
+
+    Args:
+        fileobj: Archivo (o ruta) de destino
+        rows: Líneas de venta (dicts); se consumen una a una
+        columns: Columnas (clave, encabezado, tipo, ancho) en el orden del Excel
+        sheet_name: Nombre de la hoja (Excel admite hasta 31 caracteres)
+        header_style: Encabezado en negrita sobre fondo de color y panel congelado
+
+    Returns:
+        int: Filas de datos escritas
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name[:31])
+
+    # En modo write-only los anchos y el panel se definen antes de la primera fila
+    for idx, (_, header, _, width) in enumerate(columns, 1):
+        if width:
+            worksheet.column_dimensions[get_column_letter(idx)].width = width
+    if header_style:
+        worksheet.freeze_panes = 'A2'
+
+    headers = []
+    for _, header, _, _ in columns:
+        cell = WriteOnlyCell(worksheet, value=header)
+        if header_style:
+            cell.font = _HEADER_FONT
+            cell.fill = _HEADER_FILL
+        headers.append(cell)
+    worksheet.append(headers)
+
+    keys = [key for key, _, _, _ in columns]
+    converters = [_CONVERTERS[kind] for _, _, kind, _ in columns]
+    formats = [_FORMATS.get(kind) for _, _, kind, _ in columns]
+    formatted = [i for i, fmt in enumerate(formats) if fmt]
+
+    count = 0
+    for row in rows:
+        values = [convert(row.get(key)) for key, convert in zip(keys, converters)]
+        for i in formatted:
+            if values[i] is not None:
+                cell = WriteOnlyCell(worksheet, value=values[i])
+                cell.number_format = formats[i]
+                values[i] = cell
+        worksheet.append(values)
+        count += 1
+
+    workbook.save(fileobj)
+    return count
+
+
+def build_xlsx(rows: Iterable[Dict[str, Any]], columns: Sequence[Column], sheet_name: str,
+               header_style: bool = True) -> Tuple[Any, int]:
+    """
+    Arma el libro en un archivo temporal (en memoria hasta 8 MB, luego en disco).
+
+    Returns:
+        tuple: (archivo temporal posicionado al inicio, filas escritas)
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    try:
+        count = write_xlsx(output, rows, columns, sheet_name, header_style=header_style)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output, count
+
+
+def iter_file_chunks(fileobj, chunk_size: int = DOWNLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+    """Lee el archivo por trozos para la descarga y lo cierra al terminar."""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
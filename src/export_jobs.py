@@ -0,0 +1,282 @@
+"""
+export_jobs.py - Exportaciones largas en segundo plano con progreso
+
+Exportar un año completo retenía un worker de gunicorn durante minutos y solía
+vencer el timeout del proxy. Ahora la petición encola un trabajo (tipo de
+exportación + filtros) y responde de inmediato; un pool propio de hilos,
+separado del de los dashboards, lo ejecuta y la página consulta el progreso
+hasta que el archivo está listo para descargar.
+
+- Cada trabajo escribe su archivo en EXPORT_JOBS_DIR y guarda su estado en un
+  JSON al lado: cualquier worker del mismo servidor responde el progreso y
+  la descarga
+- Pedir la misma exportación con los mismos filtros mientras otra está en
+  curso devuelve ese mismo trabajo (en este proceso)
+- Los archivos terminados se eliminan pasado EXPORT_JOB_TTL_SECONDS
+- Un trabajo sin terminar pasado max_run_seconds (su worker murió a mitad de
+  la exportación) se marca como error y se borra su archivo parcial
+
+Estados: pendiente -> en_proceso -> listo | error
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Cada cuántas filas se informa el progreso y cada cuántos segundos se guarda en disco
+_PROGRESS_EVERY_ROWS = 1000
+_PERSIST_EVERY_SECONDS = 2.0
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def count_rows(rows: Iterable[Any], progress: Callable[[int], None],
+               every: int = _PROGRESS_EVERY_ROWS) -> Iterator[Any]:
+    """Entrega las filas tal cual e informa a progress cuántas van cada `every` filas."""
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % every == 0:
+            progress(count)
+    progress(count)
+
+
+class ExportJobs:
+    """
+    Cola de exportaciones con pool de hilos propio y archivos en disco local.
+
+    Args:
+        export_dir: Carpeta de los archivos y estados de los trabajos
+        max_workers: Exportaciones simultáneas (el resto queda pendiente)
+        ttl_seconds: Segundos que se conserva un archivo terminado
+        max_run_seconds: Segundos desde que se creó un trabajo tras los cuales, si
+            ningún hilo de este proceso lo está ejecutando, se da por interrumpido
+            (por defecto ttl_seconds)
+    """
+
+    def __init__(self, export_dir: str, max_workers: int = 2, ttl_seconds: int = 1800,
+                 max_run_seconds: Optional[int] = None):
+        self.export_dir = export_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_run_seconds = ttl_seconds if max_run_seconds is None else max_run_seconds
+        os.makedirs(export_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='export-job')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active: Dict[tuple, str] = {}
+
+    @staticmethod
+    def _key(kind: str, params: Dict[str, Any]) -> tuple:
+        return (kind,) + tuple(sorted((k, str(v)) for k, v in params.items() if v not in (None, '')))
+
+    def submit(self, kind: str, params: Dict[str, Any], run: Callable[[str, Callable[[int], None]], int],
+               filename: str) -> Dict[str, Any]:
+        """
+        Encola una exportación, o devuelve la que ya está en curso con los mismos filtros.
+
+        Args:
+            kind: Tipo de exportación (ej: 'ventas', 'detalle')
+            params: Filtros de la exportación
+            run: Función (ruta_destino, progreso) que escribe el archivo y retorna las filas
+            filename: Nombre de descarga del archivo
+
+        Returns:
+            dict: Estado del trabajo (ver status)
+        """
+        self.cleanup()
+        key = self._key(kind, params)
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id is not None:
+                logger.info(f"📤 Exportación {kind} ya en curso, se reutiliza el trabajo {job_id}")
+                return dict(self._jobs[job_id])
+            job_id = uuid.uuid4().hex
+            job = {
+                'id': job_id, 'tipo': kind, 'params': params, 'estado': 'pendiente', 'filas': 0,
+                'archivo': filename, 'error': None, 'creado': time.time(), 'terminado': None,
+            }
+            self._jobs[job_id] = job
+            self._active[key] = job_id
+            self._persist(job)
+            queued = dict(job)
+
+        self._executor.submit(self._run, job, key, run)
+        logger.info(f"📤 Exportación {kind} encolada: {job_id} {params}")
+        return queued
+
+    def _run(self, job, key, run):
+        job_id = job['id']
+        ext = os.path.splitext(job['archivo'])[1]
+        part_path = os.path.join(self.export_dir, f'{job_id}{ext}.part')
+        last_persist = [0.0]
+
+        def progress(rows):
+            job['filas'] = rows
+            now = time.monotonic()
+            if now - last_persist[0] >= _PERSIST_EVERY_SECONDS:
+                last_persist[0] = now
+                self._persist(job)
+
+        start = time.perf_counter()
+        job['estado'] = 'en_proceso'
+        self._persist(job)
+        try:
+            job['filas'] = run(part_path, progress)
+            os.replace(part_path, self._file_path(job_id, ext))
+            job['estado'] = 'listo'
+            logger.info(f"✅ Exportación {job['tipo']} {job_id}: {job['filas']} filas en {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"❌ Exportación {job['tipo']} {job_id} falló: {e}", exc_info=True)
+            job['estado'] = 'error'
+            job['error'] = 'No se pudo generar la exportación'
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        finally:
+            job['terminado'] = time.time()
+            with self._lock:
+                self._active.pop(key, None)
+            self._persist(job)
+
+    def _file_path(self, job_id, ext):
+        return os.path.join(self.export_dir, f'{job_id}{ext}')
+
+    def _status_path(self, job_id):
+        return os.path.join(self.export_dir, f'{job_id}.json')
+
+    def _persist(self, job):
+        tmp = self._status_path(job['id']) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp, self._status_path(job['id']))
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Estado de un trabajo: id, tipo, params, estado, filas, archivo, error, creado, terminado.
+
+        Returns:
+            dict o None: None si el id no existe o ya expiró
+        """
+        if not _JOB_ID.match(job_id or ''):
+            return None
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+        # Trabajo de otro worker del mismo servidor
+        try:
+            with open(self._status_path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def file_path(self, job_id: str) -> Optional[str]:
+        """Ruta del archivo de un trabajo terminado (None si no está listo o expiró)."""
+        return self._ready_path(job_id, self.status(job_id))
+
+    def open_file(self, job_id: str) -> Optional[Tuple[BinaryIO, str]]:
+        """
+        Abre el archivo de un trabajo terminado para descargarlo.
+
+        El estado se lee una sola vez y el archivo queda abierto: si cleanup()
+        lo elimina mientras tanto, la descarga en curso no falla.
+
+        Returns:
+            tuple o None: (archivo abierto en binario, nombre de descarga), o
+            None si no está listo o expiró
+        """
+        job = self.status(job_id)
+        path = self._ready_path(job_id, job)
+        if path is None:
+            return None
+        try:
+            return open(path, 'rb'), job['archivo']
+        except OSError:
+            return None
+
+    def _ready_path(self, job_id: str, job: Optional[Dict[str, Any]]) -> Optional[str]:
+        if job is None or job['estado'] != 'listo':
+            return None
+        path = self._file_path(job_id, os.path.splitext(job['archivo'])[1])
+        return path if os.path.exists(path) else None
+
+    def cleanup(self) -> int:
+        """
+        Elimina los trabajos terminados hace más de ttl_seconds. Retorna cuántos.
+
+        Los trabajos sin terminar creados hace más de max_run_seconds que este
+        proceso no está ejecutando (su worker se reinició) se marcan como error,
+        para que la página deje de consultar, y se borran los archivos parciales
+        (.part) que quedaron.
+        """
+        now = time.time()
+        limit = now - self.ttl_seconds
+        run_limit = now - self.max_run_seconds
+        removed = 0
+        try:
+            names = os.listdir(self.export_dir)
+        except OSError:
+            return 0
+        with self._lock:
+            running = set(self._active.values())
+        for name in names:
+            if name.endswith('.part'):
+                self._remove_stale_part(name, running, run_limit)
+                continue
+            job_id, ext = os.path.splitext(name)
+            if ext != '.json' or not _JOB_ID.match(job_id):
+                continue
+            job = self.status(job_id)
+            if job is None:
+                continue
+            if job['terminado'] is None:
+                if job_id not in running and job['creado'] < run_limit:
+                    self._mark_interrupted(job, now)
+                continue
+            if job['terminado'] > limit:
+                continue
+            for path in (self._file_path(job_id, os.path.splitext(job['archivo'])[1]), self._status_path(job_id)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._jobs.pop(job_id, None)
+            removed += 1
+        return removed
+
+    def _mark_interrupted(self, job, now):
+        """Marca como error un trabajo cuyo worker terminó sin completarlo."""
+        logger.warning(f"⚠️ Exportación {job['tipo']} {job['id']} interrumpida ({job['estado']}), se marca como error")
+        job.update({'estado': 'error', 'error': 'La exportación se interrumpió. Vuelva a generarla.', 'terminado': now})
+        self._persist(job)
+        part_path = self._file_path(job['id'], os.path.splitext(job['archivo'])[1]) + '.part'
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+
+    def _remove_stale_part(self, name, running, run_limit):
+        """Borra un archivo parcial de un trabajo terminado, expirado o interrumpido."""
+        job_id = name.split('.', 1)[0]
+        if job_id in running:
+            return
+        job = self.status(job_id)
+        if job is None or job['terminado'] is not None or job['creado'] < run_limit:
+            try:
+                os.remove(os.path.join(self.export_dir, name))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Trabajos de este proceso por estado."""
+        with self._lock:
+            estados = [job['estado'] for job in self._jobs.values()]
+        return {estado: estados.count(estado) for estado in ('pendiente', 'en_proceso', 'listo', 'error')}
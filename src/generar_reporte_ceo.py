@@ -89,7 +89,8 @@ def extraer_datos_2025():
         sales_data = odoo.get_sales_lines(
             date_from=fecha_inicio,
             date_to=fecha_fin,
-            limit=50000  # Aumentar límite para obtener todos los datos
+            limit=50000,  # Aumentar límite para obtener todos los datos
+            fields=['balance', 'commercial_line_national_id', 'product_life_cycle']
         )
         
         print(f"✅ Obtenidas {len(sales_data)} líneas de ventas")
@@ -0,0 +1,205 @@
+"""
+master_data_cache.py - Caché de larga duración para datos maestros de Odoo
+
+Productos (con sus campos farmacéuticos), clientes e impuestos cambian muy
+poco, pero get_sales_lines los volvía a leer en cada consulta. Esta caché los
+mantiene en memoria por id y los revalida por write_date:
+
+- La primera carga fija una marca de agua: la hora (UTC, como write_date) en
+  que se pidieron los registros
+- Cada MASTER_DATA_CHECK_SECONDS se consulta solo lo modificado desde la marca
+  ([('write_date', '>=', marca)]) y se actualizan los registros ya cacheados;
+  la marca pasa a la hora de esa revisión
+- Los campos que viven en otro modelo (ej: categoría y línea comercial de
+  product.product están en product.template) se vigilan por el write_date de
+  ese modelo ('product_tmpl_id.write_date')
+- Los ids que no están en caché se piden a Odoo y se agregan
+
+La caché no ejecuta consultas: entrega tuplas (modelo, método, args, kwargs)
+para que OdooManager las envíe junto a las demás (batch JSON-RPC o etapas en
+paralelo) y luego le devuelva los registros.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Margen de la marca de agua ante diferencias de reloj con Odoo (releer un par
+# de minutos de cambios es barato; saltarse uno deja datos viejos en caché)
+_CLOCK_MARGIN = timedelta(minutes=2)
+
+
+def _watermark_now() -> str:
+    """Hora actual en el formato de write_date de Odoo (UTC), menos el margen de reloj."""
+    return (datetime.now(timezone.utc) - _CLOCK_MARGIN).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class MasterDataCache:
+    """
+    Registros de un modelo maestro de Odoo indexados por id, revalidados por write_date.
+
+    Args:
+        model: Modelo de Odoo (ej: 'product.product')
+        fields: Campos a leer de cada registro
+        check_interval_seconds: Segundos entre revisiones de cambios (0 = sin revisión)
+        related: Campos many2one cuyo write_date también cuenta como cambio del
+            registro (ej: ('product_tmpl_id',) para product.product)
+    """
+
+    def __init__(self, model: str, fields: List[str], check_interval_seconds: int = 300,
+                 related: Tuple[str, ...] = ()):
+        self.model = model
+        self.fields = list(fields)
+        self.check_interval_seconds = check_interval_seconds
+        self.related = tuple(related)
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._watermark: Optional[str] = None
+        self._load_started: Optional[str] = None
+        self._refresh_started: Optional[str] = None
+        self._last_check = time.monotonic()
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refreshed_records = 0
+        self._last_refresh_seconds = 0.0
+        self._total_refresh_seconds = 0.0
+
+    def _query(self, domain: list) -> Tuple[str, str, list, dict]:
+        return (
+            self.model, 'search_read', [domain],
+            {'fields': self.fields + ['write_date'], 'context': {'lang': 'es_PE'}}
+        )
+
+    def missing(self, ids: Iterable[int]) -> List[int]:
+        """
+        Ids que no están en caché (cuenta aciertos y fallos).
+
+        Args:
+            ids: Ids requeridos por la consulta actual
+
+        Returns:
+            list: Ids a pedir a Odoo
+        """
+        ids = list(ids)
+        with self._lock:
+            missing = [i for i in ids if i not in self._records]
+            self._hits += len(ids) - len(missing)
+            self._misses += len(missing)
+        return missing
+
+    def fetch_query(self, ids: List[int]) -> Tuple[str, str, list, dict]:
+        """Consulta de los registros que faltan en caché."""
+        with self._lock:
+            if self._watermark is None and self._load_started is None:
+                self._load_started = _watermark_now()
+        return self._query([('id', 'in', ids)])
+
+    def store(self, records: List[Dict[str, Any]]):
+        """
+        Agrega registros leídos de Odoo.
+
+        La primera carga fija la marca de agua en la hora en que se pidieron
+        los registros (fetch_query); las siguientes no la mueven (solo la
+        revisión de cambios avanza la marca, así no se salta ningún registro
+        modificado entre revisiones).
+        """
+        with self._lock:
+            for record in records:
+                self._records[record['id']] = record
+            if self._watermark is None and self._records:
+                self._watermark = self._load_started or _watermark_now()
+                self._load_started = None
+
+    def refresh_query(self) -> Optional[Tuple[str, str, list, dict]]:
+        """
+        Consulta de los registros modificados desde la última revisión, si corresponde.
+
+        Marca la revisión como hecha, de modo que entre varios hilos solo uno
+        la ejecuta.
+
+        Returns:
+            Tupla de consulta, o None si no toca revisar (o no hay marca de agua)
+        """
+        if self.check_interval_seconds <= 0:
+            return None
+        with self._lock:
+            if self._watermark is None or not self._records:
+                return None
+            now = time.monotonic()
+            if now - self._last_check < self.check_interval_seconds:
+                return None
+            self._last_check = now
+            watermark = self._watermark
+            self._refresh_started = _watermark_now()
+        domain = ['|'] * len(self.related) + [('write_date', '>=', watermark)]
+        domain += [(f'{field}.write_date', '>=', watermark) for field in self.related]
+        return self._query(domain)
+
+    def apply_refresh(self, records: List[Dict[str, Any]], seconds: float = 0.0):
+        """
+        Actualiza los registros cacheados que cambiaron y avanza la marca de
+        agua a la hora de la revisión (refresh_query).
+
+        Los registros modificados que aún no están en caché se ignoran: se
+        pedirán con su valor actual cuando alguna consulta los necesite.
+
+        Args:
+            records: Resultado de refresh_query
+            seconds: Duración de la consulta de revisión
+        """
+        with self._lock:
+            updated = 0
+            for record in records:
+                if record['id'] in self._records:
+                    self._records[record['id']] = record
+                    updated += 1
+            if self._refresh_started and self._refresh_started > (self._watermark or ''):
+                self._watermark = self._refresh_started
+            self._refresh_started = None
+            self._refreshes += 1
+            self._refreshed_records += updated
+            self._last_refresh_seconds = seconds
+            self._total_refresh_seconds += seconds
+        if updated:
+            logger.info(f"Datos maestros {self.model}: {updated} registros actualizados en {seconds:.2f}s")
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Registros cacheados de los ids indicados (los que no existen en Odoo se omiten)."""
+        with self._lock:
+            return {i: self._records[i] for i in ids if i in self._records}
+
+    def clear(self):
+        """Vacía la caché; la próxima consulta vuelve a cargar y fija una nueva marca."""
+        with self._lock:
+            self._records.clear()
+            self._watermark = None
+            self._load_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de uso para operadores.
+
+        Returns:
+            Dict con registros, aciertos, fallos, ratio de aciertos y tiempos de revisión
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'model': self.model,
+                'records': len(self._records),
+                'watermark': self._watermark,
+                'check_interval_seconds': self.check_interval_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 3) if lookups else 0.0,
+                'refreshes': self._refreshes,
+                'refreshed_records': self._refreshed_records,
+                'last_refresh_seconds': round(self._last_refresh_seconds, 3),
+                'total_refresh_seconds': round(self._total_refresh_seconds, 3),
+            }
@@ -45,25 +45,26 @@ def obtener_totales_2025():
     try:
         odoo = OdooManager()
         
-        # Obtener todas las ventas de 2025
+        # Obtener todas las ventas de 2025 por páginas (memoria acotada a una página)
         print("📥 Extrayendo datos de 2025...")
-        sales_2025 = odoo.get_sales_lines(
+        paginas_2025 = odoo.iter_sales_lines(
             date_from='2025-01-01',
             date_to='2025-12-31',
-            limit=100000
+            limit=100000,
+            fields=['balance', 'commercial_line_national_id', 'product_life_cycle']
         )
         
-        print(f"   Líneas obtenidas: {len(sales_2025)}")
-        
         # Calcular totales
         total_venta = 0
         total_productos_nuevos = 0
+        num_lineas = 0
         
         # Por línea comercial
         ventas_por_linea = {}
         productos_nuevos_por_linea = {}
         
-        for sale in sales_2025:
+        for sale in (sale for pagina in paginas_2025 for sale in pagina):
+            num_lineas += 1
             balance = float(sale.get('balance', 0))
             total_venta += balance
             
@@ -89,6 +90,8 @@ def obtener_totales_2025():
             if sale.get('product_life_cycle') == 'nuevo':
                 total_productos_nuevos += balance
         
+        print(f"   Líneas obtenidas: {num_lineas}")
+        
         # Ordenar líneas por venta descendente
         lineas_ordenadas = sorted(
             ventas_por_linea.items(),
@@ -99,7 +102,7 @@ def obtener_totales_2025():
         return {
             'total_venta': total_venta,
             'productos_nuevos': total_productos_nuevos,
-            'num_lineas': len(sales_2025),
+            'num_lineas': num_lineas,
             'por_linea': [
                 {
                     'nombre': linea,
@@ -45,26 +45,82 @@ VENTAJAS:
 ✅ Mejor rendimiento que XML-RPC
 ✅ Payloads más pequeños (JSON vs XML)
 ✅ Fácil de debuggear
-✅ Compatible con código XML-RPC existente
+✅ Compatible con código XML-RPC existente (object_proxy())
+✅ Pool de conexiones keep-alive, respuestas gzip y reintentos de lecturas
 
 AUTOR: Jonathan Cerda
 FECHA: Marzo 2026
 LICENCIA: MIT
 """
 
+import gzip
+import itertools
+import json
+import time
 import requests
 import logging
-from typing import List, Dict, Any, Optional, Union
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+# Métodos de solo lectura: se pueden reintentar sin riesgo de duplicar escrituras
+IDEMPOTENT_METHODS = frozenset({
+    'search', 'search_read', 'search_count', 'read', 'read_group',
+    'fields_get', 'name_search', 'name_get', 'check_access_rights',
+})
+IDEMPOTENT_COMMON_METHODS = frozenset({'version', 'authenticate', 'login'})
+
+# Respuestas HTTP transitorias (proxy/balanceador delante de Odoo)
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
 
 class OdooJSONRPCError(Exception):
     """Excepción personalizada para errores de Odoo"""
     pass
 
+
+class _TransientHTTPError(Exception):
+    """Respuesta HTTP transitoria que se puede reintentar"""
+
+
+class OdooJSONRPCObjectProxy:
+    """
+    Adaptador con la firma de xmlrpc.client.ServerProxy('/xmlrpc/2/object')
+
+    Permite usar el cliente donde se espera models.execute_kw(db, uid, password,
+    model, method, args, kwargs), por ejemplo en OdooManager.
+    """
+
+    def __init__(self, client: 'OdooJSONRPCClient'):
+        self.client = client
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        return self.client._call_json_rpc(
+            service="object",
+            method="execute_kw",
+            args=[db, uid, password, model, method, args, kwargs or {}]
+        )
+
+    def execute_kw_batch(self, db, uid, password, calls):
+        """Varias llamadas (model, method, args, kwargs) en una sola petición HTTP"""
+        return self.client._call_json_rpc_batch([
+            ("object", "execute_kw", [db, uid, password, model, method, args, kwargs or {}])
+            for model, method, args, kwargs in calls
+        ])
+
+    @property
+    def batch_supported(self):
+        """None mientras no se sepa si el servidor acepta batch, luego True/False"""
+        return self.client.batch_supported
+
+
 class OdooJSONRPCClient:
     """
     Cliente JSON-RPC para Odoo
     
-    Reemplaza xmlrpc.client evitando bugs de módulos que interceptan XML-RPC
+    Reemplaza xmlrpc.client evitando bugs de módulos que interceptan XML-RPC.
+    Usa una requests.Session con pool de conexiones keep-alive: las llamadas
+    reutilizan la conexión TCP/TLS en lugar de abrir una nueva por petición.
+    La sesión es segura para usar desde varios hilos.
     """
     
     def __init__(
@@ -74,7 +130,12 @@ class OdooJSONRPCClient:
         username: str,
         password: str,
         timeout: int = 30,
-        auto_authenticate: bool = True
+        auto_authenticate: bool = True,
+        pool_size: int = 10,
+        max_retries: int = 2,
+        backoff_factor: float = 0.5,
+        compress_requests: bool = False,
+        compress_min_bytes: int = 4096
     ):
         """
         Inicializar cliente Odoo JSON-RPC
@@ -86,6 +147,15 @@ class OdooJSONRPCClient:
             password: Contraseña o API Key
             timeout: Timeout en segundos para peticiones HTTP
             auto_authenticate: Si True, autentica automáticamente al crear instancia
+            pool_size: Conexiones keep-alive que se mantienen abiertas (usar
+                       al menos el número de hilos que llaman en paralelo)
+            max_retries: Reintentos de lecturas idempotentes ante errores de
+                         conexión, timeout o HTTP 502/503/504
+            backoff_factor: Espera base entre reintentos (0.5 -> 0.5s, 1s, 2s...)
+            compress_requests: Si True, envía con gzip los cuerpos grandes
+                               (requiere un proxy/servidor que acepte
+                               Content-Encoding: gzip en la petición)
+            compress_min_bytes: Tamaño mínimo del cuerpo para comprimirlo
         """
         self.url = url.rstrip('/')
         self.db = db
@@ -94,19 +164,162 @@ class OdooJSONRPCClient:
         self.timeout = timeout
         self.jsonrpc_url = f"{self.url}/jsonrpc"
         self.uid = None
-        self._request_id = 0
+        self.pool_size = max(1, pool_size)
+        self.max_retries = max(0, max_retries)
+        self.backoff_factor = backoff_factor
+        self.compress_requests = compress_requests
+        self.compress_min_bytes = compress_min_bytes
+        # itertools.count es atómico en CPython: ids únicos entre hilos
+        self._request_ids = itertools.count(1)
+        # None = aún no se sabe si el servidor acepta arreglos batch JSON-RPC
+        self.batch_supported = None
         
         # Configurar logging
         self.logger = logging.getLogger(__name__)
         
+        self.session = self._build_session()
+        
         # Autenticar
         if auto_authenticate:
             self.authenticate()
     
+    def _build_session(self) -> requests.Session:
+        """Sesión HTTP con pool de conexiones keep-alive y respuestas gzip"""
+        session = requests.Session()
+        # Los reintentos se manejan en _call_json_rpc (solo para lecturas)
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=0
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        return session
+    
+    def close(self):
+        """Cerrar las conexiones del pool"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def object_proxy(self) -> OdooJSONRPCObjectProxy:
+        """Adaptador compatible con ServerProxy('/xmlrpc/2/object')"""
+        return OdooJSONRPCObjectProxy(self)
+    
     def _get_next_id(self) -> int:
         """Generar ID único para peticiones JSON-RPC"""
-        self._request_id += 1
-        return self._request_id
+        return next(self._request_ids)
+    
+    @staticmethod
+    def _is_idempotent(service: str, method: str, args: List[Any]) -> bool:
+        """True si la llamada es de solo lectura y se puede reintentar"""
+        if service == "common":
+            return method in IDEMPOTENT_COMMON_METHODS
+        if service == "object" and method == "execute_kw" and len(args) > 4:
+            return args[4] in IDEMPOTENT_METHODS
+        return False
+    
+    def _encode_payload(self, payload: Dict[str, Any]):
+        """Serializa el payload; lo comprime con gzip si está habilitado y es grande"""
+        body = json.dumps(payload).encode('utf-8')
+        if self.compress_requests and len(body) >= self.compress_min_bytes:
+            return gzip.compress(body, compresslevel=5), {"Content-Encoding": "gzip"}
+        return body, None
+    
+    def _post(self, body: bytes, headers: Optional[Dict[str, str]]) -> Any:
+        """POST al endpoint /jsonrpc reutilizando una conexión del pool"""
+        response = self.session.post(
+            self.jsonrpc_url,
+            data=body,
+            headers=headers,
+            timeout=self.timeout
+        )
+        if response.status_code in RETRY_STATUS_CODES:
+            raise _TransientHTTPError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        # requests descomprime automáticamente las respuestas gzip
+        return response.json()
+    
+    def _send(self, body: bytes, headers: Optional[Dict[str, str]], retries: int, label: str) -> Any:
+        """
+        Envía un cuerpo JSON-RPC con reintentos y backoff exponencial
+        
+        Args:
+            body: Cuerpo serializado (ver _encode_payload)
+            headers: Encabezados adicionales (Content-Encoding)
+            retries: Reintentos ante errores de conexión, timeout o HTTP 502/503/504
+            label: Método para los mensajes de log
+            
+        Returns:
+            JSON decodificado de la respuesta
+            
+        Raises:
+            requests.exceptions.HTTPError: Respuesta HTTP de error no transitoria
+            OdooJSONRPCError: Resto de errores de transporte
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._post(body, headers)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                    _TransientHTTPError) as e:
+                if attempt >= retries:
+                    if isinstance(e, requests.exceptions.Timeout):
+                        raise OdooJSONRPCError(f"Request timeout after {self.timeout}s")
+                    if isinstance(e, _TransientHTTPError):
+                        raise OdooJSONRPCError(f"Request error: {e}")
+                    raise OdooJSONRPCError(f"Connection error: {e}")
+                delay = self.backoff_factor * (2 ** attempt)
+                attempt += 1
+                self.logger.warning(
+                    f"⚠️ {label} falló ({e}); reintento {attempt}/{retries} en {delay:.1f}s"
+                )
+                time.sleep(delay)
+            except requests.exceptions.HTTPError:
+                raise
+            except requests.exceptions.RequestException as e:
+                raise OdooJSONRPCError(f"Request error: {e}")
+            except ValueError as e:
+                raise OdooJSONRPCError(f"Invalid JSON response from Odoo: {e}")
+    
+    def _build_payload(self, service: str, method: str, args: List[Any]) -> Dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {
+                "service": service,
+                "method": method,
+                "args": args
+            },
+            "id": self._get_next_id()
+        }
+    
+    def _unwrap_response(self, result: Dict[str, Any]) -> Any:
+        """Extrae result de una respuesta JSON-RPC o lanza el error de Odoo"""
+        if "result" in result:
+            return result["result"]
+        elif "error" in result:
+            error = result["error"]
+            error_data = error.get("data", {})
+            error_msg = error_data.get("message", str(error))
+            
+            # Log detallado del error
+            self.logger.error(f"Odoo Error: {error_msg}")
+            if "debug" in error_data:
+                self.logger.debug(f"Debug info: {error_data['debug']}")
+            
+            raise OdooJSONRPCError(error_msg)
+        else:
+            raise OdooJSONRPCError("Invalid response from Odoo (no result or error)")
     
     def _call_json_rpc(
         self,
@@ -117,6 +330,10 @@ class OdooJSONRPCClient:
         """
         Llamada genérica JSON-RPC
         
+        Las lecturas idempotentes (search_read, read, search_count...) se
+        reintentan con backoff exponencial ante errores de conexión, timeout
+        o HTTP 502/503/504. Las escrituras nunca se reintentan.
+        
         Args:
             service: Servicio Odoo ('common', 'object', 'db')
             method: Método a ejecutar
@@ -128,50 +345,97 @@ class OdooJSONRPCClient:
         Raises:
             OdooJSONRPCError: Si hay error en la llamada
         """
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "call",
-            "params": {
-                "service": service,
-                "method": method,
-                "args": args
-            },
-            "id": self._get_next_id()
-        }
+        body, headers = self._encode_payload(self._build_payload(service, method, args))
+        retries = self.max_retries if self._is_idempotent(service, method, args) else 0
+        try:
+            result = self._send(body, headers, retries, method)
+        except requests.exceptions.HTTPError as e:
+            raise OdooJSONRPCError(f"Request error: {e}")
+        if not isinstance(result, dict):
+            raise OdooJSONRPCError("Invalid response from Odoo (no result or error)")
+        return self._unwrap_response(result)
+    
+    def _call_json_rpc_batch(self, calls: List[Tuple[str, str, List[Any]]]) -> List[Any]:
+        """
+        Envía varias llamadas en una sola petición HTTP (arreglo batch JSON-RPC 2.0)
         
+        Las respuestas se asocian a cada llamada por su id, sin importar el
+        orden en que lleguen. Si el servidor no acepta arreglos (el endpoint
+        /jsonrpc estándar de Odoo responde un único objeto de error o un error
+        HTTP), se recuerda en batch_supported y se ejecutan las llamadas una a
+        una. En ese caso el servidor no ejecutó ninguna llamada del arreglo,
+        así que repetirlas es seguro.
+        
+        Args:
+            calls: Lista de (service, method, args)
+            
+        Returns:
+            Lista de resultados en el mismo orden que calls
+            
+        Raises:
+            OdooJSONRPCError: Error de transporte o de alguna de las llamadas
+        """
+        if self.batch_supported is False or len(calls) < 2:
+            return [self._call_json_rpc(service, method, args) for service, method, args in calls]
+        
+        payloads = [self._build_payload(service, method, args) for service, method, args in calls]
+        body, headers = self._encode_payload(payloads)
+        idempotent = all(self._is_idempotent(service, method, args) for service, method, args in calls)
+        label = f"batch[{len(calls)}]"
         try:
-            response = requests.post(
-                self.jsonrpc_url,
-                json=payload,
-                headers=headers,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            result = response.json()
+            responses = self._send(body, headers, self.max_retries if idempotent else 0, label)
+        except requests.exceptions.HTTPError as e:
+            responses = e
+        
+        if isinstance(responses, list):
+            by_id = {r.get("id"): r for r in responses if isinstance(r, dict)}
+            if not all(p["id"] in by_id for p in payloads):
+                # El servidor procesó el arreglo: no se repite nada (podría duplicar escrituras)
+                raise OdooJSONRPCError("Invalid batch response from Odoo (missing ids)")
+            self.batch_supported = True
+            return [self._unwrap_response(by_id[p["id"]]) for p in payloads]
+        
+        self.batch_supported = False
+        self.logger.warning(
+            f"⚠️ El servidor no acepta batch JSON-RPC ({self._describe_rejection(responses)}); "
+            f"se usan llamadas individuales"
+        )
+        return [self._call_json_rpc(service, method, args) for service, method, args in calls]
+    
+    @staticmethod
+    def _describe_rejection(response: Any) -> str:
+        if isinstance(response, Exception):
+            return str(response)
+        if isinstance(response, dict) and isinstance(response.get("error"), dict):
+            return str(response["error"].get("message", response))[:200]
+        return str(response)[:200]
+    
+    def execute_kw_batch(self, calls: List[Tuple[str, str, List[Any], Optional[Dict[str, Any]]]]) -> List[Any]:
+        """
+        Ejecutar varios métodos de modelo en una sola petición HTTP
+        
+        Args:
+            calls: Lista de (model, method, args, kwargs)
             
-            if "result" in result:
-                return result["result"]
-            elif "error" in result:
-                error = result["error"]
-                error_data = error.get("data", {})
-                error_msg = error_data.get("message", str(error))
-                
-                # Log detallado del error
-                self.logger.error(f"Odoo Error: {error_msg}")
-                if "debug" in error_data:
-                    self.logger.debug(f"Debug info: {error_data['debug']}")
-                
-                raise OdooJSONRPCError(error_msg)
-            else:
-                raise OdooJSONRPCError("Invalid response from Odoo (no result or error)")
-                
-        except requests.exceptions.Timeout:
-            raise OdooJSONRPCError(f"Request timeout after {self.timeout}s")
-        except requests.exceptions.ConnectionError as e:
-            raise OdooJSONRPCError(f"Connection error: {e}")
-        except requests.exceptions.RequestException as e:
-            raise OdooJSONRPCError(f"Request error: {e}")
+        Returns:
+            Lista de resultados en el mismo orden que calls
+            
+        Raises:
+            OdooJSONRPCError: Si no está autenticado o hay error
+            
+        Example:
+            >>> moves, partners = client.execute_kw_batch([
+            ...     ('account.move', 'read', [[1, 2]], {'fields': ['name']}),
+            ...     ('res.partner', 'read', [[7]], {'fields': ['vat']}),
+            ... ])
+        """
+        if not self.uid:
+            raise OdooJSONRPCError("Not authenticated. Call authenticate() first.")
+        
+        return self._call_json_rpc_batch([
+            ("object", "execute_kw", [self.db, self.uid, self.password, model, method, args, kwargs or {}])
+            for model, method, args, kwargs in calls
+        ])
     
     def authenticate(self) -> int:
         """
@@ -496,7 +760,8 @@ class OdooJSONRPCClient:
     def __repr__(self) -> str:
         """Representación del objeto"""
         auth_status = "authenticated" if self.uid else "not authenticated"
-        return f"<OdooJSONRPCClient url={self.url} db={self.db} user={self.username} {auth_status}>"
+        return (f"<OdooJSONRPCClient url={self.url} db={self.db} user={self.username} "
+                f"{auth_status} pool={self.pool_size}>")
 
 
 # ========== EJEMPLO DE USO ==========
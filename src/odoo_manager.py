@@ -5,12 +5,32 @@ import json
 import os
 import pandas as pd
 from datetime import datetime, timedelta
+import threading
+import time
 import xmlrpc.client
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from src.logging_config import get_logger
+from src.utils import env_int
+from src.sales_cache import SalesLinesCache
+from src.master_data_cache import MasterDataCache
+from src.sales_period_cache import ClosedDaysWatcher, split_period
+from src.odoo_jsonrpc_client import OdooJSONRPCClient
+from src.sales_store import SalesLineStore, SalesStoreSync
+from src.sales_columns import SalesLinesTable
+from src.sales_aggregation import (
+    FRAME_FIELDS, RUTAS_VENCIMIENTO, sales_lines_to_frame, dashboard_rows_to_frame, add_dashboard_columns,
+    dashboard_totals, monthly_series, trend_months, year_over_year
+)
 
 logger = get_logger(__name__)
 
+
 class OdooManager:
+    # Protege los tiempos por etapa que escriben los hilos del pool de consultas
+    _timings_lock = threading.Lock()
+    # Serializa la resolución de ids de los filtros de ventas (ver _sales_filter_ids)
+    _sales_filter_lock = threading.Lock()
+
     def get_commercial_lines_stacked_data(self, date_from=None, date_to=None, linea_id=None, partner_id=None):
         """Devuelve datos para gráfico apilado por línea comercial y 5 categorías"""
         sales_lines = self.get_sales_lines(
@@ -18,7 +38,10 @@ class OdooManager:
             date_to=date_to,
             partner_id=partner_id,
             linea_id=linea_id,
-            limit=5000
+            limit=5000,
+            fields=['commercial_line_national_id', 'quantity', 'pharmaceutical_forms_id',
+                    'pharmacological_classification_id', 'administration_way_id', 'categ_id',
+                    'production_line_id']
         )
         # Nombres de las categorías a apilar
         categories = [
@@ -63,6 +86,44 @@ class OdooManager:
             'legend': [cat[1] for cat in categories]
         }
     def __init__(self):
+        # Caché compartida de get_sales_lines (TTL 0 la desactiva)
+        self._sales_cache = SalesLinesCache(
+            ttl_seconds=env_int('SALES_CACHE_TTL_SECONDS', 300),
+            max_bytes=env_int('SALES_CACHE_MAX_MB', 256) * 1024 * 1024,
+            name='sales_lines'
+        )
+        # Días cerrados del rango en caché larga (ver src/sales_period_cache.py); los días
+        # abiertos (SALES_OPEN_DAYS, contando hoy) se refrescan cada SALES_OPEN_TTL_SECONDS
+        self._closed_days_cache = SalesLinesCache(
+            ttl_seconds=env_int('SALES_CLOSED_DAYS_TTL_SECONDS', 86400),
+            max_bytes=env_int('SALES_CACHE_MAX_MB', 256) * 1024 * 1024,
+            name='sales_closed_days'
+        )
+        self._closed_days_watcher = ClosedDaysWatcher(env_int('SALES_CLOSED_DAYS_CHECK_SECONDS', 60))
+        self.sales_open_days = env_int('SALES_OPEN_DAYS', 2)
+        self.sales_open_ttl = env_int('SALES_OPEN_TTL_SECONDS', 60)
+
+        # Consultas relacionadas en paralelo (cada hilo usa su propio ServerProxy)
+        self.parallel_fetch = os.getenv('ODOO_PARALLEL_FETCH', 'true').lower() == 'true'
+        # Con JSON-RPC, consultas independientes en una sola petición HTTP (batch)
+        self.rpc_batch = os.getenv('ODOO_RPC_BATCH', 'true').lower() == 'true'
+        # Consultas grandes por partes: líneas base por página e ids por ('id', 'in', ...)
+        self.base_page_size = env_int('ODOO_BASE_PAGE_SIZE', 5000)
+        self.id_chunk_size = env_int('ODOO_ID_CHUNK_SIZE', 1000)
+        self._fetch_executor = ThreadPoolExecutor(
+            max_workers=max(1, env_int('ODOO_FETCH_WORKERS', 4)),
+            thread_name_prefix='odoo-fetch'
+        )
+        self._rpc_local = threading.local()
+        self.jsonrpc_client = None
+        # Productos, clientes e impuestos en memoria, revalidados por write_date
+        self._master_data = None
+        if os.getenv('MASTER_DATA_CACHE_ENABLED', 'true').lower() == 'true':
+            self._master_data = self._new_master_data(env_int('MASTER_DATA_CHECK_SECONDS', 300))
+        # Ids de impuestos IGV y de líneas/canales internacionales para el dominio de ventas
+        self.sales_filter_ttl = env_int('MASTER_DATA_CHECK_SECONDS', 300)
+        self._sales_filter_state = None
+
         # Configurar conexión a Odoo - Usar credenciales del .env
         try:
             # Cargar credenciales desde variables de entorno (sin valores por defecto)
@@ -89,37 +150,43 @@ class OdooManager:
             self.common_url = f"{self.url}/xmlrpc/2/common"
             self.object_url = f"{self.url}/xmlrpc/2/object"
             
-            try:
-                logger.info(f"🔍 Intentando conectar a Odoo (XML-RPC):")
-                logger.info(f"   URL: {self.url}")
-                logger.info(f"   DB: {self.db}")
-                logger.info(f"   Usuario: {self.username}")
+            # Protocolo RPC: xmlrpc (por defecto) o jsonrpc (sesión HTTP con pool keep-alive)
+            self.rpc_protocol = os.getenv('ODOO_RPC_PROTOCOL', 'xmlrpc').lower()
+            if self.rpc_protocol == 'jsonrpc':
+                self._connect_jsonrpc()
+            else:
+                try:
+                    logger.info(f"🔍 Intentando conectar a Odoo (XML-RPC):")
+                    logger.info(f"   URL: {self.url}")
+                    logger.info(f"   DB: {self.db}")
+                    logger.info(f"   Usuario: {self.username}")
                 
-                # Autenticar con XML-RPC
-                common = xmlrpc.client.ServerProxy(self.common_url, allow_none=True)
-                self.uid = common.authenticate(self.db, self.username, self.password, {})
+                    # Autenticar con XML-RPC
+                    common = xmlrpc.client.ServerProxy(self.common_url, allow_none=True)
+                    self.uid = common.authenticate(self.db, self.username, self.password, {})
                 
-                if self.uid:
-                    # Crear proxy para ejecutar métodos
-                    self.models = xmlrpc.client.ServerProxy(self.object_url, allow_none=True)
-                    logger.info(f"✅ Odoo conectado exitosamente (XML-RPC). UID: {self.uid}")
-                else:
+                    if self.uid:
+                        # Crear proxy para ejecutar métodos (uno por hilo, ver models)
+                        self.models = xmlrpc.client.ServerProxy(self.object_url, allow_none=True)
+                        self._rpc_local.models = self._models
+                        self._rpc_per_thread = True
+                        logger.info(f"✅ Odoo conectado exitosamente (XML-RPC). UID: {self.uid}")
+                    else:
+                        self.uid = None
+                        self.models = None
+                        logger.warning("❌ Autenticación falló. Credenciales incorrectas.")
+                        logger.warning("Continuando en modo offline.")
+                    
+                except xmlrpc.client.Fault as fault:
+                    logger.warning(f"❌ Error XML-RPC: {fault.faultString}")
+                    logger.warning("Continuando en modo offline.")
                     self.uid = None
                     self.models = None
-                    logger.warning("❌ Autenticación falló. Credenciales incorrectas.")
+                except Exception as auth_e:
+                    logger.warning(f"❌ Error durante autenticación a Odoo: {auth_e}")
                     logger.warning("Continuando en modo offline.")
-                    
-            except xmlrpc.client.Fault as fault:
-                logger.warning(f"❌ Error XML-RPC: {fault.faultString}")
-                logger.warning("Continuando en modo offline.")
-                self.uid = None
-                self.models = None
-            except Exception as auth_e:
-                logger.warning(f"❌ Error durante autenticación a Odoo: {auth_e}")
-                logger.warning("Continuando en modo offline.")
-                self.uid = None
-                self.models = None
-                self.models = None
+                    self.uid = None
+                    self.models = None
                 
         except Exception as e:
             logger.error(f"Error en la conexión a Odoo: {e}", exc_info=True)
@@ -127,6 +194,65 @@ class OdooManager:
             self.uid = None
             self.models = None
 
+        # Almacén local de líneas de venta sincronizado por write_date (opcional)
+        self.sales_store = None
+        self._store_sync = None
+        if os.getenv('SALES_STORE_ENABLED', 'false').lower() == 'true':
+            self._init_sales_store()
+
+    def _connect_jsonrpc(self):
+        """
+        Conecta con OdooJSONRPCClient y expone su adaptador como self.models.
+
+        El adaptador tiene la misma firma execute_kw que el ServerProxy de
+        XML-RPC, por lo que el resto de métodos no cambia. La sesión HTTP
+        mantiene un pool de conexiones keep-alive compartido por todos los hilos.
+        """
+        try:
+            logger.info(f"🔍 Intentando conectar a Odoo (JSON-RPC con pool):")
+            logger.info(f"   URL: {self.url}")
+            logger.info(f"   DB: {self.db}")
+            logger.info(f"   Usuario: {self.username}")
+
+            self.jsonrpc_client = OdooJSONRPCClient(
+                url=self.url,
+                db=self.db,
+                username=self.username,
+                password=self.password,
+                timeout=self.rpc_timeout,
+                pool_size=max(1, env_int('ODOO_HTTP_POOL_SIZE', 10)),
+                max_retries=max(0, env_int('ODOO_RPC_RETRIES', 2)),
+                compress_requests=os.getenv('ODOO_HTTP_GZIP_REQUESTS', 'false').lower() == 'true'
+            )
+            self.uid = self.jsonrpc_client.uid
+            self.models = self.jsonrpc_client.object_proxy()
+            logger.info(f"✅ Odoo conectado exitosamente (JSON-RPC). UID: {self.uid}")
+        except Exception as auth_e:
+            logger.warning(f"❌ Error durante autenticación a Odoo (JSON-RPC): {auth_e}")
+            logger.warning("Continuando en modo offline.")
+            self.jsonrpc_client = None
+            self.uid = None
+            self.models = None
+
+    def _init_sales_store(self):
+        """Crea el almacén SQLite de ventas e inicia su sincronización en segundo plano."""
+        try:
+            self.sales_store = SalesLineStore(
+                db_path=os.getenv('SALES_STORE_PATH', 'sales_store.db'),
+                start_date=os.getenv('SALES_STORE_START_DATE') or None,
+                max_age_seconds=env_int('SALES_STORE_MAX_AGE_SECONDS', 900)
+            )
+            if self.uid and self.models:
+                self._store_sync = SalesStoreSync(
+                    self, self.sales_store,
+                    interval_seconds=env_int('SALES_STORE_SYNC_SECONDS', 300)
+                )
+                self._store_sync.start()
+                logger.info(f"✅ Almacén de ventas activo ({self.sales_store.db_path}) desde {self.sales_store.start_date}")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo inicializar el almacén de ventas: {e}")
+            self.sales_store = None
+
     def authenticate_user(self, username, password):
         """Autenticar usuario contra Odoo y devolver sus datos si es exitoso."""
         try:
@@ -244,18 +370,70 @@ class OdooManager:
             print(f"Error obteniendo la lista de vendedores: {e}")
             return []
 
-    def get_sales_lines(self, page=None, per_page=None, filters=None, date_from=None, date_to=None, partner_id=None, linea_id=None, search=None, limit=10000):
-        """Obtener líneas de venta completas con todas las 27 columnas"""
+    @staticmethod
+    def _sales_cache_key(date_from=None, date_to=None, partner_id=None, linea_id=None, search=None, limit=10000):
+        """
+        Normaliza los filtros de get_sales_lines en una tupla usable como clave de caché.
+
+        Returns:
+            tuple: (date_from, date_to, partner_id, linea_id, search, limit)
+        """
+        date_from = str(date_from)[:10] if date_from else None
+        date_to = str(date_to)[:10] if date_to else None
+        # Si no hay fechas, por defecto se buscan los últimos 30 días
+        if not date_from and not date_to:
+            date_from = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        partner_id = int(partner_id) if partner_id not in (None, '') else None
+        linea_id = int(linea_id) if linea_id not in (None, '') else None
+        search = search.strip().lower() if search and search.strip() else None
+        limit = int(limit) if limit is not None else None
+        return (date_from, date_to, partner_id, linea_id, search, limit)
+
+    def get_cache_stats(self):
+        """Estadísticas de las cachés de Odoo para operadores."""
+        stats = {
+            'sales_lines': self._sales_cache.stats(),
+        }
+        if getattr(self, '_closed_days_cache', None) is not None:
+            stats['sales_closed_days'] = dict(self._closed_days_cache.stats(),
+                                              watcher=self._closed_days_watcher.stats())
+        if getattr(self, '_master_data', None) is not None:
+            stats['master_data'] = {model: cache.stats() for model, cache in self._master_data.items()}
+        if self.sales_store is not None:
+            stats['sales_store'] = self.sales_store.stats()
+            if self._store_sync is not None:
+                stats['sales_store']['last_error'] = self._store_sync.last_error
+                stats['sales_store']['sync_leader'] = self._store_sync.is_leader
+        return stats
+
+    def get_sales_lines(self, page=None, per_page=None, filters=None, date_from=None, date_to=None, partner_id=None, linea_id=None, search=None, limit=10000, columnar=False, national_only=False, fields=None):
+        """
+        Obtener líneas de venta completas con todas las 27 columnas.
+
+        Con columnar=True retorna un SalesLinesTable (ver src/sales_columns.py):
+        se itera igual que la lista de dicts pero ocupa mucho menos memoria,
+        útil para consultas grandes como un año completo.
+
+        Con national_only=True se excluye VENTA INTERNACIONAL (línea comercial
+        o canal) en el dominio de Odoo, como necesitan dashboards y exportaciones.
+
+        Con fields (lista de columnas, ver SALES_LINE_SOURCES) cada línea trae
+        solo esas columnas y no se consultan los modelos relacionados que no
+        las aportan (ej: sin route_id no se pide sale.order.line). Las
+        exportaciones usan fields=None (todas las columnas).
+
+        Los días cerrados del rango se cachean por separado de los abiertos
+        (ver _load_split_sales_lines): refrescar el mes en curso solo consulta
+        a Odoo ayer y hoy.
+        """
         try:
-            print(f"🔍 Obteniendo líneas de venta completas...")
-            
             # Verificar conexión
             if not self.uid or not self.models:
                 print("❌ No hay conexión a Odoo disponible")
                 if page is not None and per_page is not None:
                     return [], {'page': page, 'per_page': per_page, 'total': 0, 'pages': 0}
                 return []
-            
+
             # Manejar parámetros de ambos formatos de llamada
             if filters:
                 date_from = filters.get('date_from')
@@ -263,527 +441,1871 @@ class OdooManager:
                 partner_id = filters.get('partner_id')
                 linea_id = filters.get('linea_id')
                 search = filters.get('search')
-            
-            # Construir dominio de filtro
-            domain = [
-                ('move_id.move_type', 'in', ['out_invoice', 'out_refund']),
-                ('move_id.state', '=', 'posted'),
-                ('product_id.default_code', '!=', False)  # Solo productos con código
-            ]
-            
-            # Filtros de exclusión de categorías específicas
-            excluded_categories = [315, 333, 304, 314, 318, 339]
-            domain.append(('product_id.categ_id', 'not in', excluded_categories))
-            
-            # Filtros de fecha
-            if date_from:
-                domain.append(('move_id.invoice_date', '>=', date_from))
+
+            # Consultas idénticas concurrentes comparten un solo fetch a Odoo
+            cache_key = self._sales_cache_key(date_from, date_to, partner_id, linea_id, search, limit)
+            fields = self._sales_fields(fields)
+            key_suffix = ('national',) if national_only else ()
+            if fields is not None:
+                key_suffix += ('fields',) + fields
+            entry_key = cache_key + key_suffix
+            ttl = None
+            periods = self._split_sales_period(cache_key)
+            if self.sales_store is not None and self.sales_store.can_serve(cache_key[0], cache_key[1]):
+                # Rango cubierto por el almacén local sincronizado: no se consulta Odoo
+                loader = lambda: self._project_sales_lines(self._query_sales_store(cache_key, national_only), fields)
+            elif periods is not None:
+                # El resultado combinado vive lo que los días abiertos; los cerrados se reutilizan
+                loader = lambda: self._load_split_sales_lines(cache_key, periods, key_suffix, national_only, fields)
+                ttl = self.sales_open_ttl
             else:
-                # Si no hay fecha de inicio, por defecto buscar en los últimos 30 días
-                if not date_to:
-                    thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-                    domain.append(('move_id.invoice_date', '>=', thirty_days_ago))
+                loader = lambda: self._fetch_sales_lines(*cache_key, national_only=national_only, fields=fields)
 
-            if date_to:
-                domain.append(('move_id.invoice_date', '<=', date_to))
-            
-            # Filtro de cliente
-            if partner_id:
-                domain.append(('partner_id', '=', partner_id))
-            
-            # Filtro de línea comercial
-            if linea_id:
-                domain.append(('product_id.commercial_line_national_id', '=', linea_id))
-            
-            # Filtro de búsqueda general (nombre de producto, cliente, código, etc.)
-            if search:
-                search_domain = [
-                    '|', ('product_id.name', 'ilike', search),
-                    '|', ('product_id.default_code', 'ilike', search),
-                    '|', ('partner_id.name', 'ilike', search),
-                    ('move_name', 'ilike', search)
+            if columnar:
+                # La tabla es de solo lectura: se comparte tal cual desde la caché
+                table = self._sales_cache.get_or_load(
+                    entry_key + ('columnar',), lambda: self._build_sales_table(loader()), ttl
+                )
+                if page is not None and per_page is not None:
+                    return table[(page - 1) * per_page:page * per_page], self._pagination(page, per_page, len(table))
+                return table
+
+            sales_lines = list(self._sales_cache.get_or_load(entry_key, loader, ttl))
+
+            # Si se solicita paginación, devolver tupla (datos, paginación)
+            if page is not None and per_page is not None:
+                start_idx = (page - 1) * per_page
+                end_idx = start_idx + per_page
+                return sales_lines[start_idx:end_idx], self._pagination(page, per_page, len(sales_lines))
+
+            # Si no se solicita paginación, devolver solo los datos
+            return sales_lines
+
+        except Exception as e:
+            print(f"Error al obtener las líneas de venta de Odoo: {e}")
+            # Devolver formato apropiado según si se solicitó paginación
+            if page is not None and per_page is not None:
+                return [], {'page': page, 'per_page': per_page, 'total': 0, 'pages': 0}
+            return []
+
+    def iter_sales_lines(self, date_from=None, date_to=None, partner_id=None, linea_id=None, search=None, limit=None,
+                         national_only=False, fields=None):
+        """
+        Recorre las líneas de venta por páginas sin cargarlas todas en memoria.
+
+        Pensado para extracciones largas (un año completo): cada página de
+        ODOO_BASE_PAGE_SIZE líneas se pide a Odoo, se combina y se entrega antes
+        de pedir la siguiente. No pasa por la caché de get_sales_lines.
+
+        Args:
+            date_from, date_to, partner_id, linea_id, search: Mismos filtros que get_sales_lines
+            limit: Máximo de líneas base (None = sin límite)
+            national_only: Excluir VENTA INTERNACIONAL (ver get_sales_lines)
+            fields: Columnas requeridas (None = las 27 columnas, ver get_sales_lines)
+
+        Yields:
+            list: Líneas de venta de cada página
+        """
+        if not self.uid or not self.models:
+            print("❌ No hay conexión a Odoo disponible")
+            return
+
+        cache_key = self._sales_cache_key(date_from, date_to, partner_id, linea_id, search, limit)
+        fields = self._sales_fields(fields)
+        if self.sales_store is not None and self.sales_store.can_serve(cache_key[0], cache_key[1]):
+            yield self._project_sales_lines(self._query_sales_store(cache_key, national_only), fields)
+            return
+
+        domain = self._build_sales_domain(*cache_key[:5]) + self._sales_filter_domain(national_only)
+        yield from self._iter_sales_line_chunks(domain, cache_key[5], fields=fields)
+
+    # Orden del feed incremental: (write_date, id) ascendente, el cursor solo avanza
+    SALES_FEED_ORDER = 'write_date asc, id asc'
+
+    def get_sales_changes(self, after=None, limit=500, national_only=False, fields=None):
+        """
+        Facturas y notas de crédito de cliente modificadas después de un cursor, con sus líneas de venta.
+
+        Recorre account.move por (write_date, id) con búsqueda por clave (sin
+        offset): cada página cuesta lo mismo sin importar cuánto historial
+        quede atrás. Cada factura trae todas sus líneas actuales, construidas
+        como en get_sales_lines (mismas reglas de IGV, categorías y, con
+        national_only, sin VENTA INTERNACIONAL). Una factura cancelada o
+        devuelta a borrador llega con lines=[]: el consumidor reemplaza las
+        líneas de cada move_id por las recibidas.
+
+        Args:
+            after: (write_date, move_id) de la última factura recibida (None = desde el inicio)
+            limit: Facturas por página
+            national_only, fields: Como en get_sales_lines (move_id siempre se incluye)
+
+        Raises:
+            ConnectionError: Si no hay conexión a Odoo
+
+        Returns:
+            dict: moves (move_id, move_name, move_type, state, invoice_date, write_date, lines),
+                  next ((write_date, move_id) de la última factura, o after si no hubo cambios)
+                  y has_more
+        """
+        if not self.uid or not self.models:
+            raise ConnectionError("No hay conexión a Odoo disponible")
+        if fields is not None:
+            fields = list(fields) + ['move_id']
+        fields = self._sales_fields(fields)
+
+        domain = [('move_type', 'in', ['out_invoice', 'out_refund'])]
+        if after is not None:
+            write_date, move_id = after
+            domain += ['|', ('write_date', '>', write_date),
+                       '&', ('write_date', '=', write_date), ('id', '>', move_id)]
+        # Una factura de más para saber si hay otra página
+        moves = self.models.execute_kw(
+            self.db, self.uid, self.password, 'account.move', 'search_read', [domain],
+            {'fields': ['name', 'move_type', 'state', 'invoice_date', 'write_date'],
+             'order': self.SALES_FEED_ORDER, 'limit': limit + 1}
+        )
+        has_more = len(moves) > limit
+        moves = moves[:limit]
+
+        lines_by_move = {move['id']: [] for move in moves}
+        if moves:
+            line_domain = (self._build_sales_domain() + self._sales_filter_domain(national_only)
+                           + [('move_id', 'in', list(lines_by_move))])
+            for line in self._fetch_sales_lines_by_domain(line_domain, fields=fields):
+                move_id = line.get('move_id')
+                if move_id and move_id[0] in lines_by_move:
+                    lines_by_move[move_id[0]].append(line)
+
+        logger.info(f"📰 Feed de ventas: {len(moves)} factura(s) modificadas desde {after}")
+        return {
+            'moves': [
+                {
+                    'move_id': move['id'], 'move_name': move.get('name'), 'move_type': move.get('move_type'),
+                    'state': move.get('state'), 'invoice_date': move.get('invoice_date') or None,
+                    'write_date': move.get('write_date'), 'lines': lines_by_move[move['id']],
+                }
+                for move in moves
+            ],
+            'next': (moves[-1]['write_date'], moves[-1]['id']) if moves else after,
+            'has_more': has_more,
+        }
+
+    def _query_sales_store(self, cache_key, national_only=False):
+        """
+        Líneas de venta desde el almacén local (ver SalesLineStore.query).
+
+        El almacén guarda también VENTA INTERNACIONAL; con national_only se
+        descarta localmente antes de aplicar el límite.
+        """
+        if not national_only:
+            return self.sales_store.query(*cache_key)
+        lines = [l for l in self.sales_store.query(*cache_key[:5]) if not self._is_international_line(l)]
+        return lines if cache_key[5] is None else lines[:cache_key[5]]
+
+    def _split_sales_period(self, cache_key):
+        """
+        Tramos (cerrado, abierto) del rango de fechas de una consulta (ver split_period).
+
+        Returns:
+            tuple o None: None si la división está desactivada (SALES_OPEN_DAYS=0
+            o alguna de las dos cachés con TTL 0)
+        """
+        if getattr(self, 'sales_open_days', 0) <= 0:
+            return None
+        if not (self._sales_cache.enabled and self._closed_days_cache.enabled):
+            return None
+        return split_period(cache_key[0], cache_key[1], datetime.now().date(), self.sales_open_days)
+
+    def _load_split_sales_lines(self, cache_key, periods, key_suffix=(), national_only=False, fields=None):
+        """
+        Líneas de venta combinando los días abiertos (consulta a Odoo) y los cerrados (caché larga).
+
+        El orden es el de una sola consulta (fecha descendente): primero los días
+        abiertos y luego los cerrados. El tramo cerrado se pide con el mismo
+        limit que la consulta completa, así su entrada sirve para cualquier
+        cantidad de líneas abiertas y el recorte final coincide con una sola consulta.
+
+        Args:
+            cache_key: Filtros normalizados por _sales_cache_key
+            periods: (cerrado, abierto) de _split_sales_period
+            key_suffix: Parte de la clave de caché por national_only y fields
+            national_only, fields: Ver get_sales_lines
+
+        Returns:
+            list: Líneas de venta del rango completo
+        """
+        closed, opened = periods
+        partner_id, linea_id, search, limit = cache_key[2:]
+        sales_lines = []
+        if opened is not None:
+            sales_lines = self._fetch_sales_lines(*opened, partner_id, linea_id, search, limit,
+                                                  national_only=national_only, fields=fields)
+        if closed is not None and (limit is None or len(sales_lines) < limit):
+            self._check_closed_days()
+            self._closed_days_watcher.ensure_watermark()
+            closed_lines = self._closed_days_cache.get_or_load(
+                closed + cache_key[2:] + key_suffix,
+                lambda: self._fetch_sales_lines(*closed, partner_id, linea_id, search, limit,
+                                                national_only=national_only, fields=fields)
+            )
+            remaining = None if limit is None else limit - len(sales_lines)
+            sales_lines = sales_lines + list(closed_lines[:remaining])
+        return sales_lines
+
+    def _check_closed_days(self):
+        """
+        Invalida los días cerrados cacheados que tienen facturas modificadas en Odoo.
+
+        Se revisa una vez cada SALES_CLOSED_DAYS_CHECK_SECONDS; si la revisión
+        falla se mantienen los datos y se reintenta en la siguiente.
+        """
+        watcher = self._closed_days_watcher
+        query = watcher.check_query()
+        if query is None:
+            return
+        try:
+            records = self.models.execute_kw(self.db, self.uid, self.password, *query)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo revisar cambios en días cerrados: {e}")
+            return
+        dates = watcher.apply_changes(records)
+        if dates:
+            self._closed_days_cache.invalidate(self._covers_any_day(dates))
+
+    @staticmethod
+    def _covers_any_day(dates):
+        """Predicado de invalidación: claves (desde, hasta, ...) cuyo rango incluye alguna de las fechas."""
+        return lambda key: any((key[0] is None or key[0] <= d) and (key[1] is None or d <= key[1]) for d in dates)
+
+    def _invalidate_sales_days(self, dates):
+        """
+        Invalida en ambas cachés de líneas de venta solo las consultas que cubren esas fechas.
+
+        Args:
+            dates: Fechas de factura (YYYY-MM-DD) con líneas modificadas
+        """
+        dates = sorted({d for d in dates if d})
+        if not dates:
+            return
+        predicate = self._covers_any_day(dates)
+        self._sales_cache.invalidate(predicate)
+        self._closed_days_cache.invalidate(predicate)
+
+    @staticmethod
+    def _pagination(page, per_page, total_items):
+        """Datos de paginación de get_sales_lines."""
+        return {
+            'page': page,
+            'per_page': per_page,
+            'total': total_items,
+            'pages': (total_items + per_page - 1) // per_page
+        }
+
+    @staticmethod
+    def _build_sales_table(sales_lines):
+        """Convierte las líneas en SalesLinesTable y registra la memoria ahorrada."""
+        table = SalesLinesTable.from_records(sales_lines)
+        if len(table):
+            report = table.memory_report()
+            logger.info(
+                f"🧮 Líneas de venta en formato columnar: {report['rows']} filas | "
+                f"{report['columnar_bytes_per_10k'] / 1024 / 1024:.1f} MB por 10k líneas "
+                f"(dicts: {report['dict_bytes_per_10k'] / 1024 / 1024:.1f} MB)"
+            )
+        return table
+
+    # Columnas de la vista /sales que se pueden ordenar en Odoo -> campo de account.move.line
+    SALES_PAGE_SORT_FIELDS = {
+        'invoice_date': 'date',
+        'move_name': 'move_name',
+        'partner_name': 'partner_id',
+        'name': 'product_id',
+        'default_code': 'product_id',
+        'balance': 'balance',
+        'quantity': 'quantity',
+        'price_unit': 'price_unit',
+    }
+
+    # Reglas de negocio de las líneas de venta, aplicadas como dominio en Odoo
+    IGV_TAX_NAMES = ['IGV', 'IGV_INC']
+    INTERNATIONAL_LINE_NAME = 'VENTA INTERNACIONAL'
+    INTERNATIONAL_TEAM_NAME = 'INTERNACIONAL'
+
+    def _resolve_sales_filter_ids(self, models=None):
+        """
+        Consulta los ids de impuestos IGV/IGV_INC, líneas comerciales VENTA
+        INTERNACIONAL y canales INTERNACIONAL.
+
+        Los nombres se comparan en Python igual que los filtros que reemplazan:
+        nombre exacto del impuesto y 'INTERNACIONAL' contenido en el nombre de
+        la línea o el canal, sin distinguir mayúsculas. Las líneas y canales
+        archivados también se incluyen (las facturas antiguas los siguen usando).
+
+        Returns:
+            dict: igv_tax_ids, international_line_ids, international_team_ids
+        """
+        models = models if models is not None else self.models
+
+        def search_names(model, operator, name, context):
+            return models.execute_kw(
+                self.db, self.uid, self.password, model, 'search_read',
+                [[('name', operator, name)]], {'fields': ['name'], 'context': context}
+            )
+
+        archived = {'lang': 'es_PE', 'active_test': False}
+        taxes = search_names('account.tax', 'in', self.IGV_TAX_NAMES, {'lang': 'es_PE'})
+        teams = search_names('crm.team', 'ilike', self.INTERNATIONAL_TEAM_NAME, archived)
+        line_model = models.execute_kw(
+            self.db, self.uid, self.password, 'product.product', 'fields_get',
+            [['commercial_line_national_id']], {'attributes': ['relation']}
+        )['commercial_line_national_id']['relation']
+        lines = search_names(line_model, 'ilike', self.INTERNATIONAL_LINE_NAME, archived)
+
+        def matching(records, name):
+            return sorted(r['id'] for r in records if name in (r.get('name') or '').upper())
+
+        return {
+            'igv_tax_ids': sorted(t['id'] for t in taxes if t.get('name') in self.IGV_TAX_NAMES),
+            'international_line_ids': matching(lines, self.INTERNATIONAL_LINE_NAME),
+            'international_team_ids': matching(teams, self.INTERNATIONAL_TEAM_NAME),
+        }
+
+    def _sales_filter_ids(self, models=None):
+        """
+        Ids resueltos por _resolve_sales_filter_ids, reutilizados durante
+        MASTER_DATA_CHECK_SECONDS.
+
+        Returns:
+            dict de ids, o None si no se pudieron resolver
+        """
+        with self._sales_filter_lock:
+            state = getattr(self, '_sales_filter_state', None)
+            if state is not None and state[0] > time.monotonic():
+                return state[1]
+            try:
+                ids = self._resolve_sales_filter_ids(models)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudieron resolver los ids de los filtros de ventas ({e}); se filtra por nombre")
+                return None
+            self._sales_filter_state = (time.monotonic() + getattr(self, 'sales_filter_ttl', 300), ids)
+            logger.info(f"✅ Filtros de ventas resueltos: {ids}")
+            return ids
+
+    def _sales_filter_domain(self, national_only=False, models=None):
+        """
+        Compila las reglas de negocio de las líneas de venta en términos de dominio
+        de account.move.line, para que las filas excluidas no se descarguen.
+
+        - Impuesto IGV o IGV_INC (antes se filtraba al combinar las líneas)
+        - Con national_only, sin VENTA INTERNACIONAL por línea comercial ni por
+          canal (antes cada ruta lo filtraba recorriendo las líneas)
+
+        Usa los ids de _sales_filter_ids; si no están disponibles compara por
+        nombre en el servidor.
+
+        Args:
+            national_only: Excluir VENTA INTERNACIONAL
+            models: Proxy para resolver los ids (por defecto self.models)
+
+        Returns:
+            list: Términos de dominio
+        """
+        ids = self._sales_filter_ids(models)
+        if ids is None:
+            domain = [('tax_ids.name', 'in', self.IGV_TAX_NAMES)]
+            if national_only:
+                domain += [
+                    '|', ('product_id.commercial_line_national_id', '=', False),
+                    ('product_id.commercial_line_national_id.name', 'not ilike', self.INTERNATIONAL_LINE_NAME),
+                    '|', ('move_id.team_id', '=', False),
+                    ('move_id.team_id.name', 'not ilike', self.INTERNATIONAL_TEAM_NAME),
                 ]
-                domain.extend(search_domain)
+            return domain
 
-            # Obtener líneas base con todos los campos necesarios
-            query_options = {
-                'fields': [
-                    'move_id', 'partner_id', 'product_id', 'balance', 'move_name',
-                    'quantity', 'price_unit', 'tax_ids'
-                ],
-                'context': {'lang': 'es_PE'}
-            }
-            
-            # Solo agregar limit si no es None (XML-RPC no maneja None)
-            if limit is not None:
-                query_options['limit'] = limit
-            
-            sales_lines_base = self.models.execute_kw(
+        domain = [('tax_ids', 'in', ids['igv_tax_ids'])]
+        if national_only:
+            for field, key in (('product_id.commercial_line_national_id', 'international_line_ids'),
+                               ('move_id.team_id', 'international_team_ids')):
+                if ids[key]:
+                    domain += ['|', (field, '=', False), (field, 'not in', ids[key])]
+        return domain
+
+    def _national_igv_domain(self, models=None):
+        """Dominio de líneas con IGV/IGV_INC y sin VENTA INTERNACIONAL (ver _sales_filter_domain)."""
+        return self._sales_filter_domain(national_only=True, models=models)
+
+    @classmethod
+    def _is_international_line(cls, line):
+        """True si la línea de venta es VENTA INTERNACIONAL por línea comercial o canal."""
+        for field, name in (('commercial_line_national_id', cls.INTERNATIONAL_LINE_NAME),
+                            ('sales_channel_id', cls.INTERNATIONAL_TEAM_NAME)):
+            value = line.get(field)
+            if value and isinstance(value, list) and len(value) > 1 and name in value[1].upper():
+                return True
+        return False
+
+    def get_sales_lines_page(self, offset=0, limit=50, order_by='invoice_date', order_dir='desc',
+                             date_from=None, date_to=None, partner_id=None, linea_id=None, search=None):
+        """
+        Obtiene una página de líneas de venta con paginación en el servidor de Odoo.
+
+        El offset, el límite y el orden se envían al search_read de account.move.line,
+        el total se obtiene con search_count y solo se consultan los registros
+        relacionados de las líneas de la página.
+
+        Args:
+            offset: Primera fila de la página
+            limit: Filas por página
+            order_by: Columna de la vista (ver SALES_PAGE_SORT_FIELDS)
+            order_dir: 'asc' o 'desc'
+            date_from, date_to, partner_id, linea_id, search: Mismos filtros que get_sales_lines
+
+        Returns:
+            dict: {'data': [líneas de venta], 'total': int}
+
+        Raises:
+            Exception: Si falla la consulta a Odoo (la vista muestra el error en
+                lugar de una tabla vacía)
+        """
+        if not self.uid or not self.models:
+            return {'data': [], 'total': 0}
+
+        date_from, date_to, partner_id, linea_id, search, _ = self._sales_cache_key(
+            date_from, date_to, partner_id, linea_id, search
+        )
+        domain = self._build_sales_domain(date_from, date_to, partner_id, linea_id, search) + self._national_igv_domain()
+
+        field = self.SALES_PAGE_SORT_FIELDS.get(order_by, 'date')
+        descending = str(order_dir).lower() != 'asc'
+        if field == 'balance':
+            # El saldo se muestra con signo invertido
+            descending = not descending
+        direction = 'desc' if descending else 'asc'
+        order = f"{field} {direction}, move_name {direction}, id {direction}"
+
+        timings = {}
+        results = self._run_stages({
+            'search_count': lambda models: models.execute_kw(
+                self.db, self.uid, self.password, 'account.move.line', 'search_count',
+                [domain], {'context': {'lang': 'es_PE'}}
+            ),
+            'account.move.line': lambda models: models.execute_kw(
                 self.db, self.uid, self.password, 'account.move.line', 'search_read',
                 [domain],
-                query_options
+                {
+                    'fields': [
+                        'move_id', 'partner_id', 'product_id', 'balance', 'move_name',
+                        'quantity', 'price_unit', 'tax_ids'
+                    ],
+                    'offset': max(0, int(offset)),
+                    'limit': max(1, int(limit)),
+                    'order': order,
+                    'context': {'lang': 'es_PE'}
+                }
+            ),
+        }, timings)
+
+        page_base = results['account.move.line']
+        sales_lines = []
+        if page_base:
+            related = self._fetch_related_sales_data(page_base, timings)
+            sales_lines = self._merge_sales_lines(page_base, related)
+
+        logger.info(
+            f"⏱️ get_sales_lines_page offset={offset} limit={limit} | "
+            + ', '.join(f"{name}={secs:.2f}s" for name, secs in timings.items())
+        )
+        return {'data': sales_lines, 'total': results['search_count']}
+
+    def _fetch_sales_lines(self, date_from, date_to, partner_id, linea_id, search, limit, national_only=False,
+                           fields=None):
+        """
+        Consulta Odoo y construye las líneas de venta con las 27 columnas (o solo fields).
+
+        Recibe los filtros ya normalizados por _sales_cache_key. Las reglas de
+        negocio (IGV y, con national_only, VENTA INTERNACIONAL) van en el dominio.
+        Las excepciones se propagan para que los errores no queden almacenados en caché.
+        """
+        print(f"🔍 Obteniendo líneas de venta {'completas' if fields is None else f'({len(fields)} columnas)'}...")
+        domain = (self._build_sales_domain(date_from, date_to, partner_id, linea_id, search)
+                  + self._sales_filter_domain(national_only))
+        return self._fetch_sales_lines_by_domain(domain, limit, fields=fields)
+
+    # Orden por defecto de account.move.line en Odoo: las páginas respetan el mismo
+    # orden (y el mismo recorte por limit) que una sola consulta sin paginar
+    BASE_LINES_ORDER = 'date desc, move_name desc, id'
+
+    def _fetch_sales_lines_by_domain(self, domain, limit=None, models=None, fields=None):
+        """
+        Ejecuta las etapas de consulta (base, relacionadas, combinación) para un dominio.
+
+        Args:
+            domain: Dominio de account.move.line
+            limit: Máximo de líneas base (None = sin límite)
+            models: Proxy XML-RPC para el hilo actual (por defecto self.models)
+            fields: Columnas requeridas, ya normalizadas por _sales_fields (None = todas)
+
+        Returns:
+            list: Líneas de venta con las 27 columnas (o solo fields)
+        """
+        sales_lines = []
+        for chunk in self._iter_sales_line_chunks(domain, limit, models, fields):
+            sales_lines.extend(chunk)
+        return sales_lines
+
+    def _iter_sales_line_chunks(self, domain, limit=None, models=None, fields=None):
+        """
+        Genera las líneas de venta página a página (ODOO_BASE_PAGE_SIZE líneas base).
+
+        Cada página de account.move.line se combina con sus datos relacionados y
+        se entrega antes de pedir la siguiente, así que solo una página de líneas
+        base y sus facturas/órdenes están en memoria a la vez. Productos,
+        clientes e impuestos salen de las cachés de datos maestros, así que se
+        consultan una sola vez aunque se repitan entre páginas.
+
+        Args:
+            domain: Dominio de account.move.line
+            limit: Máximo de líneas base (None = sin límite)
+            models: Proxy XML-RPC para el hilo actual (por defecto self.models)
+            fields: Columnas requeridas (None = todas); solo se consultan los
+                modelos relacionados que las aportan (ver _plan_sales_fetch)
+
+        Yields:
+            list: Líneas de venta con las 27 columnas (o solo fields) de cada página
+        """
+        models = models if models is not None else self.models
+        timings = {}
+        total_start = time.perf_counter()
+        page_size = self.base_page_size if self.base_page_size > 0 else None
+        base_fields = [
+            'move_id', 'partner_id', 'product_id', 'balance', 'move_name',
+            'quantity', 'price_unit', 'tax_ids'
+        ]
+        plan = self._plan_sales_fetch(fields)
+        master = self._master_data_caches()
+        seen_ids = set()
+        offset = 0
+        pages = 0
+        total_lines = 0
+
+        while limit is None or offset < limit:
+            # Obtener líneas base con todos los campos necesarios
+            query_options = {'fields': base_fields, 'context': {'lang': 'es_PE'}}
+            page_limit = page_size
+            if limit is not None:
+                page_limit = min(page_size or limit, limit - offset)
+            # Solo agregar limit si no es None (XML-RPC no maneja None)
+            if page_limit is not None:
+                query_options['limit'] = page_limit
+            if page_size is not None:
+                query_options.update({'offset': offset, 'order': self.BASE_LINES_ORDER})
+
+            sales_lines_base = self._timed_stage(
+                timings, 'account.move.line',
+                lambda models: models.execute_kw(
+                    self.db, self.uid, self.password, 'account.move.line', 'search_read',
+                    [domain],
+                    query_options
+                ),
+                models
             )
-            
-            print(f"📊 Base obtenida: {len(sales_lines_base)} líneas")
-            
-            if not sales_lines_base:
+            received = len(sales_lines_base)
+            offset += received
+            pages += 1
+            print(f"📊 Base obtenida: {received} líneas" + (f" (página {pages})" if page_size else ""))
+            if pages > 1:
+                # Una línea creada/borrada durante la paginación puede desplazar el offset
+                sales_lines_base = [l for l in sales_lines_base if l.get('id') not in seen_ids]
+            seen_ids.update(l['id'] for l in sales_lines_base if l.get('id') is not None)
+
+            if sales_lines_base:
+                related = self._fetch_related_sales_data(sales_lines_base, timings, models, master, plan)
+
+                join_start = time.perf_counter()
+                chunk = self._merge_sales_lines(sales_lines_base, related, fields)
+                timings['join'] = timings.get('join', 0) + time.perf_counter() - join_start
+                total_lines += len(chunk)
+                del sales_lines_base, related
+                yield chunk
+
+            if page_limit is None or received < page_limit:
+                break
+
+        logger.info(
+            f"⏱️ get_sales_lines ({'paralelo' if self.parallel_fetch else 'secuencial'}, "
+            f"{pages} página(s), {total_lines} líneas) "
+            f"{time.perf_counter() - total_start:.2f}s | "
+            + ', '.join(f"{name}={secs:.2f}s" for name, secs in timings.items())
+        )
+
+    def _build_sales_domain(self, date_from=None, date_to=None, partner_id=None, linea_id=None, search=None):
+        """
+        Construye el dominio de account.move.line para las líneas de venta.
+
+        Returns:
+            list: Dominio Odoo con tipo de factura, estado, categorías excluidas y filtros
+        """
+        domain = [
+            ('move_id.move_type', 'in', ['out_invoice', 'out_refund']),
+            ('move_id.state', '=', 'posted'),
+            ('product_id.default_code', '!=', False)  # Solo productos con código
+        ]
+
+        # Filtros de exclusión de categorías específicas
+        excluded_categories = [315, 333, 304, 314, 318, 339]
+        domain.append(('product_id.categ_id', 'not in', excluded_categories))
+
+        # Filtros de fecha
+        if date_from:
+            domain.append(('move_id.invoice_date', '>=', date_from))
+
+        if date_to:
+            domain.append(('move_id.invoice_date', '<=', date_to))
+        
+        # Filtro de cliente
+        if partner_id:
+            domain.append(('partner_id', '=', partner_id))
+        
+        # Filtro de línea comercial
+        if linea_id:
+            domain.append(('product_id.commercial_line_national_id', '=', linea_id))
+        
+        # Filtro de búsqueda general (nombre de producto, cliente, código, etc.)
+        if search:
+            search_domain = [
+                '|', ('product_id.name', 'ilike', search),
+                '|', ('product_id.default_code', 'ilike', search),
+                '|', ('partner_id.name', 'ilike', search),
+                ('move_name', 'ilike', search)
+            ]
+            domain.extend(search_domain)
+
+        return domain
+
+    @property
+    def models(self):
+        """
+        Proxy de Odoo para el hilo actual (ver _worker_models).
+
+        Las peticiones de Flask, ConcurrentLoader, las exportaciones en segundo
+        plano y la sincronización del almacén llaman a Odoo desde hilos distintos
+        a la vez; con XML-RPC cada hilo usa su propio ServerProxy.
+        """
+        return self._worker_models()
+
+    @models.setter
+    def models(self, value):
+        # Proxy compartido (adaptador JSON-RPC, None u objeto de pruebas); la
+        # conexión XML-RPC activa _rpc_per_thread después de asignarlo
+        self._models = value
+        self._rpc_per_thread = False
+
+    def _worker_models(self):
+        """
+        Proxy propio del hilo actual (ServerProxy no es thread-safe).
+
+        Con JSON-RPC todos los hilos comparten el adaptador: la sesión HTTP
+        reparte las conexiones de su pool entre hilos.
+        """
+        if not getattr(self, '_rpc_per_thread', False):
+            return getattr(self, '_models', None)
+        models = getattr(self._rpc_local, 'models', None)
+        if models is None:
+            models = xmlrpc.client.ServerProxy(self.object_url, allow_none=True)
+            self._rpc_local.models = models
+        return models
+
+    def _timed_stage(self, timings, name, fn, models=None):
+        """
+        Ejecuta una etapa de consulta registrando su duración.
+
+        Args:
+            timings: Dict donde se guarda la duración de cada etapa
+            name: Nombre de la etapa (modelo de Odoo)
+            fn: Función que recibe el proxy XML-RPC y retorna el resultado
+            models: Proxy a usar; si es None se usa el proxy del hilo actual
+
+        Los trozos de una misma consulta ('account.move#2') y las páginas
+        sucesivas acumulan su duración bajo el nombre del modelo.
+        """
+        start = time.perf_counter()
+        try:
+            return fn(models if models is not None else self._worker_models())
+        finally:
+            key = name.partition('#')[0]
+            with self._timings_lock:
+                timings[key] = timings.get(key, 0) + time.perf_counter() - start
+
+    def _run_stages(self, stages, timings, models=None):
+        """
+        Ejecuta etapas independientes, en paralelo si ODOO_PARALLEL_FETCH está activo.
+
+        Si una etapa falla se cancelan las que no empezaron y se esperan las que
+        están en curso antes de propagar el error, para no dejar consultas a Odoo
+        ocupando el pool después de que la petición terminó.
+
+        Args:
+            stages: Dict nombre -> función(models)
+            timings: Dict donde se guarda la duración de cada etapa
+            models: Proxy para el modo secuencial (por defecto self.models)
+
+        Returns:
+            dict: nombre -> resultado de la etapa
+        """
+        if not self.parallel_fetch or len(stages) < 2:
+            models = models if models is not None else self.models
+            return {name: self._timed_stage(timings, name, fn, models) for name, fn in stages.items()}
+
+        futures = {
+            name: self._fetch_executor.submit(self._timed_stage, timings, name, fn)
+            for name, fn in stages.items()
+        }
+        done, pending = wait(futures.values(), return_when=FIRST_EXCEPTION)
+        failed = next((f for f in futures.values() if f in done and f.exception() is not None), None)
+        if failed is not None:
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            raise failed.exception()
+        return {name: future.result() for name, future in futures.items()}
+
+    def _run_queries(self, queries, timings, models=None):
+        """
+        Ejecuta consultas independientes de la forma (modelo, método, args, kwargs).
+
+        Con ODOO_RPC_PROTOCOL=jsonrpc y ODOO_RPC_BATCH activo se envían juntas en
+        una sola petición HTTP (batch JSON-RPC); si hay consultas partidas en
+        trozos ('modelo#n', ver _chunked_queries) se envía un batch por número
+        de trozo, para que cada petición lleve a lo sumo un trozo de ids por
+        modelo. Si el servidor no acepta batch, el cliente lo recuerda y desde
+        entonces se ejecutan como etapas normales (en paralelo si
+        ODOO_PARALLEL_FETCH está activo).
+
+        Args:
+            queries: Dict nombre -> (modelo, método, args, kwargs)
+            timings: Dict donde se guarda la duración de cada etapa
+            models: Proxy a usar (por defecto self.models)
+
+        Returns:
+            dict: nombre -> resultado de la consulta
+        """
+        proxy = models if models is not None else self.models
+        if (getattr(self, 'jsonrpc_client', None) is not None and self.rpc_batch and len(queries) > 1
+                and hasattr(proxy, 'execute_kw_batch') and proxy.batch_supported is not False):
+            rounds = {}
+            for name in queries:
+                rounds.setdefault(name.partition('#')[2], []).append(name)
+            results = {}
+            for names in rounds.values():
+                start = time.perf_counter()
+                try:
+                    batch = proxy.execute_kw_batch(self.db, self.uid, self.password, [queries[n] for n in names])
+                finally:
+                    key = f'batch[{len(names)}]'
+                    timings[key] = timings.get(key, 0) + time.perf_counter() - start
+                results.update(zip(names, batch))
+            return results
+
+        stages = {
+            name: (lambda models, query=query: models.execute_kw(self.db, self.uid, self.password, *query))
+            for name, query in queries.items()
+        }
+        return self._run_stages(stages, timings, models)
+
+    def _chunked_queries(self, name, ids, build_query):
+        """
+        Parte una consulta por lista de ids en trozos de ODOO_ID_CHUNK_SIZE ids.
+
+        Un ('id', 'in', ids) con decenas de miles de ids (un año completo) genera
+        un payload enorme y puede superar ODOO_RPC_TIMEOUT. Los trozos se
+        ejecutan como etapas independientes (en paralelo si está activo) y se
+        unen con _join_chunks.
+
+        Args:
+            name: Nombre de la consulta (modelo)
+            ids: Lista de ids
+            build_query: Función ids -> (modelo, método, args, kwargs)
+
+        Returns:
+            dict: nombre -> consulta, o 'nombre#n' -> consulta por cada trozo
+        """
+        size = self.id_chunk_size
+        if size <= 0 or len(ids) <= size:
+            return {name: build_query(ids)}
+        return {
+            f'{name}#{n}': build_query(ids[start:start + size])
+            for n, start in enumerate(range(0, len(ids), size))
+        }
+
+    @staticmethod
+    def _join_chunks(results):
+        """Une los resultados de los trozos 'modelo#n' bajo 'modelo'."""
+        joined = {}
+        for name, records in results.items():
+            joined.setdefault(name.partition('#')[0], []).extend(records)
+        return joined
+
+    # Campos de los datos maestros que se combinan con las líneas de venta
+    MASTER_DATA_FIELDS = {
+        'product.product': [
+            'name', 'default_code', 'categ_id', 'commercial_line_national_id',
+            'pharmacological_classification_id', 'pharmaceutical_forms_id',
+            'administration_way_id', 'production_line_id', 'product_life_cycle',
+        ],
+        'res.partner': ['vat', 'name'],
+        'account.tax': ['id', 'name'],
+    }
+    # Modelos de los que se vigila también el write_date: categoría, línea comercial,
+    # ciclo de vida y campos farmacéuticos se editan en la plantilla del producto
+    MASTER_DATA_RELATED = {
+        'product.product': ('product_tmpl_id',),
+    }
+
+    def _new_master_data(self, check_interval_seconds=0):
+        """Cachés de datos maestros (MasterDataCache) por modelo."""
+        return {
+            model: MasterDataCache(model, fields, check_interval_seconds, self.MASTER_DATA_RELATED.get(model, ()))
+            for model, fields in self.MASTER_DATA_FIELDS.items()
+        }
+
+    def _master_data_caches(self):
+        """
+        Cachés de datos maestros para una consulta de líneas de venta.
+
+        Con MASTER_DATA_CACHE_ENABLED se comparten entre consultas; si está
+        desactivada cada consulta usa cachés nuevas (solo evitan repetir
+        productos y clientes entre sus páginas).
+        """
+        master = getattr(self, '_master_data', None)
+        return master if master is not None else self._new_master_data()
+
+    def _refresh_master_data(self, master, timings, models=None):
+        """
+        Revisa los datos maestros modificados en Odoo desde la última revisión.
+
+        Solo se consulta lo que tiene write_date posterior a la marca de agua
+        de cada caché, una vez cada MASTER_DATA_CHECK_SECONDS. Si la revisión
+        falla se mantienen los datos actuales y se reintenta en la siguiente.
+        """
+        queries = {}
+        for model, cache in master.items():
+            query = cache.refresh_query()
+            if query is not None:
+                queries[f'{model}@refresh'] = query
+        if not queries:
+            return
+
+        start = time.perf_counter()
+        try:
+            results = self._run_queries(queries, timings, models)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo revisar cambios en datos maestros: {e}")
+            return
+        seconds = time.perf_counter() - start
+        for name, records in results.items():
+            master[name.partition('@')[0]].apply_refresh(records, seconds)
+
+    # Columnas de las líneas de venta según el modelo que las aporta.
+    # sale.order y sale.order.line se buscan desde account.move (order_id).
+    SALES_LINE_SOURCES = {
+        'account.move.line': (
+            'product_id', 'move_name', 'balance', 'quantity', 'price_unit', 'move_id', 'partner_id',
+        ),
+        'account.move': (
+            'payment_state', 'sales_channel_id', 'invoice_user_id', 'invoice_origin', 'move_ref',
+            'move_state', 'invoice_date', 'l10n_latam_document_type_id', 'origin_number',
+        ),
+        'product.product': (
+            'commercial_line_national_id', 'name', 'default_code', 'pharmacological_classification_id',
+            'pharmaceutical_forms_id', 'administration_way_id', 'categ_id', 'production_line_id',
+            'product_life_cycle',
+        ),
+        'res.partner': ('partner_name', 'vat'),
+        'account.tax': ('tax_id',),
+        'sale.order': (
+            'order_name', 'order_origin', 'client_order_ref', 'delivery_observations', 'order_date',
+            'order_state', 'commitment_date', 'order_user_id', 'partner_supplying_agency_id',
+            'partner_shipping_id',
+        ),
+        'sale.order.line': ('route_id',),
+    }
+
+    @classmethod
+    def _sales_fields(cls, fields):
+        """
+        Normaliza las columnas pedidas a get_sales_lines (tupla ordenada, usable en la clave de caché).
+
+        Raises:
+            ValueError: Si alguna columna no existe en las líneas de venta
+        """
+        if fields is None:
+            return None
+        fields = tuple(sorted(set(fields)))
+        known = {f for columns in cls.SALES_LINE_SOURCES.values() for f in columns}
+        unknown = [f for f in fields if f not in known]
+        if unknown:
+            raise ValueError(f"Columnas de líneas de venta desconocidas: {', '.join(unknown)}")
+        return fields
+
+    @classmethod
+    def _plan_sales_fetch(cls, fields=None):
+        """
+        Modelos relacionados a consultar para obtener las columnas pedidas.
+
+        account.tax siempre se incluye (sale de la caché de datos maestros y
+        respalda el filtro de IGV); sale.order y sale.order.line requieren
+        account.move para conocer las órdenes.
+
+        Args:
+            fields: Columnas normalizadas por _sales_fields (None = todas)
+
+        Returns:
+            frozenset: Modelos de SALES_LINE_SOURCES a consultar
+        """
+        if fields is None:
+            return frozenset(cls.SALES_LINE_SOURCES)
+        plan = {'account.move.line', 'account.tax'}
+        plan.update(model for model, columns in cls.SALES_LINE_SOURCES.items() if set(columns) & set(fields))
+        if plan & {'sale.order', 'sale.order.line'}:
+            plan.add('account.move')
+        return frozenset(plan)
+
+    @staticmethod
+    def _project_sales_lines(sales_lines, fields):
+        """Deja en cada línea solo las columnas pedidas (fields=None las conserva todas)."""
+        if fields is None:
+            return sales_lines
+        return [{f: line.get(f) for f in fields} for line in sales_lines]
+
+    def _fetch_related_sales_data(self, sales_lines_base, timings, models=None, master=None, plan=None):
+        """
+        Obtiene facturas, productos, clientes, impuestos y órdenes de las líneas base.
+
+        Productos, clientes e impuestos salen de las cachés de datos maestros
+        (ver MasterDataCache): solo se piden a Odoo los ids que faltan. Esas
+        consultas y account.move son independientes entre sí (se piden juntas
+        con _run_queries); sale.order y sale.order.line dependen de las
+        facturas. Las listas de ids se parten en trozos de ODOO_ID_CHUNK_SIZE
+        (ver _chunked_queries). Los modelos fuera de plan no se consultan y
+        sus datos quedan vacíos.
+
+        Args:
+            sales_lines_base: Líneas de account.move.line
+            timings: Dict donde se guarda la duración de cada etapa
+            models: Proxy para el modo secuencial (por defecto self.models)
+            master: Cachés de datos maestros (por defecto _master_data_caches())
+            plan: Modelos a consultar (ver _plan_sales_fetch; por defecto todos)
+
+        Returns:
+            dict: move_data, product_data, partner_data, tax_names, order_data, sale_line_data
+        """
+        master = master if master is not None else self._master_data_caches()
+        plan = plan if plan is not None else self._plan_sales_fetch()
+        self._refresh_master_data(master, timings, models)
+
+        def ids_of(field, model):
+            if model not in plan:
                 return []
-            
-            # Obtener IDs únicos para consultas relacionadas
-            move_ids = list(set([line['move_id'][0] for line in sales_lines_base if line.get('move_id')]))
-            product_ids = list(set([line['product_id'][0] for line in sales_lines_base if line.get('product_id')]))
-            partner_ids = list(set([line['partner_id'][0] for line in sales_lines_base if line.get('partner_id')]))
-            
-            print(f"📊 IDs únicos: {len(move_ids)} facturas, {len(product_ids)} productos, {len(partner_ids)} clientes")
-            
-            # Obtener datos de facturas (account.move) - Asientos contables
-            move_data = {}
-            if move_ids:
-                moves = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'account.move', 'search_read',
-                    [[('id', 'in', move_ids)]],
-                    {
-                        'fields': [
-                            'payment_state', 'team_id', 'invoice_user_id', 'invoice_origin',
-                            'invoice_date', 'l10n_latam_document_type_id', 'origin_number',
-                            'order_id', 'name', 'ref', 'journal_id', 'amount_total', 'state'
-                        ],
-                        'context': {'lang': 'es_PE'}
-                    }
-                )
-                move_data = {m['id']: m for m in moves}
-                print(f"✅ Asientos contables (account.move): {len(move_data)} registros")
-            
-            # Obtener datos de productos con todos los campos farmacéuticos
-            product_data = {}
-            if product_ids:
-                products = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'product.product', 'search_read',
-                    [[('id', 'in', product_ids)]],
-                    {
-                        'fields': [
-                            'name', 'default_code', 'categ_id', 'commercial_line_national_id',
-                            'pharmacological_classification_id', 'pharmaceutical_forms_id',
-                            'administration_way_id', 'production_line_id', 'product_life_cycle',
-                        ],
-                        'context': {'lang': 'es_PE'}
-                    }
-                )
-                product_data = {p['id']: p for p in products}
-                # --- DEBUG: Imprimir los campos del primer producto para verificar el nombre del campo ---
-                if products:
-                    print("🔍 DEBUG: Campos del primer producto obtenido:")
-                    print(products[0])
-                # --- FIN DEBUG ---
-                print(f"✅ Productos: {len(product_data)} registros")
-            
-            # Obtener datos de clientes
-            partner_data = {}
-            if partner_ids:
-                partners = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'res.partner', 'search_read',
-                    [[('id', 'in', partner_ids)]],
-                    {'fields': ['vat', 'name'], 'context': {'lang': 'es_PE'}}
-                )
-                partner_data = {p['id']: p for p in partners}
-                print(f"✅ Clientes: {len(partner_data)} registros")
-            
-            # Obtener datos de órdenes de venta con más campos
-            order_ids = [move['order_id'][0] for move in move_data.values() if move.get('order_id')]
-            order_data = {}
-            if order_ids:
-                orders = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'sale.order', 'search_read',
-                    [[('id', 'in', list(set(order_ids)))]],
-                    {
-                        'fields': [
-                            'name', 'delivery_observations', 'partner_supplying_agency_id', 
-                            'partner_shipping_id', 'date_order', 'state', 'amount_total',
-                            'user_id', 'team_id', 'warehouse_id', 'commitment_date',
-                            'client_order_ref', 'origin',
-                        ]
-                    }
+            return list(set([line[field][0] for line in sales_lines_base if line.get(field)]))
+
+        # Obtener IDs únicos para consultas relacionadas
+        move_ids = ids_of('move_id', 'account.move')
+        page_product_ids = ids_of('product_id', 'product.product')
+        page_partner_ids = ids_of('partner_id', 'res.partner')
+        page_tax_ids = set()
+        for line in sales_lines_base:
+            if line.get('tax_ids'):
+                page_tax_ids.update(line['tax_ids'])
+        missing = {
+            'product.product': master['product.product'].missing(page_product_ids),
+            'res.partner': master['res.partner'].missing(page_partner_ids),
+            'account.tax': master['account.tax'].missing(page_tax_ids),
+        }
+
+        print(f"📊 IDs únicos: {len(move_ids)} facturas, {len(missing['product.product'])} productos, "
+              f"{len(missing['res.partner'])} clientes")
+
+        queries = {}
+        # Obtener datos de facturas (account.move) - Asientos contables
+        if move_ids:
+            queries.update(self._chunked_queries('account.move', move_ids, lambda ids: (
+                'account.move', 'search_read',
+                [[('id', 'in', ids)]],
+                {
+                    'fields': [
+                        'payment_state', 'team_id', 'invoice_user_id', 'invoice_origin',
+                        'invoice_date', 'l10n_latam_document_type_id', 'origin_number',
+                        'order_id', 'name', 'ref', 'journal_id', 'amount_total', 'state'
+                    ],
+                    'context': {'lang': 'es_PE'}
+                }
+            )))
+        # Productos (campos farmacéuticos), clientes e impuestos que no están en caché
+        for model, ids in missing.items():
+            if ids:
+                queries.update(self._chunked_queries(model, ids, master[model].fetch_query))
+
+        results = self._join_chunks(self._run_queries(queries, timings, models))
+
+        move_data = {m['id']: m for m in results.get('account.move', [])}
+        if move_ids:
+            print(f"✅ Asientos contables (account.move): {len(move_data)} registros")
+        for model in missing:
+            if model in results:
+                master[model].store(results[model])
+        product_data = master['product.product'].get_many(page_product_ids)
+        if missing['product.product']:
+            print(f"✅ Productos: {len(product_data)} registros")
+        partner_data = master['res.partner'].get_many(page_partner_ids)
+        if missing['res.partner']:
+            print(f"✅ Clientes: {len(partner_data)} registros")
+        tax_names = {tid: tax['name'] for tid, tax in master['account.tax'].get_many(page_tax_ids).items()}
+
+        # Órdenes de venta y sus líneas dependen de las facturas
+        order_ids = list(set(move['order_id'][0] for move in move_data.values() if move.get('order_id')))
+        stages = {}
+        # Obtener datos de órdenes de venta con más campos
+        if order_ids and 'sale.order' in plan:
+            for name, query in self._chunked_queries('sale.order', order_ids, lambda ids: (
+                'sale.order', 'search_read',
+                [[('id', 'in', ids)]],
+                {
+                    'fields': [
+                        'name', 'delivery_observations', 'partner_supplying_agency_id', 
+                        'partner_shipping_id', 'date_order', 'state', 'amount_total',
+                        'user_id', 'team_id', 'warehouse_id', 'commitment_date',
+                        'client_order_ref', 'origin',
+                    ]
+                }
+            )).items():
+                stages[name] = lambda models, query=query: models.execute_kw(
+                    self.db, self.uid, self.password, *query
                 )
-                order_data = {o['id']: o for o in orders}
-                print(f"✅ Órdenes de venta (sale.order): {len(order_data)} registros con observaciones de entrega")
-            
-            # Obtener datos de líneas de orden de venta con más campos
-            sale_line_data = {}
-            if order_ids and product_ids:
+        # Obtener datos de líneas de orden de venta con más campos (solo aportan route_id)
+        sale_line_product_ids = list(set([line['product_id'][0] for line in sales_lines_base if line.get('product_id')]))
+        if order_ids and sale_line_product_ids and 'sale.order.line' in plan:
+            def fetch_sale_lines(models, query):
                 try:
-                    sale_lines = self.models.execute_kw(
-                        self.db, self.uid, self.password, 'sale.order.line', 'search_read',
-                        [[('order_id', 'in', list(set(order_ids))), ('product_id', 'in', product_ids)]],
-                        {
-                            'fields': [
-                                'order_id', 'product_id', 'route_id', 'name', 'product_uom_qty',
-                                'price_unit', 'price_subtotal', 'discount', 'product_uom',
-                                'analytic_distribution', 'display_type'
-                            ],
-                            'context': {'lang': 'es_PE'}
-                        }
-                    )
-                    for sl in sale_lines:
-                        if sl.get('order_id') and sl.get('product_id'):
-                            key = (sl['order_id'][0], sl['product_id'][0])
-                            sale_line_data[key] = sl
-                    print(f"✅ Líneas de orden de venta (sale.order.line): {len(sale_line_data)} registros con rutas")
+                    return models.execute_kw(self.db, self.uid, self.password, *query)
                 except Exception as e:
                     print(f"⚠️ Error obteniendo líneas de orden: {e}")
+                    return []
+            for name, query in self._chunked_queries('sale.order.line', order_ids, lambda ids: (
+                'sale.order.line', 'search_read',
+                [[('order_id', 'in', ids), ('product_id', 'in', sale_line_product_ids)]],
+                {
+                    'fields': [
+                        'order_id', 'product_id', 'route_id', 'name', 'product_uom_qty',
+                        'price_unit', 'price_subtotal', 'discount', 'product_uom',
+                        'analytic_distribution', 'display_type'
+                    ],
+                    'context': {'lang': 'es_PE'}
+                }
+            )).items():
+                stages[name] = lambda models, query=query: fetch_sale_lines(models, query)
+
+        results = self._join_chunks(self._run_stages(stages, timings, models))
+
+        order_data = {o['id']: o for o in results.get('sale.order', [])}
+        if 'sale.order' in results:
+            print(f"✅ Órdenes de venta (sale.order): {len(order_data)} registros con observaciones de entrega")
+        sale_line_data = {}
+        for sl in results.get('sale.order.line', []):
+            if sl.get('order_id') and sl.get('product_id'):
+                key = (sl['order_id'][0], sl['product_id'][0])
+                sale_line_data[key] = sl
+        if 'sale.order.line' in results:
+            print(f"✅ Líneas de orden de venta (sale.order.line): {len(sale_line_data)} registros con rutas")
+
+        return {
+            'move_data': move_data,
+            'product_data': product_data,
+            'partner_data': partner_data,
+            'tax_names': tax_names,
+            'order_data': order_data,
+            'sale_line_data': sale_line_data,
+        }
+
+    def _merge_sales_lines(self, sales_lines_base, related, fields=None):
+        """
+        Combina las líneas base con sus datos relacionados (27 columnas).
+
+        Solo se conservan las líneas con impuesto IGV o IGV_INC (el dominio de
+        _sales_filter_domain ya las filtra en Odoo; se mantiene como resguardo).
+        Con fields cada línea conserva solo esas columnas.
+        """
+        move_data = related['move_data']
+        product_data = related['product_data']
+        partner_data = related['partner_data']
+        tax_names = related['tax_names']
+        order_data = related['order_data']
+        sale_line_data = related['sale_line_data']
+
+        # Procesar y combinar todos los datos para las 27 columnas
+        sales_lines = []
+        ecommerce_reassigned = 0
+        print(f"🚀 Procesando {len(sales_lines_base)} líneas con 27 columnas...")
+        
+        for line in sales_lines_base:
+            move_id = line.get('move_id')
+            product_id = line.get('product_id')
+            partner_id = line.get('partner_id')
             
-            # Obtener todos los tax_ids únicos de las líneas contables
-            all_tax_ids = set()
-            for line in sales_lines_base:
-                if line.get('tax_ids'):
-                    all_tax_ids.update(line['tax_ids'])
-            tax_names = {}
-            if all_tax_ids:
-                taxes = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'account.tax', 'search_read',
-                    [[('id', 'in', list(all_tax_ids))]],
-                    {'fields': ['id', 'name'], 'context': {'lang': 'es_PE'}}
-                )
-                tax_names = {t['id']: t['name'] for t in taxes}
-            
-            # Procesar y combinar todos los datos para las 27 columnas
-            sales_lines = []
-            ecommerce_reassigned = 0
-            print(f"🚀 Procesando {len(sales_lines_base)} líneas con 27 columnas...")
-            
-            for line in sales_lines_base:
-                move_id = line.get('move_id')
-                product_id = line.get('product_id')
-                partner_id = line.get('partner_id')
-                
-                # Obtener datos relacionados
-                move = move_data.get(move_id[0], {}) if move_id else {}
-                product = product_data.get(product_id[0], {}) if product_id else {}
-                partner = partner_data.get(partner_id[0], {}) if partner_id else {}
-                
-                # Obtener datos de orden de venta
-                order_id = move.get('order_id')
-                order = order_data.get(order_id[0], {}) if order_id else {}
-                
-                # Obtener datos de línea de orden
-                sale_line_key = (order_id[0], product_id[0]) if order_id and product_id else None
-                sale_line = sale_line_data.get(sale_line_key, {}) if sale_line_key else {}
-                # Obtener nombres de impuestos
-                imp_list = []
-                for tid in line.get('tax_ids', []):
-                    if tid in tax_names:
-                        imp_list.append(tax_names[tid])
-                imp_str = ', '.join(imp_list) if imp_list else ''
-                # Filtrar por impuestos IGV o IGV_INC
-                if 'IGV' in imp_list or 'IGV_INC' in imp_list:
-                    # APLICAR CAMBIO: Reemplazar línea comercial para usuarios ECOMMERCE específicos
-                    # Se hace aquí para que el commercial_line_national_id original esté disponible para otros cálculos si es necesario
-                    commercial_line_id = product.get('commercial_line_national_id')
-                    invoice_user = move.get('invoice_user_id')
-                    
-                    
-
-                    # Crear registro completo con las 27 columnas
-                    sales_lines.append({
-                        # 1. Estado de Pago
-                        'payment_state': move.get('payment_state'),
-                        
-                        # 2. Canal de Venta
-                        'sales_channel_id': move.get('team_id'),
-                        
-                        # 3. Línea Comercial Local
-                        'commercial_line_national_id': commercial_line_id,
-                        
-                        # 4. Vendedor
-                        'invoice_user_id': move.get('invoice_user_id'),
-                        
-                        # 5. Socio
-                        'partner_name': partner.get('name'),
-                        
-                        # 6. NIF
-                        'vat': partner.get('vat'),
-                        
-                        # 7. Origen
-                        'invoice_origin': move.get('invoice_origin'),
-                        
-                        # 7.1. Asiento Contable (move_id)
-                        'move_name': move.get('name'),  # Número del asiento contable
-                        'move_ref': move.get('ref'),    # Referencia del asiento
-                        'move_state': move.get('state'), # Estado del asiento
-                        
-                        # 7.2. Orden de Venta (order_id) 
-                        'order_name': order.get('name'),  # Número de la orden de venta
-                        'order_origin': order.get('origin'), # Origen de la orden
-                        'client_order_ref': order.get('client_order_ref'), # Referencia del cliente
-                        
-                        # 8. Producto
-                        'name': product.get('name', ''),
-                        
-                        # 9. Referencia Interna
-                        'default_code': product.get('default_code', ''),
-                        
-                        # 10. ID Producto
-                        'product_id': line.get('product_id'),
-                        
-                        # 11. Fecha Factura
-                        'invoice_date': move.get('invoice_date'),
-                        
-                        # 12. Tipo Documento
-                        'l10n_latam_document_type_id': move.get('l10n_latam_document_type_id'),
-                        
-                        # 13. Número
-                        'move_name': line.get('move_name'),
-                        
-                        # 14. Ref. Doc. Rectificado
-                        'origin_number': move.get('origin_number'),
-                        
-                        # 15. Saldo
-                        'balance': -line.get('balance', 0) if line.get('balance') is not None else 0,
-                        
-                        # 16. Clasificación Farmacológica
-                        'pharmacological_classification_id': product.get('pharmacological_classification_id'),
-                        
-                        # 17. Observaciones Entrega (delivery_observations)
-                        'delivery_observations': order.get('delivery_observations'),
-                        
-                        # 17.1. Información adicional de la orden
-                        'order_date': order.get('date_order'),  # Fecha de la orden
-                        'order_state': order.get('state'),      # Estado de la orden
-                        'commitment_date': order.get('commitment_date'),  # Fecha compromiso
-                        'order_user_id': order.get('user_id'),  # Vendedor de la orden
-                        
-                        # 18. Agencia
-                        'partner_supplying_agency_id': order.get('partner_supplying_agency_id'),
-                        
-                        # 19. Formas Farmacéuticas
-                        'pharmaceutical_forms_id': product.get('pharmaceutical_forms_id'),
-                        
-                        # 20. Vía Administración
-                        'administration_way_id': product.get('administration_way_id'),
-                        
-                        # 21. Categoría Producto
-                        'categ_id': product.get('categ_id'),
-                        
-                        # 22. Línea Producción
-                        'production_line_id': product.get('production_line_id'),
-                        
-                        # 23. Cantidad
-                        'quantity': line.get('quantity'),
-                        
-                        # 24. Precio Unitario
-                        'price_unit': line.get('price_unit'),
-                        
-                        # 25. Dirección Entrega
-                        'partner_shipping_id': order.get('partner_shipping_id'),
-                        
-                        # 26. Ruta
-                        'route_id': sale_line.get('route_id'),
-                        
-                        # 27. Ciclo de Vida
-                        'product_life_cycle': product.get('product_life_cycle'),
-                        
-                        # 28. IMP (Impuesto)
-                        'tax_id': imp_str,
-                        
-                        # Campos adicionales para compatibilidad
-                        'move_id': line.get('move_id'),
-                        'partner_id': line.get('partner_id')
-                    })
+            # Obtener datos relacionados
+            move = move_data.get(move_id[0], {}) if move_id else {}
+            product = product_data.get(product_id[0], {}) if product_id else {}
+            partner = partner_data.get(partner_id[0], {}) if partner_id else {}
             
-            print(f"✅ Procesadas {len(sales_lines)} líneas con 27 columnas completas")
-            print(f"🔄 Reasignadas {ecommerce_reassigned} líneas a ECOMMERCE (usuarios específicos)")
+            # Obtener datos de orden de venta
+            order_id = move.get('order_id')
+            order = order_data.get(order_id[0], {}) if order_id else {}
             
-            # Si se solicita paginación, devolver tupla (datos, paginación)
-            if page is not None and per_page is not None:
-                # Calcular paginación
-                total_items = len(sales_lines)
-                start_idx = (page - 1) * per_page
-                end_idx = start_idx + per_page
-                paginated_data = sales_lines[start_idx:end_idx]
+            # Obtener datos de línea de orden
+            sale_line_key = (order_id[0], product_id[0]) if order_id and product_id else None
+            sale_line = sale_line_data.get(sale_line_key, {}) if sale_line_key else {}
+            # Obtener nombres de impuestos
+            imp_list = []
+            for tid in line.get('tax_ids', []):
+                if tid in tax_names:
+                    imp_list.append(tax_names[tid])
+            imp_str = ', '.join(imp_list) if imp_list else ''
+            # Filtrar por impuestos IGV o IGV_INC
+            if 'IGV' in imp_list or 'IGV_INC' in imp_list:
+                # APLICAR CAMBIO: Reemplazar línea comercial para usuarios ECOMMERCE específicos
+                # Se hace aquí para que el commercial_line_national_id original esté disponible para otros cálculos si es necesario
+                commercial_line_id = product.get('commercial_line_national_id')
+                invoice_user = move.get('invoice_user_id')
                 
-                pagination = {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total_items,
-                    'pages': (total_items + per_page - 1) // per_page
-                }
                 
-                return paginated_data, pagination
-            
-            # Si no se solicita paginación, devolver solo los datos
-            return sales_lines
-            
+
+                # Crear registro completo con las 27 columnas
+                sales_lines.append({
+                    # 1. Estado de Pago
+                    'payment_state': move.get('payment_state'),
+                    
+                    # 2. Canal de Venta
+                    'sales_channel_id': move.get('team_id'),
+                    
+                    # 3. Línea Comercial Local
+                    'commercial_line_national_id': commercial_line_id,
+                    
+                    # 4. Vendedor
+                    'invoice_user_id': move.get('invoice_user_id'),
+                    
+                    # 5. Socio
+                    'partner_name': partner.get('name'),
+                    
+                    # 6. NIF
+                    'vat': partner.get('vat'),
+                    
+                    # 7. Origen
+                    'invoice_origin': move.get('invoice_origin'),
+                    
+                    # 7.1. Asiento Contable (move_id)
+                    'move_name': move.get('name'),  # Número del asiento contable
+                    'move_ref': move.get('ref'),    # Referencia del asiento
+                    'move_state': move.get('state'), # Estado del asiento
+                    
+                    # 7.2. Orden de Venta (order_id) 
+                    'order_name': order.get('name'),  # Número de la orden de venta
+                    'order_origin': order.get('origin'), # Origen de la orden
+                    'client_order_ref': order.get('client_order_ref'), # Referencia del cliente
+                    
+                    # 8. Producto
+                    'name': product.get('name', ''),
+                    
+                    # 9. Referencia Interna
+                    'default_code': product.get('default_code', ''),
+                    
+                    # 10. ID Producto
+                    'product_id': line.get('product_id'),
+                    
+                    # 11. Fecha Factura
+                    'invoice_date': move.get('invoice_date'),
+                    
+                    # 12. Tipo Documento
+                    'l10n_latam_document_type_id': move.get('l10n_latam_document_type_id'),
+                    
+                    # 13. Número
+                    'move_name': line.get('move_name'),
+                    
+                    # 14. Ref. Doc. Rectificado
+                    'origin_number': move.get('origin_number'),
+                    
+                    # 15. Saldo
+                    'balance': -line.get('balance', 0) if line.get('balance') is not None else 0,
+                    
+                    # 16. Clasificación Farmacológica
+                    'pharmacological_classification_id': product.get('pharmacological_classification_id'),
+                    
+                    # 17. Observaciones Entrega (delivery_observations)
+                    'delivery_observations': order.get('delivery_observations'),
+                    
+                    # 17.1. Información adicional de la orden
+                    'order_date': order.get('date_order'),  # Fecha de la orden
+                    'order_state': order.get('state'),      # Estado de la orden
+                    'commitment_date': order.get('commitment_date'),  # Fecha compromiso
+                    'order_user_id': order.get('user_id'),  # Vendedor de la orden
+                    
+                    # 18. Agencia
+                    'partner_supplying_agency_id': order.get('partner_supplying_agency_id'),
+                    
+                    # 19. Formas Farmacéuticas
+                    'pharmaceutical_forms_id': product.get('pharmaceutical_forms_id'),
+                    
+                    # 20. Vía Administración
+                    'administration_way_id': product.get('administration_way_id'),
+                    
+                    # 21. Categoría Producto
+                    'categ_id': product.get('categ_id'),
+                    
+                    # 22. Línea Producción
+                    'production_line_id': product.get('production_line_id'),
+                    
+                    # 23. Cantidad
+                    'quantity': line.get('quantity'),
+                    
+                    # 24. Precio Unitario
+                    'price_unit': line.get('price_unit'),
+                    
+                    # 25. Dirección Entrega
+                    'partner_shipping_id': order.get('partner_shipping_id'),
+                    
+                    # 26. Ruta
+                    'route_id': sale_line.get('route_id'),
+                    
+                    # 27. Ciclo de Vida
+                    'product_life_cycle': product.get('product_life_cycle'),
+                    
+                    # 28. IMP (Impuesto)
+                    'tax_id': imp_str,
+                    
+                    # Campos adicionales para compatibilidad
+                    'move_id': line.get('move_id'),
+                    'partner_id': line.get('partner_id')
+                })
+        
+        print(f"✅ Procesadas {len(sales_lines)} líneas con 27 columnas completas")
+        print(f"🔄 Reasignadas {ecommerce_reassigned} líneas a ECOMMERCE (usuarios específicos)")
+
+        return self._project_sales_lines(sales_lines, fields)
+
+    # --- Motor de agregación en Odoo (read_group) ---
+
+    def read_sales_groups(self, groupby, date_from=None, date_to=None, partner_id=None, linea_id=None,
+                          extra_domain=None, models=None):
+        """
+        Suma saldo y cantidad de las líneas de venta agrupadas en el servidor de Odoo.
+
+        Usa el mismo dominio que las líneas de venta (incluidos IGV y la exclusión
+        de VENTA INTERNACIONAL), por lo que los totales coinciden con el detalle.
+
+        Args:
+            groupby: Lista de campos almacenados de account.move.line (ej: ['product_id']);
+                     'invoice_date:month' retorna el mes como 'YYYY-MM'
+            date_from, date_to, partner_id, linea_id: Mismos filtros que get_sales_lines
+            extra_domain: Condiciones adicionales (ej: rutas de vencimiento)
+            models: Proxy XML-RPC para el hilo actual (por defecto self.models)
+
+        Returns:
+            list: [{<campo>: valor, 'balance': saldo positivo, 'quantity': cantidad, 'count': líneas}]
+        """
+        models = models if models is not None else self.models
+        domain = self._build_sales_domain(date_from, date_to, partner_id, linea_id) + self._national_igv_domain(models)
+        if extra_domain:
+            domain += list(extra_domain)
+
+        groups = models.execute_kw(
+            self.db, self.uid, self.password, 'account.move.line', 'read_group',
+            [domain, ['balance:sum', 'quantity:sum'], list(groupby)],
+            {'lazy': False, 'context': {'lang': 'es_PE'}}
+        )
+        return [
+            {
+                **{field: self._read_group_month(group, field) if field.endswith(':month') else group.get(field)
+                   for field in groupby},
+                'balance': -(group.get('balance') or 0),
+                'quantity': group.get('quantity') or 0,
+                'count': group.get('__count', 0),
+            }
+            for group in groups
+        ]
+
+    @staticmethod
+    def _read_group_month(group, field):
+        """
+        Mes (YYYY-MM) de un grupo de read_group por '<fecha>:month'.
+
+        El valor del grupo es una etiqueta traducida ('marzo 2026'): el mes se
+        toma de __range (Odoo 15+) o de la condición >= de __domain.
+        """
+        period = (group.get('__range') or {}).get(field)
+        if period and period.get('from'):
+            return str(period['from'])[:7]
+        date_field = field.split(':')[0]
+        for term in group.get('__domain') or []:
+            if isinstance(term, (list, tuple)) and len(term) == 3 and term[0] == date_field and term[1] == '>=':
+                return str(term[2])[:7]
+        return None
+
+    def _read_product_master(self, product_ids, models=None):
+        """Datos de producto necesarios para las agregaciones, indexados por id."""
+        if not product_ids:
+            return {}
+        models = models if models is not None else self.models
+        products = models.execute_kw(
+            self.db, self.uid, self.password, 'product.product', 'read',
+            [list(product_ids)],
+            {'fields': ['name', 'commercial_line_national_id', 'product_life_cycle'], 'context': {'lang': 'es_PE'}}
+        )
+        return {p['id']: p for p in products}
+
+    def _read_move_master(self, move_ids, models=None):
+        """Canal, vendedor y fecha de cada factura, indexados por id."""
+        if not move_ids:
+            return {}
+        models = models if models is not None else self.models
+        moves = models.execute_kw(
+            self.db, self.uid, self.password, 'account.move', 'read',
+            [list(move_ids)],
+            {'fields': ['team_id', 'invoice_user_id', 'invoice_date'], 'context': {'lang': 'es_PE'}}
+        )
+        return {m['id']: m for m in moves}
+
+    def get_daily_cube_rows(self, date_from, date_to=None, linea_id=None, table='sales_cube', national_only=True,
+                            dims=None, by_month=False):
+        """
+        Totales del rango compuestos desde el cubo diario del almacén local (ver src/sales_cube.py).
+
+        Cada fila tiene las dimensiones de la tabla con los valores de las
+        líneas de venta (commercial_line_national_id, invoice_user_id, route_id...)
+        y las medidas balance, abs_balance, quantity y lines, así que se puede
+        usar en lugar de las líneas de detalle en sales_lines_to_frame.
+
+        Args:
+            date_from, date_to: Rango de fechas de factura (YYYY-MM-DD)
+            linea_id: Solo la línea comercial indicada
+            table: 'sales_cube' (dimensiones de los dashboards) o 'sales_cube_partner'
+            national_only: Excluir VENTA INTERNACIONAL (línea comercial o canal); dims
+                           debe incluir commercial_line_national_id y sales_channel_id
+            dims: Agrupar solo por estas dimensiones de la tabla
+            by_month: Agrupar además por mes ('month': YYYY-MM)
+
+        Returns:
+            list o None: None si el almacén no está activo o no cubre el rango
+        """
+        store = getattr(self, 'sales_store', None)
+        if store is None or not store.can_serve(date_from, date_to):
+            return None
+        rows = store.query_cube(date_from, date_to, linea_id, table, dims=dims, by_month=by_month)
+        if national_only:
+            rows = [r for r in rows if not self._is_international_line(r)]
+        return rows
+
+    def get_dashboard_lines(self, date_from, date_to, limit=10000):
+        """
+        Filas para sales_lines_to_frame sin VENTA INTERNACIONAL: celdas del cubo
+        diario si el almacén cubre el rango, si no líneas de get_sales_lines
+        con las columnas del DataFrame (FRAME_FIELDS).
+        """
+        rows = self.get_daily_cube_rows(date_from, date_to)
+        if rows is not None:
+            return rows
+        return self.get_sales_lines(date_from=date_from, date_to=date_to, limit=limit, national_only=True,
+                                    fields=FRAME_FIELDS)
+
+    # Dimensiones del cubo para las series mensuales (canal para excluir VENTA INTERNACIONAL)
+    MONTHLY_CUBE_DIMS = ('commercial_line_national_id', 'invoice_user_id', 'product_life_cycle', 'sales_channel_id')
+
+    def get_sales_by_month(self, date_from, date_to, linea_id=None):
+        """
+        Series mensuales de ventas (total, IPN, por línea comercial y por vendedor).
+
+        Con el almacén local se suman las celdas del cubo diario por mes. Si no,
+        se agrupa en Odoo con read_group: por mes y producto (líneas comerciales
+        e IPN) y por factura (vendedor y fecha de factura), en paralelo. El
+        resultado de Odoo se guarda en la caché de ventas.
+
+        Args:
+            date_from, date_to: Rango de fechas de factura (YYYY-MM-DD)
+            linea_id: Solo la línea comercial indicada
+
+        Returns:
+            dict: Ver sales_aggregation.monthly_series
+        """
+        months = trend_months(date_to, self._months_between(date_from, date_to))
+        cube_rows = self.get_daily_cube_rows(date_from, date_to, linea_id, dims=self.MONTHLY_CUBE_DIMS, by_month=True)
+        if cube_rows is not None:
+            return monthly_series(cube_rows, months)
+        if not self.uid or not self.models:
+            return monthly_series([], months)
+
+        def loader():
+            rows, seller_rows = self._read_monthly_sales_groups(date_from, date_to, linea_id)
+            return monthly_series(rows, months, seller_rows)
+
+        cache = getattr(self, '_sales_cache', None)
+        if cache is None:
+            return loader()
+        return cache.get_or_load(('sales_by_month', date_from, date_to, linea_id), loader)
+
+    @staticmethod
+    def _months_between(date_from, date_to):
+        """Cantidad de meses calendario de date_from a date_to (inclusive)."""
+        return (int(date_to[:4]) - int(date_from[:4])) * 12 + int(date_to[5:7]) - int(date_from[5:7]) + 1
+
+    def _read_monthly_sales_groups(self, date_from, date_to, linea_id=None):
+        """
+        Grupos de Odoo para get_sales_by_month.
+
+        Returns:
+            tuple: (filas por mes y producto, filas por factura con su mes y vendedor)
+        """
+        timings = {}
+        stages = {
+            'productos': lambda models: self.read_sales_groups(
+                ['invoice_date:month', 'product_id'], date_from, date_to, linea_id=linea_id, models=models),
+            'facturas': lambda models: self.read_sales_groups(
+                ['move_id'], date_from, date_to, linea_id=linea_id, models=models),
+        }
+        groups = self._run_stages(stages, timings)
+
+        products = self._read_product_master({g['product_id'][0] for g in groups['productos'] if g.get('product_id')})
+        rows = []
+        for group in groups['productos']:
+            product = products.get(group['product_id'][0], {}) if group.get('product_id') else {}
+            rows.append({
+                'month': group['invoice_date:month'],
+                'commercial_line_national_id': product.get('commercial_line_national_id'),
+                'product_life_cycle': product.get('product_life_cycle'),
+                'balance': group['balance'],
+            })
+
+        moves = self._read_move_master([g['move_id'][0] for g in groups['facturas'] if g.get('move_id')])
+        seller_rows = []
+        for group in groups['facturas']:
+            move = moves.get(group['move_id'][0], {}) if group.get('move_id') else {}
+            seller_rows.append({
+                'month': str(move['invoice_date'])[:7] if move.get('invoice_date') else None,
+                'invoice_user_id': move.get('invoice_user_id'),
+                'balance': group['balance'],
+            })
+
+        logger.info(
+            f"⏱️ get_sales_by_month {date_from}..{date_to}: {len(rows)} grupos mes/producto, "
+            f"{len(seller_rows)} facturas | " + ', '.join(f"{name}={secs:.2f}s" for name, secs in timings.items())
+        )
+        return rows, seller_rows
+
+    def get_sales_trend(self, date_to=None, months=12, linea_id=None):
+        """
+        Tendencia de los últimos meses con comparación contra el año anterior.
+
+        Los meses terminan en el mes de date_to; el año anterior se corta en el
+        mismo día (date_to menos un año), así el mes en curso se compara contra
+        el mismo avance del mes del año anterior.
+
+        Args:
+            date_to: Fecha final (YYYY-MM-DD); por defecto hoy
+            months: Cantidad de meses de la serie
+            linea_id: Solo la línea comercial indicada
+
+        Returns:
+            dict: actual y anterior (ver get_sales_by_month) y variacion
+                  {'total': [...], 'ipn': [...]} en % (None si el año anterior es 0)
+        """
+        date_to = date_to or datetime.now().strftime('%Y-%m-%d')
+        date_from = trend_months(date_to, months)[0] + '-01'
+        year = int(date_to[:4]) - 1
+        # 29 de febrero -> 28 de febrero del año anterior
+        previous_to = f"{year}{date_to[4:]}" if date_to[5:] != '02-29' else f"{year}-02-28"
+        previous_from = f"{int(date_from[:4]) - 1}{date_from[4:]}"
+
+        actual = self.get_sales_by_month(date_from, date_to, linea_id)
+        anterior = self.get_sales_by_month(previous_from, previous_to, linea_id)
+        return {
+            'actual': actual,
+            'anterior': anterior,
+            'variacion': {
+                'total': year_over_year(actual['total'], anterior['total']),
+                'ipn': year_over_year(actual['ipn'], anterior['ipn']),
+            },
+        }
+
+    @staticmethod
+    def aggregate_dashboard_rows(rows):
+        """
+        Calcula los totales del dashboard mensual a partir de filas por producto.
+
+        Cada fila trae 'linea' (nombre de línea comercial), 'producto', 'ciclo_vida',
+        'balance', 'vencimiento' (saldo con ruta 18/19) y 'ecommerce' (saldo de
+        vendedores ECOMMERCE). Los totales se calculan con group-bys de pandas
+        (ver src/sales_aggregation.py).
+
+        Returns:
+            dict: ventas_por_linea, ventas_por_ruta, ventas_ipn_por_linea,
+                  ventas_por_producto, ciclo_vida_por_producto, ventas_por_ciclo_vida,
+                  ventas_por_linea_ecommerce
+        """
+        return dashboard_totals(dashboard_rows_to_frame(rows))
+
+    def get_dashboard_aggregates(self, date_from, date_to, ecommerce_user_ids=None):
+        """
+        Totales del dashboard mensual calculados con read_group en Odoo.
+
+        Si el almacén local cubre el rango, los totales salen del cubo diario
+        sin consultar Odoo. Si no, se ejecutan en paralelo tres agrupaciones por
+        producto (ventas, rutas de vencimiento 18/19 según la línea de la orden,
+        ver _read_vencimiento_groups, y vendedores ECOMMERCE) y se
+        combinan con los datos del producto, sin descargar las líneas de detalle.
+        Si read_group falla se calcula lo mismo a partir de get_sales_lines.
+
+        Args:
+            date_from: Fecha inicial (YYYY-MM-DD)
+            date_to: Fecha final (YYYY-MM-DD)
+            ecommerce_user_ids: IDs de vendedores del equipo ECOMMERCE
+
+        Returns:
+            dict: Ver aggregate_dashboard_rows
+        """
+        ecommerce_user_ids = [int(uid) for uid in (ecommerce_user_ids or [])]
+        cube_rows = self.get_daily_cube_rows(date_from, date_to)
+        if cube_rows is not None:
+            return self.aggregate_dashboard_lines(cube_rows, ecommerce_user_ids)
+        if not self.uid or not self.models:
+            return self.aggregate_dashboard_rows([])
+
+        try:
+            timings = {}
+            stages = {
+                'ventas': lambda models: self.read_sales_groups(
+                    ['product_id'], date_from, date_to, models=models),
+                'vencimiento': lambda models: self._read_vencimiento_groups(date_from, date_to, models),
+            }
+            if ecommerce_user_ids:
+                stages['ecommerce'] = lambda models: self.read_sales_groups(
+                    ['product_id'], date_from, date_to,
+                    extra_domain=[('move_id.invoice_user_id', 'in', ecommerce_user_ids)], models=models)
+            groups = self._run_stages(stages, timings)
+
+            by_product = {}
+            for key, field in (('ventas', 'balance'), ('vencimiento', 'vencimiento'), ('ecommerce', 'ecommerce')):
+                for group in groups.get(key, []):
+                    product = group.get('product_id')
+                    if not product:
+                        continue
+                    row = by_product.setdefault(product[0], {'balance': 0, 'vencimiento': 0, 'ecommerce': 0})
+                    row[field] += group['balance']
+
+            products = self._read_product_master(by_product.keys())
+            rows = []
+            for product_id, row in by_product.items():
+                product = products.get(product_id, {})
+                linea = product.get('commercial_line_national_id')
+                row.update({
+                    'linea': linea[1].upper() if isinstance(linea, list) and len(linea) > 1 else None,
+                    'producto': product.get('name', ''),
+                    'ciclo_vida': product.get('product_life_cycle'),
+                })
+                rows.append(row)
+
+            logger.info(
+                f"⏱️ get_dashboard_aggregates {date_from}..{date_to}: {len(rows)} productos | "
+                + ', '.join(f"{name}={secs:.2f}s" for name, secs in timings.items())
+            )
+            return self.aggregate_dashboard_rows(rows)
+
         except Exception as e:
-            print(f"Error al obtener las líneas de venta de Odoo: {e}")
-            # Devolver formato apropiado según si se solicitó paginación
-            if page is not None and per_page is not None:
-                return [], {'page': page, 'per_page': per_page, 'total': 0, 'pages': 0}
+            logger.warning(f"⚠️ read_group no disponible ({e}), se agregan las líneas de detalle")
+            return self.aggregate_dashboard_lines(
+                self.get_dashboard_lines(date_from, date_to, limit=None),
+                ecommerce_user_ids
+            )
+
+    def _read_vencimiento_groups(self, date_from, date_to, models):
+        """
+        Saldo por producto de las líneas con ruta de vencimiento 18/19.
+
+        La ruta se toma como en _merge_sales_lines: de la sale.order.line con la
+        misma orden (order_id de la factura) y producto, así las notas de crédito
+        de una orden también descuentan. Se agrupa por factura y producto en Odoo
+        y solo se leen la orden de cada factura y la ruta de esas líneas de orden.
+
+        Returns:
+            list: [{'product_id': valor, 'balance': saldo}] como read_sales_groups
+        """
+        groups = self.read_sales_groups(
+            ['move_id', 'product_id'], date_from, date_to,
+            extra_domain=[('move_id.order_id', '!=', False)], models=models)
+        groups = [g for g in groups if g.get('move_id') and g.get('product_id')]
+        if not groups:
             return []
 
+        def run(name, ids, build_query):
+            records = []
+            for query in self._chunked_queries(name, ids, build_query).values():
+                records.extend(models.execute_kw(self.db, self.uid, self.password, *query))
+            return records
+
+        moves = run('account.move', list({g['move_id'][0] for g in groups}), lambda ids: (
+            'account.move', 'read', [ids], {'fields': ['order_id']}))
+        order_by_move = {m['id']: m['order_id'][0] for m in moves if m.get('order_id')}
+        product_ids = list({g['product_id'][0] for g in groups})
+        sale_lines = run('sale.order.line', list(set(order_by_move.values())), lambda ids: (
+            'sale.order.line', 'search_read',
+            [[('order_id', 'in', ids), ('product_id', 'in', product_ids)]],
+            {'fields': ['order_id', 'product_id', 'route_id']}))
+        route_by_key = {
+            (sl['order_id'][0], sl['product_id'][0]): sl.get('route_id')
+            for sl in sale_lines if sl.get('order_id') and sl.get('product_id')
+        }
+
+        products, totals = {}, {}
+        for group in groups:
+            product_id = group['product_id'][0]
+            route = route_by_key.get((order_by_move.get(group['move_id'][0]), product_id))
+            if route and route[0] in RUTAS_VENCIMIENTO:
+                products[product_id] = group['product_id']
+                totals[product_id] = totals.get(product_id, 0) + group['balance']
+        return [{'product_id': products[pid], 'balance': balance} for pid, balance in totals.items()]
+
+    @staticmethod
+    def aggregate_dashboard_lines(sales_lines, ecommerce_user_ids=()):
+        """
+        Totales del dashboard mensual a partir de líneas de detalle de get_sales_lines.
+
+        Excluye VENTA INTERNACIONAL y retorna las mismas claves que
+        aggregate_dashboard_rows.
+        """
+        frame = sales_lines_to_frame(sales_lines)
+        return dashboard_totals(add_dashboard_columns(frame, ecommerce_user_ids))
+
     def get_sales_dashboard_data(self, date_from=None, date_to=None, linea_id=None, partner_id=None):
-        """Obtener datos para el dashboard de ventas"""
+        """
+        Obtener datos para el dashboard de ventas.
+
+        Si el almacén local cubre el rango (y no se filtra por cliente), los
+        totales se componen desde el cubo diario sin consultar Odoo. Si no, se
+        agrupan en Odoo (read_group por producto, cliente y factura) y solo se
+        leen los datos maestros de productos y facturas agrupados.
+        Como antes, los montos se suman en valor absoluto (las notas de crédito
+        suman), por eso cada agrupación se consulta por separado para saldos
+        positivos, negativos y en cero (bonificaciones: no suman ventas pero sí
+        cantidad y líneas).
+        """
         try:
-            # Obtener líneas de venta
-            sales_lines = self.get_sales_lines(
-                date_from=date_from,
-                date_to=date_to,
-                partner_id=partner_id,
-                linea_id=linea_id,
-                limit=5000
-            )
-            
-            # Filtrar VENTA INTERNACIONAL (exportaciones)
-            sales_lines_filtered = []
-            for line in sales_lines:
-                # Filtrar por línea comercial
-                linea_comercial = line.get('commercial_line_national_id')
-                if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                    nombre_linea = linea_comercial[1].upper()
-                    if 'VENTA INTERNACIONAL' in nombre_linea:
-                        continue
-                
-                # Filtrar por canal de ventas
-                canal_ventas = line.get('sales_channel_id')
-                if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                    nombre_canal = canal_ventas[1].upper()
-                    if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                        continue
-                
-                sales_lines_filtered.append(line)
-            
-            sales_lines = sales_lines_filtered  # Usar los datos filtrados
-            
-            if not sales_lines:
+            if not partner_id:
+                cube_rows = self.get_daily_cube_rows(date_from, date_to, linea_id)
+                if cube_rows is not None:
+                    partner_rows = self.get_daily_cube_rows(date_from, date_to, linea_id, table='sales_cube_partner')
+                    month_rows = self.get_daily_cube_rows(
+                        date_from, date_to, linea_id, dims=('commercial_line_national_id', 'sales_channel_id'),
+                        by_month=True)
+                    return self._sales_dashboard_from_cube(cube_rows, partner_rows, month_rows)
+
+            if not self.uid or not self.models:
                 return self._get_empty_dashboard_data()
-            
-            # Calcular métricas básicas
-            total_sales = sum([abs(line.get('balance', 0)) for line in sales_lines])
-            total_quantity = sum([line.get('quantity', 0) for line in sales_lines])
-            total_lines = len(sales_lines)
-            
+
+            filters = {'date_from': date_from, 'date_to': date_to, 'partner_id': partner_id, 'linea_id': linea_id}
+
+            def grouped(field, operator):
+                return lambda models: self.read_sales_groups(
+                    [field], extra_domain=[('balance', operator, 0)], models=models, **filters
+                )
+
+            balance_operators = ('>', '<', '=')
+            stages = {}
+            for field in ('product_id', 'partner_id', 'move_id'):
+                for operator in balance_operators:
+                    stages[f'{field}{operator}0'] = grouped(field, operator)
+            results = self._run_stages(stages, {})
+
+            def sum_by_id(field):
+                totals = {}
+                for key in (f'{field}{operator}0' for operator in balance_operators):
+                    for group in results[key]:
+                        value = group.get(field)
+                        group_id = value[0] if value else False
+                        item = totals.setdefault(group_id, {'record': value, 'sales': 0, 'quantity': 0, 'count': 0})
+                        item['sales'] += abs(group['balance'])
+                        item['quantity'] += group['quantity']
+                        item['count'] += group['count']
+                return totals
+
+            by_product = sum_by_id('product_id')
+            by_partner = sum_by_id('partner_id')
+            by_move = sum_by_id('move_id')
+
+            if not by_product:
+                return self._get_empty_dashboard_data()
+
+            add = self._add_dashboard_bucket
+
             # Métricas por cliente
             clients_data = {}
-            for line in sales_lines:
-                client_name = line.get('partner_name', 'Sin Cliente')
-                if client_name not in clients_data:
-                    clients_data[client_name] = {'sales': 0, 'quantity': 0}
-                clients_data[client_name]['sales'] += abs(line.get('balance', 0))
-                clients_data[client_name]['quantity'] += line.get('quantity', 0)
-            
-            # Top clientes
-            top_clients = sorted(clients_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:10]
-            
-            # Métricas por producto
+            for item in by_partner.values():
+                partner = item['record']
+                add(clients_data, partner[1] if partner else 'Sin Cliente', item)
+
+            # Métricas por producto y por línea comercial
+            product_master = self._read_product_master([pid for pid in by_product if pid])
             products_data = {}
-            for line in sales_lines:
-                product_name = line.get('name', 'Sin Producto')
-                if product_name not in products_data:
-                    products_data[product_name] = {'sales': 0, 'quantity': 0}
-                products_data[product_name]['sales'] += abs(line.get('balance', 0))
-                products_data[product_name]['quantity'] += line.get('quantity', 0)
-            
-            # Top productos
-            top_products = sorted(products_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:10]
-            
-            # Métricas por canal
-            channels_data = {}
-            for line in sales_lines:
-                channel = line.get('sales_channel_id')
-                channel_name = channel[1] if channel and len(channel) > 1 else 'Sin Canal'
-                if channel_name not in channels_data:
-                    channels_data[channel_name] = {'sales': 0, 'quantity': 0}
-                channels_data[channel_name]['sales'] += abs(line.get('balance', 0))
-                channels_data[channel_name]['quantity'] += line.get('quantity', 0)
-            
-            sales_by_channel = list(channels_data.items())
-            
-            # Métricas por línea comercial (NUEVO)
             commercial_lines_data = {}
-            for line in sales_lines:
-                commercial_line = line.get('commercial_line_national_id')
-                if commercial_line:
-                    line_name = commercial_line[1] if commercial_line and len(commercial_line) > 1 else 'Sin Línea'
-                else:
-                    line_name = 'Sin Línea Comercial'
-                
-                if line_name not in commercial_lines_data:
-                    commercial_lines_data[line_name] = {'sales': 0, 'quantity': 0}
-                commercial_lines_data[line_name]['sales'] += abs(line.get('balance', 0))
-                commercial_lines_data[line_name]['quantity'] += line.get('quantity', 0)
-            
-            # Preparar datos de líneas comerciales para el gráfico
-            commercial_lines_sorted = sorted(commercial_lines_data.items(), key=lambda x: x[1]['sales'], reverse=True)
-            commercial_lines = [
-                {
-                    'name': line_name,
-                    'amount': data['sales'],
-                    'quantity': data['quantity']
-                } 
-                for line_name, data in commercial_lines_sorted
-            ]
-            
-            # Estadísticas de líneas comerciales
-            commercial_lines_stats = {
-                'total_lines': len(commercial_lines),
-                'top_line_name': commercial_lines[0]['name'] if commercial_lines else 'N/A',
-                'top_line_amount': commercial_lines[0]['amount'] if commercial_lines else 0
-            }
-            
-            # Métricas por vendedor (NUEVO)
+            for product_id, item in by_product.items():
+                product = product_master.get(product_id, {})
+                add(products_data, product.get('name', 'Sin Producto'), item)
+                add(commercial_lines_data, self._dashboard_line_name(product.get('commercial_line_national_id')), item)
+
+            # Métricas por canal, por vendedor y por mes (datos de la factura)
+            move_master = self._read_move_master([mid for mid in by_move if mid])
+            channels_data = {}
             sellers_data = {}
-            for line in sales_lines:
-                seller = line.get('invoice_user_id')
-                if seller:
-                    seller_name = seller[1] if seller and len(seller) > 1 else 'Sin Vendedor'
-                else:
-                    seller_name = 'Sin Vendedor Asignado'
-                
-                if seller_name not in sellers_data:
-                    sellers_data[seller_name] = {'sales': 0, 'quantity': 0}
-                sellers_data[seller_name]['sales'] += abs(line.get('balance', 0))
-                sellers_data[seller_name]['quantity'] += line.get('quantity', 0)
-            
-            # Preparar datos de vendedores para el gráfico (Top 8 vendedores)
-            sellers_sorted = sorted(sellers_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:8]
-            sellers = [
-                {
-                    'name': seller_name,
-                    'amount': data['sales'],
-                    'quantity': data['quantity']
-                } 
-                for seller_name, data in sellers_sorted
-            ]
-            
-            # Estadísticas de vendedores
-            sellers_stats = {
-                'total_sellers': len(sellers_data),
-                'top_seller_name': sellers[0]['name'] if sellers else 'N/A',
-                'top_seller_amount': sellers[0]['amount'] if sellers else 0
-            }
-            
-            return {
-                'total_sales': total_sales,
-                'total_quantity': total_quantity,
-                'total_lines': total_lines,
-                'top_clients': top_clients,
-                'top_products': top_products,
-                'sales_by_month': [],  # Puede implementarse después
-                'sales_by_channel': sales_by_channel,
-                # Datos específicos para líneas comerciales
-                'commercial_lines': commercial_lines,
-                'commercial_lines_stats': commercial_lines_stats,
-                # Datos específicos para vendedores
-                'sellers': sellers,
-                'sellers_stats': sellers_stats,
-                # Campos KPI para el template
-                'kpi_total_sales': total_sales,
-                'kpi_total_invoices': total_lines,
-                'kpi_total_quantity': total_quantity
-            }
-            
+            months_data = {}
+            for move_id, item in by_move.items():
+                move = move_master.get(move_id, {})
+                channel = move.get('team_id')
+                add(channels_data, channel[1] if channel and len(channel) > 1 else 'Sin Canal', item)
+                add(sellers_data, self._dashboard_seller_name(move.get('invoice_user_id')), item)
+                if move.get('invoice_date'):
+                    add(months_data, str(move['invoice_date'])[:7], item)
+
+            return self._sales_dashboard_result(
+                total_sales=sum(item['sales'] for item in by_product.values()),
+                total_quantity=sum(item['quantity'] for item in by_product.values()),
+                total_lines=sum(item['count'] for item in by_product.values()),
+                clients_data=clients_data, products_data=products_data,
+                commercial_lines_data=commercial_lines_data, channels_data=channels_data,
+                sellers_data=sellers_data, months_data=months_data,
+            )
+
         except Exception as e:
             print(f"Error obteniendo datos del dashboard: {e}")
             return self._get_empty_dashboard_data()
 
+    @staticmethod
+    def _add_dashboard_bucket(bucket, name, item):
+        """Suma ventas y cantidad de item en bucket[name]."""
+        if name not in bucket:
+            bucket[name] = {'sales': 0, 'quantity': 0}
+        bucket[name]['sales'] += item['sales']
+        bucket[name]['quantity'] += item['quantity']
+
+    @staticmethod
+    def _dashboard_line_name(commercial_line):
+        if commercial_line:
+            return commercial_line[1] if len(commercial_line) > 1 else 'Sin Línea'
+        return 'Sin Línea Comercial'
+
+    @staticmethod
+    def _dashboard_seller_name(seller):
+        if seller:
+            return seller[1] if len(seller) > 1 else 'Sin Vendedor'
+        return 'Sin Vendedor Asignado'
+
+    def _sales_dashboard_from_cube(self, cube_rows, partner_rows, month_rows=()):
+        """
+        Datos de get_sales_dashboard_data desde las celdas del cubo diario.
+
+        Las mismas sumas que las agrupaciones de read_group: abs_balance por
+        producto, línea comercial, canal y vendedor (sales_cube), por cliente
+        (sales_cube_partner) y por mes (month_rows).
+        """
+        if not cube_rows:
+            return self._get_empty_dashboard_data()
+        add = self._add_dashboard_bucket
+        clients_data = {}
+        for row in partner_rows:
+            partner = row.get('partner_id')
+            add(clients_data, partner[1] if partner else 'Sin Cliente',
+                {'sales': row['abs_balance'], 'quantity': row['quantity']})
+
+        products_data, commercial_lines_data, channels_data, sellers_data = {}, {}, {}, {}
+        for row in cube_rows:
+            item = {'sales': row['abs_balance'], 'quantity': row['quantity']}
+            add(products_data, row.get('name') or 'Sin Producto', item)
+            add(commercial_lines_data, self._dashboard_line_name(row.get('commercial_line_national_id')), item)
+            channel = row.get('sales_channel_id')
+            add(channels_data, channel[1] if channel and len(channel) > 1 else 'Sin Canal', item)
+            add(sellers_data, self._dashboard_seller_name(row.get('invoice_user_id')), item)
+
+        months_data = {}
+        for row in month_rows:
+            add(months_data, row['month'], {'sales': row['abs_balance'], 'quantity': row['quantity']})
+
+        return self._sales_dashboard_result(
+            total_sales=sum(row['abs_balance'] for row in cube_rows),
+            total_quantity=sum(row['quantity'] for row in cube_rows),
+            total_lines=sum(row['lines'] for row in cube_rows),
+            clients_data=clients_data, products_data=products_data,
+            commercial_lines_data=commercial_lines_data, channels_data=channels_data,
+            sellers_data=sellers_data, months_data=months_data,
+        )
+
+    @staticmethod
+    def _sales_dashboard_result(total_sales, total_quantity, total_lines, clients_data, products_data,
+                                commercial_lines_data, channels_data, sellers_data, months_data=None):
+        """Arma la respuesta de get_sales_dashboard_data a partir de los totales por grupo."""
+        top_clients = sorted(clients_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:10]
+        top_products = sorted(products_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:10]
+        sales_by_month = sorted((months_data or {}).items())
+        sales_by_channel = list(channels_data.items())
+
+        # Preparar datos de líneas comerciales para el gráfico
+        commercial_lines_sorted = sorted(commercial_lines_data.items(), key=lambda x: x[1]['sales'], reverse=True)
+        commercial_lines = [
+            {
+                'name': line_name,
+                'amount': data['sales'],
+                'quantity': data['quantity']
+            } 
+            for line_name, data in commercial_lines_sorted
+        ]
+        
+        # Estadísticas de líneas comerciales
+        commercial_lines_stats = {
+            'total_lines': len(commercial_lines),
+            'top_line_name': commercial_lines[0]['name'] if commercial_lines else 'N/A',
+            'top_line_amount': commercial_lines[0]['amount'] if commercial_lines else 0
+        }
+        
+        # Preparar datos de vendedores para el gráfico (Top 8 vendedores)
+        sellers_sorted = sorted(sellers_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:8]
+        sellers = [
+            {
+                'name': seller_name,
+                'amount': data['sales'],
+                'quantity': data['quantity']
+            } 
+            for seller_name, data in sellers_sorted
+        ]
+        
+        # Estadísticas de vendedores
+        sellers_stats = {
+            'total_sellers': len(sellers_data),
+            'top_seller_name': sellers[0]['name'] if sellers else 'N/A',
+            'top_seller_amount': sellers[0]['amount'] if sellers else 0
+        }
+        
+        return {
+            'total_sales': total_sales,
+            'total_quantity': total_quantity,
+            'total_lines': total_lines,
+            'top_clients': top_clients,
+            'top_products': top_products,
+            'sales_by_month': sales_by_month,
+            'sales_by_channel': sales_by_channel,
+            # Datos específicos para líneas comerciales
+            'commercial_lines': commercial_lines,
+            'commercial_lines_stats': commercial_lines_stats,
+            # Datos específicos para vendedores
+            'sellers': sellers,
+            'sellers_stats': sellers_stats,
+            # Campos KPI para el template
+            'kpi_total_sales': total_sales,
+            'kpi_total_invoices': total_lines,
+            'kpi_total_quantity': total_quantity
+        }
+
     def _get_empty_dashboard_data(self):
         """Datos vacíos para el dashboard"""
         return {
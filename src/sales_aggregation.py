@@ -0,0 +1,367 @@
+"""
+sales_aggregation.py - Agregaciones vectorizadas de ventas para los dashboards
+
+Convierte las líneas de venta (dicts de 27 columnas) en un DataFrame tipado una
+sola vez y calcula con group-bys de pandas los totales que antes se acumulaban
+en bucles dentro de /dashboard y /dashboard_linea.
+
+Las funciones de normalización (normalizar_linea_comercial, limpiar_nombre_atrevia)
+se aplican sobre los valores únicos de cada columna categórica, no por fila.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from src.sales_columns import SalesLinesTable
+from src.utils import normalizar_linea_comercial, limpiar_nombre_atrevia
+
+# Rutas de venta que cuentan como "vencimiento < 6 meses"
+RUTAS_VENCIMIENTO = (18, 19)
+
+# Líneas que no participan del Top de productos del dashboard general
+LINEAS_SIN_TOP_PRODUCTOS = ['GENVET', 'MARCA BLANCA', 'TERCEROS']
+
+# Columnas de get_sales_lines que lee sales_lines_to_frame (get_sales_lines(fields=...))
+FRAME_FIELDS = (
+    'balance', 'commercial_line_national_id', 'name', 'product_life_cycle',
+    'pharmaceutical_forms_id', 'invoice_user_id', 'route_id', 'sales_channel_id',
+)
+
+
+def _column(sales_lines, key: str) -> List[Any]:
+    """Valores de un campo por línea (lista de dicts o SalesLinesTable)."""
+    if isinstance(sales_lines, SalesLinesTable):
+        return sales_lines.column(key)
+    return [line.get(key) for line in sales_lines]
+
+
+def _many2one_names(sales_lines, key: str) -> List[Any]:
+    """Nombre de un campo many2one de Odoo ([id, nombre] o False) por línea."""
+    return [v[1] if v else None for v in _column(sales_lines, key)]
+
+
+def _recode(values, func) -> pd.Categorical:
+    """
+    Construye una columna categórica aplicando func solo a los valores únicos.
+
+    func puede unir categorías (ej: GENVET y MARCA BLANCA -> TERCEROS); los
+    códigos se recalculan sin volver a recorrer las filas en Python.
+    """
+    categorical = pd.Categorical(values)
+    mapped = pd.Index([func(c) for c in categorical.categories], dtype='object')
+    categories = mapped.dropna().unique()
+    lookup = np.append(categories.get_indexer(mapped), -1)
+    return pd.Categorical.from_codes(lookup[categorical.codes], categories=categories)
+
+
+def sales_lines_to_frame(sales_lines: List[Dict[str, Any]], exclude_international: bool = True) -> pd.DataFrame:
+    """
+    Construye un DataFrame tipado con las columnas que usan los dashboards.
+
+    Columnas: balance (float64), linea (línea comercial normalizada), producto
+    (nombre limpio), ciclo_vida, forma, vendedor_id, vendedor_nombre (todas
+    categóricas) y route_id (int64, 0 = sin ruta).
+
+    Cada campo se extrae con una sola pasada y las normalizaciones se aplican
+    a las categorías, no a las filas.
+
+    Args:
+        sales_lines: Líneas retornadas por OdooManager.get_sales_lines (lista o SalesLinesTable)
+        exclude_international: Excluir VENTA INTERNACIONAL por línea comercial o canal
+
+    Returns:
+        pd.DataFrame: Una fila por línea de venta
+    """
+    linea_raw = pd.Categorical(_many2one_names(sales_lines, 'commercial_line_national_id'))
+    users = _column(sales_lines, 'invoice_user_id')
+
+    frame = pd.DataFrame({
+        'balance': np.array([b or 0.0 for b in _column(sales_lines, 'balance')], dtype='float64'),
+        'linea': _recode(linea_raw, lambda v: normalizar_linea_comercial(v.upper())),
+        'producto': _recode([n or '' for n in _column(sales_lines, 'name')],
+                            lambda v: limpiar_nombre_atrevia(v.strip()) if v.strip() else None),
+        'ciclo_vida': pd.Categorical([c or None for c in _column(sales_lines, 'product_life_cycle')]),
+        'forma': pd.Categorical([v[1] if v else 'Instrumental' for v in _column(sales_lines, 'pharmaceutical_forms_id')]),
+        'vendedor_id': pd.Categorical([str(u[0]) if u else None for u in users]),
+        'vendedor_nombre': pd.Categorical([u[1] if u else None for u in users]),
+        'route_id': np.array([r[0] if r else 0 for r in _column(sales_lines, 'route_id')], dtype='int64'),
+    })
+
+    if exclude_international and len(frame):
+        canal = pd.Categorical(_many2one_names(sales_lines, 'sales_channel_id'))
+        linea_int = np.append([('VENTA INTERNACIONAL' in c.upper()) for c in linea_raw.categories], False)
+        canal_int = np.append([('INTERNACIONAL' in c.upper()) for c in canal.categories], False)
+        internacional = linea_int[linea_raw.codes] | canal_int[canal.codes]
+        if internacional.any():
+            frame = frame.loc[~internacional].reset_index(drop=True)
+    return frame
+
+
+def dashboard_rows_to_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Construye el DataFrame de dashboard_totals a partir de filas ya agrupadas
+    (por ejemplo, grupos por producto de read_group).
+
+    Cada fila trae 'linea' (nombre sin normalizar), 'producto', 'ciclo_vida',
+    'balance', 'vencimiento' y 'ecommerce'.
+    """
+    return pd.DataFrame({
+        'linea': _recode([r.get('linea') or None for r in rows], normalizar_linea_comercial),
+        'producto': _recode([r.get('producto') or '' for r in rows],
+                            lambda v: limpiar_nombre_atrevia(v.strip()) if v.strip() else None),
+        'ciclo_vida': pd.Categorical([r.get('ciclo_vida') or None for r in rows]),
+        'balance': np.array([r.get('balance') or 0.0 for r in rows], dtype='float64'),
+        'vencimiento': np.array([r.get('vencimiento') or 0.0 for r in rows], dtype='float64'),
+        'ecommerce': np.array([r.get('ecommerce') or 0.0 for r in rows], dtype='float64'),
+    })
+
+
+def add_dashboard_columns(frame: pd.DataFrame, ecommerce_user_ids: Iterable = ()) -> pd.DataFrame:
+    """
+    Agrega las columnas vencimiento (saldo con ruta 18/19) y ecommerce (saldo de
+    vendedores del equipo ECOMMERCE) a un DataFrame de líneas de detalle.
+    """
+    ecommerce_ids = {str(uid) for uid in ecommerce_user_ids}
+    balance = frame['balance'].to_numpy()
+    es_vencimiento = frame['route_id'].isin(RUTAS_VENCIMIENTO).to_numpy(dtype=bool)
+    es_ecommerce = frame['vendedor_id'].isin(ecommerce_ids).to_numpy(dtype=bool)
+    frame = frame.copy()
+    frame['vencimiento'] = np.where(es_vencimiento, balance, 0.0)
+    frame['ecommerce'] = np.where(es_ecommerce, balance, 0.0)
+    return frame
+
+
+def _sum_by(frame: pd.DataFrame, key: str, value: str = 'balance') -> Dict[Any, float]:
+    """Suma value agrupando por key (en orden de aparición, sin nulos)."""
+    if frame.empty:
+        return {}
+    sums = frame.groupby(key, sort=False, observed=True, dropna=True)[value].sum()
+    return {k: float(v) for k, v in sums.items()}
+
+
+def dashboard_totals(frame: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Totales del dashboard mensual (/dashboard).
+
+    El DataFrame debe tener las columnas linea, producto, ciclo_vida, balance,
+    vencimiento y ecommerce: puede venir de líneas de detalle (ver
+    add_dashboard_columns) o de grupos por producto calculados en Odoo.
+
+    Returns:
+        dict: ventas_por_linea, ventas_por_ruta, ventas_ipn_por_linea,
+              ventas_por_producto, ciclo_vida_por_producto, ventas_por_ciclo_vida,
+              ventas_por_linea_ecommerce
+    """
+    ecommerce_rows = frame[frame['ecommerce'] != 0] if not frame.empty else frame
+    if not ecommerce_rows.empty:
+        linea_ecommerce = ecommerce_rows['linea'].astype('object').fillna('N/A')
+        ventas_ecommerce = ecommerce_rows['ecommerce'].groupby(linea_ecommerce.to_numpy(), sort=False).sum()
+        ventas_por_linea_ecommerce = {k: float(v) for k, v in ventas_ecommerce.items()}
+    else:
+        ventas_por_linea_ecommerce = {}
+
+    # Una fila agrupada con saldo neto 0 puede tener vencimiento distinto de 0:
+    # el filtro de saldo solo aplica a los totales de ventas.
+    if not frame.empty:
+        vencimiento = frame[frame['linea'].notna() & (frame['vencimiento'] != 0)]
+        ventas_por_ruta = _sum_by(vencimiento, 'linea', 'vencimiento')
+    else:
+        ventas_por_ruta = {}
+
+    frame = frame[frame['balance'] != 0] if not frame.empty else frame
+    con_linea = frame[frame['linea'].notna()] if not frame.empty else frame
+
+    ventas_ipn = _sum_by(con_linea[con_linea['ciclo_vida'] == 'nuevo'], 'linea') if not con_linea.empty else {}
+
+    if not frame.empty:
+        top = frame[frame['producto'].notna() & (frame['producto'] != '')
+                    & ~frame['linea'].isin(LINEAS_SIN_TOP_PRODUCTOS)]
+        primeros = top.drop_duplicates('producto')
+        ciclo_vida_por_producto = dict(zip(primeros['producto'].astype('object'), primeros['ciclo_vida'].astype('object')))
+        ciclo_vida_por_producto = {k: (None if pd.isna(v) else v) for k, v in ciclo_vida_por_producto.items()}
+        ciclo = frame['ciclo_vida'].astype('object').fillna('No definido')
+        ventas_por_ciclo_vida = {k: float(v) for k, v in frame['balance'].groupby(ciclo.to_numpy(), sort=False).sum().items()}
+    else:
+        top = frame
+        ciclo_vida_por_producto = {}
+        ventas_por_ciclo_vida = {}
+
+    return {
+        'ventas_por_linea': _sum_by(con_linea, 'linea'),
+        'ventas_por_ruta': ventas_por_ruta,
+        'ventas_ipn_por_linea': ventas_ipn,
+        'ventas_por_producto': _sum_by(top, 'producto'),
+        'ciclo_vida_por_producto': ciclo_vida_por_producto,
+        'ventas_por_ciclo_vida': ventas_por_ciclo_vida,
+        'ventas_por_linea_ecommerce': ventas_por_linea_ecommerce,
+    }
+
+
+def linea_totals(frame: pd.DataFrame, linea_nombre: str) -> Dict[str, Any]:
+    """
+    Totales del dashboard por línea comercial (/dashboard_linea).
+
+    Args:
+        frame: DataFrame de sales_lines_to_frame
+        linea_nombre: Línea comercial seleccionada (normalizada, ej: 'PETMEDICA')
+
+    Returns:
+        dict: ventas_por_vendedor, ventas_ipn_por_vendedor, ventas_vencimiento_por_vendedor,
+              nombres_vendedores, ajustes_sin_vendedor, ventas_por_producto,
+              ventas_por_ciclo_vida, ventas_por_forma
+    """
+    linea = frame[frame['linea'] == linea_nombre.upper()] if not frame.empty else frame
+    if linea.empty:
+        return empty_linea_totals()
+
+    con_vendedor = linea[linea['vendedor_id'].notna()]
+    nombres = con_vendedor.drop_duplicates('vendedor_id', keep='last')
+    ciclo = linea['ciclo_vida'].astype('object').fillna('No definido')
+    productos = linea[linea['producto'].notna() & (linea['producto'] != '')]
+
+    return {
+        'ventas_por_vendedor': _sum_by(con_vendedor, 'vendedor_id'),
+        'ventas_ipn_por_vendedor': _sum_by(con_vendedor[con_vendedor['ciclo_vida'] == 'nuevo'], 'vendedor_id'),
+        'ventas_vencimiento_por_vendedor': _sum_by(
+            con_vendedor[con_vendedor['route_id'].isin(RUTAS_VENCIMIENTO)], 'vendedor_id'),
+        'nombres_vendedores': dict(zip(nombres['vendedor_id'].astype('object'), nombres['vendedor_nombre'].astype('object'))),
+        'ajustes_sin_vendedor': float(linea.loc[linea['vendedor_id'].isna(), 'balance'].sum()),
+        'ventas_por_producto': _sum_by(productos, 'producto'),
+        'ventas_por_ciclo_vida': {k: float(v) for k, v in linea['balance'].groupby(ciclo.to_numpy(), sort=False).sum().items()},
+        'ventas_por_forma': _sum_by(linea, 'forma'),
+    }
+
+
+def empty_linea_totals() -> Dict[str, Any]:
+    """Totales de linea_totals para una línea sin ventas."""
+    return {
+        'ventas_por_vendedor': {}, 'ventas_ipn_por_vendedor': {}, 'ventas_vencimiento_por_vendedor': {},
+        'nombres_vendedores': {}, 'ajustes_sin_vendedor': 0, 'ventas_por_producto': {},
+        'ventas_por_ciclo_vida': {}, 'ventas_por_forma': {},
+    }
+
+
+def _sum_by_linea(frame: pd.DataFrame, key: str, value: str = 'balance') -> Dict[str, Dict[Any, float]]:
+    """Como _sum_by, separado por línea comercial: línea -> {key: suma}."""
+    result: Dict[str, Dict[Any, float]] = {}
+    if frame.empty:
+        return result
+    sums = frame.groupby(['linea', key], sort=False, observed=True, dropna=True)[value].sum()
+    for (linea, k), v in sums.items():
+        result.setdefault(linea, {})[k] = float(v)
+    return result
+
+
+def lineas_totals(frame: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    linea_totals de todas las líneas comerciales en una sola pasada.
+
+    /dashboard_linea guarda este resultado por mes y dia_fin, así cambiar de
+    línea no vuelve a consultar Odoo ni a recorrer las ventas.
+
+    Args:
+        frame: DataFrame de sales_lines_to_frame
+
+    Returns:
+        dict: Línea normalizada -> mismo dict que linea_totals (solo líneas con ventas)
+    """
+    if frame.empty:
+        return {}
+    frame = frame[frame['linea'].notna()]
+    con_vendedor = frame[frame['vendedor_id'].notna()]
+    nombres = con_vendedor.drop_duplicates(['linea', 'vendedor_id'], keep='last')
+    productos = frame[frame['producto'].notna() & (frame['producto'] != '')]
+    ciclo = frame.assign(ciclo_vida=frame['ciclo_vida'].astype('object').fillna('No definido'))
+
+    por_linea = {
+        'ventas_por_vendedor': _sum_by_linea(con_vendedor, 'vendedor_id'),
+        'ventas_ipn_por_vendedor': _sum_by_linea(con_vendedor[con_vendedor['ciclo_vida'] == 'nuevo'], 'vendedor_id'),
+        'ventas_vencimiento_por_vendedor': _sum_by_linea(
+            con_vendedor[con_vendedor['route_id'].isin(RUTAS_VENCIMIENTO)], 'vendedor_id'),
+        'ventas_por_producto': _sum_by_linea(productos, 'producto'),
+        'ventas_por_ciclo_vida': _sum_by_linea(ciclo, 'ciclo_vida'),
+        'ventas_por_forma': _sum_by_linea(frame, 'forma'),
+    }
+    ajustes = frame.loc[frame['vendedor_id'].isna()].groupby('linea', observed=True)['balance'].sum()
+
+    result = {}
+    for linea in lineas_con_ventas(frame):
+        totals = {key: sums.get(linea, {}) for key, sums in por_linea.items()}
+        totals['ajustes_sin_vendedor'] = float(ajustes.get(linea, 0.0))
+        totals['nombres_vendedores'] = {}
+        result[linea] = totals
+    for linea, vendedor_id, nombre in zip(nombres['linea'].astype('object'), nombres['vendedor_id'].astype('object'),
+                                          nombres['vendedor_nombre'].astype('object')):
+        result[linea]['nombres_vendedores'][vendedor_id] = nombre
+    return result
+
+
+def lineas_con_ventas(frame: pd.DataFrame) -> List[str]:
+    """Líneas comerciales normalizadas presentes en las ventas (orden de aparición)."""
+    if frame.empty:
+        return []
+    return [l for l in frame['linea'].astype('object').dropna().unique()]
+
+
+def trend_months(date_to: str, months: int = 12) -> List[str]:
+    """Los `months` meses (YYYY-MM) que terminan en el mes de date_to (YYYY-MM-DD)."""
+    year, month = int(date_to[:4]), int(date_to[5:7])
+    result = []
+    for _ in range(months):
+        result.append(f"{year}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return result[::-1]
+
+
+def monthly_series(rows: List[Dict[str, Any]], months: List[str], seller_rows=None) -> Dict[str, Any]:
+    """
+    Series mensuales de ventas: total, IPN, por línea comercial y por vendedor.
+
+    Las filas son líneas de venta o grupos ya sumados (celdas del cubo, grupos
+    de read_group) con 'month' (YYYY-MM) y las columnas de sales_lines_to_frame;
+    deben venir sin VENTA INTERNACIONAL.
+
+    Args:
+        rows: Filas por mes para total, IPN y líneas comerciales
+        months: Meses de la serie en orden (los meses sin ventas quedan en 0)
+        seller_rows: Filas por mes para los vendedores (por defecto rows)
+
+    Returns:
+        dict: months, total, ipn (listas alineadas con months), por_linea y
+              por_vendedor ({clave: lista}) y nombres_vendedores
+    """
+    def by_month(frame, key=None):
+        if frame.empty:
+            return {} if key else [0.0] * len(months)
+        if key is None:
+            sums = frame.groupby('month', observed=False)['balance'].sum()
+            return [float(v) for v in sums.reindex(months, fill_value=0.0)]
+        sums = frame.groupby([key, 'month'], observed=True)['balance'].sum().unstack('month')
+        sums = sums.reindex(columns=months).fillna(0.0)
+        return {k: [float(v) for v in values] for k, values in sums.iterrows()}
+
+    def to_frame(items):
+        frame = sales_lines_to_frame(items, exclude_international=False)
+        frame['month'] = pd.Categorical(_column(items, 'month'), categories=months)
+        return frame[frame['month'].notna()]
+
+    frame = to_frame(rows)
+    sellers = frame if seller_rows is None else to_frame(seller_rows)
+    sellers = sellers[sellers['vendedor_id'].notna()]
+    nombres = sellers.drop_duplicates('vendedor_id', keep='last')
+
+    return {
+        'months': list(months),
+        'total': by_month(frame),
+        'ipn': by_month(frame[frame['ciclo_vida'] == 'nuevo']),
+        'por_linea': by_month(frame[frame['linea'].notna()], 'linea'),
+        'por_vendedor': by_month(sellers, 'vendedor_id'),
+        'nombres_vendedores': dict(zip(nombres['vendedor_id'].astype('object'), nombres['vendedor_nombre'].astype('object'))),
+    }
+
+
+def year_over_year(actual: List[float], anterior: List[float]) -> List[Any]:
+    """Variación porcentual mes a mes contra el año anterior (None si el año anterior es 0)."""
+    return [(a - b) / abs(b) * 100 if b else None for a, b in zip(actual, anterior)]
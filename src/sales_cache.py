@@ -0,0 +1,217 @@
+"""
+sales_cache.py - Caché en memoria para resultados de consultas a Odoo
+
+Evita repetir las mismas consultas XML-RPC cuando varios usuarios abren el
+dashboard con los mismos filtros (ej: 40 vendedores a las 9am consultando el mes).
+
+Características:
+- TTL configurable por entrada
+- Desalojo LRU limitado por tamaño estimado en memoria
+- Single-flight: peticiones concurrentes con la misma clave comparten una sola consulta
+- Contadores de aciertos/fallos para operadores (ver /admin/cache-stats)
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Cantidad de filas que se muestrean para estimar el tamaño de una lista grande
+_SIZE_SAMPLE_ROWS = 50
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estima el tamaño en bytes de un resultado (listas de dicts de Odoo).
+
+    Para listas grandes se mide una muestra de filas y se extrapola,
+    lo que evita recorrer decenas de miles de diccionarios.
+
+    Args:
+        value: Objeto a medir
+
+    Returns:
+        int: Tamaño aproximado en bytes
+    """
+    if isinstance(value, (list, tuple)):
+        total = sys.getsizeof(value)
+        if not value:
+            return total
+        sample = value[:_SIZE_SAMPLE_ROWS]
+        sample_size = sum(estimate_size(item) for item in sample)
+        return total + int(sample_size * len(value) / len(sample))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class _InFlight:
+    """Consulta en curso compartida entre hilos que piden la misma clave."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SalesLinesCache:
+    """
+    Caché TTL + LRU (por memoria) con deduplicación de consultas concurrentes.
+
+    Los errores del cargador no se almacenan: se propagan a todos los hilos
+    que esperaban la misma clave y la siguiente petición vuelve a consultar.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, max_bytes: int = 256 * 1024 * 1024, name: str = 'sales_lines'):
+        """
+        Args:
+            ttl_seconds: Segundos de vida de cada entrada (0 desactiva la caché)
+            max_bytes: Tamaño máximo estimado de todas las entradas
+            name: Nombre para logs y estadísticas
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.name = name
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._inflight: Dict[Hashable, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._shared = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_bytes > 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl_seconds: Optional[int] = None) -> Any:
+        """
+        Devuelve el valor en caché o lo carga una sola vez con `loader`.
+
+        Args:
+            key: Clave normalizada de la consulta
+            loader: Función sin argumentos que obtiene el valor desde Odoo
+            ttl_seconds: TTL específico para esta entrada (por defecto el de la caché)
+
+        Returns:
+            Valor cacheado o recién cargado
+        """
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                self._remove(key)
+                self._expirations += 1
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                # Otra petición ya está consultando: esperar su resultado
+                self._shared += 1
+                leader = False
+            else:
+                flight = _InFlight()
+                self._inflight[key] = flight
+                self._misses += 1
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+            raise
+
+        flight.value = value
+        self._store(key, value, self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._inflight.pop(key, None)
+        flight.event.set()
+        return value
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: int):
+        """Guarda una entrada y desaloja las menos usadas si se supera el límite."""
+        if ttl_seconds <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.warning(f"Caché {self.name}: resultado de {size / 1024 / 1024:.1f} MB excede el límite, no se almacena")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl_seconds, size, value)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+
+    def _remove(self, key: Hashable):
+        """Elimina una entrada (el llamador debe tener el lock)."""
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """
+        Invalida entradas de la caché.
+
+        Args:
+            predicate: Función que recibe la clave y retorna True si debe eliminarse.
+                       Si es None se vacía toda la caché.
+        """
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for key in keys:
+                self._remove(key)
+        if keys:
+            logger.info(f"Caché {self.name}: {len(keys)} entradas invalidadas")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de uso para operadores.
+
+        Returns:
+            Dict con hits, misses, ratio de aciertos, entradas y memoria usada
+        """
+        with self._lock:
+            lookups = self._hits + self._misses + self._shared
+            return {
+                'name': self.name,
+                'enabled': self.enabled,
+                'ttl_seconds': self.ttl_seconds,
+                'max_mb': round(self.max_bytes / 1024 / 1024, 1),
+                'used_mb': round(self._current_bytes / 1024 / 1024, 2),
+                'entries': len(self._entries),
+                'in_flight': len(self._inflight),
+                'hits': self._hits,
+                'misses': self._misses,
+                'shared_in_flight': self._shared,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_ratio': round((self._hits + self._shared) / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,261 @@
+"""
+sales_columns.py - Representación columnar compacta de las líneas de venta
+
+Cada línea de get_sales_lines es un dict de ~40 claves donde muchos valores se
+repiten en miles de filas ([id, nombre] de línea comercial, vendedor, forma
+farmacéutica, categoría, ruta...). SalesLinesTable guarda las mismas líneas por
+columnas:
+
+- Numéricas (balance, quantity, price_unit): array('d') de 8 bytes por fila
+- Many2one ([id, nombre] o False): array de ids + diccionario id -> nombre
+- Resto (textos, fechas): códigos en un array + tabla de valores únicos
+
+Iterar la tabla sigue entregando dicts de fila como antes, por lo que los
+llamadores existentes no cambian.
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Columnas numéricas de las líneas de venta
+NUMERIC_COLUMNS = ('balance', 'quantity', 'price_unit')
+
+# Filas que se decodifican juntas al iterar (acota la memoria temporal)
+_ITER_CHUNK_ROWS = 1000
+
+_NAN = float('nan')
+
+# Ids reservados de _Many2oneColumn para los valores vacíos
+_M2O_FALSE = -1
+_M2O_NONE = -2
+
+
+class _NumericColumn:
+    """Columna float64; None/False se guardan como NaN y se leen como None."""
+
+    def __init__(self, values):
+        # array('d') rechaza (TypeError) cualquier valor no numérico
+        self.values = array('d', [_NAN if v is None or v is False else v for v in values])
+
+    def decode(self, start, stop):
+        return [None if v != v else v for v in self.values[start:stop]]
+
+    def nbytes(self):
+        return sys.getsizeof(self.values)
+
+
+class _Many2oneColumn:
+    """Columna many2one: id por fila y un nombre por id."""
+
+    def __init__(self, values):
+        names: Dict[int, str] = {}
+        ids = []
+        append = ids.append
+        for v in values:
+            if v is None:
+                append(_M2O_NONE)
+            elif v is False:
+                append(_M2O_FALSE)
+            elif v.__class__ is list and len(v) == 2 and v[0].__class__ is int:
+                append(v[0])
+                if v[0] not in names:
+                    names[v[0]] = v[1]
+            else:
+                raise TypeError(f'{v!r} no es un many2one')
+        self.names = names
+        self.ids = array('i', ids)
+
+    def decode(self, start, stop):
+        names = self.names
+        return [
+            [i, names[i]] if i >= 0 else (None if i == _M2O_NONE else False)
+            for i in self.ids[start:stop]
+        ]
+
+    def nbytes(self):
+        return sys.getsizeof(self.ids) + sys.getsizeof(self.names) + sum(
+            sys.getsizeof(name) for name in self.names.values()
+        )
+
+
+class _DictionaryColumn:
+    """Columna con valores repetidos: código por fila + tabla de valores únicos."""
+
+    def __init__(self, values):
+        unique: List[Any] = []
+        lookup: Dict[Any, int] = {}
+        codes = []
+        append = codes.append
+        for v in values:
+            # El tipo es parte de la clave: False == 0 y True == 1 en un dict
+            # (un valor no hashable lanza TypeError)
+            key = (v.__class__, v)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(unique)
+                unique.append(v)
+            append(code)
+        self.values = unique
+        self.codes = array('i', codes)
+
+    def decode(self, start, stop):
+        values = self.values
+        return [values[c] for c in self.codes[start:stop]]
+
+    def nbytes(self):
+        return sys.getsizeof(self.codes) + sys.getsizeof(self.values) + sum(
+            sys.getsizeof(v) for v in self.values
+        )
+
+
+class _ListColumn:
+    """Valores que no se pueden codificar (listas de varios elementos, dicts): se guardan tal cual."""
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def decode(self, start, stop):
+        return self.values[start:stop]
+
+    def nbytes(self):
+        return sys.getsizeof(self.values) + sum(sys.getsizeof(v) for v in self.values)
+
+
+def _encode_column(name: str, values: List[Any]):
+    """
+    Elige la representación más compacta que admite todos los valores.
+
+    Se prueba según el primer valor no vacío; si algún valor no encaja, el
+    constructor lanza TypeError y se pasa a la siguiente representación.
+    """
+    sample = next((v for v in values if v is not None and v is not False), None)
+    candidates = []
+    if name in NUMERIC_COLUMNS:
+        candidates.append(_NumericColumn)
+    if sample.__class__ is list:
+        candidates.append(_Many2oneColumn)
+    candidates.append(_DictionaryColumn)
+    for column_class in candidates:
+        try:
+            return column_class(values)
+        except TypeError:
+            continue
+    return _ListColumn(values)
+
+
+class SalesLinesTable:
+    """
+    Contenedor columnar de solo lectura para líneas de venta.
+
+    Se construye con from_records y se lee como la lista de dicts original
+    (len, índice, slice, iteración). Las filas que se entregan son dicts
+    nuevos, así que una misma tabla puede compartirse entre peticiones (por
+    ejemplo, desde la caché de get_sales_lines).
+    """
+
+    def __init__(self, columns: Dict[str, Any], length: int):
+        self._columns = columns
+        self._length = length
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'SalesLinesTable':
+        """
+        Construye la tabla a partir de dicts de fila (ej: get_sales_lines).
+
+        Las claves ausentes en una fila se leen como None.
+        """
+        records = records if isinstance(records, list) else list(records)
+        names: Dict[str, None] = {}
+        for record in records:
+            if record.keys() != names.keys():
+                names.update(dict.fromkeys(record))
+        columns = {name: _encode_column(name, [r.get(name) for r in records]) for name in names}
+        return cls(columns, len(records))
+
+    # --- Lectura ---
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def _rows(self, start, stop) -> List[Dict[str, Any]]:
+        if not self._columns:
+            return [{} for _ in range(start, stop)]
+        names = list(self._columns)
+        decoded = [column.decode(start, stop) for column in self._columns.values()]
+        return [dict(zip(names, values)) for values in zip(*decoded)]
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Dict de la fila index (nuevo en cada llamada)."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('SalesLinesTable index out of range')
+        return self._rows(index, index + 1)[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step == 1:
+                return self._rows(start, max(start, stop))
+            return [self.row(i) for i in range(start, stop, step)]
+        return self.row(key)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start in range(0, self._length, _ITER_CHUNK_ROWS):
+            yield from self._rows(start, min(start + _ITER_CHUNK_ROWS, self._length))
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Lista de dicts equivalente a la que retorna get_sales_lines."""
+        return self._rows(0, self._length)
+
+    def column(self, name: str) -> List[Any]:
+        """Valores de una columna sin construir los dicts de fila."""
+        column = self._columns.get(name)
+        return column.decode(0, self._length) if column is not None else [None] * self._length
+
+    def numeric(self, name: str) -> array:
+        """Columna numérica como array('d') (NaN = vacío), sin copiar."""
+        column = self._columns.get(name)
+        if not isinstance(column, _NumericColumn):
+            raise KeyError(f"'{name}' no es una columna numérica")
+        return column.values
+
+    # --- Memoria ---
+
+    def memory_usage(self) -> int:
+        """Bytes ocupados por las columnas (arrays, diccionarios y valores únicos)."""
+        return sys.getsizeof(self._columns) + sum(column.nbytes() for column in self._columns.values())
+
+    def __sizeof__(self):
+        # sys.getsizeof (y estimate_size de la caché) miden la tabla completa
+        return object.__sizeof__(self) + self.memory_usage()
+
+    def memory_report(self, sample_rows: int = 200) -> Dict[str, Any]:
+        """
+        Memoria de la tabla frente a la lista de dicts equivalente.
+
+        El tamaño de la lista de dicts se estima con estimate_size de la caché
+        sobre una muestra de filas (cuenta cada valor aunque esté compartido).
+
+        Returns:
+            dict: rows, columnar_bytes, dict_bytes y los mismos valores por
+                  cada 10.000 líneas
+        """
+        from src.sales_cache import estimate_size
+
+        rows = self._length
+        columnar = self.memory_usage()
+        sample = self._rows(0, min(sample_rows, rows))
+        dict_bytes = int(estimate_size(sample) * rows / len(sample)) if sample else 0
+        return {
+            'rows': rows,
+            'columnar_bytes': columnar,
+            'dict_bytes': dict_bytes,
+            'columnar_bytes_per_10k': int(columnar * 10000 / rows) if rows else 0,
+            'dict_bytes_per_10k': int(dict_bytes * 10000 / rows) if rows else 0,
+        }
@@ -0,0 +1,200 @@
+"""
+sales_cube.py - Cubo diario de ventas materializado en el almacén SQLite
+
+Todos los KPI de /dashboard, /dashboard_linea y get_sales_dashboard_data son
+sumas sobre algún subconjunto de (día, línea comercial, vendedor, producto,
+ciclo de vida, ruta, canal, forma farmacéutica). El cubo guarda esas sumas por
+día en tablas del mismo SQLite que SalesLineStore, y se mantiene al escribir:
+cada vez que se reemplazan facturas se recalculan solo los días afectados.
+
+Un rango (mes a la fecha, o hasta dia_fin) se compone sumando las celdas de
+sus días, sin volver a leer las líneas de detalle.
+
+Tablas:
+- sales_cube: dimensiones de los dashboards (ver CUBE_TABLES)
+- sales_cube_partner: día, cliente, línea comercial y canal (top de clientes)
+
+Cada dimensión se guarda como el valor de la línea serializado en JSON (many2one
+[id, nombre], texto o False) y se devuelve igual, así las filas del cubo se
+usan como líneas de venta en sales_lines_to_frame. Medidas: balance (saldo),
+abs_balance (saldo en valor absoluto, notas de crédito suman), quantity y lines.
+"""
+
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Tabla -> dimensiones (claves de las líneas de venta)
+CUBE_TABLES = {
+    'sales_cube': (
+        'commercial_line_national_id', 'invoice_user_id', 'product_id', 'name',
+        'product_life_cycle', 'route_id', 'sales_channel_id', 'pharmaceutical_forms_id',
+    ),
+    'sales_cube_partner': ('partner_id', 'commercial_line_national_id', 'sales_channel_id'),
+}
+CUBE_MEASURES = ('balance', 'abs_balance', 'quantity', 'lines')
+
+# Cambia cuando cambian las tablas: el almacén reconstruye el cubo al abrir
+CUBE_VERSION = '1'
+
+# Máximo de parámetros por IN (...) en una sentencia SQLite
+_SQL_CHUNK = 500
+
+
+def _many2one_id(value):
+    if isinstance(value, (list, tuple)) and value:
+        return value[0]
+    return None
+
+
+def create_cube_tables(conn: sqlite3.Connection):
+    """Crea las tablas e índices del cubo si no existen."""
+    for table, dims in CUBE_TABLES.items():
+        columns = ', '.join(f'{d} TEXT' for d in dims)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                day TEXT NOT NULL,
+                commercial_line_id INTEGER,
+                {columns},
+                balance REAL NOT NULL,
+                abs_balance REAL NOT NULL,
+                quantity REAL NOT NULL,
+                lines INTEGER NOT NULL
+            )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_day ON {table} (day)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_linea_day ON {table} (commercial_line_id, day)")
+
+
+def clear_cube(conn: sqlite3.Connection):
+    """Elimina todas las celdas del cubo."""
+    for table in CUBE_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+
+
+def days_of_moves(conn: sqlite3.Connection, move_ids: List[int]) -> set:
+    """Fechas de factura que tienen hoy en el almacén las facturas indicadas."""
+    days = set()
+    for i in range(0, len(move_ids), _SQL_CHUNK):
+        chunk = move_ids[i:i + _SQL_CHUNK]
+        marks = ','.join('?' * len(chunk))
+        days.update(row[0] for row in conn.execute(
+            f"SELECT DISTINCT invoice_date FROM sales_lines WHERE move_id IN ({marks})", chunk
+        ))
+    return days
+
+
+def rebuild_days(conn: sqlite3.Connection, days: Optional[Iterable[str]] = None) -> int:
+    """
+    Recalcula las celdas del cubo de los días indicados desde sales_lines.
+
+    Args:
+        conn: Conexión al SQLite del almacén (en la misma transacción que la escritura)
+        days: Fechas de factura (YYYY-MM-DD); None recalcula el cubo completo
+
+    Returns:
+        int: Celdas escritas
+    """
+    if days is None:
+        clear_cube(conn)
+        chunks = [None]
+    else:
+        days = sorted(d for d in days if d)
+        chunks = [days[i:i + _SQL_CHUNK] for i in range(0, len(days), _SQL_CHUNK)]
+
+    written = 0
+    for chunk in chunks:
+        if chunk is None:
+            rows = conn.execute("SELECT invoice_date, data FROM sales_lines WHERE invoice_date IS NOT NULL")
+        else:
+            marks = ','.join('?' * len(chunk))
+            for table in CUBE_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE day IN ({marks})", chunk)
+            rows = conn.execute(f"SELECT invoice_date, data FROM sales_lines WHERE invoice_date IN ({marks})", chunk)
+
+        cells = {table: {} for table in CUBE_TABLES}
+        for day, data in rows.fetchall():
+            line = json.loads(data)
+            balance = float(line.get('balance') or 0)
+            quantity = float(line.get('quantity') or 0)
+            linea_id = _many2one_id(line.get('commercial_line_national_id'))
+            for table, dims in CUBE_TABLES.items():
+                key = (day, linea_id) + tuple(json.dumps(line.get(d), ensure_ascii=False) for d in dims)
+                cell = cells[table].get(key)
+                if cell is None:
+                    cell = cells[table][key] = [0.0, 0.0, 0.0, 0]
+                cell[0] += balance
+                cell[1] += abs(balance)
+                cell[2] += quantity
+                cell[3] += 1
+
+        for table, dims in CUBE_TABLES.items():
+            columns = ', '.join(('day', 'commercial_line_id') + dims + CUBE_MEASURES)
+            marks = ','.join('?' * (2 + len(dims) + len(CUBE_MEASURES)))
+            conn.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({marks})",
+                [key + tuple(cell) for key, cell in cells[table].items()]
+            )
+            written += len(cells[table])
+    return written
+
+
+def query_cube(conn: sqlite3.Connection, table: str = 'sales_cube', date_from: Optional[str] = None,
+               date_to: Optional[str] = None, linea_id: Optional[int] = None,
+               dims: Optional[Iterable[str]] = None, by_month: bool = False) -> List[Dict[str, Any]]:
+    """
+    Suma las celdas de los días de un rango agrupando por las dimensiones de la tabla.
+
+    Args:
+        conn: Conexión al SQLite del almacén
+        table: Tabla del cubo (ver CUBE_TABLES)
+        date_from, date_to: Rango de fechas de factura (YYYY-MM-DD, inclusive)
+        linea_id: Solo la línea comercial indicada
+        dims: Agrupar solo por estas dimensiones de la tabla (por defecto todas)
+        by_month: Agrupar además por mes; cada fila trae 'month' (YYYY-MM)
+
+    Returns:
+        list: Un dict por combinación de dimensiones con sus valores originales y las medidas
+    """
+    dims = tuple(dims) if dims is not None else CUBE_TABLES[table]
+    unknown = set(dims) - set(CUBE_TABLES[table])
+    if unknown:
+        raise ValueError(f"Dimensiones fuera de {table}: {', '.join(sorted(unknown))}")
+    keys = (('substr(day, 1, 7)',) if by_month else ()) + dims
+    sql = (f"SELECT {', '.join(keys + ('SUM(balance)', 'SUM(abs_balance)', 'SUM(quantity)', 'SUM(lines)'))} "
+           f"FROM {table} WHERE 1 = 1")
+    params: List[Any] = []
+    if date_from:
+        sql += " AND day >= ?"
+        params.append(str(date_from)[:10])
+    if date_to:
+        sql += " AND day <= ?"
+        params.append(str(date_to)[:10])
+    if linea_id:
+        sql += " AND commercial_line_id = ?"
+        params.append(int(linea_id))
+    if keys:
+        sql += f" GROUP BY {', '.join(keys)}"
+
+    decoded = {}
+
+    def decode(text):
+        # Los mismos valores (productos, vendedores...) se repiten en muchas filas
+        if text not in decoded:
+            decoded[text] = json.loads(text)
+        return decoded[text]
+
+    result = []
+    for row in conn.execute(sql, params).fetchall():
+        if by_month:
+            month, row = row[0], row[1:]
+        item = {d: decode(v) for d, v in zip(dims, row)}
+        item.update(zip(CUBE_MEASURES, row[len(dims):]))
+        if by_month:
+            item['month'] = month
+        result.append(item)
+    return result
@@ -0,0 +1,71 @@
+"""
+sales_feed.py - Cursor y formato del feed incremental de ventas (/api/sales/changes)
+
+Los reportes externos re-exportaban meses completos para encontrar qué cambió.
+El feed entrega solo las facturas y notas de crédito modificadas desde la
+última consulta (ver OdooManager.get_sales_changes), una por línea de NDJSON
+con todas sus líneas de venta actuales.
+
+El cursor es opaco para el cliente: codifica (write_date, move_id) de la
+última factura entregada. El cliente guarda el de X-Next-Cursor y lo envía en
+la siguiente consulta; mientras X-Has-More sea 'true' hay más páginas.
+"""
+
+import base64
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.stream_export import STREAM_CHUNK_BYTES
+
+# write_date de Odoo: 'YYYY-MM-DD HH:MM:SS' (con fracción de segundo en algunas versiones)
+_WRITE_DATE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d{1,6})?$')
+
+
+def encode_cursor(write_date: str, move_id: int) -> str:
+    """Cursor opaco (base64 URL-safe) de la última factura entregada."""
+    raw = json.dumps([write_date, move_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    Decodifica un cursor de encode_cursor.
+
+    Returns:
+        tuple o None: (write_date, move_id); None si no hay cursor (desde el inicio)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        write_date, move_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+    if not isinstance(write_date, str) or not _WRITE_DATE.match(write_date) \
+            or not isinstance(move_id, int) or isinstance(move_id, bool) or move_id < 0:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return write_date, move_id
+
+
+def iter_changes_ndjson(moves: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Un objeto JSON por factura (con sus líneas), en trozos de ~STREAM_CHUNK_BYTES.
+
+    Yields:
+        bytes: Trozos de NDJSON en UTF-8
+    """
+    parts: List[str] = []
+    size = 0
+    for move in moves:
+        line = json.dumps(move, ensure_ascii=False, default=str) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_BYTES:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
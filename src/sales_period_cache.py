@@ -0,0 +1,160 @@
+"""
+sales_period_cache.py - Caché por periodos de las líneas de venta: días cerrados y días abiertos
+
+En el mes en curso /dashboard volvía a descargar todas las facturas del mes en
+cada refresco, aunque solo cambian las de hoy. get_sales_lines parte el rango
+de fechas en dos tramos:
+
+- Días cerrados (hasta anteayer): se cachean por mucho tiempo y solo se
+  invalidan cuando cambia una factura de cliente con esa fecha de factura
+  (revisión periódica por write_date de account.move)
+- Días abiertos (ayer y hoy): TTL corto, se vuelven a consultar por separado
+
+Las líneas de ambos tramos se juntan antes de agregar, así que un refresco del
+mes a la fecha solo consulta a Odoo uno o dos días.
+
+El vigilante no ejecuta consultas: entrega la tupla (modelo, método, args,
+kwargs) para que OdooManager la envíe y luego le devuelva los registros, como
+MasterDataCache.
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# La marca de agua inicial se retrocede este margen para cubrir la diferencia
+# de reloj con Odoo (write_date se guarda en UTC)
+WATERMARK_MARGIN_SECONDS = 300
+
+
+def split_period(date_from: Optional[str], date_to: Optional[str], today: date,
+                 open_days: int = 2) -> Tuple[Optional[tuple], Optional[tuple]]:
+    """
+    Parte un rango de fechas de factura en días cerrados y días abiertos.
+
+    Args:
+        date_from: Fecha inicial (YYYY-MM-DD) o None (sin límite)
+        date_to: Fecha final (YYYY-MM-DD) o None (sin límite)
+        today: Fecha actual
+        open_days: Días abiertos contando hoy (2 = hoy y ayer)
+
+    Returns:
+        tuple: (cerrado, abierto); cada tramo es (desde, hasta) o None si el
+               rango no lo incluye. El tramo cerrado siempre tiene fecha final.
+    """
+    first_open = today - timedelta(days=open_days - 1)
+    last_closed = (first_open - timedelta(days=1)).isoformat()
+    first_open = first_open.isoformat()
+
+    closed = opened = None
+    if date_from is None or date_from <= last_closed:
+        closed = (date_from, min(date_to, last_closed) if date_to else last_closed)
+    if date_to is None or date_to >= first_open:
+        opened = (max(date_from, first_open) if date_from else first_open, date_to)
+    return closed, opened
+
+
+class ClosedDaysWatcher:
+    """
+    Detecta facturas de cliente modificadas en Odoo para invalidar días cerrados.
+
+    Guarda una marca de agua de write_date: cada check_interval_seconds se
+    consultan las facturas con write_date posterior y se informan sus fechas
+    de factura. Se revisa account.move sin filtrar por estado, así una factura
+    que pasa de publicada a cancelada o borrador también invalida su día.
+
+    Args:
+        check_interval_seconds: Segundos entre revisiones (0 = sin revisión)
+    """
+
+    def __init__(self, check_interval_seconds: int = 60):
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._watermark: Optional[str] = None
+        # Registros (id, write_date) ya informados con write_date igual a la marca
+        self._seen: Set[tuple] = set()
+        self._last_check = time.monotonic()
+        self._checks = 0
+        self._changed_moves = 0
+        self._invalidated_dates: List[str] = []
+
+    def ensure_watermark(self):
+        """Fija la marca de agua antes de cachear el primer tramo cerrado."""
+        with self._lock:
+            if self._watermark is None:
+                start = datetime.now(timezone.utc) - timedelta(seconds=WATERMARK_MARGIN_SECONDS)
+                self._watermark = start.strftime('%Y-%m-%d %H:%M:%S')
+                self._last_check = time.monotonic()
+
+    def check_query(self) -> Optional[Tuple[str, str, list, dict]]:
+        """
+        Consulta de las facturas modificadas desde la marca, si corresponde revisar.
+
+        Marca la revisión como hecha, de modo que entre varios hilos solo uno
+        la ejecuta.
+
+        Returns:
+            Tupla de consulta, o None si no toca revisar (o aún no hay días cerrados)
+        """
+        if self.check_interval_seconds <= 0:
+            return None
+        with self._lock:
+            if self._watermark is None:
+                return None
+            now = time.monotonic()
+            if now - self._last_check < self.check_interval_seconds:
+                return None
+            self._last_check = now
+            watermark = self._watermark
+        return (
+            'account.move', 'search_read',
+            [[
+                ('move_type', 'in', ['out_invoice', 'out_refund']),
+                ('invoice_date', '!=', False),
+                # >= para no perder facturas escritas en el mismo segundo que la marca
+                ('write_date', '>=', watermark),
+            ]],
+            {'fields': ['invoice_date', 'write_date']}
+        )
+
+    def apply_changes(self, records: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Registra el resultado de check_query y avanza la marca de agua.
+
+        Args:
+            records: Facturas modificadas (invoice_date, write_date)
+
+        Returns:
+            set: Fechas de factura (YYYY-MM-DD) cuyos días cerrados deben invalidarse
+        """
+        with self._lock:
+            changed = [r for r in records if (r['id'], r.get('write_date')) not in self._seen]
+            write_dates = [r['write_date'] for r in records if r.get('write_date')]
+            if write_dates and max(write_dates) > (self._watermark or ''):
+                self._watermark = max(write_dates)
+                self._seen = set()
+            self._seen.update((r['id'], r['write_date']) for r in records if r.get('write_date') == self._watermark)
+            dates = {str(r['invoice_date'])[:10] for r in changed if r.get('invoice_date')}
+            self._checks += 1
+            self._changed_moves += len(changed)
+            if dates:
+                self._invalidated_dates = sorted(dates)
+        if dates:
+            logger.info(f"Días cerrados con facturas modificadas: {', '.join(sorted(dates))}")
+        return dates
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado de la revisión para operadores."""
+        with self._lock:
+            return {
+                'watermark': self._watermark,
+                'check_interval_seconds': self.check_interval_seconds,
+                'checks': self._checks,
+                'changed_moves': self._changed_moves,
+                'last_invalidated_dates': list(self._invalidated_dates),
+            }
@@ -0,0 +1,442 @@
+"""
+sales_store.py - Almacén local de líneas de venta sincronizado desde Odoo
+
+Guarda en SQLite las líneas de venta ya desnormalizadas (27 columnas) para que
+los meses cerrados y los reportes anuales no vuelvan a consultar Odoo. En el
+mismo archivo se mantiene el cubo diario de ventas (ver src/sales_cube.py).
+
+La sincronización es incremental: solo se re-consultan las facturas cuyo
+account.move o cuyas account.move.line tengan write_date posterior a la última
+marca de agua. Las líneas de esas facturas se reemplazan por completo, por lo
+que una factura que pasa de publicada a cancelada (o a borrador) desaparece
+del almacén.
+
+Con varios workers (gunicorn) sobre el mismo archivo solo sincroniza el
+proceso que tiene el lock '<SALES_STORE_PATH>.sync.lock'; los demás leen el
+almacén y reintentan tomar el lock en cada intervalo (si ese proceso muere,
+otro lo reemplaza).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.logging_config import get_logger
+from src import sales_cube
+
+try:
+    import fcntl
+except ImportError:  # Windows: cada proceso sincroniza por su cuenta
+    fcntl = None
+
+logger = get_logger(__name__)
+
+# Facturas que se re-consultan por cada llamada a Odoo durante la sincronización
+SYNC_CHUNK_SIZE = 500
+# Registros por página al buscar facturas y líneas modificadas (la primera
+# sincronización recorre todo el rango cubierto)
+SYNC_PAGE_SIZE = 5000
+
+
+def _many2one_id(value):
+    """Extrae el id de un campo many2one de Odoo ([id, nombre] o False)."""
+    if isinstance(value, (list, tuple)) and value:
+        return value[0]
+    return None
+
+
+class SalesLineStore:
+    """Persistencia SQLite de líneas de venta con columnas indexadas para los filtros."""
+
+    def __init__(self, db_path: str = 'sales_store.db', start_date: Optional[str] = None, max_age_seconds: int = 900):
+        """
+        Args:
+            db_path: Ruta del archivo SQLite
+            start_date: Primera fecha de factura cubierta (YYYY-MM-DD).
+                        Por defecto el 1 de enero del año anterior.
+            max_age_seconds: Antigüedad máxima de la última sincronización para servir consultas
+        """
+        self.db_path = db_path
+        self.start_date = start_date or f"{datetime.now().year - 1}-01-01"
+        self.max_age_seconds = max_age_seconds
+        self._init_database()
+
+    @contextmanager
+    def get_connection(self):
+        """Context manager para manejar conexiones a SQLite."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _init_database(self):
+        """Crea las tablas e índices si no existen."""
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sales_lines (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    move_id INTEGER NOT NULL,
+                    invoice_date TEXT,
+                    move_name TEXT,
+                    partner_id INTEGER,
+                    commercial_line_id INTEGER,
+                    search_text TEXT,
+                    data TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_lines_move ON sales_lines (move_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_lines_date ON sales_lines (invoice_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_lines_partner_date ON sales_lines (partner_id, invoice_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_lines_linea_date ON sales_lines (commercial_line_id, invoice_date)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+            sales_cube.create_cube_tables(conn)
+            row = conn.execute("SELECT value FROM sync_state WHERE key = 'cube_version'").fetchone()
+            if not row or row[0] != sales_cube.CUBE_VERSION:
+                # Almacén creado antes del cubo (o con otra versión): se arma desde las líneas
+                cells = sales_cube.rebuild_days(conn)
+                self._set_state(conn, 'cube_version', sales_cube.CUBE_VERSION)
+                if cells:
+                    logger.info(f"Cubo diario de ventas reconstruido: {cells} celdas")
+
+    # --- Estado de sincronización ---
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn, key: str, value: Optional[str]):
+        conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """Mayor write_date de Odoo ya sincronizado."""
+        return self.get_state('watermark')
+
+    def is_fresh(self) -> bool:
+        """True si la última sincronización exitosa es reciente y cubre el mismo rango."""
+        last_sync = self.get_state('last_sync_at')
+        if not last_sync or self.get_state('start_date') != self.start_date:
+            return False
+        return time.time() - float(last_sync) <= self.max_age_seconds
+
+    def can_serve(self, date_from: Optional[str], date_to: Optional[str] = None) -> bool:
+        """
+        Indica si una consulta puede responderse desde el almacén.
+
+        Args:
+            date_from: Fecha inicial solicitada (YYYY-MM-DD)
+            date_to: Fecha final solicitada (no limita la cobertura)
+
+        Returns:
+            bool: True si el rango está cubierto y el almacén está fresco
+        """
+        if not date_from or str(date_from)[:10] < self.start_date:
+            return False
+        return self.is_fresh()
+
+    # --- Escritura ---
+
+    def replace_moves(self, move_ids: Iterable[int], sales_lines: List[Dict[str, Any]]):
+        """
+        Reemplaza todas las líneas de las facturas indicadas.
+
+        Las facturas que ya no devuelven líneas (canceladas, en borrador o sin IGV)
+        quedan eliminadas del almacén. En la misma transacción se recalculan las
+        celdas del cubo de los días que tenían o tienen ahora esas facturas.
+
+        Args:
+            move_ids: Facturas re-consultadas
+            sales_lines: Líneas de venta actuales de esas facturas
+
+        Returns:
+            set: Fechas de factura que tenían o tienen ahora esas facturas
+        """
+        move_ids = list(move_ids)
+        rows = []
+        for line in sales_lines:
+            search_text = ' '.join(str(line.get(k) or '') for k in ('name', 'default_code', 'partner_name', 'move_name'))
+            rows.append((
+                _many2one_id(line.get('move_id')),
+                line.get('invoice_date') or None,
+                line.get('move_name'),
+                _many2one_id(line.get('partner_id')),
+                _many2one_id(line.get('commercial_line_national_id')),
+                search_text.lower(),
+                json.dumps(line, ensure_ascii=False, default=str),
+            ))
+
+        with self.get_connection() as conn:
+            days = sales_cube.days_of_moves(conn, move_ids) | {row[1] for row in rows}
+            conn.executemany("DELETE FROM sales_lines WHERE move_id = ?", [(m,) for m in move_ids])
+            conn.executemany(
+                "INSERT INTO sales_lines (move_id, invoice_date, move_name, partner_id, commercial_line_id, search_text, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            sales_cube.rebuild_days(conn, days)
+        return days
+
+    def mark_synced(self, watermark: Optional[str]):
+        """Registra una sincronización completa y la nueva marca de agua."""
+        with self.get_connection() as conn:
+            if watermark:
+                self._set_state(conn, 'watermark', watermark)
+            self._set_state(conn, 'start_date', self.start_date)
+            self._set_state(conn, 'last_sync_at', str(time.time()))
+
+    def reset(self):
+        """Elimina todas las líneas y el estado (fuerza una sincronización completa)."""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM sales_lines")
+            conn.execute("DELETE FROM sync_state")
+            sales_cube.clear_cube(conn)
+            self._set_state(conn, 'cube_version', sales_cube.CUBE_VERSION)
+
+    # --- Lectura ---
+
+    def query(self, date_from=None, date_to=None, partner_id=None, linea_id=None, search=None, limit=None) -> List[Dict[str, Any]]:
+        """
+        Consulta líneas de venta con los mismos filtros que OdooManager.get_sales_lines.
+
+        Returns:
+            list: Líneas de venta (dicts de 27 columnas), más recientes primero
+        """
+        sql = "SELECT data FROM sales_lines WHERE 1 = 1"
+        params: List[Any] = []
+        if date_from:
+            sql += " AND invoice_date >= ?"
+            params.append(str(date_from)[:10])
+        if date_to:
+            sql += " AND invoice_date <= ?"
+            params.append(str(date_to)[:10])
+        if partner_id:
+            sql += " AND partner_id = ?"
+            params.append(int(partner_id))
+        if linea_id:
+            sql += " AND commercial_line_id = ?"
+            params.append(int(linea_id))
+        if search:
+            sql += " AND search_text LIKE ?"
+            params.append(f"%{search.strip().lower()}%")
+        # Mismo orden por defecto que account.move.line en Odoo
+        sql += " ORDER BY invoice_date DESC, move_name DESC, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with self.get_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query_cube(self, date_from=None, date_to=None, linea_id=None, table: str = 'sales_cube',
+                   dims=None, by_month: bool = False) -> List[Dict[str, Any]]:
+        """
+        Totales del cubo diario para un rango de fechas (ver sales_cube.query_cube).
+
+        Returns:
+            list: Filas con las dimensiones de la tabla y balance, abs_balance, quantity, lines
+                  (y 'month' si by_month)
+        """
+        with self.get_connection() as conn:
+            return sales_cube.query_cube(conn, table, date_from, date_to, linea_id, dims, by_month)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del almacén para operadores."""
+        with self.get_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM sales_lines").fetchone()[0]
+            cube_cells = conn.execute("SELECT COUNT(*) FROM sales_cube").fetchone()[0]
+        last_sync = self.get_state('last_sync_at')
+        return {
+            'db_path': self.db_path,
+            'start_date': self.start_date,
+            'rows': count,
+            'cube_cells': cube_cells,
+            'watermark': self.watermark,
+            'last_sync_at': datetime.fromtimestamp(float(last_sync)).isoformat(timespec='seconds') if last_sync else None,
+            'fresh': self.is_fresh(),
+        }
+
+
+class SalesStoreSync:
+    """Sincroniza un SalesLineStore desde Odoo en un hilo de fondo."""
+
+    def __init__(self, odoo_manager, store: SalesLineStore, interval_seconds: int = 300):
+        """
+        Args:
+            odoo_manager: OdooManager conectado (provee dominio, consultas y combinación)
+            store: Almacén local a mantener actualizado
+            interval_seconds: Segundos entre sincronizaciones
+        """
+        self.odoo = odoo_manager
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+        self.lock_path = f'{store.db_path}.sync.lock'
+        self._lock_file = None
+
+    def acquire_leadership(self) -> bool:
+        """
+        Toma (sin esperar) el lock de sincronización del almacén.
+
+        El lock es del sistema operativo (fcntl.flock): se libera solo si el
+        proceso muere. Sin fcntl (Windows) todos los procesos sincronizan.
+
+        Returns:
+            bool: True si este proceso debe sincronizar
+        """
+        if fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"🔒 Este proceso ({os.getpid()}) sincroniza el almacén de ventas")
+        return True
+
+    def release_leadership(self):
+        """Libera el lock de sincronización (otro proceso puede tomarlo)."""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @property
+    def is_leader(self) -> bool:
+        return fcntl is None or self._lock_file is not None
+
+    def _search_read_pages(self, models, model: str, domain: list, fields: List[str]) -> List[Dict[str, Any]]:
+        """search_read en páginas de SYNC_PAGE_SIZE, avanzando por id (estable aunque lleguen registros nuevos)."""
+        odoo = self.odoo
+        records, last_id = [], 0
+        while True:
+            page = models.execute_kw(
+                odoo.db, odoo.uid, odoo.password, model, 'search_read',
+                [domain + [('id', '>', last_id)]],
+                {'fields': fields, 'order': 'id asc', 'limit': SYNC_PAGE_SIZE}
+            )
+            records.extend(page)
+            if len(page) < SYNC_PAGE_SIZE:
+                return records
+            last_id = page[-1]['id']
+
+    def _changed_move_ids(self, models, watermark: Optional[str]):
+        """
+        Facturas de cliente con cambios desde la marca de agua.
+
+        Se revisan account.move (cambios de estado, ej: publicada → cancelada) y
+        account.move.line (cambios en las líneas). Se usa >= para no perder
+        registros escritos en el mismo segundo que la marca de agua.
+
+        Returns:
+            tuple: (set de move_ids, mayor write_date observado)
+        """
+        move_domain = [
+            ('move_type', 'in', ['out_invoice', 'out_refund']),
+            ('invoice_date', '>=', self.store.start_date),
+        ]
+        line_domain = [
+            ('move_id.move_type', 'in', ['out_invoice', 'out_refund']),
+            ('move_id.invoice_date', '>=', self.store.start_date),
+        ]
+        if watermark:
+            move_domain.append(('write_date', '>=', watermark))
+            line_domain.append(('write_date', '>=', watermark))
+
+        moves = self._search_read_pages(models, 'account.move', move_domain, ['id', 'write_date'])
+        lines = self._search_read_pages(models, 'account.move.line', line_domain, ['move_id', 'write_date'])
+
+        move_ids = {m['id'] for m in moves}
+        move_ids.update(l['move_id'][0] for l in lines if l.get('move_id'))
+        write_dates = [r['write_date'] for r in moves + lines if r.get('write_date')]
+        return move_ids, max(write_dates) if write_dates else watermark
+
+    def sync_once(self) -> Dict[str, Any]:
+        """
+        Ejecuta una sincronización incremental.
+
+        Returns:
+            dict: Facturas re-consultadas, líneas escritas, nueva marca de agua y duración
+        """
+        with self._lock:
+            start = time.perf_counter()
+            models = self.odoo._worker_models()
+            if self.store.get_state('start_date') not in (None, self.store.start_date):
+                logger.info("Almacén de ventas: cambió el rango cubierto, sincronización completa")
+                self.store.reset()
+            watermark = self.store.watermark
+
+            move_ids, new_watermark = self._changed_move_ids(models, watermark)
+            move_ids = sorted(move_ids)
+            written = 0
+            days = set()
+            for i in range(0, len(move_ids), SYNC_CHUNK_SIZE):
+                chunk = move_ids[i:i + SYNC_CHUNK_SIZE]
+                domain = (self.odoo._build_sales_domain() + self.odoo._sales_filter_domain(models=models)
+                          + [('move_id', 'in', chunk)])
+                sales_lines = self.odoo._fetch_sales_lines_by_domain(domain, limit=None, models=models)
+                days |= self.store.replace_moves(chunk, sales_lines)
+                written += len(sales_lines)
+
+            self.store.mark_synced(new_watermark)
+            # Solo las consultas cacheadas que cubren los días de esas facturas (antes y después)
+            self.odoo._invalidate_sales_days(days)
+
+            result = {
+                'moves': len(move_ids),
+                'lines': written,
+                'watermark': new_watermark,
+                'seconds': round(time.perf_counter() - start, 2),
+            }
+            logger.info(f"🔄 Almacén de ventas sincronizado: {result}")
+            return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Otro worker ya sincroniza el mismo archivo: se reintenta en el siguiente intervalo
+                if self.acquire_leadership():
+                    self.sync_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"⚠️ Error sincronizando almacén de ventas: {e}")
+            self._stop.wait(self.interval_seconds)
+        self.release_leadership()
+
+    def start(self):
+        """Inicia el hilo de sincronización periódica (daemon)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sales-store-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo de sincronización (al salir libera su lock)."""
+        self._stop.set()
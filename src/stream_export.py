@@ -0,0 +1,184 @@
+"""
+stream_export.py - Exportación de líneas de venta a CSV, NDJSON y Parquet
+
+Mismas columnas (traducción, orden y tipos) que el detalle del dashboard
+(DETALLE_COLUMNS de src/excel_export.py), sin pasar por openpyxl:
+
+- CSV y NDJSON: generadores de bytes que la respuesta envía a medida que se
+  leen las líneas (una fila a la vez, agrupadas en trozos de ~64 KB)
+- Parquet: grupos de filas con pyarrow (PARQUET_ROW_GROUP_ROWS filas por grupo)
+  escritos a un archivo temporal; requiere pyarrow instalado
+
+Valores: los mismos conversores que el Excel (_CONVERTERS de
+src/excel_export.py: many2one -> nombre, moneda -> float), con texto siempre
+como str y fechas 'YYYY-MM-DD' (date en Parquet); vacíos -> '' en CSV y null
+en NDJSON/Parquet.
+"""
+
+import csv
+import io
+import json
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from src.excel_export import _CONVERTERS as _EXCEL_CONVERTERS, Column
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# pyarrow es opcional: sin él no se ofrece Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+    pq = None
+
+# Formato -> (tipo MIME, extensión)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Bytes acumulados antes de entregar un trozo de CSV/NDJSON
+STREAM_CHUNK_BYTES = 64 * 1024
+
+PARQUET_ROW_GROUP_ROWS = 50_000
+
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def _plain_text(value):
+    return None if value is None else str(value)
+
+
+def _plain_date(value):
+    return value.strftime('%Y-%m-%d') if isinstance(value, datetime) else value
+
+
+# Sobre el valor ya convertido para Excel: texto como str (columna string en
+# Parquet) y fechas de vuelta a 'YYYY-MM-DD' (CSV/JSON)
+_PLAIN = {'texto': _plain_text, 'fecha': _plain_date}
+
+
+def _converter(kind: str):
+    """Conversor de un tipo de columna: el del Excel más el ajuste de _PLAIN."""
+    convert = _EXCEL_CONVERTERS[kind]
+    plain = _PLAIN.get(kind)
+    if plain is None:
+        return convert
+    return lambda value: plain(convert(value))
+
+
+def _records(rows: Iterable[Dict[str, Any]], columns: Sequence[Column]) -> Iterator[List[Any]]:
+    """Valores de cada fila en el orden de las columnas, ya convertidos."""
+    keys = [key for key, _, _, _ in columns]
+    converters = [_converter(kind) for _, _, kind, _ in columns]
+    for row in rows:
+        yield [convert(row.get(key)) for key, convert in zip(keys, converters)]
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], columns: Sequence[Column]) -> Iterator[bytes]:
+    """
+    CSV en UTF-8 con BOM (Excel lo abre con tildes) y encabezados traducidos.
+
+    Yields:
+        bytes: Trozos de ~STREAM_CHUNK_BYTES
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([header for _, header, _, _ in columns])
+    for values in _records(rows, columns):
+        writer.writerow(values)
+        if buffer.tell() >= STREAM_CHUNK_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]], columns: Sequence[Column]) -> Iterator[bytes]:
+    """
+    Un objeto JSON por línea con las claves traducidas.
+
+    Yields:
+        bytes: Trozos de ~STREAM_CHUNK_BYTES
+    """
+    headers = [header for _, header, _, _ in columns]
+    parts: List[str] = []
+    size = 0
+    for values in _records(rows, columns):
+        line = json.dumps(dict(zip(headers, values)), ensure_ascii=False) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_BYTES:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def _parquet_schema(columns: Sequence[Column]):
+    types = {'moneda': pa.float64(), 'numero': pa.float64(), 'fecha': pa.date32()}
+    return pa.schema([(header, types.get(kind, pa.string())) for _, header, kind, _ in columns])
+
+
+def _parquet_batch(batch: List[List[Any]], columns: Sequence[Column], schema):
+    arrays = []
+    for i, (_, _, kind, _) in enumerate(columns):
+        values = [r[i] for r in batch]
+        if kind == 'fecha':
+            values = [datetime.strptime(v, '%Y-%m-%d').date() if v else None for v in values]
+        arrays.append(pa.array(values, type=schema.field(i).type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(fileobj, rows: Iterable[Dict[str, Any]], columns: Sequence[Column],
+                  row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> int:
+    """
+    Escribe las filas en Parquet, un grupo de filas cada row_group_rows.
+
+    Raises:
+        RuntimeError: Si pyarrow no está instalado
+
+    Returns:
+        int: Filas escritas
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Exportar a Parquet requiere pyarrow (pip install pyarrow)")
+    schema = _parquet_schema(columns)
+    count = 0
+    batch: List[List[Any]] = []
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for values in _records(rows, columns):
+            batch.append(values)
+            if len(batch) >= row_group_rows:
+                writer.write_table(_parquet_batch(batch, columns, schema))
+                count += len(batch)
+                batch = []
+        if batch or not count:
+            writer.write_table(_parquet_batch(batch, columns, schema))
+            count += len(batch)
+    return count
+
+
+def build_parquet(rows: Iterable[Dict[str, Any]], columns: Sequence[Column]) -> Tuple[Any, int]:
+    """
+    Arma el Parquet en un archivo temporal (en memoria hasta 8 MB, luego en disco).
+
+    Returns:
+        tuple: (archivo temporal posicionado al inicio, filas escritas)
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    try:
+        count = write_parquet(output, rows, columns)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output, count
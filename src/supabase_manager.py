@@ -3,19 +3,38 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from src.cache_signal import make_cache_signal
 from src.logging_config import get_logger
+from src.sales_cache import SalesLinesCache
+from src.utils import env_int
 
 load_dotenv()
 logger = get_logger(__name__)
 
+
 class SupabaseManager:
     """
     Gestor de conexión y operaciones con Supabase para metas de ventas.
     Reemplaza GoogleSheetsManager para gestionar metas de 2026.
+
+    Metas y equipos solo cambian al guardar /meta o /metas_vendedor: las
+    lecturas completas de sus tablas se sirven desde memoria y los métodos
+    write_*/guardar_* las invalidan. La invalidación se publica en una señal
+    compartida (ver src/cache_signal.py) para que los demás workers también
+    vuelvan a leer. SUPABASE_CACHE_TTL_SECONDS limita cuánto se sirve un
+    cambio hecho fuera de la aplicación (ej: desde la consola de Supabase).
     """
     
     def __init__(self):
         """Inicializa la conexión con Supabase"""
+        self._cache = SalesLinesCache(
+            ttl_seconds=env_int('SUPABASE_CACHE_TTL_SECONDS', 600),
+            max_bytes=32 * 1024 * 1024,
+            name='supabase'
+        )
+        self._signal = make_cache_signal('supabase')
+        self._signal_version = self._signal.version()
+
         supabase_url = os.getenv('SUPABASE_URL')
         supabase_key = os.getenv('SUPABASE_KEY')
         
@@ -34,6 +53,71 @@ class SupabaseManager:
             self.supabase = None
             self.enabled = False
     
+    # ========== CACHÉ DE LECTURAS ==========
+    
+    def cache_version(self):
+        """
+        Versión de la señal compartida: cambia cada vez que cualquier worker guarda.
+
+        Si cambió desde la última lectura se descarta la caché local. Otras
+        cachés derivadas de metas/equipos (ej: DashboardWidgets) la usan en sus claves.
+        """
+        version = self._signal.version()
+        if version != self._signal_version:
+            self._signal_version = version
+            self._cache.invalidate()
+        return version
+    
+    def _cached_rows(self, table: str, loader, scope: tuple = ()):
+        """
+        Filas de una tabla desde la caché, o desde Supabase con loader (una sola vez
+        aunque lleguen varias peticiones a la vez).
+
+        La clave incluye la versión de la señal: una lectura que empezó antes de
+        un guardado no deja sus filas viejas en la caché nueva. Los errores de
+        loader no se cachean. Retorna copias que quien llama puede modificar.
+
+        Args:
+            table: Tabla (al guardar se invalidan todas sus lecturas)
+            loader: Consulta a Supabase que retorna las filas
+            scope: Filtros de la consulta (meses, línea), parte de la clave
+        """
+        version = self.cache_version()
+        rows = self._cache.get_or_load((table, version) + tuple(scope), loader)
+        return [dict(row) for row in rows]
+    
+    def _query_metas(self, table: str, mes_desde: str = None, mes_hasta: str = None,
+                     linea_comercial: str = None):
+        """
+        Consulta de una tabla de metas filtrada en PostgREST por rango de meses y línea.
+
+        'mes' se guarda como 'YYYY-MM': el orden de texto es el cronológico.
+        Ver sql/create_metas_indexes_supabase.sql para los índices que la sirven.
+
+        Returns:
+            tuple: (consulta postgrest sin ejecutar, scope para la clave de caché)
+        """
+        mes_desde = mes_desde[:7] if mes_desde else None
+        mes_hasta = mes_hasta[:7] if mes_hasta else None
+        linea_comercial = linea_comercial.upper() if linea_comercial else None
+        query = self.supabase.table(table).select('*')
+        if mes_desde:
+            query = query.gte('mes', mes_desde)
+        if mes_hasta:
+            query = query.lte('mes', mes_hasta)
+        if linea_comercial:
+            query = query.eq('linea_comercial', linea_comercial)
+        return query, (mes_desde, mes_hasta, linea_comercial)
+    
+    def _invalidate(self, table: str):
+        """Descarta las lecturas de una tabla en este worker y avisa a los demás."""
+        self._cache.invalidate(lambda key: key[0] == table)
+        self._signal.bump()
+    
+    def cache_stats(self):
+        """Estadísticas de la caché de metas y equipos (ver /admin/cache-stats)."""
+        return self._cache.stats()
+    
     # ========== METAS DE VENTAS GENERALES ==========
     
     def guardar_meta_venta(self, mes: str, linea_comercial: str, 
@@ -54,6 +138,13 @@ class SupabaseManager:
             print("⚠️ Supabase no disponible")
             return None
         
+        try:
+            return self._upsert_meta_venta(mes, linea_comercial, meta_total, meta_ipn)
+        finally:
+            self._invalidate('metas_ventas_2026')
+    
+    def _upsert_meta_venta(self, mes, linea_comercial, meta_total, meta_ipn=None):
+        """Upsert de guardar_meta_venta sin invalidar la caché (quien llama invalida una vez)."""
         try:
             data = {
                 'mes': mes,
@@ -104,24 +195,28 @@ class SupabaseManager:
             print(f"❌ Error obteniendo metas: {e}")
             return []
     
-    def obtener_todas_metas(self):
+    def obtener_todas_metas(self, mes_desde: str = None, mes_hasta: str = None):
         """
-        Obtiene todas las metas de 2026
+        Obtiene las metas por línea, todas o solo las de un rango de meses
+        
+        Args:
+            mes_desde: Primer mes 'YYYY-MM' (opcional)
+            mes_hasta: Último mes 'YYYY-MM' (opcional)
         
         Returns:
-            Lista de todas las metas
+            Lista de metas ordenada por mes y línea comercial
         """
         if not self.enabled:
             return []
         
         try:
-            result = self.supabase.table('metas_ventas_2026')\
-                .select('*')\
-                .order('mes, linea_comercial')\
-                .execute()
+            query, scope = self._query_metas('metas_ventas_2026', mes_desde, mes_hasta)
+            rows = self._cached_rows(
+                'metas_ventas_2026', lambda: query.order('mes, linea_comercial').execute().data, scope
+            )
             
-            print(f"📊 Total de metas: {len(result.data)}")
-            return result.data
+            print(f"📊 Total de metas: {len(rows)}")
+            return rows
         except Exception as e:
             print(f"❌ Error obteniendo todas las metas: {e}")
             return []
@@ -152,6 +247,15 @@ class SupabaseManager:
             print("⚠️ Supabase no disponible")
             return None
         
+        try:
+            return self._upsert_meta_vendedor(mes, vendedor_id, vendedor_nombre, meta_total, equipo_venta,
+                                              linea_comercial, meta_ipn, region)
+        finally:
+            self._invalidate('metas_vendedor_2026')
+    
+    def _upsert_meta_vendedor(self, mes, vendedor_id, vendedor_nombre, meta_total, equipo_venta=None,
+                              linea_comercial=None, meta_ipn=None, region=None):
+        """Upsert de guardar_meta_vendedor sin invalidar la caché (quien llama invalida una vez)."""
         try:
             data = {
                 'mes': mes,
@@ -252,10 +356,12 @@ class SupabaseManager:
             return {}
         
         try:
-            response = self.supabase.table('equipos_vendedores').select('*').execute()
+            rows = self._cached_rows(
+                'equipos_vendedores', lambda: self.supabase.table('equipos_vendedores').select('*').execute().data
+            )
             
             equipos_dict = {}
-            for row in response.data:
+            for row in rows:
                 equipo_id = row.get('equipo_id')
                 vendedor_id = row.get('vendedor_id')
                 
@@ -309,20 +415,28 @@ class SupabaseManager:
             
         except Exception as e:
             print(f"Error al escribir equipos de vendedores: {e}")
+        finally:
+            # Aunque falle el insert, el delete ya cambió la tabla
+            self._invalidate('equipos_vendedores')
     
-    def read_metas(self):
+    def read_metas(self, mes_desde: str = None, mes_hasta: str = None, linea_comercial: str = None):
         """
         Lee las metas de vendedores y las retorna en formato anidado.
         Retorna: {equipo_id: {vendedor_id: {mes: {meta, meta_ipn}}}}
+        
+        Args:
+            mes_desde, mes_hasta: Rango de meses 'YYYY-MM' (opcional, sin ellos todo el historial)
+            linea_comercial: Solo las metas de esta línea (opcional, ej: 'petmedica')
         """
         if not self.enabled:
             return {}
         
         try:
-            response = self.supabase.table('metas_vendedor_2026').select('*').execute()
+            query, scope = self._query_metas('metas_vendedor_2026', mes_desde, mes_hasta, linea_comercial)
+            rows = self._cached_rows('metas_vendedor_2026', lambda: query.execute().data, scope)
             
             metas_anidadas = {}
-            for row in response.data:
+            for row in rows:
                 # Usar linea_comercial en lugar de equipo_venta, normalizar a lowercase
                 linea_comercial = row.get('linea_comercial', '').lower()
                 vendedor_id = str(row.get('vendedor_id', ''))
@@ -380,13 +494,19 @@ class SupabaseManager:
             
         except Exception as e:
             print(f"Error al escribir metas de vendedores: {e}")
+        finally:
+            self._invalidate('metas_vendedor_2026')
     
     # ========== MÉTODOS DE COMPATIBILIDAD CON GOOGLE SHEETS ==========
     
-    def read_metas_por_linea(self):
+    def read_metas_por_linea(self, mes_desde: str = None, mes_hasta: str = None):
         """
         Lee metas por línea en formato compatible con GoogleSheetsManager
         
+        Args:
+            mes_desde, mes_hasta: Rango de meses 'YYYY-MM' (opcional, sin ellos todo el historial).
+                Las páginas piden solo los meses que muestran.
+        
         Returns:
             Dict con estructura: {mes: {'metas': {linea: meta}, 'metas_ipn': {linea: meta_ipn}, 'total': X, 'total_ipn': Y}}
         """
@@ -394,7 +514,7 @@ class SupabaseManager:
             return {}
         
         try:
-            metas = self.obtener_todas_metas()
+            metas = self.obtener_todas_metas(mes_desde, mes_hasta)
             
             # Convertir a formato esperado por el código existente
             metas_por_mes = {}
@@ -437,11 +557,14 @@ class SupabaseManager:
                     meta_ipn = metas_ipn.get(linea, None)
                     # Normalizar línea a mayúsculas para consistencia
                     linea_normalizada = linea.upper()
-                    self.guardar_meta_venta(mes, linea_normalizada, meta_total, meta_ipn)
+                    self._upsert_meta_venta(mes, linea_normalizada, meta_total, meta_ipn)
             
             print("✅ Metas guardadas en Supabase")
         except Exception as e:
             print(f"❌ Error en write_metas_por_linea: {e}")
+        finally:
+            # Una sola invalidación por formulario, no una por línea
+            self._invalidate('metas_ventas_2026')
     
     def read_metas_vendedor(self):
         """
@@ -454,13 +577,12 @@ class SupabaseManager:
             return {}
         
         try:
-            result = self.supabase.table('metas_vendedor_2026')\
-                .select('*')\
-                .execute()
+            query, scope = self._query_metas('metas_vendedor_2026')
+            rows = self._cached_rows('metas_vendedor_2026', lambda: query.execute().data, scope)
             
             # Convertir a formato anidado esperado
             metas_anidadas = {}
-            for meta in result.data:
+            for meta in rows:
                 equipo_id = meta.get('equipo_venta', 'SIN_EQUIPO')
                 vendedor_id = str(meta['vendedor_id'])
                 mes = meta['mes']
@@ -500,7 +622,7 @@ class SupabaseManager:
                         vendedor_nombre = vendedores_info[str(vendedor_id)].get('name', f'Vendedor {vendedor_id}')
                     
                     for mes, datos in meses.items():
-                        self.guardar_meta_vendedor(
+                        self._upsert_meta_vendedor(
                             mes=mes,
                             vendedor_id=int(vendedor_id),
                             vendedor_nombre=vendedor_nombre,
@@ -512,3 +634,5 @@ class SupabaseManager:
             print("✅ Metas de vendedores guardadas en Supabase")
         except Exception as e:
             print(f"❌ Error en write_metas_vendedor: {e}")
+        finally:
+            self._invalidate('metas_vendedor_2026')
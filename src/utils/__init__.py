@@ -6,10 +6,12 @@ normalización y transformaciones.
 """
 
 from .date_utils import get_meses_del_año
+from .env_utils import env_int
 from .product_utils import normalizar_linea_comercial, limpiar_nombre_producto, limpiar_nombre_atrevia
 
 __all__ = [
     'get_meses_del_año',
+    'env_int',
     'normalizar_linea_comercial',
     'limpiar_nombre_producto',
     'limpiar_nombre_atrevia'
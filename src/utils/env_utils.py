@@ -0,0 +1,25 @@
+"""
+Utilidades para leer la configuración desde variables de entorno.
+
+Módulo que contiene funciones auxiliares para convertir variables de entorno
+a tipos de Python con un valor por defecto.
+"""
+
+import os
+
+
+def env_int(nombre, default):
+    """
+    Lee una variable de entorno entera.
+
+    Args:
+        nombre (str): Nombre de la variable de entorno.
+        default (int): Valor si la variable no existe, está vacía o no es un entero.
+
+    Returns:
+        int: Valor de la variable o default.
+    """
+    try:
+        return int(os.getenv(nombre) or default)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,51 @@
+// static/js/export_jobs.js
+// Exportaciones en segundo plano: encola el trabajo (background=1), consulta el
+// progreso en /api/export/jobs/<id> y descarga el archivo cuando está listo.
+
+function exportarEnSegundoPlano(url, boton) {
+    const separador = url.includes('?') ? '&' : '?';
+    const textoOriginal = boton ? boton.innerHTML : '';
+    const mostrar = (texto) => { if (boton) boton.innerHTML = texto; };
+    const terminar = () => { if (boton) { boton.innerHTML = textoOriginal; boton.classList.remove('disabled'); } };
+
+    if (boton) {
+        if (boton.classList.contains('disabled')) return;
+        boton.classList.add('disabled');
+    }
+    mostrar('<i class="bi bi-hourglass-split"></i> Preparando exportación...');
+
+    const consultar = (respuesta) => {
+        if (!respuesta.ok) throw new Error('HTTP ' + respuesta.status);
+        return respuesta.json();
+    };
+
+    const seguir = (job) => {
+        if (job.estado === 'listo') {
+            if (job.truncado) {
+                alert(`La exportación llegó al máximo de ${job.max_filas.toLocaleString('es-PE')} filas: ` +
+                      'el archivo no incluye todas las ventas. Acote el rango de fechas o los filtros.');
+            }
+            mostrar('<i class="bi bi-check-circle"></i> Descargando...');
+            window.location.href = job.descarga;
+            setTimeout(terminar, 3000);
+            return;
+        }
+        if (job.estado === 'error') {
+            throw new Error(job.error || 'No se pudo generar la exportación');
+        }
+        mostrar(`<i class="bi bi-hourglass-split"></i> Exportando... ${job.filas.toLocaleString('es-PE')} filas`);
+        setTimeout(() => {
+            fetch(`/api/export/jobs/${job.id}`, { credentials: 'same-origin' })
+                .then(consultar).then(seguir).catch(fallar);
+        }, 2000);
+    };
+
+    const fallar = (error) => {
+        console.error('Exportación fallida:', error);
+        alert('No se pudo completar la exportación. Intente nuevamente.');
+        terminar();
+    };
+
+    fetch(`${url}${separador}background=1`, { credentials: 'same-origin' })
+        .then(consultar).then(seguir).catch(fallar);
+}
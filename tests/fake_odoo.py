@@ -0,0 +1,314 @@
+"""
+Servidor Odoo falso para tests
+
+Levanta en localhost (hilo en segundo plano) un endpoint /jsonrpc con el
+comportamiento de Odoo necesario para probar OdooJSONRPCClient y OdooManager
+sin red:
+
+- common.authenticate -> uid fijo
+- object.execute_kw: search_read, read, search, search_count, fields_get y
+  create sobre registros en memoria (dominios con '|', '&', '!', rutas como
+  'move_id.team_id' y =, !=, in, not in, >, <, >=, <=, ilike, not ilike;
+  offset/limit en el orden en que se cargaron los registros)
+- Arreglos batch JSON-RPC 2.0, o su rechazo como hace Odoo estándar
+  (batch=False: responde un único objeto de error)
+- Respuestas HTTP de error programadas (fail_statuses) y peticiones gzip
+
+Cada llamada queda registrada en requests (puerto de la conexión, método,
+modelo, tamaño del batch, compresión y args/kwargs) para verificar el transporte.
+
+make_sales_line arma una línea de venta ya combinada (como la retorna
+get_sales_lines) para los tests que no pasan por el servidor.
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _FakeOdooHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        compressed = self.headers.get('Content-Encoding') == 'gzip'
+        if compressed:
+            body = gzip.decompress(body)
+        payload = json.loads(body)
+
+        fake.log(payload, self.client_address[1], compressed)
+        with fake.lock:
+            status = fake.fail_statuses.pop(0) if fake.fail_statuses else 200
+        if status != 200:
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if isinstance(payload, list):
+            if fake.batch:
+                response = [fake.dispatch(p) for p in payload]
+                if fake.reverse_batch:
+                    response.reverse()
+            else:
+                response = fake.batch_rejection()
+        else:
+            response = fake.dispatch(payload)
+
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+# Modelo relacionado de los campos que aparecen en rutas de dominio ('move_id.team_id', ...)
+RELATIONS = {
+    'move_id': 'account.move',
+    'product_id': 'product.product',
+    'product_tmpl_id': 'product.template',
+    'partner_id': 'res.partner',
+    'tax_ids': 'account.tax',
+    'team_id': 'crm.team',
+    'order_id': 'sale.order',
+    'commercial_line_national_id': 'product.commercial.line',
+}
+
+
+def _ids(value):
+    """Ids de un many2one ([id, nombre]) o de un x2many (lista de ids)"""
+    if isinstance(value, list) and len(value) == 2 and isinstance(value[1], str):
+        return [value[0]]
+    if isinstance(value, list):
+        return value
+    return []
+
+
+def _compare(current, op, value):
+    """Evalúa una condición sobre un valor ya resuelto (campo simple, many2one o x2many)"""
+    if isinstance(current, list) and not (len(current) == 2 and isinstance(current[1], str)):
+        # x2many: 'in' si algún id coincide
+        if op == 'in':
+            return bool(set(current) & set(value))
+        if op == 'not in':
+            return not set(current) & set(value)
+        return True
+    if isinstance(current, list):
+        current = current[0]
+    if op == '=':
+        return current == value
+    if op == '!=':
+        return current != value
+    if op == 'in':
+        return current in value
+    if op == 'not in':
+        return current not in value
+    if op == '>=':
+        return bool(current) and current >= value
+    if op == '<=':
+        return bool(current) and current <= value
+    if op == '>':
+        return bool(current) and current > value
+    if op == '<':
+        return bool(current) and current < value
+    if op in ('ilike', 'not ilike'):
+        found = bool(current) and str(value).lower() in str(current).lower()
+        return found if op == 'ilike' else not found
+    return True
+
+
+def make_sales_line(move_id=1, invoice_date='2026-03-05', balance=150.5, **fields):
+    """
+    Línea de venta desnormalizada como la retorna get_sales_lines (las columnas que usan los tests).
+
+    Los many2one van como [id, nombre]; fields reemplaza o agrega columnas.
+    """
+    line = {
+        'move_id': [move_id, f'F001-{move_id:05d}'],
+        'move_name': f'F001-{move_id:05d}',
+        'invoice_date': invoice_date,
+        'partner_id': [100, 'Clínica Ñaña'],
+        'partner_name': 'Clínica Ñaña',
+        'vat': '20123456789',
+        'invoice_user_id': [7, 'Ana'],
+        'sales_channel_id': [1, 'NACIONAL'],
+        'commercial_line_national_id': [2, 'PETMEDICA'],
+        'name': 'Producto X',
+        'default_code': 'PX',
+        'quantity': 3.0,
+        'price_unit': 50.0,
+        'balance': balance,
+        'route_id': False,
+        'pharmaceutical_forms_id': False,
+        'product_life_cycle': 'nuevo',
+    }
+    line.update(fields)
+    return line
+
+
+class FakeOdooServer:
+    """
+    Odoo falso en un puerto libre de localhost
+
+    Args:
+        records: Dict modelo -> lista de registros (dicts con 'id')
+        batch: Si False, rechaza arreglos batch como el /jsonrpc estándar de Odoo
+        uid: UID que retorna authenticate
+
+    reverse_batch=True responde los arreglos batch en orden inverso (JSON-RPC
+    2.0 no garantiza el orden de las respuestas).
+    """
+
+    def __init__(self, records=None, batch=True, uid=2):
+        self.records = records or {}
+        self.batch = batch
+        self.uid = uid
+        self.requests = []
+        self.fail_statuses = []
+        self.reverse_batch = False
+        self.lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _FakeOdooHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._httpd.server_address[1]}'
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Registro de peticiones ---
+
+    def log(self, payload, port, compressed):
+        calls = payload if isinstance(payload, list) else [payload]
+        with self.lock:
+            for call in calls:
+                params = call['params']
+                is_object = params['service'] == 'object'
+                self.requests.append({
+                    'port': port,
+                    'method': params['args'][4] if is_object else params['method'],
+                    'model': params['args'][3] if is_object else None,
+                    'batch': len(payload) if isinstance(payload, list) else 0,
+                    'gzip': compressed,
+                    'args': params['args'][5:] if is_object else None,
+                })
+
+    def object_calls(self):
+        """(modelo, método, tamaño del batch) de cada execute_kw recibido"""
+        return [(r['model'], r['method'], r['batch']) for r in self.requests if r['model']]
+
+    # --- Respuestas ---
+
+    def batch_rejection(self):
+        """Respuesta de Odoo estándar a un arreglo en /jsonrpc"""
+        return {'jsonrpc': '2.0', 'id': None, 'error': {
+            'code': 200, 'message': 'Odoo Server Error',
+            'data': {'name': 'builtins.AttributeError', 'message': "'list' object has no attribute 'get'"},
+        }}
+
+    def dispatch(self, payload):
+        params = payload['params']
+        try:
+            if params['service'] == 'common' and params['method'] == 'authenticate':
+                result = self.uid
+            elif params['service'] == 'common' and params['method'] == 'version':
+                result = {'server_version': '17.0'}
+            elif params['service'] == 'object' and params['method'] == 'execute_kw':
+                _, _, _, model, method, args, kwargs = params['args']
+                result = self.execute(model, method, args, kwargs or {})
+            else:
+                raise ValueError(f"Servicio no soportado: {params['service']}.{params['method']}")
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': payload['id'], 'error': {
+                'code': 200, 'message': 'Odoo Server Error',
+                'data': {'name': type(e).__name__, 'message': str(e)},
+            }}
+        return {'jsonrpc': '2.0', 'id': payload['id'], 'result': result}
+
+    def execute(self, model, method, args, kwargs):
+        records = self.records.get(model, [])
+        if method in ('search_read', 'search', 'search_count'):
+            found = [r for r in records if self.matches(r, args[0] if args else [])]
+            if method == 'search_count':
+                return len(found)
+            if method == 'search':
+                return [r['id'] for r in found]
+            offset = kwargs.get('offset') or 0
+            limit = kwargs.get('limit') or None
+            page = found[offset:offset + limit if limit else None]
+            return [self._project(r, kwargs.get('fields')) for r in page]
+        if method == 'read':
+            ids = set(args[0])
+            return [self._project(r, kwargs.get('fields')) for r in records if r['id'] in ids]
+        if method == 'fields_get':
+            return {f: {'type': 'many2one', 'relation': RELATIONS[f]} for f in args[0] if f in RELATIONS}
+        if method == 'create':
+            with self.lock:
+                new_id = max((r['id'] for r in records), default=0) + 1
+                self.records.setdefault(model, []).append(dict(args[0], id=new_id))
+            return new_id
+        raise ValueError(f'Método no soportado: {model}.{method}')
+
+    def matches(self, record, domain):
+        """Evalúa un dominio en notación polaca ('|', '&', '!') sobre un registro"""
+        stack = []
+        for token in reversed(domain):
+            if token in ('|', '&'):
+                first, second = stack.pop(), stack.pop()
+                stack.append(first or second if token == '|' else first and second)
+            elif token == '!':
+                stack.append(not stack.pop())
+            else:
+                stack.append(self._leaf(record, *token))
+        return all(stack)
+
+    def _leaf(self, record, field, op, value):
+        """
+        Condición sobre un campo o una ruta ('product_id.commercial_line_national_id').
+
+        Los campos que el registro no tiene (o modelos relacionados sin
+        registros cargados) se ignoran: la condición se da por cumplida.
+        """
+        head, _, rest = field.partition('.')
+        if head not in record:
+            return True
+        if not rest:
+            return _compare(record[head], op, value)
+        related = self.records.get(RELATIONS.get(head))
+        if not related:
+            return True
+        ids = _ids(record[head])
+        rows = [r for r in related if r['id'] in ids]
+        if not rows:
+            return _compare(False, op, value)
+        return any(self._leaf(row, rest, op, value) for row in rows)
+
+    @staticmethod
+    def _project(record, fields):
+        if not fields:
+            return dict(record)
+        return {k: v for k, v in record.items() if k == 'id' or k in fields}
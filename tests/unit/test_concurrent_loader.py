@@ -0,0 +1,83 @@
+"""
+Tests unitarios para src/concurrent_loader.py
+
+Tests de la carga en paralelo de fuentes independientes, con timeout por
+llamada y manejo de fallos parciales.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.concurrent_loader import ConcurrentLoader, shared_executor
+
+
+def lenta(valor, segundos=0.2):
+    time.sleep(segundos)
+    return valor
+
+
+def falla():
+    raise RuntimeError('Supabase caído')
+
+
+class TestConcurrentLoader:
+    """Suite de tests para ConcurrentLoader"""
+
+    @pytest.fixture
+    def executor(self):
+        executor = ThreadPoolExecutor(max_workers=4)
+        yield executor
+        executor.shutdown(wait=False)
+
+    def test_latencia_es_la_de_la_llamada_mas_lenta(self, executor):
+        """Test que tres llamadas de 0.2s terminan en bastante menos que su suma"""
+        loader = ConcurrentLoader(executor=executor)
+        start = time.monotonic()
+        for nombre in ('metas', 'equipos', 'ventas'):
+            loader.submit(nombre, lenta, nombre)
+        resultados = loader.results()
+        elapsed = time.monotonic() - start
+
+        assert resultados == {'metas': 'metas', 'equipos': 'equipos', 'ventas': 'ventas'}
+        assert elapsed < 0.5
+        assert loader.errors == {}
+
+    def test_fallo_parcial_usa_el_valor_por_defecto(self, executor):
+        """Test que una fuente que falla devuelve su default y queda en errors"""
+        loader = ConcurrentLoader(executor=executor)
+        loader.submit('metas', falla, default={})
+        loader.submit('ventas', lenta, [1, 2], segundos=0)
+
+        assert loader.result('metas') == {}
+        assert loader.result('ventas') == [1, 2]
+        assert isinstance(loader.errors['metas'], RuntimeError)
+
+    def test_timeout_por_llamada(self, executor):
+        """Test que una llamada que no responde a tiempo no retiene la página"""
+        release = threading.Event()
+        loader = ConcurrentLoader(timeout_seconds=5, executor=executor)
+        loader.submit('equipos', release.wait, 5, default={}, timeout=0.1)
+        loader.submit('metas', lenta, 'ok', segundos=0)
+
+        start = time.monotonic()
+        assert loader.result('equipos') == {}
+        assert time.monotonic() - start < 1
+        assert isinstance(loader.errors['equipos'], TimeoutError)
+        assert loader.result('metas') == 'ok'
+        release.set()
+
+    def test_llamada_requerida_propaga_el_error(self, executor):
+        """Test que si falla una llamada requerida result() lanza su error"""
+        loader = ConcurrentLoader(executor=executor)
+        loader.submit('ventas', falla, required=True)
+
+        with pytest.raises(RuntimeError):
+            loader.result('ventas')
+        assert 'ventas' in loader.errors
+
+    def test_pool_compartido(self):
+        """Test que todas las peticiones usan el mismo pool"""
+        assert ConcurrentLoader().executor is shared_executor() is ConcurrentLoader().executor
@@ -0,0 +1,222 @@
+"""
+Tests unitarios para src/dashboard_widgets.py
+
+Tests del periodo del dashboard, del cálculo de cada widget de /dashboard y
+de la caché por widget con fuentes compartidas.
+"""
+
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.dashboard_widgets import (
+    DashboardWidgets, calcular_kpis, consolidar_metas, dashboard_period, datos_lineas, tabla_ecommerce,
+    top_productos
+)
+
+
+NOW = datetime(2026, 3, 18, 10, 0)
+
+AGREGADOS = {
+    'ventas_por_linea': {'PETMEDICA': 600.0, 'AGROVET': 300.0, 'ECOMMERCE': 100.0},
+    'ventas_por_ruta': {'PETMEDICA': 50.0},
+    'ventas_ipn_por_linea': {'PETMEDICA': 200.0, 'ECOMMERCE': 40.0},
+    'ventas_por_producto': {'A': 10.0, 'B': 30.0, 'C': 20.0},
+    'ciclo_vida_por_producto': {'B': 'nuevo'},
+    'ventas_por_ciclo_vida': {'nuevo': 200.0, 'No definido': 800.0},
+    'ventas_por_linea_ecommerce': {'PETMEDICA': 60.0, 'AGROVET': 20.0},
+}
+
+METAS = {'2026-03': {'metas': {'PETMEDICA': 1000, 'GENVET': 100, 'terceros': 50, 'ecommerce': 160},
+                     'metas_ipn': {'petmedica': 400}}}
+
+
+class TestDashboardPeriod:
+    """Suite de tests para dashboard_period"""
+
+    def test_mes_en_curso_hasta_hoy(self):
+        """Test que sin parámetros se usa el mes actual hasta hoy"""
+        periodo = dashboard_period(now=NOW)
+
+        assert (periodo['mes'], periodo['fecha_inicio'], periodo['fecha_fin']) == ('2026-03', '2026-03-01', '2026-03-18')
+
+    def test_mes_pasado_y_dia_fin(self):
+        """Test que un mes pasado va hasta fin de mes y dia_fin se limita al mes"""
+        assert dashboard_period('2026', '2026-02', now=NOW)['fecha_fin'] == '2026-02-28'
+        assert dashboard_period('2026', '2026-02', dia_fin='31', now=NOW)['fecha_fin'] == '2026-02-28'
+        assert dashboard_period('2026', '2026-02', dia_fin='10', now=NOW)['dia_actual'] == 10
+
+    def test_parametros_invalidos(self):
+        """Test que un año o mes inválido usa los valores por defecto"""
+        periodo = dashboard_period('abc', '2026/13', 'x', now=NOW)
+
+        assert (periodo['año'], periodo['mes'], periodo['dia_actual']) == (2026, '2026-03', 18)
+
+
+class TestWidgetData:
+    """Suite de tests para los cálculos de los widgets"""
+
+    def test_metas_genvet_suma_a_terceros(self):
+        """Test que las claves se normalizan y GENVET se suma a TERCEROS"""
+        metas, metas_ipn = consolidar_metas(METAS, '2026-03')
+
+        assert metas == {'petmedica': 1000, 'terceros': 150, 'ecommerce': 160}
+        assert metas_ipn == {'petmedica': 400}
+        assert consolidar_metas(METAS, '2026-04') == ({}, {})
+
+    def test_tabla_y_kpis(self):
+        """Test de las filas de la tabla y los KPIs (ECOMMERCE cuenta en la venta total, no en la tabla)"""
+        metas, metas_ipn = consolidar_metas(METAS, '2026-03')
+        filas = datos_lineas(AGREGADOS, metas, metas_ipn)
+
+        assert [f['nombre'] for f in filas] == ['AGROVET', 'PETMEDICA', 'TERCEROS']
+        petmedica = filas[1]
+        assert (petmedica['porcentaje_total'], petmedica['porcentaje_sobre_total']) == (60.0, 60.0)
+        assert (petmedica['venta_pn'], petmedica['porcentaje_pn'], petmedica['vencimiento_6_meses']) == (200.0, 50.0, 50.0)
+
+        periodo = dashboard_period(now=NOW)
+        kpis = calcular_kpis(AGREGADOS, filas, metas, metas_ipn, periodo, now=NOW)
+        assert (kpis['meta_total'], kpis['venta_total'], kpis['venta_ipn']) == (1310, 1000.0, 200.0)
+        assert kpis['faltante_meta'] == 310
+        assert kpis['avance_lineal_pct'] == pytest.approx(1000.0 / 18 * 31 / 1310 * 100)
+        assert kpis['ritmo_diario_requerido'] > 0
+
+    def test_top_productos_y_ecommerce(self):
+        """Test del Top de productos y de la tabla del equipo ECOMMERCE"""
+        assert [p['nombre'] for p in top_productos(AGREGADOS, n=2)] == ['B', 'C']
+        assert top_productos(AGREGADOS)[0]['ciclo_vida'] == 'nuevo'
+
+        ecommerce = tabla_ecommerce(AGREGADOS, {'ecommerce': 160}, ['7'])
+        assert ecommerce['kpis'] == {'meta_total': 160, 'venta_total': 80.0, 'porcentaje_avance': 50.0}
+        assert [(l['nombre'], l['porcentaje_sobre_total']) for l in ecommerce['lineas']] == [
+            ('PETMEDICA', 75.0), ('AGROVET', 25.0)
+        ]
+        assert tabla_ecommerce(AGREGADOS, {}, [])['lineas'] == []
+
+
+class TestDashboardWidgets:
+    """Suite de tests para DashboardWidgets (caché por widget y fuentes compartidas)"""
+
+    @pytest.fixture
+    def managers(self):
+        data_manager = MagicMock()
+        data_manager.get_dashboard_aggregates.return_value = AGREGADOS
+        supabase_manager = MagicMock()
+        supabase_manager.read_metas_por_linea.return_value = METAS
+        supabase_manager.read_equipos.return_value = {'ecommerce': [7]}
+        return data_manager, supabase_manager
+
+    def test_widgets_comparten_fuentes_y_se_cachean(self, managers):
+        """Test que los widgets consultan una vez cada fuente y cada widget queda en caché"""
+        data_manager, supabase_manager = managers
+        widgets = DashboardWidgets(data_manager, supabase_manager, ttl_seconds=60)
+        periodo = dashboard_period(now=NOW)
+
+        for name in ('kpis', 'lineas', 'productos', 'ciclo_vida', 'ecommerce'):
+            widgets.widget(name, periodo)
+        kpis = widgets.widget('kpis', periodo)
+
+        assert kpis['venta_total'] == 1000.0
+        data_manager.get_dashboard_aggregates.assert_called_once_with(
+            '2026-03-01', '2026-03-18', ecommerce_user_ids=['7'])
+        supabase_manager.read_metas_por_linea.assert_called_once_with(mes_desde='2026-03', mes_hasta='2026-03')
+        supabase_manager.read_equipos.assert_called_once()
+        data_manager.get_commercial_lines_stacked_data.assert_not_called()
+        assert widgets.stats()['hits'] >= 1
+
+    def test_widget_lento_no_retiene_a_los_demas(self, managers):
+        """Test que mientras el gráfico apilado consulta, los otros widgets responden"""
+        data_manager, supabase_manager = managers
+        release = threading.Event()
+        data_manager.get_commercial_lines_stacked_data.side_effect = lambda **kw: release.wait(5) and {'yAxis': []}
+        widgets = DashboardWidgets(data_manager, supabase_manager, ttl_seconds=60)
+        periodo = dashboard_period(now=NOW)
+
+        slow = threading.Thread(target=widgets.widget, args=('apilado', periodo))
+        slow.start()
+        start = time.monotonic()
+        productos = widgets.widget('productos', periodo)
+        elapsed = time.monotonic() - start
+        release.set()
+        slow.join()
+
+        assert productos['productos'][0]['nombre'] == 'B'
+        assert elapsed < 1
+
+    def test_errores_no_se_cachean(self, managers):
+        """Test que si Odoo falla el widget lanza el error y la siguiente petición reintenta"""
+        data_manager, supabase_manager = managers
+        data_manager.get_dashboard_aggregates.side_effect = [RuntimeError('Odoo caído'), AGREGADOS]
+        widgets = DashboardWidgets(data_manager, supabase_manager, ttl_seconds=60)
+        periodo = dashboard_period(now=NOW)
+
+        with pytest.raises(RuntimeError):
+            widgets.widget('productos', periodo)
+        assert widgets.widget('productos', periodo)['productos']
+        with pytest.raises(KeyError):
+            widgets.widget('desconocido', periodo)
+
+    def test_invalidate_relee_metas(self, managers):
+        """Test que al guardar metas se descartan los widgets y las fuentes"""
+        data_manager, supabase_manager = managers
+        widgets = DashboardWidgets(data_manager, supabase_manager, ttl_seconds=60)
+        periodo = dashboard_period(now=NOW)
+
+        widgets.widget('kpis', periodo)
+        widgets.invalidate()
+        widgets.widget('kpis', periodo)
+
+        assert supabase_manager.read_metas_por_linea.call_count == 2
+
+    def test_guardado_en_otro_worker_relee_metas(self, managers):
+        """Test que si cambia la versión de Supabase (guardado en otro worker) se recalculan los widgets"""
+        data_manager, supabase_manager = managers
+        supabase_manager.cache_version.return_value = 'v1'
+        widgets = DashboardWidgets(data_manager, supabase_manager, ttl_seconds=60)
+        periodo = dashboard_period(now=NOW)
+
+        widgets.widget('kpis', periodo)
+        widgets.widget('kpis', periodo)
+        supabase_manager.cache_version.return_value = 'v2'
+        widgets.widget('kpis', periodo)
+
+        assert supabase_manager.read_metas_por_linea.call_count == 2
+        data_manager.get_dashboard_aggregates.assert_called_once()
+
+    def test_metas_y_agregados_en_paralelo(self, managers):
+        """Test que un widget pide las metas mientras Odoo calcula los agregados"""
+        data_manager, supabase_manager = managers
+        data_manager.get_dashboard_aggregates.side_effect = lambda *a, **kw: time.sleep(0.3) or AGREGADOS
+        supabase_manager.read_metas_por_linea.side_effect = lambda **kw: time.sleep(0.3) or METAS
+        widgets = DashboardWidgets(data_manager, supabase_manager, ttl_seconds=60)
+
+        start = time.monotonic()
+        kpis = widgets.widget('kpis', dashboard_period(now=NOW))
+
+        assert kpis['meta_total'] == 1310
+        assert time.monotonic() - start < 0.55
+
+    def test_cambiar_de_linea_no_consulta_odoo(self, managers):
+        """Test que los totales de todas las líneas se calculan una vez por periodo"""
+        data_manager, supabase_manager = managers
+        data_manager.get_dashboard_lines.return_value = [
+            {'commercial_line_national_id': [1, 'PETMEDICA'], 'invoice_user_id': [7, 'Ana'], 'balance': 100.0,
+             'name': 'Producto X', 'sales_channel_id': [1, 'NACIONAL']},
+            {'commercial_line_national_id': [2, 'AGROVET'], 'invoice_user_id': [8, 'Luis'], 'balance': 40.0,
+             'name': 'Producto Y', 'sales_channel_id': [1, 'NACIONAL']},
+        ]
+        widgets = DashboardWidgets(data_manager, supabase_manager, ttl_seconds=60)
+
+        petmedica = widgets.agregados_por_linea('2026-03-01', '2026-03-18')['por_linea']['PETMEDICA']
+        agregados = widgets.agregados_por_linea('2026-03-01', '2026-03-18')
+
+        assert petmedica['ventas_por_vendedor'] == {'7': 100.0}
+        assert agregados['por_linea']['AGROVET']['ventas_por_vendedor'] == {'8': 40.0}
+        assert agregados['lineas_con_ventas'] == ['PETMEDICA', 'AGROVET']
+        data_manager.get_dashboard_lines.assert_called_once_with('2026-03-01', '2026-03-18', limit=10000)
+
+        widgets.agregados_por_linea('2026-03-01', '2026-03-10')
+        assert data_manager.get_dashboard_lines.call_count == 2
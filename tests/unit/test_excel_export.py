@@ -0,0 +1,69 @@
+"""
+Tests unitarios para src/excel_export.py
+
+Tests del libro write-only: encabezados, conversión de tipos, formatos por
+columna y descarga por trozos.
+"""
+
+import io
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from src.excel_export import (
+    CURRENCY_FORMAT, DATE_FORMAT, DETALLE_COLUMNS, NUMBER_FORMAT, build_xlsx, iter_file_chunks, raw_columns,
+    write_xlsx
+)
+from tests.fake_odoo import make_sales_line
+
+
+def read_sheet(output):
+    output.seek(0)
+    return load_workbook(io.BytesIO(output.read())).active
+
+
+class TestExcelExport:
+    """Suite de tests para el libro de exportación en streaming"""
+
+    def test_detalle_traduce_convierte_y_formatea(self):
+        """Test que el detalle trae encabezados traducidos, fechas, nombres y formatos por columna"""
+        output, filas = build_xlsx(iter([make_sales_line(1), make_sales_line(2, balance='x')]), DETALLE_COLUMNS, 'Detalle Ventas 2026-03')
+        ws = read_sheet(output)
+        headers = [c.value for c in ws[1]]
+        col = {h: i for i, h in enumerate(headers)}
+        fila = ws[2]
+
+        assert filas == 2
+        assert headers == [h for _, h, _, _ in DETALLE_COLUMNS]
+        assert ws[1][0].font.bold and ws.freeze_panes == 'A2'
+        assert fila[col['Fecha Factura']].value == datetime(2026, 3, 5)
+        assert fila[col['Fecha Factura']].number_format == DATE_FORMAT
+        assert fila[col['Vendedor']].value == 'Ana'
+        assert fila[col['Importe Total']].value == 150.5
+        assert fila[col['Importe Total']].number_format == CURRENCY_FORMAT
+        assert fila[col['Cantidad']].number_format == NUMBER_FORMAT
+        assert fila[col['Ruta de Venta']].value is None
+        assert ws[3][col['Importe Total']].value == 0.0
+        assert ws.column_dimensions['D'].width == 40
+
+    def test_exportacion_cruda(self):
+        """Test que sin formato se escriben las claves tal cual y las listas como texto"""
+        linea = make_sales_line()
+        output = io.BytesIO()
+        write_xlsx(output, [linea], raw_columns(linea.keys()), 'Ventas', header_style=False)
+        ws = read_sheet(output)
+
+        assert [c.value for c in ws[1]] == list(linea.keys())
+        assert ws[2][list(linea).index('invoice_user_id')].value == "[7, 'Ana']"
+        assert ws[2][list(linea).index('invoice_date')].value == '2026-03-05'
+
+    def test_descarga_por_trozos(self):
+        """Test que la descarga entrega el archivo completo en trozos y lo cierra"""
+        output, _ = build_xlsx((make_sales_line(i) for i in range(500)), DETALLE_COLUMNS, 'Ventas')
+        contenido = output.read()
+        output.seek(0)
+
+        trozos = list(iter_file_chunks(output, chunk_size=4096))
+
+        assert len(trozos) > 1 and b''.join(trozos) == contenido
+        assert output.closed
@@ -0,0 +1,166 @@
+"""
+Tests unitarios para src/export_jobs.py
+
+Tests de la cola de exportaciones: ejecución en segundo plano, progreso,
+deduplicación de filtros iguales, errores y expiración de archivos.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.export_jobs import ExportJobs, count_rows
+
+
+def wait_done(jobs, job_id, timeout=5):
+    """Espera a que el trabajo termine (listo o error)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.status(job_id)
+        if job['estado'] in ('listo', 'error'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('El trabajo no terminó a tiempo')
+
+
+def write_rows(n):
+    """Función run que escribe n filas informando el progreso"""
+    def run(path, progress):
+        with open(path, 'w') as f:
+            for _ in count_rows(range(n), progress, every=10):
+                f.write('x')
+        return n
+    return run
+
+
+class TestExportJobs:
+    """Suite de tests para ExportJobs"""
+
+    @pytest.fixture
+    def jobs(self, tmp_path):
+        return ExportJobs(str(tmp_path / 'exports'), max_workers=2, ttl_seconds=60)
+
+    def test_trabajo_termina_y_deja_el_archivo(self, jobs):
+        """Test que el trabajo pasa a listo con las filas escritas y su archivo en disco"""
+        job = jobs.submit('detalle', {'mes': '2026-03'}, write_rows(25), 'detalle_ventas_2026-03.xlsx')
+
+        assert job['estado'] == 'pendiente'
+        done = wait_done(jobs, job['id'])
+        assert (done['estado'], done['filas'], done['archivo']) == ('listo', 25, 'detalle_ventas_2026-03.xlsx')
+        with open(jobs.file_path(job['id'])) as f:
+            assert f.read() == 'x' * 25
+        assert jobs.stats()['listo'] == 1
+
+    def test_filtros_iguales_comparten_el_trabajo_en_curso(self, jobs):
+        """Test que la misma exportación en curso se reutiliza y el progreso se informa"""
+        release = threading.Event()
+        progreso = threading.Event()
+
+        def run(path, progress):
+            progress(1000)
+            progreso.set()
+            release.wait(5)
+            open(path, 'w').close()
+            return 1000
+
+        first = jobs.submit('ventas', {'date_from': '2025-01-01', 'linea_id': None}, run, 'a.xlsx')
+        progreso.wait(5)
+        again = jobs.submit('ventas', {'linea_id': '', 'date_from': '2025-01-01'}, run, 'b.xlsx')
+        other = jobs.submit('ventas', {'date_from': '2025-02-01'}, write_rows(1), 'c.xlsx')
+
+        assert again['id'] == first['id']
+        assert other['id'] != first['id']
+        assert jobs.status(first['id'])['filas'] == 1000
+        release.set()
+        assert wait_done(jobs, first['id'])['estado'] == 'listo'
+        # Terminado, la misma exportación genera un trabajo nuevo
+        assert jobs.submit('ventas', {'date_from': '2025-01-01'}, write_rows(1), 'd.xlsx')['id'] != first['id']
+
+    def test_error_no_deja_archivo(self, jobs):
+        """Test que si la exportación falla el estado es error y no hay descarga"""
+        def run(path, progress):
+            open(path, 'w').close()
+            raise RuntimeError('Odoo caído')
+
+        job = wait_done(jobs, jobs.submit('detalle', {'mes': '2026-03'}, run, 'x.xlsx')['id'])
+
+        assert job['estado'] == 'error' and job['error']
+        assert jobs.file_path(job['id']) is None
+        assert not [n for n in os.listdir(jobs.export_dir) if n.endswith('.part')]
+
+    def test_estado_visible_desde_otro_worker(self, jobs):
+        """Test que otro proceso con la misma carpeta ve el estado y el archivo"""
+        job_id = jobs.submit('detalle', {'mes': '2026-03'}, write_rows(3), 'd.xlsx')['id']
+        wait_done(jobs, job_id)
+
+        otro = ExportJobs(jobs.export_dir)
+        assert otro.status(job_id)['estado'] == 'listo'
+        assert otro.file_path(job_id) == jobs.file_path(job_id)
+        assert otro.status('../../etc/passwd') is None
+
+    def test_archivos_expirados_se_eliminan(self, jobs):
+        """Test que cleanup borra los trabajos terminados hace más de ttl_seconds"""
+        job_id = jobs.submit('detalle', {'mes': '2026-03'}, write_rows(3), 'd.xlsx')['id']
+        wait_done(jobs, job_id)
+        path = jobs.file_path(job_id)
+
+        assert jobs.cleanup() == 0
+        jobs.ttl_seconds = -1
+        assert jobs.cleanup() == 1
+        assert not os.path.exists(path)
+        assert jobs.status(job_id) is None
+
+    def test_descarga_abierta_sobrevive_a_cleanup(self, jobs):
+        """Test que open_file lee el estado una vez y el archivo abierto se descarga aunque expire"""
+        job_id = jobs.submit('detalle', {'mes': '2026-03'}, write_rows(4), 'detalle_ventas_2026-03.xlsx')['id']
+        wait_done(jobs, job_id)
+
+        archivo, nombre = jobs.open_file(job_id)
+        jobs.ttl_seconds = -1
+        jobs.cleanup()
+
+        with archivo:
+            assert (archivo.read(), nombre) == (b'xxxx', 'detalle_ventas_2026-03.xlsx')
+        assert jobs.open_file(job_id) is None
+        assert jobs.open_file('no-existe') is None
+
+    def test_trabajo_interrumpido_se_marca_como_error(self, jobs):
+        """Test que cleanup marca como error un trabajo sin terminar de un worker caído y borra su .part"""
+        def trabajo_huerfano(job_id, creado):
+            job = {
+                'id': job_id, 'tipo': 'ventas', 'params': {}, 'estado': 'en_proceso', 'filas': 500,
+                'archivo': 'ventas.xlsx', 'error': None, 'creado': creado, 'terminado': None,
+            }
+            jobs._persist(job)
+            open(os.path.join(jobs.export_dir, f'{job_id}.xlsx.part'), 'w').close()
+
+        viejo, reciente = 'a' * 32, 'b' * 32
+        trabajo_huerfano(viejo, time.time() - 120)
+        trabajo_huerfano(reciente, time.time())
+
+        assert jobs.cleanup() == 0
+        job = jobs.status(viejo)
+        assert job['estado'] == 'error' and job['error'] and job['terminado']
+        assert not os.path.exists(os.path.join(jobs.export_dir, f'{viejo}.xlsx.part'))
+        # Uno reciente puede seguir en curso en otro worker
+        assert jobs.status(reciente)['estado'] == 'en_proceso'
+        assert os.path.exists(os.path.join(jobs.export_dir, f'{reciente}.xlsx.part'))
+
+    def test_trabajo_en_curso_no_se_interrumpe(self, jobs):
+        """Test que cleanup no toca un trabajo que este proceso sigue ejecutando"""
+        release = threading.Event()
+
+        def run(path, progress):
+            open(path, 'w').close()
+            release.wait(5)
+            return 0
+
+        job_id = jobs.submit('ventas', {'date_from': '2025-01-01'}, run, 'v.xlsx')['id']
+        jobs.max_run_seconds = -1
+        jobs.cleanup()
+
+        assert jobs.status(job_id)['estado'] in ('pendiente', 'en_proceso')
+        release.set()
+        assert wait_done(jobs, job_id)['estado'] == 'listo'
@@ -0,0 +1,200 @@
+"""
+Tests unitarios para MasterDataCache
+
+Tests de aciertos/fallos, la marca de agua por write_date, la revisión de
+cambios y su uso en get_sales_lines contra un Odoo falso.
+"""
+
+import copy
+import time
+from unittest.mock import patch
+
+from src.master_data_cache import MasterDataCache
+from src.odoo_manager import OdooManager
+from tests.fake_odoo import FakeOdooServer
+from tests.unit.test_odoo_sales_fetch import FAKE_RECORDS
+
+
+PRODUCTS = [
+    {'id': 1, 'name': 'Producto X', 'write_date': '2026-01-10 08:00:00'},
+    {'id': 2, 'name': 'Producto Y', 'write_date': '2026-02-01 12:30:00'},
+]
+
+
+def loaded_cache(check_interval_seconds=300, related=()):
+    cache = MasterDataCache('product.product', ['name'], check_interval_seconds, related)
+    cache.missing([1, 2])
+    with patch('src.master_data_cache._watermark_now', return_value='2026-02-01 12:30:00'):
+        cache.fetch_query([1, 2])
+    cache.store([dict(p) for p in PRODUCTS])
+    return cache
+
+
+class TestMasterDataCache:
+    """Suite de tests para MasterDataCache"""
+
+    def test_aciertos_y_fallos(self):
+        """Test que solo los ids nuevos se piden y el ratio de aciertos se calcula"""
+        cache = loaded_cache()
+
+        assert cache.missing([1, 2, 3]) == [3]
+        assert cache.fetch_query([3]) == (
+            'product.product', 'search_read', [[('id', 'in', [3])]],
+            {'fields': ['name', 'write_date'], 'context': {'lang': 'es_PE'}}
+        )
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (2, 3, 0.4)
+        assert cache.get_many([1, 3]) == {1: PRODUCTS[0]}
+
+    def test_primera_carga_fija_la_marca_de_agua(self):
+        """Test que la marca es la hora en que se pidió la primera carga, no el write_date de sus registros"""
+        cache = MasterDataCache('product.product', ['name'])
+        with patch('src.master_data_cache._watermark_now', return_value='2026-03-10 09:00:00'):
+            cache.fetch_query([1])
+        cache.store([dict(PRODUCTS[0])])
+        with patch('src.master_data_cache._watermark_now', return_value='2026-03-10 09:05:00'):
+            cache.fetch_query([2])
+        cache.store([{'id': 2, 'name': 'Nuevo', 'write_date': '2026-03-11 00:00:00'}])
+
+        assert cache.stats()['watermark'] == '2026-03-10 09:00:00'
+
+    def test_revision_solo_al_vencer_el_intervalo(self):
+        """Test que la revisión pide lo modificado desde la marca y no se repite antes de tiempo"""
+        now = time.monotonic()
+        with patch('src.master_data_cache.time.monotonic', return_value=now):
+            cache = loaded_cache(check_interval_seconds=60)
+        with patch('src.master_data_cache.time.monotonic', return_value=now + 30):
+            assert cache.refresh_query() is None
+        with patch('src.master_data_cache.time.monotonic', return_value=now + 61):
+            query = cache.refresh_query()
+            assert cache.refresh_query() is None
+
+        assert query[2] == [[('write_date', '>=', '2026-02-01 12:30:00')]]
+
+    def test_revision_incluye_modelos_relacionados(self):
+        """Test que con related la revisión también trae los registros cuya plantilla cambió"""
+        cache = loaded_cache(check_interval_seconds=60, related=('product_tmpl_id',))
+        with patch('src.master_data_cache.time.monotonic', return_value=time.monotonic() + 61):
+            query = cache.refresh_query()
+
+        assert query[2] == [['|', ('write_date', '>=', '2026-02-01 12:30:00'),
+                             ('product_tmpl_id.write_date', '>=', '2026-02-01 12:30:00')]]
+
+    def test_sin_intervalo_no_revisa(self):
+        """Test que check_interval_seconds=0 desactiva la revisión"""
+        cache = loaded_cache(check_interval_seconds=0)
+        with patch('src.master_data_cache.time.monotonic', return_value=time.monotonic() + 3600):
+            assert cache.refresh_query() is None
+
+    def test_aplicar_revision_actualiza_solo_los_cacheados(self):
+        """Test que se actualizan los registros en caché y la marca pasa a la hora de la revisión"""
+        cache = loaded_cache(check_interval_seconds=60)
+        with patch('src.master_data_cache.time.monotonic', return_value=time.monotonic() + 61), \
+                patch('src.master_data_cache._watermark_now', return_value='2026-03-07 00:00:00'):
+            cache.refresh_query()
+        cache.apply_refresh([
+            {'id': 2, 'name': 'Producto Y (nuevo nombre)', 'write_date': '2026-03-05 09:00:00'},
+            {'id': 9, 'name': 'No cacheado', 'write_date': '2026-03-06 10:00:00'},
+        ], seconds=0.25)
+
+        assert cache.get_many([2, 9]) == {
+            2: {'id': 2, 'name': 'Producto Y (nuevo nombre)', 'write_date': '2026-03-05 09:00:00'}
+        }
+        stats = cache.stats()
+        assert stats['watermark'] == '2026-03-07 00:00:00'
+        assert (stats['refreshes'], stats['refreshed_records'], stats['last_refresh_seconds']) == (1, 1, 0.25)
+
+
+def records_with_write_date():
+    records = copy.deepcopy(FAKE_RECORDS)
+    for model in ('product.product', 'res.partner', 'account.tax'):
+        for record in records[model]:
+            record['write_date'] = '2026-01-01 00:00:00'
+    # Cada variante con su plantilla (donde se editan categoría, línea comercial, etc.)
+    records['product.template'] = []
+    for product in records['product.product']:
+        product['product_tmpl_id'] = [product['id'] + 5000, product['name']]
+        records['product.template'].append({'id': product['id'] + 5000, 'write_date': '2026-01-01 00:00:00'})
+    return records
+
+
+class TestOdooManagerMasterData:
+    """Suite de tests para los datos maestros en get_sales_lines"""
+
+    def build(self, monkeypatch, server, enabled=True):
+        monkeypatch.setenv('ODOO_URL', server.url)
+        monkeypatch.setenv('ODOO_DB', 'test_db')
+        monkeypatch.setenv('ODOO_USER', 'test@example.com')
+        monkeypatch.setenv('ODOO_PASSWORD', 'test_password')
+        monkeypatch.setenv('ODOO_RPC_PROTOCOL', 'jsonrpc')
+        monkeypatch.setenv('SALES_CACHE_TTL_SECONDS', '0')
+        monkeypatch.setenv('MASTER_DATA_CACHE_ENABLED', 'true' if enabled else 'false')
+        monkeypatch.setenv('MASTER_DATA_CHECK_SECONDS', '60')
+        return OdooManager()
+
+    def test_segunda_consulta_no_pide_datos_maestros(self, monkeypatch):
+        """Test que la segunda consulta solo pide líneas, facturas y órdenes"""
+        with FakeOdooServer(records_with_write_date()) as server:
+            om = self.build(monkeypatch, server)
+            first = om.get_sales_lines(date_from='2026-01-01')
+            calls_first = len(server.object_calls())
+            second = om.get_sales_lines(date_from='2026-01-01')
+
+        assert first == second and len(first) == 1  # la línea con EXO no se descarga (solo IGV)
+        assert {model for model, _, _ in server.object_calls()[calls_first:]} == {
+            'account.move.line', 'account.move', 'sale.order', 'sale.order.line'
+        }
+        stats = om.get_cache_stats()['master_data']
+        assert stats['product.product']['hit_ratio'] == 0.5
+        assert stats['res.partner']['records'] == 1
+
+    def test_revision_trae_los_cambios(self, monkeypatch):
+        """Test que al vencer el intervalo solo se piden los registros modificados"""
+        with FakeOdooServer(records_with_write_date()) as server:
+            om = self.build(monkeypatch, server)
+            with patch('src.master_data_cache._watermark_now', return_value='2026-01-05 00:00:00'):
+                om.get_sales_lines(date_from='2026-01-01')
+
+            product = server.records['product.product'][0]
+            product.update(name='Producto X Plus', write_date='2026-01-20 10:00:00')
+            calls_first = len(server.requests)
+            with patch('src.master_data_cache.time.monotonic', return_value=time.monotonic() + 120), \
+                    patch('src.master_data_cache._watermark_now', return_value='2026-01-21 00:00:00'):
+                lines = om.get_sales_lines(date_from='2026-01-01')
+
+        refresh = [r for r in server.requests[calls_first:]
+                   if r['model'] == 'product.product' and r['method'] == 'search_read']
+        assert [r['args'][0][0] for r in refresh] == [[
+            '|', ['write_date', '>=', '2026-01-05 00:00:00'], ['product_tmpl_id.write_date', '>=', '2026-01-05 00:00:00']
+        ]]
+        assert [l['name'] for l in lines] == ['Producto X Plus']
+        stats = om.get_cache_stats()['master_data']['product.product']
+        assert (stats['refreshes'], stats['refreshed_records']) == (1, 1)
+        assert stats['watermark'] == '2026-01-21 00:00:00'
+
+    def test_revision_trae_cambios_de_la_plantilla(self, monkeypatch):
+        """Test que un cambio en product.template (sin tocar la variante) llega a la caché"""
+        with FakeOdooServer(records_with_write_date()) as server:
+            om = self.build(monkeypatch, server)
+            with patch('src.master_data_cache._watermark_now', return_value='2026-01-05 00:00:00'):
+                om.get_sales_lines(date_from='2026-01-01')
+
+            # La línea comercial se edita en la plantilla: la variante conserva su write_date
+            product = server.records['product.product'][0]
+            product['commercial_line_national_id'] = [3, 'AVIVET']
+            server.records['product.template'][0]['write_date'] = '2026-01-20 10:00:00'
+            with patch('src.master_data_cache.time.monotonic', return_value=time.monotonic() + 120):
+                lines = om.get_sales_lines(date_from='2026-01-01')
+
+        assert [l['commercial_line_national_id'] for l in lines] == [[3, 'AVIVET']]
+        assert om.get_cache_stats()['master_data']['product.product']['refreshed_records'] == 1
+
+    def test_cache_desactivada(self, monkeypatch):
+        """Test que MASTER_DATA_CACHE_ENABLED=false vuelve a pedir los datos maestros"""
+        with FakeOdooServer(records_with_write_date()) as server:
+            om = self.build(monkeypatch, server, enabled=False)
+            om.get_sales_lines(date_from='2026-01-01')
+            om.get_sales_lines(date_from='2026-01-01')
+
+        assert [(m, method) for m, method, _ in server.object_calls()].count(('product.product', 'search_read')) == 2
+        assert 'master_data' not in om.get_cache_stats()
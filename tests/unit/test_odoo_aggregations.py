@@ -0,0 +1,265 @@
+"""
+Tests unitarios para el motor de agregación de OdooManager
+
+Tests de read_group y de los totales del dashboard mensual.
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.odoo_manager import OdooManager
+
+
+# Ids de los filtros de ventas ya resueltos (impuesto IGV, línea y canal internacionales)
+SALES_FILTER_IDS = {'igv_tax_ids': [7], 'international_line_ids': [9], 'international_team_ids': [6]}
+
+
+@pytest.fixture
+def om():
+    """OdooManager conectado con proxy XML-RPC mockeado (modo secuencial)"""
+    manager = OdooManager.__new__(OdooManager)
+    manager.db, manager.uid, manager.password = 'test_db', 2, 'pwd'
+    manager.models = MagicMock()
+    manager.parallel_fetch = False
+    manager.id_chunk_size = 1000
+    manager._sales_filter_state = (float('inf'), SALES_FILTER_IDS)
+    return manager
+
+
+# Líneas de detalle de un mes (como las retorna get_sales_lines)
+DETAIL_LINES = [
+    {'commercial_line_national_id': [2, 'PETMEDICA'], 'name': 'ATREVIA ONE MEDIUM', 'product_life_cycle': 'nuevo',
+     'balance': 100.0, 'route_id': [18, 'Venc'], 'invoice_user_id': [7, 'Ana'], 'sales_channel_id': [1, 'NACIONAL']},
+    {'commercial_line_national_id': [2, 'PETMEDICA'], 'name': 'ATREVIA ONE LARGE', 'product_life_cycle': 'nuevo',
+     'balance': 50.0, 'route_id': False, 'invoice_user_id': [8, 'Luis'], 'sales_channel_id': [1, 'NACIONAL']},
+    {'commercial_line_national_id': [4, 'GENVET'], 'name': 'GENÉRICO', 'product_life_cycle': False,
+     'balance': 30.0, 'route_id': [19, 'Venc'], 'invoice_user_id': [7, 'Ana'], 'sales_channel_id': [1, 'NACIONAL']},
+    {'commercial_line_national_id': [9, 'VENTA INTERNACIONAL'], 'name': 'EXPORT', 'product_life_cycle': False,
+     'balance': 999.0, 'route_id': False, 'invoice_user_id': [7, 'Ana'], 'sales_channel_id': [1, 'NACIONAL']},
+]
+
+
+class TestReadSalesGroups:
+    """Suite de tests para read_sales_groups"""
+
+    def test_read_group_con_dominio_y_signo(self, om):
+        """Test que se llama read_group con el dominio de ventas y se invierte el saldo"""
+        om.models.execute_kw.return_value = [
+            {'product_id': [1000, 'X'], 'balance': -150.0, 'quantity': 3, '__count': 2},
+        ]
+
+        groups = om.read_sales_groups(['product_id'], '2026-01-01', '2026-01-31')
+
+        assert groups == [{'product_id': [1000, 'X'], 'balance': 150.0, 'quantity': 3, 'count': 2}]
+        args = om.models.execute_kw.call_args.args
+        assert args[3:5] == ('account.move.line', 'read_group')
+        domain, fields, groupby = args[5]
+        assert ('move_id.invoice_date', '>=', '2026-01-01') in domain
+        assert ('tax_ids', 'in', [7]) in domain
+        assert ('product_id.commercial_line_national_id', 'not in', [9]) in domain
+        assert ('move_id.team_id', 'not in', [6]) in domain
+        assert fields == ['balance:sum', 'quantity:sum']
+        assert groupby == ['product_id']
+        assert om.models.execute_kw.call_args.args[6]['lazy'] is False
+
+
+class TestDashboardAggregates:
+    """Suite de tests para get_dashboard_aggregates"""
+
+    # Factura 10 (orden 500): productos 1 y 2; factura 11 (orden 501): producto 3
+    MOVE_PRODUCT_GROUPS = [
+        {'move_id': [10, 'F1'], 'product_id': [1, 'A'], 'balance': -100.0},
+        {'move_id': [10, 'F1'], 'product_id': [2, 'B'], 'balance': -50.0},
+        {'move_id': [11, 'F2'], 'product_id': [3, 'G'], 'balance': -30.0},
+    ]
+    MOVES = [{'id': 10, 'order_id': [500, 'S500']}, {'id': 11, 'order_id': [501, 'S501']}]
+    SALE_LINES = [
+        {'order_id': [500, 'S500'], 'product_id': [1, 'A'], 'route_id': [18, 'Venc']},
+        {'order_id': [500, 'S500'], 'product_id': [2, 'B'], 'route_id': False},
+        {'order_id': [501, 'S501'], 'product_id': [3, 'G'], 'route_id': [19, 'Venc']},
+    ]
+
+    def fake_odoo(self, model, method, args, kwargs):
+        """Responde read_group según la agrupación y el dominio extra, y los read de maestros"""
+        if model == 'account.move':
+            return self.MOVES
+        if model == 'sale.order.line':
+            return self.SALE_LINES
+        if method == 'read':
+            return [
+                {'id': 1, 'name': 'ATREVIA ONE MEDIUM', 'commercial_line_national_id': [2, 'PETMEDICA'], 'product_life_cycle': 'nuevo'},
+                {'id': 2, 'name': 'ATREVIA ONE LARGE', 'commercial_line_national_id': [2, 'PETMEDICA'], 'product_life_cycle': 'nuevo'},
+                {'id': 3, 'name': 'GENÉRICO', 'commercial_line_national_id': [4, 'GENVET'], 'product_life_cycle': False},
+            ]
+        domain = args[0]
+        if args[2] == ['move_id', 'product_id']:
+            assert ('move_id.order_id', '!=', False) in domain
+            return self.MOVE_PRODUCT_GROUPS
+        if ('move_id.invoice_user_id', 'in', [7]) in domain:
+            return [{'product_id': [1, 'A'], 'balance': -100.0}, {'product_id': [3, 'G'], 'balance': -30.0}]
+        return [
+            {'product_id': [1, 'A'], 'balance': -100.0},
+            {'product_id': [2, 'B'], 'balance': -50.0},
+            {'product_id': [3, 'G'], 'balance': -30.0},
+        ]
+
+    def test_read_group_coincide_con_detalle(self, om):
+        """Test que los totales agrupados en Odoo son iguales a los calculados con el detalle"""
+        om.models.execute_kw.side_effect = lambda db, uid, pwd, model, method, args, kwargs: self.fake_odoo(model, method, args, kwargs)
+
+        grouped = om.get_dashboard_aggregates('2026-01-01', '2026-01-31', ecommerce_user_ids=['7'])
+        detail = OdooManager.aggregate_dashboard_lines(DETAIL_LINES, ['7'])
+
+        assert grouped == detail
+        assert grouped['ventas_por_linea'] == {'PETMEDICA': 150.0, 'TERCEROS': 30.0}
+        assert grouped['ventas_por_ruta'] == {'PETMEDICA': 100.0, 'TERCEROS': 30.0}
+        assert grouped['ventas_ipn_por_linea'] == {'PETMEDICA': 150.0}
+        assert grouped['ventas_por_producto'] == {'ATREVIA ONE': 150.0}
+        assert grouped['ventas_por_linea_ecommerce'] == {'PETMEDICA': 100.0, 'TERCEROS': 30.0}
+
+    def test_no_descarga_lineas_de_detalle(self, om):
+        """Test que el camino agrupado no consulta search_read de account.move.line"""
+        om.models.execute_kw.side_effect = lambda db, uid, pwd, model, method, args, kwargs: self.fake_odoo(model, method, args, kwargs)
+
+        om.get_dashboard_aggregates('2026-01-01', '2026-01-31')
+
+        methods = {(c.args[3], c.args[4]) for c in om.models.execute_kw.call_args_list}
+        assert ('account.move.line', 'search_read') not in methods
+        assert methods == {('account.move.line', 'read_group'), ('product.product', 'read'),
+                           ('account.move', 'read'), ('sale.order.line', 'search_read')}
+
+    def test_nota_de_credito_descuenta_vencimiento(self, om):
+        """Test que la ruta sale de la línea de la orden (factura y producto), como en el detalle"""
+        self.MOVE_PRODUCT_GROUPS = self.MOVE_PRODUCT_GROUPS + [
+            # Nota de crédito de la orden 500 (sin sale_line_ids): saldo positivo en Odoo
+            {'move_id': [12, 'NC1'], 'product_id': [1, 'A'], 'balance': 40.0},
+        ]
+        self.MOVES = self.MOVES + [{'id': 12, 'order_id': [500, 'S500']}]
+        om.models.execute_kw.side_effect = lambda db, uid, pwd, model, method, args, kwargs: self.fake_odoo(model, method, args, kwargs)
+
+        grouped = om.get_dashboard_aggregates('2026-01-01', '2026-01-31')
+        refund = dict(DETAIL_LINES[0], balance=-40.0)
+        detail = OdooManager.aggregate_dashboard_lines(DETAIL_LINES + [refund])
+
+        assert grouped['ventas_por_ruta'] == {'PETMEDICA': 60.0, 'TERCEROS': 30.0}
+        assert grouped['ventas_por_ruta'] == detail['ventas_por_ruta']
+
+    def test_fallback_a_detalle_si_read_group_falla(self, om):
+        """Test que si read_group falla se agregan las líneas de get_sales_lines"""
+        om.models.execute_kw.side_effect = RuntimeError('read_group no permitido')
+
+        with patch.object(OdooManager, 'get_sales_lines', return_value=DETAIL_LINES) as mock_lines:
+            result = om.get_dashboard_aggregates('2026-01-01', '2026-01-31')
+
+        mock_lines.assert_called_once()
+        assert result['ventas_por_linea'] == {'PETMEDICA': 150.0, 'TERCEROS': 30.0}
+
+
+class TestSalesDashboardData:
+    """Suite de tests para get_sales_dashboard_data con read_group"""
+
+    def test_montos_absolutos_y_maestros(self, om):
+        """Test que se suman valores absolutos de ventas y notas de crédito"""
+        def fake(db, uid, pwd, model, method, args, kwargs):
+            if method == 'read' and model == 'product.product':
+                return [{'id': 1, 'name': 'Producto X', 'commercial_line_national_id': [2, 'PETMEDICA']}]
+            if method == 'read' and model == 'account.move':
+                return [{'id': 10, 'team_id': [5, 'AGROVET'], 'invoice_user_id': [3, 'Ana'], 'invoice_date': '2026-01-20'}]
+            field = args[2][0]
+            value = {'product_id': [1, 'X'], 'partner_id': [100, 'Clínica A'], 'move_id': [10, 'F1']}[field]
+            if ('balance', '=', 0) in args[0]:
+                return []
+            positive = ('balance', '>', 0) in args[0]
+            # Odoo: saldo negativo = venta, positivo = nota de crédito
+            return [{field: value, 'balance': 20.0 if positive else -100.0, 'quantity': 1, '__count': 1}]
+
+        om.models.execute_kw.side_effect = fake
+        data = om.get_sales_dashboard_data('2026-01-01', '2026-01-31')
+
+        assert data['total_sales'] == 120.0
+        assert data['total_lines'] == 2
+        assert data['top_clients'] == [('Clínica A', {'sales': 120.0, 'quantity': 2})]
+        assert data['commercial_lines'][0] == {'name': 'PETMEDICA', 'amount': 120.0, 'quantity': 2}
+        assert data['sellers'][0]['name'] == 'Ana'
+        assert data['sales_by_channel'] == [('AGROVET', {'sales': 120.0, 'quantity': 2})]
+        assert data['sales_by_month'] == [('2026-01', {'sales': 120.0, 'quantity': 2})]
+
+    def test_bonificaciones_con_saldo_cero(self, om):
+        """Test que las líneas con saldo 0 (bonificaciones) suman cantidad y líneas, no ventas"""
+        def fake(db, uid, pwd, model, method, args, kwargs):
+            if method == 'read' and model == 'product.product':
+                return [{'id': 1, 'name': 'Producto X', 'commercial_line_national_id': [2, 'PETMEDICA']}]
+            if method == 'read' and model == 'account.move':
+                return [{'id': 10, 'team_id': [5, 'AGROVET'], 'invoice_user_id': [3, 'Ana'], 'invoice_date': '2026-01-20'}]
+            field = args[2][0]
+            value = {'product_id': [1, 'X'], 'partner_id': [100, 'Clínica A'], 'move_id': [10, 'F1']}[field]
+            if ('balance', '>', 0) in args[0]:
+                return []
+            if ('balance', '=', 0) in args[0]:
+                return [{field: value, 'balance': 0.0, 'quantity': 5, '__count': 2}]
+            return [{field: value, 'balance': -100.0, 'quantity': 1, '__count': 1}]
+
+        om.models.execute_kw.side_effect = fake
+        data = om.get_sales_dashboard_data('2026-01-01', '2026-01-31')
+
+        assert (data['total_sales'], data['total_quantity'], data['total_lines']) == (100.0, 6, 3)
+        assert data['top_clients'] == [('Clínica A', {'sales': 100.0, 'quantity': 6})]
+        assert data['top_products'] == [('Producto X', {'sales': 100.0, 'quantity': 6})]
+        assert data['commercial_lines'][0]['quantity'] == 6
+
+
+class TestSalesByMonth:
+    """Suite de tests para las series mensuales agrupadas en Odoo"""
+
+    def fake_odoo(self, db, uid, pwd, model, method, args, kwargs):
+        """read_group por mes y producto o por factura, y read de productos y facturas"""
+        if method == 'read' and model == 'product.product':
+            return [
+                {'id': 1, 'name': 'ATREVIA', 'commercial_line_national_id': [2, 'PETMEDICA'], 'product_life_cycle': 'nuevo'},
+                {'id': 3, 'name': 'GENÉRICO', 'commercial_line_national_id': [4, 'GENVET'], 'product_life_cycle': False},
+            ]
+        if method == 'read' and model == 'account.move':
+            return [
+                {'id': 10, 'team_id': False, 'invoice_user_id': [7, 'Ana'], 'invoice_date': '2026-01-15'},
+                {'id': 11, 'team_id': False, 'invoice_user_id': [8, 'Luis'], 'invoice_date': '2026-03-02'},
+            ]
+        if args[2] == ['move_id']:
+            return [{'move_id': [10, 'F1'], 'balance': -130.0}, {'move_id': [11, 'F2'], 'balance': -40.0}]
+        return [
+            # Odoo 15+: el mes viene en __range; versiones anteriores solo en __domain
+            {'invoice_date:month': 'enero 2026', 'product_id': [1, 'A'], 'balance': -100.0,
+             '__range': {'invoice_date:month': {'from': '2026-01-01', 'to': '2026-02-01'}}},
+            {'invoice_date:month': 'enero 2026', 'product_id': [3, 'G'], 'balance': -30.0,
+             '__domain': [('invoice_date', '>=', '2026-01-01'), ('invoice_date', '<', '2026-02-01')]},
+            {'invoice_date:month': 'marzo 2026', 'product_id': [1, 'A'], 'balance': -40.0,
+             '__range': {'invoice_date:month': {'from': '2026-03-01', 'to': '2026-04-01'}}},
+        ]
+
+    def test_series_con_read_group_por_mes(self, om):
+        """Test que las series se arman con read_group por mes y por factura, sin descargar líneas"""
+        om.models.execute_kw.side_effect = self.fake_odoo
+
+        series = om.get_sales_by_month('2026-01-01', '2026-03-31')
+
+        assert series['months'] == ['2026-01', '2026-02', '2026-03']
+        assert series['total'] == [130.0, 0.0, 40.0]
+        assert series['ipn'] == [100.0, 0.0, 40.0]
+        assert series['por_linea'] == {'PETMEDICA': [100.0, 0.0, 40.0], 'TERCEROS': [30.0, 0.0, 0.0]}
+        assert series['por_vendedor'] == {'7': [130.0, 0.0, 0.0], '8': [0.0, 0.0, 40.0]}
+        groupbys = [c.args[5][2] for c in om.models.execute_kw.call_args_list if c.args[4] == 'read_group']
+        assert sorted(groupbys) == [['invoice_date:month', 'product_id'], ['move_id']]
+
+    def test_tendencia_con_año_anterior(self, om):
+        """Test que la tendencia consulta el año anterior cortado en el mismo día"""
+        om.models.execute_kw.side_effect = self.fake_odoo
+
+        with patch.object(OdooManager, 'get_sales_by_month', autospec=True,
+                          side_effect=lambda self, d_from, d_to, linea_id=None: {
+                              'total': [100.0, 50.0] if d_to == '2026-03-18' else [80.0, 0.0],
+                              'ipn': [10.0, 0.0] if d_to == '2026-03-18' else [20.0, 0.0]}) as by_month:
+            trend = om.get_sales_trend('2026-03-18', months=2)
+
+        assert [c.args[1:3] for c in by_month.call_args_list] == [
+            ('2026-02-01', '2026-03-18'), ('2025-02-01', '2025-03-18')
+        ]
+        assert trend['variacion'] == {'total': [25.0, None], 'ipn': [-50.0, None]}
@@ -0,0 +1,195 @@
+"""
+Tests unitarios para el transporte de OdooJSONRPCClient
+
+Tests del pool de conexiones keep-alive, reintentos, compresión y batch
+JSON-RPC contra un servidor Odoo falso local (tests/fake_odoo.py).
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.odoo_jsonrpc_client import OdooJSONRPCClient, OdooJSONRPCError
+from src.odoo_manager import OdooManager
+from tests.fake_odoo import FakeOdooServer
+
+
+RECORDS = {
+    'res.partner': [{'id': 1, 'name': 'X'}, {'id': 2, 'name': 'Y'}],
+    'account.tax': [{'id': 7, 'name': 'IGV'}],
+}
+
+
+@pytest.fixture
+def server():
+    """Servidor Odoo falso con soporte de batch"""
+    with FakeOdooServer({model: list(rows) for model, rows in RECORDS.items()}) as fake:
+        yield fake
+
+
+@pytest.fixture
+def server_sin_batch():
+    """Servidor Odoo falso que rechaza arreglos batch (como Odoo estándar)"""
+    with FakeOdooServer({model: list(rows) for model, rows in RECORDS.items()}, batch=False) as fake:
+        yield fake
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault('backoff_factor', 0)
+    return OdooJSONRPCClient(server.url, 'db', 'user', 'pwd', timeout=5, **kwargs)
+
+
+class TestOdooJSONRPCTransport:
+    """Suite de tests para el transporte HTTP del cliente JSON-RPC"""
+
+    def test_reutiliza_la_conexion(self, server):
+        """Test que las llamadas sucesivas viajan por la misma conexión keep-alive"""
+        with make_client(server) as client:
+            for _ in range(5):
+                assert client.search_read('res.partner', [('id', '=', 1)]) == [{'id': 1, 'name': 'X'}]
+
+        assert client.uid == 2
+        assert len(server.requests) == 6
+        assert len({r['port'] for r in server.requests}) == 1
+
+    def test_pool_compartido_entre_hilos(self, server):
+        """Test que varios hilos comparten el pool sin abrir más conexiones que pool_size"""
+        client = make_client(server, pool_size=3)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(10):
+                    client.read('res.partner', [1])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        client.close()
+
+        assert errors == []
+        assert len(server.requests) == 31
+        assert len({r['port'] for r in server.requests}) <= 3
+
+    def test_reintenta_lecturas_idempotentes(self, server):
+        """Test que una lectura se reintenta ante 503/502 y termina con éxito"""
+        client = make_client(server, max_retries=2)
+        server.fail_statuses = [503, 502]
+
+        assert len(client.search_read('res.partner', [])) == 2
+        assert [r['method'] for r in server.requests[1:]] == ['search_read'] * 3
+
+    def test_agota_reintentos(self, server):
+        """Test que se lanza OdooJSONRPCError al agotar los reintentos"""
+        client = make_client(server, max_retries=1)
+        server.fail_statuses = [503, 503, 503]
+
+        with pytest.raises(OdooJSONRPCError, match='503'):
+            client.search_count('res.partner', [])
+        assert len(server.requests) == 3  # authenticate + 2 intentos
+
+    def test_no_reintenta_escrituras(self, server):
+        """Test que create/write no se reintentan (podrían duplicar registros)"""
+        client = make_client(server, max_retries=3)
+        server.fail_statuses = [503]
+
+        with pytest.raises(OdooJSONRPCError):
+            client.create('res.partner', {'name': 'Nuevo'})
+        assert [r['method'] for r in server.requests[1:]] == ['create']
+
+    def test_compresion_de_peticiones_grandes(self, server):
+        """Test que solo los cuerpos que superan el umbral se envían con gzip"""
+        client = make_client(server, compress_requests=True, compress_min_bytes=2000)
+
+        client.read('res.partner', [1])
+        assert client.read('res.partner', list(range(1000))) == RECORDS['res.partner']
+
+        assert [r['gzip'] for r in server.requests] == [False, False, True]
+
+    def test_error_de_conexion(self):
+        """Test que un servidor caído se reporta como OdooJSONRPCError"""
+        with pytest.raises(OdooJSONRPCError, match='Connection error'):
+            OdooJSONRPCClient('http://127.0.0.1:9', 'db', 'user', 'pwd', timeout=2,
+                              max_retries=1, backoff_factor=0)
+
+
+BATCH_CALLS = [
+    ('res.partner', 'search_read', [[('id', 'in', [2])]], {'fields': ['name']}),
+    ('account.tax', 'read', [[7]], {'fields': ['name']}),
+    ('res.partner', 'search_count', [[]], None),
+]
+BATCH_RESULTS = [[{'id': 2, 'name': 'Y'}], [{'id': 7, 'name': 'IGV'}], 2]
+
+
+class TestOdooJSONRPCBatch:
+    """Suite de tests para execute_kw_batch"""
+
+    def test_una_sola_peticion_http(self, server):
+        """Test que todas las llamadas viajan en un arreglo y se respetan los resultados"""
+        client = make_client(server)
+
+        assert client.execute_kw_batch(BATCH_CALLS) == BATCH_RESULTS
+        assert server.object_calls() == [
+            ('res.partner', 'search_read', 3), ('account.tax', 'read', 3), ('res.partner', 'search_count', 3),
+        ]
+        assert client.batch_supported is True
+
+    def test_respuestas_se_asocian_por_id(self, server):
+        """Test que el orden de las respuestas no altera el orden de los resultados"""
+        client = make_client(server)
+        server.reverse_batch = True
+
+        assert client.execute_kw_batch(BATCH_CALLS) == BATCH_RESULTS
+
+    def test_servidor_sin_batch_usa_llamadas_individuales(self, server_sin_batch):
+        """Test que si Odoo rechaza el arreglo se repiten las llamadas una a una y se recuerda"""
+        client = make_client(server_sin_batch)
+
+        assert client.execute_kw_batch(BATCH_CALLS) == BATCH_RESULTS
+        assert client.batch_supported is False
+        assert [batch for _, _, batch in server_sin_batch.object_calls()] == [3, 3, 3, 0, 0, 0]
+
+        # La segunda vez ya no se intenta el arreglo
+        assert client.execute_kw_batch(BATCH_CALLS) == BATCH_RESULTS
+        assert [batch for _, _, batch in server_sin_batch.object_calls()[6:]] == [0, 0, 0]
+
+    def test_error_de_una_llamada(self, server):
+        """Test que un error de Odoo en una llamada del arreglo se propaga"""
+        client = make_client(server)
+
+        with pytest.raises(OdooJSONRPCError, match='no soportado'):
+            client.execute_kw_batch(BATCH_CALLS + [('res.partner', 'unlink', [[1]], None)])
+        assert client.batch_supported is True
+
+    def test_reintenta_batch_de_lecturas(self, server):
+        """Test que un arreglo solo de lecturas se reintenta ante HTTP 503"""
+        client = make_client(server, max_retries=1)
+        server.fail_statuses = [503]
+
+        assert client.execute_kw_batch(BATCH_CALLS) == BATCH_RESULTS
+        assert len(server.object_calls()) == 6
+
+
+class TestOdooManagerJSONRPC:
+    """Suite de tests para ODOO_RPC_PROTOCOL=jsonrpc en OdooManager"""
+
+    def test_odoo_manager_usa_el_cliente_con_pool(self, server):
+        """Test que OdooManager consulta vía JSON-RPC y todos los hilos comparten el adaptador"""
+        env = {
+            'ODOO_URL': server.url, 'ODOO_DB': 'db', 'ODOO_USER': 'user', 'ODOO_PASSWORD': 'pwd',
+            'ODOO_RPC_PROTOCOL': 'jsonrpc', 'ODOO_HTTP_POOL_SIZE': '4', 'SALES_STORE_ENABLED': 'false',
+        }
+        with patch.dict('os.environ', env):
+            manager = OdooManager()
+
+        assert manager.uid == 2
+        assert manager.jsonrpc_client.pool_size == 4
+        assert manager.models.execute_kw('db', 2, 'pwd', 'res.partner', 'read', [[1]]) == [{'id': 1, 'name': 'X'}]
+
+        proxies = list(manager._fetch_executor.map(lambda _: manager._worker_models(), range(4)))
+        assert all(p is manager.models for p in proxies)
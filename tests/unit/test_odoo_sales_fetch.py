@@ -0,0 +1,581 @@
+"""
+Tests unitarios para la obtención de líneas de venta en OdooManager
+
+Tests de las consultas relacionadas en paralelo y su modo secuencial.
+"""
+
+import http.client
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.concurrent_loader import ConcurrentLoader
+from src.odoo_manager import OdooManager
+from src.sales_aggregation import FRAME_FIELDS
+from src.sales_columns import SalesLinesTable
+from src.sales_store import SalesLineStore
+from tests.fake_odoo import FakeOdooServer, RELATIONS
+
+
+# Datos mínimos de Odoo: 2 facturas, 2 productos, 2 clientes, 1 orden
+FAKE_RECORDS = {
+    'account.move.line': [
+        {'id': 1, 'move_id': [10, 'F001-1'], 'partner_id': [100, 'Clínica A'], 'product_id': [1000, 'Producto X'],
+         'balance': -150.0, 'move_name': 'F001-1', 'quantity': 3, 'price_unit': 50.0, 'tax_ids': [7]},
+        {'id': 2, 'move_id': [11, 'F001-2'], 'partner_id': [101, 'Farmacia B'], 'product_id': [1001, 'Producto Y'],
+         'balance': -80.0, 'move_name': 'F001-2', 'quantity': 1, 'price_unit': 80.0, 'tax_ids': [8]},
+    ],
+    'account.move': [
+        {'id': 10, 'name': 'F001-1', 'team_id': [5, 'AGROVET'], 'invoice_user_id': [3, 'Ana'],
+         'invoice_date': '2026-01-15', 'order_id': [500, 'S0500'], 'state': 'posted'},
+        {'id': 11, 'name': 'F001-2', 'team_id': [5, 'AGROVET'], 'invoice_user_id': [3, 'Ana'],
+         'invoice_date': '2026-01-16', 'order_id': False, 'state': 'posted'},
+    ],
+    'product.product': [
+        {'id': 1000, 'name': 'Producto X', 'default_code': 'PX', 'commercial_line_national_id': [2, 'PETMEDICA'],
+         'product_life_cycle': 'nuevo'},
+        {'id': 1001, 'name': 'Producto Y', 'default_code': 'PY', 'commercial_line_national_id': [3, 'AVIVET'],
+         'product_life_cycle': False},
+    ],
+    'res.partner': [
+        {'id': 100, 'name': 'Clínica A', 'vat': '20111111111'},
+        {'id': 101, 'name': 'Farmacia B', 'vat': '20222222222'},
+    ],
+    'account.tax': [
+        {'id': 7, 'name': 'IGV'},
+        {'id': 8, 'name': 'EXO'},
+    ],
+    'crm.team': [
+        {'id': 5, 'name': 'AGROVET'},
+    ],
+    'product.commercial.line': [
+        {'id': 2, 'name': 'PETMEDICA'},
+        {'id': 3, 'name': 'AVIVET'},
+    ],
+    'sale.order': [
+        {'id': 500, 'name': 'S0500', 'delivery_observations': 'Entregar en almacén'},
+    ],
+    'sale.order.line': [
+        {'id': 900, 'order_id': [500, 'S0500'], 'product_id': [1000, 'Producto X'], 'route_id': [18, 'Vencimiento']},
+    ],
+}
+
+
+class FakeObjectProxy:
+    """Proxy XML-RPC falso que registra qué hilo atiende cada modelo"""
+
+    calls = []
+    lock = threading.Lock()
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        with self.lock:
+            self.calls.append((model, id(self), threading.current_thread().name))
+        if method == 'fields_get':
+            return {f: {'type': 'many2one', 'relation': RELATIONS[f]} for f in args[0]}
+        return [dict(r) for r in FAKE_RECORDS[model]]
+
+
+class SingleThreadProxy(FakeObjectProxy):
+    """Como xmlrpc.client.ServerProxy: falla si dos hilos lo usan a la vez"""
+
+    def __init__(self):
+        self.busy = threading.Lock()
+
+    def execute_kw(self, *args, **kwargs):
+        if not self.busy.acquire(blocking=False):
+            raise http.client.CannotSendRequest('Request-sent')
+        try:
+            time.sleep(0.002)
+            return super().execute_kw(*args, **kwargs)
+        finally:
+            self.busy.release()
+
+
+class FakeCommonProxy:
+    def authenticate(self, db, username, password, context):
+        return 2
+
+
+def fake_server_proxy(url, allow_none=False):
+    return FakeCommonProxy() if url.endswith('/common') else FakeObjectProxy()
+
+
+@pytest.fixture
+def odoo_env(monkeypatch):
+    """Variables de entorno mínimas para conectar OdooManager"""
+    monkeypatch.setenv('ODOO_URL', 'https://test.odoo.com')
+    monkeypatch.setenv('ODOO_DB', 'test_db')
+    monkeypatch.setenv('ODOO_USER', 'test@example.com')
+    monkeypatch.setenv('ODOO_PASSWORD', 'test_password')
+    monkeypatch.setenv('SALES_CACHE_TTL_SECONDS', '0')
+    FakeObjectProxy.calls = []
+
+
+def build_manager(monkeypatch, parallel):
+    monkeypatch.setenv('ODOO_PARALLEL_FETCH', 'true' if parallel else 'false')
+    return OdooManager()
+
+
+class TestSalesLinesFetch:
+    """Suite de tests para get_sales_lines con consultas relacionadas"""
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_paralelo_y_secuencial_dan_el_mismo_resultado(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que ambos modos construyen exactamente las mismas líneas"""
+        parallel = build_manager(monkeypatch, parallel=True).get_sales_lines(date_from='2026-01-01')
+        sequential = build_manager(monkeypatch, parallel=False).get_sales_lines(date_from='2026-01-01')
+
+        assert parallel == sequential
+        # Solo se conserva la línea con IGV
+        assert len(parallel) == 1
+        line = parallel[0]
+        assert line['partner_name'] == 'Clínica A'
+        assert line['balance'] == 150.0
+        assert line['route_id'] == [18, 'Vencimiento']
+        assert line['order_name'] == 'S0500'
+        assert line['tax_id'] == 'IGV'
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_modo_paralelo_usa_proxy_por_hilo(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que las consultas relacionadas corren en hilos del pool con su propio proxy"""
+        om = build_manager(monkeypatch, parallel=True)
+        om.get_sales_lines(date_from='2026-01-01')
+
+        by_model = {model: (proxy_id, thread) for model, proxy_id, thread in FakeObjectProxy.calls}
+        assert by_model['account.move.line'][0] == id(om.models)
+        for model in ('account.move', 'product.product', 'res.partner', 'account.tax', 'sale.order'):
+            proxy_id, thread = by_model[model]
+            assert thread.startswith('odoo-fetch')
+            assert proxy_id != id(om.models)
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_modo_secuencial_usa_proxy_principal(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que con ODOO_PARALLEL_FETCH=false todo usa el proxy principal"""
+        om = build_manager(monkeypatch, parallel=False)
+        om.get_sales_lines(date_from='2026-01-01')
+
+        # 4 consultas para resolver los ids de los filtros de ventas + 7 de las líneas
+        assert len(FakeObjectProxy.calls) == 11
+        assert {proxy_id for _, proxy_id, _ in FakeObjectProxy.calls} == {id(om.models)}
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_error_en_consulta_relacionada_retorna_vacio(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que un error en un hilo del pool se propaga sin dejar consultas en curso"""
+        om = build_manager(monkeypatch, parallel=True)
+        om._sales_filter_ids()  # ids de los filtros de ventas ya resueltos
+        running = []
+
+        def execute_kw(db, uid, password, model, method, args, kwargs=None):
+            if model == 'account.move.line':
+                return [dict(r) for r in FAKE_RECORDS[model]]
+            if model == 'account.move':
+                raise RuntimeError('timeout')
+            with FakeObjectProxy.lock:
+                running.append(model)
+            time.sleep(0.05)
+            with FakeObjectProxy.lock:
+                running.remove(model)
+            return [dict(r) for r in FAKE_RECORDS[model]]
+
+        with patch.object(FakeObjectProxy, 'execute_kw', side_effect=execute_kw):
+            assert om.get_sales_lines(date_from='2026-01-01') == []
+            assert running == []
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_rango_cubierto_se_sirve_desde_almacen(self, mock_proxy, odoo_env, monkeypatch, tmp_path):
+        """Test que con el almacén fresco un mes cerrado no consulta Odoo"""
+        om = build_manager(monkeypatch, parallel=True)
+        om.sales_store = SalesLineStore(db_path=str(tmp_path / 'ventas.db'), start_date='2025-01-01')
+        om.sales_store.replace_moves([10], [{'move_id': [10, 'F001-1'], 'invoice_date': '2025-02-10', 'balance': 10.0}])
+        om.sales_store.mark_synced('2025-03-01 00:00:00')
+
+        lines = om.get_sales_lines(date_from='2025-02-01', date_to='2025-02-28')
+
+        assert [l['balance'] for l in lines] == [10.0]
+        assert FakeObjectProxy.calls == []
+        # Fuera del rango cubierto se consulta Odoo
+        om.get_sales_lines(date_from='2024-12-01', date_to='2024-12-31')
+        assert FakeObjectProxy.calls
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_formato_columnar(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que columnar=True retorna una SalesLinesTable con las mismas filas"""
+        om = build_manager(monkeypatch, parallel=False)
+        lines = om.get_sales_lines(date_from='2026-01-01')
+
+        table = om.get_sales_lines(date_from='2026-01-01', columnar=True)
+
+        assert isinstance(table, SalesLinesTable)
+        assert list(table) == lines
+        page, pagination = om.get_sales_lines(date_from='2026-01-01', columnar=True, page=1, per_page=10)
+        assert page == lines
+        assert pagination == {'page': 1, 'per_page': 10, 'total': 1, 'pages': 1}
+
+
+class TestConcurrentLoads:
+    """Suite de tests para cargas de Odoo simultáneas desde varios hilos"""
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy',
+           side_effect=lambda url, allow_none=False: FakeCommonProxy() if url.endswith('/common') else SingleThreadProxy())
+    def test_cargas_simultaneas_no_comparten_proxy(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que cargas de Odoo en paralelo (/dashboard_linea, exportaciones) usan un ServerProxy por hilo"""
+        om = build_manager(monkeypatch, parallel=False)
+        sellers, lines = om.get_all_sellers(), om.get_sales_lines(date_from='2026-01-01')
+        assert sellers and lines
+
+        executor = ThreadPoolExecutor(max_workers=4)
+        try:
+            for _ in range(10):
+                loader = ConcurrentLoader(executor=executor)
+                loader.submit('vendedores', om.get_all_sellers, required=True)
+                loader.submit('ventas', om.get_sales_lines, date_from='2026-01-01', required=True)
+                # Exportación en segundo plano: recorre iter_sales_lines en otro hilo
+                loader.submit('exportacion', lambda: [l for page in om.iter_sales_lines(date_from='2026-01-01')
+                                                      for l in page], required=True)
+                assert om.get_all_sellers() == sellers
+                assert loader.results()['vendedores'] == sellers
+                assert loader.result('ventas') == lines
+                assert loader.result('exportacion') == lines
+        finally:
+            executor.shutdown(wait=True)
+
+        threads_by_proxy = {}
+        for _, proxy_id, thread in FakeObjectProxy.calls:
+            threads_by_proxy.setdefault(proxy_id, set()).add(thread)
+        assert all(len(threads) == 1 for threads in threads_by_proxy.values())
+
+
+class TestSalesLinesFetchJSONRPC:
+    """Suite de tests para get_sales_lines con JSON-RPC y batch contra un Odoo falso"""
+
+    def build_jsonrpc_manager(self, monkeypatch, server, batch=True):
+        monkeypatch.setenv('ODOO_URL', server.url)
+        monkeypatch.setenv('ODOO_RPC_PROTOCOL', 'jsonrpc')
+        monkeypatch.setenv('ODOO_RPC_BATCH', 'true' if batch else 'false')
+        return build_manager(monkeypatch, parallel=True)
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_batch_agrupa_consultas_relacionadas(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que facturas, productos, clientes e impuestos viajan en una sola petición"""
+        expected = build_manager(monkeypatch, parallel=False).get_sales_lines(date_from='2026-01-01')
+
+        with FakeOdooServer(FAKE_RECORDS) as server:
+            lines = self.build_jsonrpc_manager(monkeypatch, server).get_sales_lines(date_from='2026-01-01')
+
+        assert lines == expected
+        calls = server.object_calls()
+        assert calls[:9] == [
+            ('account.tax', 'search_read', 0),
+            ('crm.team', 'search_read', 0),
+            ('product.product', 'fields_get', 0),
+            ('product.commercial.line', 'search_read', 0),
+            ('account.move.line', 'search_read', 0),
+            ('account.move', 'search_read', 4),
+            ('product.product', 'search_read', 4),
+            ('res.partner', 'search_read', 4),
+            ('account.tax', 'search_read', 4),
+        ]
+        # Órdenes y líneas de orden van en etapas paralelas: su orden de llegada varía
+        assert sorted(calls[9:]) == [('sale.order', 'search_read', 0), ('sale.order.line', 'search_read', 0)]
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_servidor_sin_batch_vuelve_a_consultas_individuales(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que si Odoo rechaza el batch el resultado es el mismo y luego no se reintenta"""
+        expected = build_manager(monkeypatch, parallel=False).get_sales_lines(date_from='2026-01-01')
+
+        with FakeOdooServer(FAKE_RECORDS, batch=False) as server:
+            om = self.build_jsonrpc_manager(monkeypatch, server)
+            first = om.get_sales_lines(date_from='2026-01-01')
+            calls_first = len(server.object_calls())
+            second = om.get_sales_lines(date_from='2026-01-02')
+
+        assert first == second == expected
+        assert om.models.batch_supported is False
+        # Segunda consulta: llamadas individuales, ningún arreglo; productos,
+        # clientes e impuestos salen de la caché de datos maestros
+        assert sorted(server.object_calls()[calls_first:]) == [
+            ('account.move', 'search_read', 0),
+            ('account.move.line', 'search_read', 0),
+            ('sale.order', 'search_read', 0),
+            ('sale.order.line', 'search_read', 0),
+        ]
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_batch_desactivado(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que ODOO_RPC_BATCH=false usa las etapas en paralelo"""
+        with FakeOdooServer(FAKE_RECORDS) as server:
+            self.build_jsonrpc_manager(monkeypatch, server, batch=False).get_sales_lines(date_from='2026-01-01')
+
+        assert all(batch == 0 for _, _, batch in server.object_calls())
+        assert len(server.object_calls()) == 11
+
+
+class TestSalesLinesFieldProjection:
+    """Suite de tests para get_sales_lines(fields=...) y el plan de consultas relacionadas"""
+
+    def fetch(self, monkeypatch, **kwargs):
+        with FakeOdooServer(FAKE_RECORDS) as server:
+            monkeypatch.setenv('ODOO_URL', server.url)
+            monkeypatch.setenv('ODOO_RPC_PROTOCOL', 'jsonrpc')
+            om = build_manager(monkeypatch, parallel=True)
+            om._sales_filter_ids()  # ids de los filtros de ventas ya resueltos
+            calls = len(server.object_calls())
+            lines = om.get_sales_lines(date_from='2026-01-01', **kwargs)
+        return lines, {model for model, _, _ in server.object_calls()[calls:]}
+
+    def test_columnas_del_dashboard_omiten_orden_y_cliente(self, odoo_env, monkeypatch):
+        """Test que las columnas del DataFrame no consultan sale.order ni res.partner"""
+        full, _ = self.fetch(monkeypatch)
+        lines, models = self.fetch(monkeypatch, fields=FRAME_FIELDS)
+
+        assert models == {'account.move.line', 'account.move', 'product.product', 'account.tax', 'sale.order.line'}
+        assert lines == [{f: line[f] for f in FRAME_FIELDS} for line in full]
+        assert lines[0]['route_id'] == [18, 'Vencimiento']
+
+    def test_sin_route_id_no_consulta_lineas_de_orden(self, odoo_env, monkeypatch):
+        """Test que solo columnas de producto omiten facturas y órdenes"""
+        lines, models = self.fetch(monkeypatch, fields=['balance', 'commercial_line_national_id'])
+
+        assert models == {'account.move.line', 'product.product', 'account.tax'}
+        assert lines == [{'balance': 150.0, 'commercial_line_national_id': [2, 'PETMEDICA']}]
+
+    def test_sin_fields_plan_completo(self, odoo_env, monkeypatch):
+        """Test que sin fields (exportaciones) se consultan todos los modelos"""
+        lines, models = self.fetch(monkeypatch)
+
+        assert models == set(OdooManager.SALES_LINE_SOURCES)
+        assert lines[0]['order_name'] == 'S0500' and lines[0]['vat'] == '20111111111'
+
+    def test_columna_desconocida(self):
+        """Test que una columna inexistente se rechaza y el orden de fields no importa"""
+        with pytest.raises(ValueError, match='route'):
+            OdooManager._sales_fields(['balance', 'route'])
+        assert OdooManager._sales_fields(['name', 'balance', 'name']) == ('balance', 'name')
+
+
+def make_year_records(n_lines):
+    """Odoo falso con n líneas base: 3 por factura, 30 productos, 25 clientes, 1 orden cada 2 facturas"""
+    records = {model: [] for model in ('account.move.line', 'account.move', 'product.product', 'res.partner',
+                                       'sale.order', 'sale.order.line')}
+    records['account.tax'] = [{'id': 7, 'name': 'IGV'}]
+    for i in range(n_lines):
+        move, product, partner = i // 3 + 1, i % 30 + 1, i % 25 + 1
+        records['account.move.line'].append({
+            'id': i + 1, 'move_id': [move, f'F-{move}'], 'partner_id': [partner, f'Cliente {partner}'],
+            'product_id': [product, f'Producto {product}'], 'balance': -float(i + 1), 'move_name': f'F-{move}',
+            'quantity': 1, 'price_unit': float(i + 1), 'tax_ids': [7],
+        })
+    for move in range(1, n_lines // 3 + 2):
+        records['account.move'].append({
+            'id': move, 'name': f'F-{move}', 'invoice_date': '2025-06-01', 'team_id': [5, 'AGROVET'],
+            'order_id': [move // 2 + 1, f'S{move // 2 + 1}'] if move % 2 else False,
+        })
+    for product in range(1, 31):
+        records['product.product'].append({'id': product, 'name': f'Producto {product}', 'default_code': f'P{product}'})
+    for partner in range(1, 26):
+        records['res.partner'].append({'id': partner, 'name': f'Cliente {partner}', 'vat': str(partner)})
+    for order in range(1, n_lines // 6 + 2):
+        records['sale.order'].append({'id': order, 'name': f'S{order}'})
+        records['sale.order.line'].append({'id': order, 'order_id': [order, f'S{order}'],
+                                           'product_id': [1, 'Producto 1'], 'route_id': [18, 'Vencimiento']})
+    return records
+
+
+class TestSalesLinesChunkedFetch:
+    """Suite de tests para la consulta por páginas y trozos de ids (ODOO_BASE_PAGE_SIZE / ODOO_ID_CHUNK_SIZE)"""
+
+    def build(self, monkeypatch, server, page_size, chunk_size, batch=False):
+        monkeypatch.setenv('ODOO_URL', server.url)
+        monkeypatch.setenv('ODOO_RPC_PROTOCOL', 'jsonrpc')
+        monkeypatch.setenv('ODOO_RPC_BATCH', 'true' if batch else 'false')
+        monkeypatch.setenv('ODOO_BASE_PAGE_SIZE', str(page_size))
+        monkeypatch.setenv('ODOO_ID_CHUNK_SIZE', str(chunk_size))
+        return build_manager(monkeypatch, parallel=True)
+
+    def fetch(self, monkeypatch, page_size, chunk_size, batch=False, **kwargs):
+        with FakeOdooServer(make_year_records(120)) as server:
+            om = self.build(monkeypatch, server, page_size, chunk_size, batch)
+            return om.get_sales_lines(date_from='2025-01-01', **kwargs), server
+
+    def test_paginas_y_trozos_dan_el_mismo_resultado(self, odoo_env, monkeypatch):
+        """Test que paginar la base y partir los ids no cambia las líneas ni su orden"""
+        expected, _ = self.fetch(monkeypatch, page_size=0, chunk_size=0)
+        lines, server = self.fetch(monkeypatch, page_size=25, chunk_size=7)
+
+        assert len(expected) == 120
+        assert lines == expected
+        base_calls = [r['args'][1] for r in server.requests if r['model'] == 'account.move.line']
+        assert [(kw['offset'], kw['limit']) for kw in base_calls] == [(0, 25), (25, 25), (50, 25), (75, 25), (100, 25)]
+        assert all(kw['order'] == OdooManager.BASE_LINES_ORDER for kw in base_calls)
+        # Ningún ('id', 'in', ...) supera el tamaño de trozo
+        for r in server.requests:
+            if r['model'] in ('account.move', 'product.product', 'res.partner', 'sale.order'):
+                assert len(r['args'][0][0][0][2]) <= 7
+
+    def test_limit_se_respeta_entre_paginas(self, odoo_env, monkeypatch):
+        """Test que limit recorta igual que una sola consulta"""
+        expected, _ = self.fetch(monkeypatch, page_size=0, chunk_size=0, limit=60)
+        lines, server = self.fetch(monkeypatch, page_size=25, chunk_size=7, limit=60)
+
+        assert lines == expected
+        assert [r['args'][1]['limit'] for r in server.requests if r['model'] == 'account.move.line'] == [25, 25, 10]
+
+    def test_productos_y_clientes_se_consultan_una_vez(self, odoo_env, monkeypatch):
+        """Test que los datos maestros repetidos entre páginas no se vuelven a pedir"""
+        _, server = self.fetch(monkeypatch, page_size=25, chunk_size=1000)
+
+        requested = {'product.product': [], 'res.partner': [], 'account.tax': []}
+        for r in server.requests:
+            if r['model'] in requested and r['method'] == 'search_read' and r['args'][0][0][0][0] == 'id':
+                requested[r['model']].extend(r['args'][0][0][0][2])
+        assert len(requested['product.product']) == len(set(requested['product.product'])) == 30
+        assert len(requested['res.partner']) == len(set(requested['res.partner'])) == 25
+        assert requested['account.tax'] == [7]
+
+    def test_batch_envia_un_trozo_por_modelo(self, odoo_env, monkeypatch):
+        """Test que con batch cada petición lleva a lo sumo un trozo de cada modelo"""
+        expected, _ = self.fetch(monkeypatch, page_size=0, chunk_size=0)
+        lines, server = self.fetch(monkeypatch, page_size=0, chunk_size=7, batch=True)
+
+        assert lines == expected
+        batch_sizes = {r['batch'] for r in server.requests if r['batch']}
+        assert batch_sizes and max(batch_sizes) <= 4
+
+    def test_iter_sales_lines_entrega_paginas(self, odoo_env, monkeypatch):
+        """Test que iter_sales_lines entrega cada página combinada por separado"""
+        expected, _ = self.fetch(monkeypatch, page_size=0, chunk_size=0)
+
+        with FakeOdooServer(make_year_records(120)) as server:
+            om = self.build(monkeypatch, server, page_size=50, chunk_size=7)
+            chunks = list(om.iter_sales_lines(date_from='2025-01-01'))
+
+        assert [len(c) for c in chunks] == [50, 50, 20]
+        assert [line for chunk in chunks for line in chunk] == expected
+
+
+class TestSalesChangesFeed:
+    """Suite de tests para el feed incremental get_sales_changes"""
+
+    def records(self):
+        """30 líneas en 11 facturas (la 11 sin líneas); las facturas 1-4 comparten write_date"""
+        records = make_year_records(30)
+        for move in records['account.move']:
+            move.update({'move_type': 'out_invoice', 'state': 'posted',
+                         'write_date': f"2026-01-01 10:00:{max(move['id'], 4):02d}"})
+        return records
+
+    def build(self, monkeypatch, server):
+        monkeypatch.setenv('ODOO_URL', server.url)
+        monkeypatch.setenv('ODOO_RPC_PROTOCOL', 'jsonrpc')
+        monkeypatch.setenv('ODOO_RPC_BATCH', 'false')
+        return build_manager(monkeypatch, parallel=False)
+
+    def test_paginas_por_cursor_con_las_lineas_de_get_sales_lines(self, odoo_env, monkeypatch):
+        """Test que las páginas recorren todas las facturas una vez, con sus líneas combinadas"""
+        with FakeOdooServer(self.records()) as server:
+            om = self.build(monkeypatch, server)
+            expected = om.get_sales_lines(date_from='2025-01-01')
+            pages, after = [], None
+            while True:
+                page = om.get_sales_changes(after=after, limit=4)
+                pages.append(page)
+                after = page['next']
+                if not page['has_more']:
+                    break
+            feed_calls = [r['args'][1] for r in server.requests
+                          if r['model'] == 'account.move' and 'write_date' in r['args'][1].get('fields', [])]
+
+        moves = [move for page in pages for move in page['moves']]
+        assert [len(page['moves']) for page in pages] == [4, 4, 3]
+        assert [move['move_id'] for move in moves] == list(range(1, 12))
+        assert after == ('2026-01-01 10:00:11', 11)
+        assert [line for move in moves for line in move['lines']] == expected
+        assert moves[-1]['lines'] == []
+        assert all(kw['order'] == OdooManager.SALES_FEED_ORDER and kw['limit'] == 5 for kw in feed_calls)
+
+    def test_solo_entrega_lo_modificado_despues_del_cursor(self, odoo_env, monkeypatch):
+        """Test que con el último cursor solo llegan las facturas modificadas; una cancelada llega sin líneas"""
+        with FakeOdooServer(self.records()) as server:
+            om = self.build(monkeypatch, server)
+            after = om.get_sales_changes(limit=100)['next']
+
+            assert om.get_sales_changes(after=after, limit=100) == {'moves': [], 'next': after, 'has_more': False}
+
+            move = next(m for m in server.records['account.move'] if m['id'] == 2)
+            move.update({'state': 'cancel', 'write_date': '2026-01-02 08:00:00'})
+            page = om.get_sales_changes(after=after, limit=100)
+
+        assert [(m['move_id'], m['state'], m['lines']) for m in page['moves']] == [(2, 'cancel', [])]
+        assert page['next'] == ('2026-01-02 08:00:00', 2)
+
+    def test_fields_conserva_move_id(self, odoo_env, monkeypatch):
+        """Test que con fields las líneas traen move_id para agruparlas por factura"""
+        with FakeOdooServer(self.records()) as server:
+            page = self.build(monkeypatch, server).get_sales_changes(limit=1, fields=['balance'])
+
+        assert [sorted(line) for line in page['moves'][0]['lines']] == [['balance', 'move_id']] * 3
+
+
+class TestSalesLinesPage:
+    """Suite de tests para la paginación en el servidor de get_sales_lines_page"""
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_offset_limit_y_orden_se_envian_a_odoo(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que la página se pide a Odoo con offset/limit/order y total por search_count"""
+        om = build_manager(monkeypatch, parallel=False)
+        requests_seen = {}
+
+        def execute_kw(db, uid, password, model, method, args, kwargs=None):
+            requests_seen[(model, method)] = (args, kwargs)
+            if method == 'search_count':
+                return 1234
+            records = FAKE_RECORDS[model]
+            if model == 'account.move.line':
+                records = records[:1]  # Odoo solo devuelve la página
+            return [dict(r) for r in records]
+
+        om.models.execute_kw = execute_kw
+        page = om.get_sales_lines_page(offset=100, limit=25, order_by='balance', order_dir='asc',
+                                       date_from='2026-01-01', date_to='2026-01-31')
+
+        assert page['total'] == 1234
+        assert len(page['data']) == 1
+        args, kwargs = requests_seen[('account.move.line', 'search_read')]
+        assert kwargs['offset'] == 100
+        assert kwargs['limit'] == 25
+        # Saldo ascendente en pantalla = balance descendente en Odoo
+        assert kwargs['order'].startswith('balance desc')
+        assert ('tax_ids.name', 'in', ['IGV', 'IGV_INC']) in args[0]
+        count_args, _ = requests_seen[('account.move.line', 'search_count')]
+        assert count_args[0] == args[0]
+        # Relacionados solo para los ids de la página
+        move_args, _ = requests_seen[('account.move', 'search_read')]
+        assert move_args[0] == [('id', 'in', [10])]
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_columna_no_ordenable_usa_fecha(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que una columna desconocida ordena por fecha"""
+        om = build_manager(monkeypatch, parallel=False)
+        seen = {}
+
+        def execute_kw(db, uid, password, model, method, args, kwargs=None):
+            seen[(model, method)] = kwargs
+            return 0 if method == 'search_count' else []
+
+        om.models.execute_kw = execute_kw
+        page = om.get_sales_lines_page(order_by='route_id', order_dir='desc')
+
+        assert page == {'data': [], 'total': 0}
+        assert seen[('account.move.line', 'search_read')]['order'] == 'date desc, move_name desc, id desc'
+
+    @patch('src.odoo_manager.xmlrpc.client.ServerProxy', side_effect=fake_server_proxy)
+    def test_error_de_odoo_se_propaga(self, mock_proxy, odoo_env, monkeypatch):
+        """Test que un fallo de Odoo no se confunde con una página vacía (la ruta responde 502)"""
+        om = build_manager(monkeypatch, parallel=False)
+        om.models.execute_kw = MagicMock(side_effect=RuntimeError('timeout'))
+
+        with pytest.raises(RuntimeError):
+            om.get_sales_lines_page(date_from='2026-01-01')
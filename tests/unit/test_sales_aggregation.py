@@ -0,0 +1,167 @@
+"""
+Tests unitarios para src/sales_aggregation.py
+
+Tests del DataFrame tipado de líneas de venta y de los totales vectorizados
+de /dashboard y /dashboard_linea.
+"""
+
+import pytest
+
+from src.sales_aggregation import (
+    sales_lines_to_frame, add_dashboard_columns, dashboard_rows_to_frame, dashboard_totals, empty_linea_totals, linea_totals,
+    lineas_con_ventas, lineas_totals, monthly_series, trend_months, year_over_year
+)
+from tests.fake_odoo import make_sales_line
+
+
+def make_sale(linea='PETMEDICA', name='Producto X', balance=100.0, user=(7, 'Ana'), ciclo=False,
+              ruta=False, forma=None, canal='NACIONAL'):
+    """make_sales_line con línea comercial, vendedor, ruta, forma y canal por nombre (False si no tiene)"""
+    return make_sales_line(
+        name=name,
+        balance=balance,
+        commercial_line_national_id=[1, linea] if linea else False,
+        invoice_user_id=list(user) if user else False,
+        product_life_cycle=ciclo,
+        route_id=[ruta, 'Ruta'] if ruta else False,
+        pharmaceutical_forms_id=[1, forma] if forma else False,
+        sales_channel_id=[1, canal],
+    )
+
+
+SALES = [
+    make_sale(name='ATREVIA ONE MEDIUM', ciclo='nuevo', ruta=18, forma='Tableta'),
+    make_sale(name='ATREVIA ONE LARGE', balance=50.0, user=(8, 'Luis'), ciclo='nuevo'),
+    make_sale(name='Producto Y', balance=-20.0, user=None),
+    make_sale(linea='MARCA BLANCA', name='Genérico', balance=30.0, ruta=19),
+    make_sale(linea='VENTA INTERNACIONAL', name='Export', balance=999.0),
+    make_sale(name='Canal export', balance=500.0, canal='VENTA INTERNACIONAL'),
+    make_sale(name='Producto X', balance=10.0, user=(7, 'Ana María')),
+]
+
+
+class TestSalesLinesToFrame:
+    """Suite de tests para sales_lines_to_frame"""
+
+    def test_tipos_y_exclusion_internacional(self):
+        """Test que se excluyen exportaciones y las columnas son categóricas"""
+        df = sales_lines_to_frame(SALES)
+
+        assert len(df) == 5
+        assert df['balance'].dtype == 'float64'
+        for col in ('linea', 'producto', 'ciclo_vida', 'forma', 'vendedor_id', 'vendedor_nombre'):
+            assert df[col].dtype == 'category'
+        assert list(df['linea']) == ['PETMEDICA', 'PETMEDICA', 'PETMEDICA', 'TERCEROS', 'PETMEDICA']
+        assert df['producto'].iloc[0] == 'ATREVIA ONE'
+        assert df['forma'].iloc[1] == 'Instrumental'
+
+    def test_lista_vacia(self):
+        """Test que sin ventas se obtiene un DataFrame vacío con las columnas"""
+        df = sales_lines_to_frame([])
+
+        assert df.empty
+        assert dashboard_totals(add_dashboard_columns(df))['ventas_por_linea'] == {}
+        assert linea_totals(df, 'PETMEDICA')['ventas_por_vendedor'] == {}
+        assert lineas_con_ventas(df) == []
+
+
+class TestDashboardTotals:
+    """Suite de tests para dashboard_totals"""
+
+    def test_totales_por_linea_ruta_ipn_y_ecommerce(self):
+        """Test que los totales coinciden con los del bucle original de /dashboard"""
+        totals = dashboard_totals(add_dashboard_columns(sales_lines_to_frame(SALES), ecommerce_user_ids=[8]))
+
+        assert totals['ventas_por_linea'] == {'PETMEDICA': 140.0, 'TERCEROS': 30.0}
+        assert totals['ventas_por_ruta'] == {'PETMEDICA': 100.0, 'TERCEROS': 30.0}
+        assert totals['ventas_ipn_por_linea'] == {'PETMEDICA': 150.0}
+        # TERCEROS no participa del Top de productos
+        assert totals['ventas_por_producto'] == {'ATREVIA ONE': 150.0, 'Producto Y': -20.0, 'Producto X': 10.0}
+        assert totals['ciclo_vida_por_producto'] == {'ATREVIA ONE': 'nuevo', 'Producto Y': None, 'Producto X': None}
+        assert totals['ventas_por_ciclo_vida'] == {'nuevo': 150.0, 'No definido': 20.0}
+        assert totals['ventas_por_linea_ecommerce'] == {'PETMEDICA': 50.0}
+
+    def test_producto_con_saldo_neto_cero(self):
+        """Test que un producto agrupado con saldo neto 0 conserva su vencimiento y ecommerce"""
+        rows = [
+            {'linea': 'PETMEDICA', 'producto': 'A', 'ciclo_vida': 'nuevo', 'balance': 100.0,
+             'vencimiento': 100.0, 'ecommerce': 0.0},
+            # venta con ruta 18 de 40 y nota de crédito sin ruta de 40
+            {'linea': 'PETMEDICA', 'producto': 'B', 'ciclo_vida': False, 'balance': 0.0,
+             'vencimiento': 40.0, 'ecommerce': 40.0},
+        ]
+        totals = dashboard_totals(dashboard_rows_to_frame(rows))
+
+        assert totals['ventas_por_linea'] == {'PETMEDICA': 100.0}
+        assert totals['ventas_por_ruta'] == {'PETMEDICA': 140.0}
+        assert totals['ventas_por_linea_ecommerce'] == {'PETMEDICA': 40.0}
+        assert totals['ventas_por_producto'] == {'A': 100.0}
+
+
+class TestLineaTotals:
+    """Suite de tests para linea_totals"""
+
+    def test_totales_por_vendedor(self):
+        """Test de ventas, IPN y vencimiento por vendedor y ajustes sin vendedor"""
+        totals = linea_totals(sales_lines_to_frame(SALES), 'petmedica')
+
+        assert totals['ventas_por_vendedor'] == {'7': 110.0, '8': 50.0}
+        assert totals['ventas_ipn_por_vendedor'] == {'7': 100.0, '8': 50.0}
+        assert totals['ventas_vencimiento_por_vendedor'] == {'7': 100.0}
+        # Se conserva el último nombre visto del vendedor
+        assert totals['nombres_vendedores'] == {'7': 'Ana María', '8': 'Luis'}
+        assert totals['ajustes_sin_vendedor'] == pytest.approx(-20.0)
+
+    def test_graficos_de_la_linea(self):
+        """Test de productos, ciclo de vida y forma farmacéutica de la línea"""
+        totals = linea_totals(sales_lines_to_frame(SALES), 'PETMEDICA')
+
+        assert totals['ventas_por_producto'] == {'ATREVIA ONE': 150.0, 'Producto Y': -20.0, 'Producto X': 10.0}
+        assert totals['ventas_por_ciclo_vida'] == {'nuevo': 150.0, 'No definido': -10.0}
+        assert totals['ventas_por_forma'] == {'Tableta': 100.0, 'Instrumental': 40.0}
+
+    def test_lineas_con_ventas(self):
+        """Test que se listan las líneas normalizadas en orden de aparición"""
+        assert lineas_con_ventas(sales_lines_to_frame(SALES)) == ['PETMEDICA', 'TERCEROS']
+
+    def test_todas_las_lineas_en_una_pasada(self):
+        """Test que lineas_totals da para cada línea lo mismo (y en el mismo orden) que linea_totals"""
+        df = sales_lines_to_frame(SALES)
+        todas = lineas_totals(df)
+
+        assert list(todas) == ['PETMEDICA', 'TERCEROS']
+        for linea, totals in todas.items():
+            esperado = linea_totals(df, linea)
+            assert {k: list(v.items()) if isinstance(v, dict) else v for k, v in totals.items()} == \
+                {k: list(v.items()) if isinstance(v, dict) else v for k, v in esperado.items()}
+        assert lineas_totals(sales_lines_to_frame([])) == {}
+        assert linea_totals(df, 'AGROVET') == empty_linea_totals()
+
+
+class TestMonthlySeries:
+    """Suite de tests para las series mensuales"""
+
+    def test_meses_de_la_tendencia(self):
+        """Test que los meses terminan en el mes de la fecha final y cruzan el año"""
+        assert trend_months('2026-02-15', 4) == ['2025-11', '2025-12', '2026-01', '2026-02']
+
+    def test_series_por_mes(self):
+        """Test de total, IPN, líneas y vendedores alineados con los meses (meses sin ventas en 0)"""
+        rows = [
+            dict(make_sale(ciclo='nuevo'), month='2026-01'),
+            dict(make_sale(linea='GENVET', balance=30.0, user=(8, 'Luis')), month='2026-01'),
+            dict(make_sale(balance=-20.0, user=None), month='2026-03'),
+            dict(make_sale(balance=5.0), month='2025-12'),  # fuera de la serie
+        ]
+
+        series = monthly_series(rows, ['2026-01', '2026-02', '2026-03'])
+
+        assert series['total'] == [130.0, 0.0, -20.0]
+        assert series['ipn'] == [100.0, 0.0, 0.0]
+        assert series['por_linea'] == {'PETMEDICA': [100.0, 0.0, -20.0], 'TERCEROS': [30.0, 0.0, 0.0]}
+        assert series['por_vendedor'] == {'7': [100.0, 0.0, 0.0], '8': [30.0, 0.0, 0.0]}
+        assert series['nombres_vendedores'] == {'7': 'Ana', '8': 'Luis'}
+
+    def test_variacion_interanual(self):
+        """Test de la variación porcentual contra el año anterior"""
+        assert year_over_year([120.0, 50.0, 10.0], [100.0, 0.0, -20.0]) == [20.0, None, 150.0]
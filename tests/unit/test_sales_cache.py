@@ -0,0 +1,131 @@
+"""
+Tests unitarios para SalesLinesCache
+
+Tests del TTL, desalojo LRU por memoria y deduplicación de consultas concurrentes.
+"""
+
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.sales_cache import SalesLinesCache, estimate_size
+
+
+class TestSalesLinesCache:
+    """Suite de tests para SalesLinesCache"""
+
+    @pytest.fixture
+    def cache(self):
+        """Caché con TTL corto y límite amplio"""
+        return SalesLinesCache(ttl_seconds=60, max_bytes=10 * 1024 * 1024, name='test')
+
+    def test_hit_devuelve_valor_sin_recargar(self, cache):
+        """Test que una segunda petición con la misma clave no llama al cargador"""
+        loader = MagicMock(return_value=[{'id': 1}])
+
+        first = cache.get_or_load(('2026-01-01',), loader)
+        second = cache.get_or_load(('2026-01-01',), loader)
+
+        assert first == second == [{'id': 1}]
+        loader.assert_called_once()
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_ratio'] == 0.5
+
+    def test_entrada_expira_tras_ttl(self, cache):
+        """Test que una entrada vencida se vuelve a cargar"""
+        loader = MagicMock(side_effect=[['a'], ['b']])
+
+        with patch('src.sales_cache.time.monotonic', return_value=1000.0):
+            assert cache.get_or_load('k', loader) == ['a']
+        with patch('src.sales_cache.time.monotonic', return_value=1061.0):
+            assert cache.get_or_load('k', loader) == ['b']
+
+        assert loader.call_count == 2
+        assert cache.stats()['expirations'] == 1
+
+    def test_desalojo_lru_por_tamano(self):
+        """Test que se desaloja la entrada menos usada al superar el límite de memoria"""
+        row = [{'name': 'x' * 1000}]
+        size = estimate_size(row)
+        cache = SalesLinesCache(ttl_seconds=60, max_bytes=int(size * 2.5))
+
+        cache.get_or_load('a', lambda: list(row))
+        cache.get_or_load('b', lambda: list(row))
+        cache.get_or_load('a', lambda: list(row))  # 'a' pasa a ser la más reciente
+        cache.get_or_load('c', lambda: list(row))
+
+        loader_b = MagicMock(return_value=list(row))
+        cache.get_or_load('b', loader_b)
+
+        loader_b.assert_called_once()
+        assert cache.stats()['evictions'] >= 1
+
+    def test_resultado_mayor_al_limite_no_se_almacena(self):
+        """Test que un resultado más grande que la caché no se guarda"""
+        cache = SalesLinesCache(ttl_seconds=60, max_bytes=100)
+        loader = MagicMock(return_value=[{'name': 'x' * 1000}])
+
+        cache.get_or_load('k', loader)
+        cache.get_or_load('k', loader)
+
+        assert loader.call_count == 2
+        assert cache.stats()['entries'] == 0
+
+    def test_peticiones_concurrentes_comparten_una_consulta(self, cache):
+        """Test que varios hilos con la misma clave disparan una sola consulta"""
+        calls = []
+        release = threading.Event()
+
+        def slow_loader():
+            calls.append(1)
+            release.wait(timeout=5)
+            return ['resultado']
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load('k', slow_loader)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join(timeout=5)
+
+        assert len(calls) == 1
+        assert results == [['resultado']] * 8
+        assert cache.stats()['shared_in_flight'] == 7
+
+    def test_errores_no_se_cachean(self, cache):
+        """Test que un error del cargador se propaga y no queda almacenado"""
+        loader = MagicMock(side_effect=[RuntimeError('Odoo caído'), ['ok']])
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load('k', loader)
+        assert cache.get_or_load('k', loader) == ['ok']
+        assert cache.stats()['in_flight'] == 0
+
+    def test_ttl_cero_desactiva_cache(self):
+        """Test que con TTL 0 siempre se consulta al cargador"""
+        cache = SalesLinesCache(ttl_seconds=0)
+        loader = MagicMock(return_value=[])
+
+        cache.get_or_load('k', loader)
+        cache.get_or_load('k', loader)
+
+        assert loader.call_count == 2
+        assert cache.stats()['enabled'] is False
+
+    def test_invalidate_con_predicado(self, cache):
+        """Test que invalidate elimina solo las claves que cumplen el predicado"""
+        cache.get_or_load(('2026-01-01', 1), lambda: ['a'])
+        cache.get_or_load(('2026-02-01', 1), lambda: ['b'])
+
+        cache.invalidate(lambda key: key[0].startswith('2026-01'))
+
+        assert cache.stats()['entries'] == 1
@@ -0,0 +1,119 @@
+"""
+Tests unitarios para SalesLinesTable
+
+Tests de la representación columnar de las líneas de venta.
+"""
+
+import sys
+
+import pytest
+
+from src.sales_cache import estimate_size
+from src.sales_columns import SalesLinesTable
+from src.sales_aggregation import sales_lines_to_frame, linea_totals
+
+
+def make_line(i):
+    """Línea de venta con many2one repetidos, textos y numéricos"""
+    return {
+        'sales_channel_id': [5, 'AGROVET'],
+        'commercial_line_national_id': [2, 'PETMEDICA'] if i % 2 else [3, 'AVIVET'],
+        'invoice_user_id': [i % 4 + 1, f'Vendedor {i % 4 + 1}'],
+        'partner_name': f'Cliente {i % 10}',
+        'move_name': f'F001-{i // 3}',
+        'move_ref': False,
+        'invoice_date': '2026-01-15',
+        'route_id': [18, 'Vencimiento'] if i % 5 == 0 else False,
+        'order_user_id': None,
+        'balance': float(i),
+        'quantity': i % 3,
+        'price_unit': None,
+        'product_life_cycle': 'nuevo' if i % 3 == 0 else False,
+    }
+
+
+LINES = [make_line(i) for i in range(50)]
+
+
+class TestSalesLinesTable:
+    """Suite de tests para SalesLinesTable"""
+
+    def test_iteracion_reconstruye_los_dicts(self):
+        """Test que iterar, indexar y cortar entregan las filas originales"""
+        table = SalesLinesTable.from_records(LINES)
+
+        assert len(table) == 50
+        assert list(table) == LINES
+        assert table.to_records() == LINES
+        assert table[3] == LINES[3]
+        assert table[-1] == LINES[-1]
+        assert table[10:20] == LINES[10:20]
+        assert table[::10] == LINES[::10]
+        with pytest.raises(IndexError):
+            table[50]
+
+    def test_vacios_y_tipos_se_conservan(self):
+        """Test que se distinguen False, None y 0 en cada tipo de columna"""
+        lines = [
+            {'a': 0, 'b': False, 'c': None, 'd': [1, 'X'], 'balance': 0.0},
+            {'a': False, 'b': 0, 'c': 1, 'd': None, 'balance': None},
+            {'a': True, 'b': 1, 'c': None, 'd': False, 'balance': 2.5},
+        ]
+        table = SalesLinesTable.from_records(lines)
+
+        assert table.to_records() == lines
+        assert [type(v) for v in table.column('a')] == [int, bool, bool]
+
+    def test_filas_son_independientes(self):
+        """Test que modificar una fila entregada no altera la tabla"""
+        table = SalesLinesTable.from_records(LINES)
+
+        row = table[1]
+        row['commercial_line_national_id'][1] = 'OTRA'
+        row['balance'] = -1
+
+        assert table[1] == LINES[1]
+
+    def test_columnas_no_codificables_y_claves_ausentes(self):
+        """Test que listas arbitrarias se guardan tal cual y las claves faltantes son None"""
+        lines = [{'tax_ids': [1, 2, 3]}, {'tax_ids': [4], 'extra': 'x'}]
+        table = SalesLinesTable.from_records(lines)
+
+        assert table.to_records() == [{'tax_ids': [1, 2, 3], 'extra': None}, {'tax_ids': [4], 'extra': 'x'}]
+
+    def test_columnas_numericas(self):
+        """Test de acceso por columna y columna numérica como array"""
+        table = SalesLinesTable.from_records(LINES)
+
+        assert sum(table.numeric('balance')) == sum(l['balance'] for l in LINES)
+        assert table.column('partner_name') == [l['partner_name'] for l in LINES]
+        with pytest.raises(KeyError):
+            table.numeric('partner_name')
+
+    def test_reporte_de_memoria(self):
+        """Test que la tabla ocupa menos que la lista de dicts y se mide con getsizeof"""
+        lines = [make_line(i) for i in range(2000)]
+        table = SalesLinesTable.from_records(lines)
+
+        report = table.memory_report()
+
+        assert report['rows'] == 2000
+        assert report['columnar_bytes'] < report['dict_bytes'] / 5
+        assert report['columnar_bytes_per_10k'] == report['columnar_bytes'] * 5
+        # La caché de get_sales_lines mide la tabla completa
+        assert estimate_size(table) == sys.getsizeof(table) >= report['columnar_bytes']
+
+    def test_tabla_vacia(self):
+        """Test que una tabla sin filas se comporta como lista vacía"""
+        table = SalesLinesTable.from_records([])
+
+        assert len(table) == 0
+        assert list(table) == []
+        assert table.memory_report()['columnar_bytes_per_10k'] == 0
+
+    def test_agregacion_vectorizada_acepta_tabla(self):
+        """Test que sales_lines_to_frame lee las columnas de la tabla"""
+        table = SalesLinesTable.from_records(LINES)
+
+        assert linea_totals(sales_lines_to_frame(table), 'PETMEDICA') == \
+            linea_totals(sales_lines_to_frame(LINES), 'PETMEDICA')
@@ -0,0 +1,157 @@
+"""
+Tests unitarios para el cubo diario de ventas
+
+Compara los totales compuestos desde las celdas del cubo con los calculados
+sobre las líneas de detalle del almacén, y prueba su mantenimiento al
+reemplazar facturas.
+"""
+
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.odoo_manager import OdooManager
+from src.sales_aggregation import linea_totals, monthly_series, sales_lines_to_frame
+from src.sales_store import SalesLineStore
+
+
+SELLERS = [[7, 'Ana'], [8, 'Luis'], False]
+LINES = [[2, 'PETMEDICA'], [4, 'GENVET'], [9, 'VENTA INTERNACIONAL']]
+
+
+def make_lines(move_id, day, n=4):
+    """Líneas de una factura con vendedores, líneas y rutas variadas (ciclo y forma según el producto)"""
+    lines = []
+    for i in range(n):
+        k = move_id + i
+        lines.append({
+            'move_id': [move_id, f'F001-{move_id}'], 'move_name': f'F001-{move_id}', 'invoice_date': day,
+            'partner_id': [100 + k % 3, f'Cliente {k % 3}'], 'partner_name': f'Cliente {k % 3}',
+            'commercial_line_national_id': LINES[k % 3], 'name': f'PRODUCTO {k % 5}',
+            'product_id': [k % 5, f'[P{k % 5}] PRODUCTO {k % 5}'], 'default_code': f'P{k % 5}',
+            'product_life_cycle': 'nuevo' if k % 5 == 2 else False,
+            'pharmaceutical_forms_id': [1, 'TABLETA'] if k % 5 < 3 else False,
+            'invoice_user_id': SELLERS[k % 3], 'route_id': [18, 'Venc'] if k % 6 == 0 else False,
+            'sales_channel_id': [1, 'NACIONAL'], 'balance': -25.5 if k % 7 == 0 else 10.0 * (k % 9 + 1),
+            'quantity': k % 4 + 1,
+        })
+    return lines
+
+
+def month_lines():
+    """Facturas 1..30 del 2026-03-01 al 2026-03-10"""
+    return {m: make_lines(m, f'2026-03-{(m - 1) // 3 + 1:02d}') for m in range(1, 31)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SalesLineStore(db_path=str(tmp_path / 'ventas.db'), start_date='2026-01-01')
+    moves = month_lines()
+    store.replace_moves(list(moves), [l for m in moves.values() for l in m])
+    store.mark_synced('2026-03-11 00:00:00')
+    return store
+
+
+def rounded(value):
+    if isinstance(value, dict):
+        return {k: rounded(v) for k, v in value.items()}
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+class TestSalesCube:
+    """Suite de tests para las tablas del cubo en SalesLineStore"""
+
+    def test_totales_del_mes_coinciden_con_el_detalle(self, store):
+        """Test que los totales del dashboard y de una línea son los mismos con celdas o líneas"""
+        lines = store.query(date_from='2026-03-01', date_to='2026-03-31')
+        cells = store.query_cube('2026-03-01', '2026-03-31')
+
+        assert len(cells) < len(lines)
+        assert rounded(OdooManager.aggregate_dashboard_lines(cells, ['7'])) == \
+            rounded(OdooManager.aggregate_dashboard_lines(lines, ['7']))
+        assert rounded(linea_totals(sales_lines_to_frame(cells), 'PETMEDICA')) == \
+            rounded(linea_totals(sales_lines_to_frame(lines), 'PETMEDICA'))
+
+    def test_rango_hasta_dia_fin(self, store):
+        """Test que un rango parcial suma solo las celdas de sus días"""
+        lines = store.query(date_from='2026-03-01', date_to='2026-03-04', linea_id=2)
+        cells = store.query_cube('2026-03-01', '2026-03-04', linea_id=2)
+
+        assert sum(c['lines'] for c in cells) == len(lines)
+        assert sum(c['balance'] for c in cells) == pytest.approx(sum(l['balance'] for l in lines))
+        assert sum(c['abs_balance'] for c in cells) == pytest.approx(sum(abs(l['balance']) for l in lines))
+
+    def test_reemplazar_facturas_actualiza_los_dias_afectados(self, store):
+        """Test que mover una factura de día y cancelar otra recalcula solo esas celdas"""
+        moved = [dict(l, invoice_date='2026-03-09') for l in make_lines(1, '2026-03-09')]
+        store.replace_moves([1, 2], moved)
+
+        day1 = store.query_cube('2026-03-01', '2026-03-01')
+        assert sum(c['lines'] for c in day1) == 4  # solo queda la factura 3
+        lines = store.query(date_from='2026-03-01', date_to='2026-03-31')
+        cells = store.query_cube('2026-03-01', '2026-03-31')
+        assert sum(c['lines'] for c in cells) == len(lines)
+        assert sum(c['balance'] for c in cells) == pytest.approx(sum(l['balance'] for l in lines))
+
+    def test_almacen_anterior_al_cubo_se_reconstruye(self, store):
+        """Test que al abrir un almacén sin cubo (o de otra versión) se arma desde las líneas"""
+        with sqlite3.connect(store.db_path) as conn:
+            conn.execute("DELETE FROM sales_cube")
+            conn.execute("DELETE FROM sync_state WHERE key = 'cube_version'")
+
+        reopened = SalesLineStore(db_path=store.db_path, start_date='2026-01-01')
+
+        assert sum(c['lines'] for c in reopened.query_cube('2026-03-01', '2026-03-31')) == 120
+        assert reopened.stats()['cube_cells'] > 0
+
+
+class TestOdooManagerCube:
+    """Suite de tests para los dashboards servidos desde el cubo"""
+
+    @pytest.fixture
+    def om(self, store):
+        manager = OdooManager.__new__(OdooManager)
+        manager.db, manager.uid, manager.password = 'test_db', 2, 'pwd'
+        manager.models = MagicMock()
+        manager.sales_store = store
+        return manager
+
+    def test_agregados_del_dashboard_sin_consultar_odoo(self, om, store):
+        """Test que get_dashboard_aggregates compone el mes desde el cubo"""
+        result = om.get_dashboard_aggregates('2026-03-01', '2026-03-31', ecommerce_user_ids=['8'])
+
+        lines = store.query(date_from='2026-03-01', date_to='2026-03-31')
+        assert rounded(result) == rounded(OdooManager.aggregate_dashboard_lines(lines, ['8']))
+        om.models.execute_kw.assert_not_called()
+
+    def test_datos_del_dashboard_de_ventas(self, om, store):
+        """Test que get_sales_dashboard_data suma valores absolutos sin VENTA INTERNACIONAL"""
+        data = om.get_sales_dashboard_data('2026-03-01', '2026-03-10')
+
+        national = [l for l in store.query(date_from='2026-03-01', date_to='2026-03-10')
+                    if not OdooManager._is_international_line(l)]
+        assert data['total_lines'] == len(national)
+        assert data['total_sales'] == pytest.approx(sum(abs(l['balance']) for l in national))
+        assert sum(c[1]['sales'] for c in data['top_clients']) == pytest.approx(data['total_sales'])
+        assert 'VENTA INTERNACIONAL' not in [l['name'] for l in data['commercial_lines']]
+        assert data['sales_by_month'] == [('2026-03', {'sales': pytest.approx(data['total_sales']),
+                                                       'quantity': data['total_quantity']})]
+        om.models.execute_kw.assert_not_called()
+
+    def test_series_mensuales_desde_el_cubo(self, om, store):
+        """Test que get_sales_by_month suma las celdas por mes igual que las líneas de detalle"""
+        series = om.get_sales_by_month('2026-02-01', '2026-03-31')
+
+        national = [dict(l, month=l['invoice_date'][:7])
+                    for l in store.query(date_from='2026-02-01', date_to='2026-03-31')
+                    if not OdooManager._is_international_line(l)]
+        assert rounded(series) == rounded(monthly_series(national, ['2026-02', '2026-03']))
+        assert series['total'][0] == 0.0
+        om.models.execute_kw.assert_not_called()
+
+    def test_rango_no_cubierto_usa_odoo(self, om):
+        """Test que fuera del rango del almacén no se usa el cubo"""
+        assert om.get_daily_cube_rows('2025-06-01', '2025-06-30') is None
@@ -0,0 +1,49 @@
+"""
+Tests unitarios para src/sales_feed.py
+
+Tests del cursor opaco y del NDJSON del feed incremental de ventas.
+"""
+
+import json
+
+import pytest
+
+from src import sales_feed
+from src.sales_feed import decode_cursor, encode_cursor, iter_changes_ndjson
+
+
+class TestSalesFeed:
+    """Suite de tests para el cursor y el formato del feed"""
+
+    def test_cursor_ida_y_vuelta(self):
+        """Test que el cursor es opaco (URL-safe) y se decodifica al mismo par"""
+        cursor = encode_cursor('2026-03-05 14:22:01', 123456)
+
+        assert '2026' not in cursor and cursor.replace('-', '').replace('_', '').isalnum()
+        assert decode_cursor(cursor) == ('2026-03-05 14:22:01', 123456)
+        assert decode_cursor('') is None and decode_cursor(None) is None
+
+    @pytest.mark.parametrize('cursor', [
+        'no-es-base64!',
+        encode_cursor('2026-03-05', 1),
+        encode_cursor("2026-03-05 14:22:01' OR 1=1", 1),
+        encode_cursor('2026-03-05 14:22:01', -1),
+        encode_cursor('2026-03-05 14:22:01', True),
+    ])
+    def test_cursor_invalido(self, cursor):
+        """Test que un cursor manipulado o mal formado se rechaza"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_ndjson_una_factura_por_linea(self, monkeypatch):
+        """Test que cada factura es un objeto JSON con sus líneas, en trozos"""
+        monkeypatch.setattr(sales_feed, 'STREAM_CHUNK_BYTES', 200)
+        moves = [{'move_id': i, 'move_name': f'F001-{i}', 'state': 'posted',
+                  'lines': [{'partner_name': 'Clínica Ñaña', 'balance': 10.5}]} for i in range(5)]
+
+        chunks = list(iter_changes_ndjson(moves))
+        parsed = [json.loads(line) for line in b''.join(chunks).decode('utf-8').splitlines()]
+
+        assert len(chunks) > 1
+        assert parsed == moves
+        assert list(iter_changes_ndjson([])) == []
@@ -0,0 +1,144 @@
+"""
+Tests unitarios para los filtros de ventas compilados en el dominio de Odoo
+
+Compara, sobre un dataset fijo de respuestas de Odoo (tests/fixtures), las
+líneas filtradas en el servidor con el resultado de los filtros en Python que
+reemplazan (IGV al combinar y VENTA INTERNACIONAL en cada ruta).
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.odoo_manager import OdooManager
+from src.sales_store import SalesLineStore
+from tests.fake_odoo import FakeOdooServer
+
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'odoo_ventas_enero_2026.json')
+
+
+def load_dataset():
+    with open(DATASET, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def legacy_national_filter(sales_data):
+    """Filtro que hacían /dashboard_linea y las exportaciones sobre cada línea"""
+    filtered = []
+    for sale in sales_data:
+        linea_comercial = sale.get('commercial_line_national_id')
+        if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
+            if 'VENTA INTERNACIONAL' in linea_comercial[1].upper():
+                continue
+        canal_ventas = sale.get('sales_channel_id')
+        if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
+            nombre_canal = canal_ventas[1].upper()
+            if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
+                continue
+        filtered.append(sale)
+    return filtered
+
+
+@pytest.fixture
+def server():
+    with FakeOdooServer(load_dataset()) as fake:
+        yield fake
+
+
+@pytest.fixture
+def om(server, monkeypatch):
+    monkeypatch.setenv('ODOO_URL', server.url)
+    monkeypatch.setenv('ODOO_DB', 'test_db')
+    monkeypatch.setenv('ODOO_USER', 'test@example.com')
+    monkeypatch.setenv('ODOO_PASSWORD', 'test_password')
+    monkeypatch.setenv('ODOO_RPC_PROTOCOL', 'jsonrpc')
+    monkeypatch.setenv('SALES_CACHE_TTL_SECONDS', '0')
+    monkeypatch.setenv('SALES_STORE_ENABLED', 'false')
+    return OdooManager()
+
+
+def legacy_sales_lines(om):
+    """Salida anterior: dominio sin reglas de negocio y filtros en Python"""
+    domain = om._build_sales_domain('2026-01-01', '2026-01-31')
+    return legacy_national_filter(om._fetch_sales_lines_by_domain(domain, limit=10000))
+
+
+def requested_move_ids(server, since=0):
+    return {i for r in server.requests[since:] if r['model'] == 'account.move' for i in r['args'][0][0][0][2]}
+
+
+class TestSalesFilterDomain:
+    """Suite de tests para _sales_filter_domain y get_sales_lines(national_only=True)"""
+
+    def test_ids_resueltos(self, om):
+        """Test que impuestos, líneas y canales se resuelven por nombre sin distinguir mayúsculas"""
+        assert om._sales_filter_ids() == {
+            'igv_tax_ids': [1, 2],
+            'international_line_ids': [22, 23],
+            'international_team_ids': [11, 12],
+        }
+        assert om._sales_filter_domain(national_only=True) == [
+            ('tax_ids', 'in', [1, 2]),
+            '|', ('product_id.commercial_line_national_id', '=', False),
+            ('product_id.commercial_line_national_id', 'not in', [22, 23]),
+            '|', ('move_id.team_id', '=', False),
+            ('move_id.team_id', 'not in', [11, 12]),
+        ]
+
+    def test_ids_se_resuelven_una_vez(self, om, server):
+        """Test que consultas sucesivas reutilizan los ids resueltos"""
+        om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31', national_only=True)
+        om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31')
+
+        assert [m for m, _, _ in server.object_calls()].count('crm.team') == 1
+
+    def test_coincide_con_filtros_en_python(self, om, server):
+        """Test que el dominio compilado da las mismas líneas que los filtros anteriores"""
+        expected = legacy_sales_lines(om)
+        calls = len(server.requests)
+
+        lines = om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31', national_only=True)
+
+        assert len(expected) > 10
+        assert lines == expected
+        # Las facturas excluidas ya no se consultan
+        assert requested_move_ids(server, calls) == {l['move_id'][0] for l in expected}
+
+    def test_sin_national_only_conserva_internacional(self, om):
+        """Test que sin national_only solo se aplica el filtro de IGV"""
+        lines = om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31')
+
+        assert any(OdooManager._is_international_line(l) for l in lines)
+        assert all(set(l['tax_id'].split(', ')) & {'IGV', 'IGV_INC'} for l in lines)
+        assert legacy_national_filter(lines) == om.get_sales_lines(
+            date_from='2026-01-01', date_to='2026-01-31', national_only=True
+        )
+
+    def test_sin_ids_filtra_por_nombre(self, om):
+        """Test que si no se pueden resolver los ids se usa el dominio por nombre con el mismo resultado"""
+        expected = legacy_sales_lines(om)
+
+        with patch.object(OdooManager, '_resolve_sales_filter_ids', side_effect=RuntimeError('sin acceso a crm.team')):
+            om._sales_filter_state = None
+            domain = om._sales_filter_domain(national_only=True)
+            lines = om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31', national_only=True)
+
+        assert domain[0] == ('tax_ids.name', 'in', ['IGV', 'IGV_INC'])
+        assert lines == expected
+
+    def test_almacen_local_excluye_internacional(self, om, tmp_path):
+        """Test que con el almacén local VENTA INTERNACIONAL se descarta antes del límite"""
+        lines = om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31')
+        om.sales_store = SalesLineStore(db_path=str(tmp_path / 'ventas.db'), start_date='2026-01-01')
+        om.sales_store.replace_moves(sorted({l['move_id'][0] for l in lines}), lines)
+        om.sales_store.mark_synced('2026-02-01 00:00:00')
+
+        national = om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31', national_only=True)
+        first = om.get_sales_lines(date_from='2026-01-01', date_to='2026-01-31', national_only=True, limit=3)
+
+        assert len(national) == len(legacy_national_filter(lines))
+        assert not any(OdooManager._is_international_line(l) for l in national)
+        assert first == national[:3]
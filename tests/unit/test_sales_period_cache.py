@@ -0,0 +1,181 @@
+"""
+Tests unitarios para la caché por periodos de las líneas de venta
+
+Tests de split_period, ClosedDaysWatcher y get_sales_lines con días cerrados
+en caché larga y días abiertos refrescados por separado, contra un Odoo falso.
+"""
+
+import copy
+import time
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from src.odoo_manager import OdooManager
+from src.sales_period_cache import ClosedDaysWatcher, split_period
+from tests.fake_odoo import FakeOdooServer
+from tests.unit.test_odoo_sales_fetch import FAKE_RECORDS
+
+
+TODAY = date(2026, 3, 18)
+
+
+class TestSplitPeriod:
+    """Suite de tests para split_period"""
+
+    def test_mes_en_curso(self):
+        """Test que el mes a la fecha se parte en días cerrados y ayer/hoy"""
+        assert split_period('2026-03-01', '2026-03-31', TODAY) == (
+            ('2026-03-01', '2026-03-16'), ('2026-03-17', '2026-03-31')
+        )
+
+    def test_rango_cerrado_o_abierto_completo(self):
+        """Test que un mes anterior es solo cerrado y hoy es solo abierto"""
+        assert split_period('2026-02-01', '2026-02-28', TODAY) == (('2026-02-01', '2026-02-28'), None)
+        assert split_period('2026-03-18', '2026-03-18', TODAY) == (None, ('2026-03-18', '2026-03-18'))
+
+    def test_rangos_sin_limite(self):
+        """Test que sin fecha final el tramo abierto no tiene fin y sin inicial el cerrado no tiene inicio"""
+        assert split_period('2026-03-10', None, TODAY) == (('2026-03-10', '2026-03-16'), ('2026-03-17', None))
+        assert split_period(None, '2026-03-17', TODAY, open_days=1) == (
+            (None, '2026-03-17'), None
+        )
+
+
+class TestClosedDaysWatcher:
+    """Suite de tests para ClosedDaysWatcher"""
+
+    def test_sin_marca_no_revisa(self):
+        """Test que no se revisa hasta que se cachea el primer tramo cerrado"""
+        watcher = ClosedDaysWatcher(check_interval_seconds=60)
+        with patch('src.sales_period_cache.time.monotonic', return_value=time.monotonic() + 120):
+            assert watcher.check_query() is None
+
+    def test_revision_al_vencer_el_intervalo(self):
+        """Test que la revisión pide facturas modificadas desde la marca, una vez por intervalo"""
+        watcher = ClosedDaysWatcher(check_interval_seconds=60)
+        watcher.ensure_watermark()
+        now = time.monotonic()
+        with patch('src.sales_period_cache.time.monotonic', return_value=now + 30):
+            assert watcher.check_query() is None
+        with patch('src.sales_period_cache.time.monotonic', return_value=now + 61):
+            query = watcher.check_query()
+            assert watcher.check_query() is None
+
+        assert query[0] == 'account.move'
+        assert query[2][0][-1] == ('write_date', '>=', watcher.stats()['watermark'])
+
+    def test_cambios_del_mismo_segundo_no_se_repiten(self):
+        """Test que una factura ya informada con la marca actual no vuelve a invalidar su día"""
+        watcher = ClosedDaysWatcher()
+        changes = [
+            {'id': 1, 'invoice_date': '2026-03-02', 'write_date': '2026-03-18 10:00:00'},
+            {'id': 2, 'invoice_date': '2026-03-05', 'write_date': '2026-03-18 09:00:00'},
+        ]
+
+        assert watcher.apply_changes(changes) == {'2026-03-02', '2026-03-05'}
+        assert watcher.apply_changes(changes[:1]) == set()
+        assert watcher.apply_changes([dict(changes[0], write_date='2026-03-18 11:00:00')]) == {'2026-03-02'}
+        stats = watcher.stats()
+        assert (stats['watermark'], stats['changed_moves']) == ('2026-03-18 11:00:00', 3)
+
+
+def period_records():
+    """FAKE_RECORDS con una factura de hace 10 días (cerrada) y otra de hoy (abierta)"""
+    records = copy.deepcopy(FAKE_RECORDS)
+    today = date.today()
+    records['account.move'][0]['invoice_date'] = (today - timedelta(days=10)).isoformat()
+    records['account.move'][1]['invoice_date'] = today.isoformat()
+    for move in records['account.move']:
+        move.update(move_type='out_invoice', write_date='2000-01-01 00:00:00')
+    records['account.move.line'][1]['tax_ids'] = [7]
+    return records
+
+
+def invoice_date_from(request):
+    """Fecha inicial (move_id.invoice_date >=) del dominio de una consulta de líneas base"""
+    return [v for f, op, v in (t for t in request['args'][0][0] if isinstance(t, list))
+            if f == 'move_id.invoice_date' and op == '>='][0]
+
+
+class TestSplitPeriodSalesLines:
+    """Suite de tests para get_sales_lines con días cerrados y abiertos en cachés separadas"""
+
+    @pytest.fixture
+    def server(self):
+        with FakeOdooServer(period_records()) as fake:
+            yield fake
+
+    @pytest.fixture
+    def om(self, server, monkeypatch):
+        monkeypatch.setenv('ODOO_URL', server.url)
+        monkeypatch.setenv('ODOO_DB', 'test_db')
+        monkeypatch.setenv('ODOO_USER', 'test@example.com')
+        monkeypatch.setenv('ODOO_PASSWORD', 'test_password')
+        monkeypatch.setenv('ODOO_RPC_PROTOCOL', 'jsonrpc')
+        monkeypatch.setenv('SALES_STORE_ENABLED', 'false')
+        monkeypatch.setenv('SALES_CACHE_TTL_SECONDS', '300')
+        # Resultado combinado sin caché: cada consulta vuelve a pedir los días abiertos
+        monkeypatch.setenv('SALES_OPEN_TTL_SECONDS', '0')
+        monkeypatch.setenv('SALES_CLOSED_DAYS_CHECK_SECONDS', '60')
+        return OdooManager()
+
+    def base_requests(self, server, since):
+        return [r for r in server.requests[since:] if r['model'] == 'account.move.line']
+
+    def test_refresco_solo_consulta_dias_abiertos(self, om, server):
+        """Test que el segundo refresco del mes solo pide a Odoo ayer y hoy"""
+        date_from = (date.today() - timedelta(days=20)).isoformat()
+        first = om.get_sales_lines(date_from=date_from)
+        calls = len(server.requests)
+        second = om.get_sales_lines(date_from=date_from)
+
+        assert [l['move_name'] for l in first] == ['F001-2', 'F001-1']
+        assert second == first
+        base = self.base_requests(server, calls)
+        assert [invoice_date_from(r) for r in base] == [(date.today() - timedelta(days=1)).isoformat()]
+        assert om.get_cache_stats()['sales_closed_days']['hits'] == 1
+
+    def test_factura_modificada_invalida_su_dia(self, om, server):
+        """Test que un cambio en una factura cerrada vuelve a consultar solo su tramo cerrado"""
+        date_from = (date.today() - timedelta(days=20)).isoformat()
+        om.get_sales_lines(date_from=date_from)
+
+        server.records['account.move.line'][0]['balance'] = -999.0
+        server.records['account.move'][0]['write_date'] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with patch('src.sales_period_cache.time.monotonic', return_value=time.monotonic() + 120):
+            lines = om.get_sales_lines(date_from=date_from)
+
+        assert [l['balance'] for l in lines] == [80.0, 999.0]
+        assert om.get_cache_stats()['sales_closed_days']['watcher']['last_invalidated_dates'] == [
+            server.records['account.move'][0]['invoice_date']
+        ]
+
+    def test_invalidar_dias_solo_descarta_consultas_que_los_cubren(self, om, server):
+        """Test que _invalidate_sales_days (sincronización del almacén) conserva los rangos de otros días"""
+        enero, febrero = ('2025-01-01', '2025-01-31'), ('2025-02-01', '2025-02-28')
+        om.get_sales_lines(date_from=enero[0], date_to=enero[1])
+        om.get_sales_lines(date_from=febrero[0], date_to=febrero[1])
+
+        om._invalidate_sales_days({'2025-01-15', None})
+        calls = len(server.requests)
+        om.get_sales_lines(date_from=febrero[0], date_to=febrero[1])
+        assert self.base_requests(server, calls) == []
+        om.get_sales_lines(date_from=enero[0], date_to=enero[1])
+        assert [invoice_date_from(r) for r in self.base_requests(server, calls)] == [enero[0]]
+
+    def test_limit_recorta_como_una_sola_consulta(self, om):
+        """Test que limit toma primero los días abiertos y completa con los cerrados"""
+        date_from = (date.today() - timedelta(days=20)).isoformat()
+
+        assert [l['move_name'] for l in om.get_sales_lines(date_from=date_from, limit=1)] == ['F001-2']
+        assert [l['move_name'] for l in om.get_sales_lines(date_from=date_from, limit=5)] == ['F001-2', 'F001-1']
+
+    def test_open_days_cero_desactiva_la_division(self, om, server):
+        """Test que SALES_OPEN_DAYS=0 consulta el rango completo en una sola consulta"""
+        om.sales_open_days = 0
+        date_from = (date.today() - timedelta(days=20)).isoformat()
+        om.get_sales_lines(date_from=date_from)
+
+        assert [invoice_date_from(r) for r in self.base_requests(server, 0)] == [date_from]
@@ -0,0 +1,190 @@
+"""
+Tests unitarios para SalesLineStore y SalesStoreSync
+
+Tests del almacén local de líneas de venta y su sincronización incremental.
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src import sales_store
+from src.sales_store import SalesLineStore, SalesStoreSync
+from tests.fake_odoo import make_sales_line
+
+
+class TestSalesLineStore:
+    """Suite de tests para SalesLineStore"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return SalesLineStore(db_path=str(tmp_path / 'ventas.db'), start_date='2025-01-01', max_age_seconds=60)
+
+    def test_replace_moves_y_query_con_filtros(self, store):
+        """Test que las consultas filtran por fecha, cliente, línea y búsqueda"""
+        store.replace_moves([10, 11, 12], [
+            make_sales_line(10, '2025-03-01'),
+            make_sales_line(11, '2025-03-15', partner_id=[101, 'Farmacia B']),
+            make_sales_line(12, '2025-04-01', commercial_line_national_id=[3, 'AVIVET'], name='Vacuna Z'),
+        ])
+
+        assert len(store.query(date_from='2025-03-01', date_to='2025-03-31')) == 2
+        assert [l['move_id'][0] for l in store.query(date_from='2025-01-01', partner_id=101)] == [11]
+        assert [l['move_id'][0] for l in store.query(date_from='2025-01-01', linea_id=3)] == [12]
+        assert [l['move_id'][0] for l in store.query(date_from='2025-01-01', search='VACUNA')] == [12]
+        # Más recientes primero y con límite
+        assert [l['move_id'][0] for l in store.query(date_from='2025-01-01', limit=2)] == [12, 11]
+
+    def test_replace_moves_elimina_lineas_anteriores(self, store):
+        """Test que re-sincronizar una factura reemplaza sus líneas"""
+        store.replace_moves([10], [make_sales_line(10, '2025-03-01'), make_sales_line(10, '2025-03-01')])
+        store.replace_moves([10], [])
+
+        assert store.query(date_from='2025-01-01') == []
+
+    def test_can_serve_requiere_cobertura_y_frescura(self, store):
+        """Test que solo se sirven rangos cubiertos tras una sincronización reciente"""
+        assert store.can_serve('2025-06-01') is False
+
+        store.mark_synced('2025-06-30 10:00:00')
+
+        assert store.can_serve('2025-06-01') is True
+        assert store.can_serve('2024-12-01') is False
+        assert store.can_serve(None) is False
+        with patch('src.sales_store.time.time', return_value=store_time_plus(store, 61)):
+            assert store.can_serve('2025-06-01') is False
+
+    def test_stats(self, store):
+        """Test que stats reporta filas y marca de agua"""
+        store.replace_moves([10], [make_sales_line(10, '2025-03-01')])
+        store.mark_synced('2025-03-01 08:00:00')
+
+        stats = store.stats()
+        assert stats['rows'] == 1
+        assert stats['watermark'] == '2025-03-01 08:00:00'
+        assert stats['fresh'] is True
+
+
+def store_time_plus(store, seconds):
+    return float(store.get_state('last_sync_at')) + seconds
+
+
+class TestSalesStoreSync:
+    """Suite de tests para SalesStoreSync"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return SalesLineStore(db_path=str(tmp_path / 'ventas.db'), start_date='2025-01-01')
+
+    @pytest.fixture
+    def odoo(self):
+        """OdooManager falso: facturas actuales por id y respuestas de write_date"""
+        odoo = MagicMock()
+        odoo.current_lines = {}
+        odoo._build_sales_domain.return_value = []
+        odoo._sales_filter_domain.return_value = []
+
+        def fetch_by_domain(domain, limit=None, models=None):
+            move_ids = domain[-1][2]
+            return [line for m in move_ids for line in odoo.current_lines.get(m, [])]
+
+        odoo._fetch_sales_lines_by_domain.side_effect = fetch_by_domain
+        return odoo
+
+    def set_changes(self, odoo, moves, lines):
+        odoo._worker_models.return_value.execute_kw.side_effect = (
+            lambda db, uid, pwd, model, method, args, kwargs: moves if model == 'account.move' else lines
+        )
+
+    def test_sync_inicial_y_cancelacion(self, store, odoo):
+        """Test que una factura cancelada desaparece en la siguiente sincronización"""
+        odoo.current_lines = {
+            10: [make_sales_line(10, '2025-03-01')],
+            11: [make_sales_line(11, '2025-03-02'), make_sales_line(11, '2025-03-02')],
+        }
+        self.set_changes(odoo,
+                         moves=[{'id': 10, 'write_date': '2025-03-01 09:00:00'},
+                                {'id': 11, 'write_date': '2025-03-02 09:00:00'}],
+                         lines=[{'move_id': [11, 'F001-11'], 'write_date': '2025-03-02 09:05:00'}])
+
+        result = SalesStoreSync(odoo, store).sync_once()
+
+        assert result['moves'] == 2
+        assert result['lines'] == 3
+        assert store.watermark == '2025-03-02 09:05:00'
+
+        # La factura 11 pasa a cancelada: ya no retorna líneas publicadas
+        odoo.current_lines[11] = []
+        self.set_changes(odoo, moves=[{'id': 11, 'write_date': '2025-03-05 12:00:00'}], lines=[])
+
+        result = SalesStoreSync(odoo, store).sync_once()
+
+        assert result['moves'] == 1
+        assert [l['move_id'][0] for l in store.query(date_from='2025-01-01')] == [10]
+        assert store.watermark == '2025-03-05 12:00:00'
+        # Se invalida el día que tenía la factura, aunque ya no tenga líneas
+        odoo._invalidate_sales_days.assert_called_with({'2025-03-02'})
+
+    def test_sync_invalida_dia_anterior_y_nuevo(self, store, odoo):
+        """Test que una factura que cambia de fecha invalida el día que tenía y el que tiene ahora"""
+        odoo.current_lines = {10: [make_sales_line(10, '2025-03-01')]}
+        self.set_changes(odoo, moves=[{'id': 10, 'write_date': '2025-03-01 09:00:00'}], lines=[])
+        SalesStoreSync(odoo, store).sync_once()
+
+        odoo.current_lines = {10: [make_sales_line(10, '2025-03-04')]}
+        self.set_changes(odoo, moves=[{'id': 10, 'write_date': '2025-03-04 09:00:00'}], lines=[])
+        SalesStoreSync(odoo, store).sync_once()
+
+        odoo._invalidate_sales_days.assert_called_with({'2025-03-01', '2025-03-04'})
+
+    def test_sync_usa_marca_de_agua_en_dominio(self, store, odoo):
+        """Test que solo se piden cambios desde la última marca de agua"""
+        store.mark_synced('2025-03-02 09:05:00')
+        self.set_changes(odoo, moves=[], lines=[])
+
+        result = SalesStoreSync(odoo, store).sync_once()
+
+        calls = odoo._worker_models.return_value.execute_kw.call_args_list
+        for c in calls:
+            assert ('write_date', '>=', '2025-03-02 09:05:00') in c.args[5][0]
+        assert result['moves'] == 0
+        assert store.watermark == '2025-03-02 09:05:00'
+        odoo._fetch_sales_lines_by_domain.assert_not_called()
+
+    def test_primera_sincronizacion_por_paginas(self, store, odoo):
+        """Test que facturas y líneas modificadas se piden en páginas avanzando por id"""
+        moves = [{'id': i, 'write_date': '2025-03-01 09:00:00'} for i in range(1, 6)]
+        odoo.current_lines = {i: [make_sales_line(i, '2025-03-01')] for i in range(1, 6)}
+
+        def execute_kw(db, uid, pwd, model, method, args, kwargs):
+            if model != 'account.move':
+                return []
+            last_id = args[0][-1][2]
+            return [m for m in moves if m['id'] > last_id][:kwargs['limit']]
+
+        odoo._worker_models.return_value.execute_kw.side_effect = execute_kw
+        with patch.object(sales_store, 'SYNC_PAGE_SIZE', 2):
+            result = SalesStoreSync(odoo, store).sync_once()
+
+        move_calls = [c for c in odoo._worker_models.return_value.execute_kw.call_args_list
+                      if c.args[3] == 'account.move']
+        assert [c.args[5][0][-1] for c in move_calls] == [('id', '>', 0), ('id', '>', 2), ('id', '>', 4)]
+        assert result['moves'] == 5
+
+
+@pytest.mark.skipif(sales_store.fcntl is None, reason='fcntl no disponible (Windows)')
+class TestSalesStoreSyncLeader:
+    """Suite de tests del lock que elige un solo proceso sincronizador"""
+
+    def test_solo_un_sincronizador_por_archivo(self, tmp_path):
+        """Test que un segundo sincronizador del mismo archivo no toma el lock hasta que se libera"""
+        store = SalesLineStore(db_path=str(tmp_path / 'ventas.db'), start_date='2025-01-01')
+        primero, segundo = SalesStoreSync(MagicMock(), store), SalesStoreSync(MagicMock(), store)
+
+        assert primero.acquire_leadership() is True
+        assert primero.acquire_leadership() is True
+        assert segundo.acquire_leadership() is False
+        assert (primero.is_leader, segundo.is_leader) == (True, False)
+
+        primero.release_leadership()
+        assert segundo.acquire_leadership() is True
+        segundo.release_leadership()
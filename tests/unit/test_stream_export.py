@@ -0,0 +1,81 @@
+"""
+Tests unitarios para src/stream_export.py
+
+Tests de las exportaciones CSV, NDJSON y Parquet con las columnas del
+detalle del dashboard.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from src import stream_export
+from src.excel_export import _CONVERTERS, DETALLE_COLUMNS
+from src.stream_export import iter_csv, iter_ndjson, write_parquet
+from tests.fake_odoo import make_sales_line
+
+
+HEADERS = [header for _, header, _, _ in DETALLE_COLUMNS]
+
+
+class TestStreamExport:
+    """Suite de tests para CSV, NDJSON y Parquet"""
+
+    def test_csv(self, monkeypatch):
+        """Test que el CSV trae BOM, encabezados traducidos, nombres de many2one y vacíos"""
+        monkeypatch.setattr(stream_export, 'STREAM_CHUNK_BYTES', 256)
+        chunks = list(iter_csv((make_sales_line(i) for i in range(20)), DETALLE_COLUMNS))
+        text = b''.join(chunks).decode('utf-8')
+
+        assert len(chunks) > 1
+        assert text.startswith('﻿')
+        rows = list(csv.DictReader(io.StringIO(text.lstrip('﻿'))))
+        assert list(rows[0]) == HEADERS and len(rows) == 20
+        assert (rows[0]['Vendedor'], rows[0]['Cliente'], rows[0]['Fecha Factura']) == ('Ana', 'Clínica Ñaña', '2026-03-05')
+        assert (rows[0]['Importe Total'], rows[0]['Ruta de Venta'], rows[0]['RUC/DNI Cliente']) == ('150.5', '', '20123456789')
+
+    def test_ndjson(self):
+        """Test que cada línea es un objeto JSON con claves traducidas y null para vacíos"""
+        text = b''.join(iter_ndjson([make_sales_line(1), make_sales_line(2, balance='x')], DETALLE_COLUMNS)).decode('utf-8')
+        rows = [json.loads(line) for line in text.splitlines()]
+
+        assert list(rows[0]) == HEADERS
+        assert (rows[0]['Importe Total'], rows[1]['Importe Total']) == (150.5, 0.0)
+        assert rows[0]['Ruta de Venta'] is None and rows[0]['Línea Comercial'] == 'PETMEDICA'
+        assert b''.join(iter_ndjson([], DETALLE_COLUMNS)) == b''
+
+    def test_mismos_valores_que_el_excel(self):
+        """Test que CSV/NDJSON/Parquet convierten igual que el Excel (salvo fecha como texto y texto como str)"""
+        line = make_sales_line(invoice_user_id=[7], partner_name=False, quantity=None, vat=20123456789)
+        values = next(stream_export._records([line], DETALLE_COLUMNS))
+        excel = [_CONVERTERS[kind](line.get(key)) for key, _, kind, _ in DETALLE_COLUMNS]
+
+        for (key, _, kind, _), value, expected in zip(DETALLE_COLUMNS, values, excel):
+            if kind == 'fecha':
+                expected = expected.strftime('%Y-%m-%d')
+            elif kind == 'texto' and expected is not None:
+                expected = str(expected)
+            assert value == expected, key
+
+    def test_parquet_por_grupos_de_filas(self):
+        """Test que el Parquet se escribe en grupos de filas con tipos por columna"""
+        pq = pytest.importorskip('pyarrow.parquet')
+        output = io.BytesIO()
+
+        assert write_parquet(output, (make_sales_line(i) for i in range(25)), DETALLE_COLUMNS, row_group_rows=10) == 25
+        output.seek(0)
+        parquet = pq.ParquetFile(output)
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+        assert table.column_names == HEADERS
+        assert str(table.schema.field('Fecha Factura').type) == 'date32[day]'
+        assert table.column('Importe Total').to_pylist()[0] == 150.5
+
+    def test_parquet_sin_pyarrow(self, monkeypatch):
+        """Test que sin pyarrow la exportación Parquet informa el motivo"""
+        monkeypatch.setattr(stream_export, 'PYARROW_AVAILABLE', False)
+
+        with pytest.raises(RuntimeError, match='pyarrow'):
+            write_parquet(io.BytesIO(), [make_sales_line()], DETALLE_COLUMNS)
@@ -0,0 +1,279 @@
+"""
+Tests unitarios para la caché de lecturas de SupabaseManager
+
+Tests de las lecturas de metas y equipos desde memoria, la invalidación al
+guardar y la señal compartida entre workers (src/cache_signal.py).
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from src import cache_signal
+from src.cache_signal import FileCacheSignal, RedisCacheSignal, make_cache_signal
+from src.supabase_manager import SupabaseManager
+
+
+class FakeQuery:
+    """Consulta encadenable de postgrest sobre tablas en memoria"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = None
+        self.payload = None
+        self.on_conflict = None
+        self.filters = []
+
+    def select(self, *args):
+        self.action = 'select'
+        return self
+
+    def order(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda r: r.get(column) <= value)
+        return self
+
+    def neq(self, *args):
+        return self
+
+    def upsert(self, data, on_conflict=None):
+        self.action, self.payload, self.on_conflict = 'upsert', data, on_conflict.split(',')
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def execute(self):
+        rows = self.client.tables.setdefault(self.table, [])
+        if self.action == 'select':
+            self.client.reads[self.table] = self.client.reads.get(self.table, 0) + 1
+            if self.client.fail_reads:
+                self.client.fail_reads -= 1
+                raise ConnectionError('Supabase no responde')
+            return SimpleNamespace(data=[dict(r) for r in rows if all(f(r) for f in self.filters)])
+        if self.action == 'upsert':
+            key = [self.payload.get(c) for c in self.on_conflict]
+            rows[:] = [r for r in rows if [r.get(c) for c in self.on_conflict] != key] + [dict(self.payload)]
+            return SimpleNamespace(data=[dict(self.payload)])
+        if self.action == 'insert':
+            rows.extend(dict(r) for r in self.payload)
+            return SimpleNamespace(data=self.payload)
+        rows.clear()
+        return SimpleNamespace(data=[])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {
+            'metas_ventas_2026': [{'mes': '2026-03', 'linea_comercial': 'PETMEDICA', 'meta_total': 100.0,
+                                   'meta_ipn': 10.0}],
+            'metas_vendedor_2026': [{'mes': '2026-03', 'vendedor_id': 7, 'linea_comercial': 'PETMEDICA',
+                                     'meta_total': 50.0, 'meta_ipn': 5.0, 'equipo_venta': 'petmedica'}],
+            'equipos_vendedores': [{'equipo_id': 'ecommerce', 'vendedor_id': 7}],
+        }
+        self.reads = {}
+        self.fail_reads = 0
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def supabase_env(monkeypatch, tmp_path):
+    """Credenciales falsas y señal de caché en una carpeta del test"""
+    monkeypatch.setenv('SUPABASE_URL', 'https://test.supabase.co')
+    monkeypatch.setenv('SUPABASE_KEY', 'test-key')
+    monkeypatch.setenv('CACHE_SIGNAL_DIR', str(tmp_path))
+    monkeypatch.delenv('REDIS_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_CACHE_TTL_SECONDS', raising=False)
+
+
+def build_manager(client):
+    with patch('src.supabase_manager.create_client', return_value=client):
+        return SupabaseManager()
+
+
+class TestSupabaseCache:
+    """Suite de tests para la caché write-through de SupabaseManager"""
+
+    def test_lecturas_desde_memoria(self, supabase_env):
+        """Test que cada tabla se lee de Supabase una sola vez"""
+        client = FakeSupabase()
+        sm = build_manager(client)
+
+        for _ in range(3):
+            assert sm.read_metas_por_linea()['2026-03']['total'] == 100.0
+            assert sm.read_equipos() == {'ecommerce': [7]}
+            assert sm.read_metas()['petmedica']['7']['2026-03']['meta'] == 50.0
+            assert sm.read_metas_vendedor()['petmedica']['7']['2026-03']['meta'] == 50.0
+
+        assert client.reads == {'metas_ventas_2026': 1, 'equipos_vendedores': 1, 'metas_vendedor_2026': 1}
+        assert sm.cache_stats()['hits'] >= 6
+
+    def test_guardar_invalida_la_tabla(self, supabase_env):
+        """Test que después de guardar se lee el valor nuevo"""
+        client = FakeSupabase()
+        sm = build_manager(client)
+        sm.read_metas_por_linea()
+
+        sm.write_metas_por_linea({'2026-03': {'metas': {'PETMEDICA': 300.0}, 'metas_ipn': {}}})
+        sm.write_metas({'petmedica': {'7': {'2026-03': {'meta': 80.0, 'meta_ipn': 8.0}}}})
+
+        assert sm.read_metas_por_linea()['2026-03']['metas'] == {'PETMEDICA': 300.0}
+        assert sm.read_metas()['petmedica']['7']['2026-03']['meta'] == 80.0
+        assert client.reads['metas_ventas_2026'] == 2
+
+    def test_guardado_en_otro_worker(self, supabase_env):
+        """Test que un worker ve de inmediato lo que guardó otro"""
+        client = FakeSupabase()
+        worker_a, worker_b = build_manager(client), build_manager(client)
+        assert worker_a.read_equipos() == {'ecommerce': [7]}
+
+        worker_b.write_equipos({'ecommerce': [7, 8]}, [{'id': 7, 'name': 'Ana'}, {'id': 8, 'name': 'Luis'}])
+
+        assert worker_a.read_equipos() == {'ecommerce': [7, 8]}
+        assert worker_a.read_equipos() == {'ecommerce': [7, 8]}
+        assert client.reads['equipos_vendedores'] == 2
+
+    def test_copias_y_errores_no_se_cachean(self, supabase_env):
+        """Test que modificar lo leído no altera la caché y que un error no queda guardado"""
+        client = FakeSupabase()
+        client.fail_reads = 1
+        sm = build_manager(client)
+
+        assert sm.obtener_todas_metas() == []
+        metas = sm.obtener_todas_metas()
+        metas[0]['meta_total'] = 0
+        metas.clear()
+
+        assert sm.obtener_todas_metas()[0]['meta_total'] == 100.0
+        assert client.reads['metas_ventas_2026'] == 2
+
+    def test_un_guardado_invalida_una_vez(self, supabase_env):
+        """Test que guardar un formulario con varias metas publica una sola invalidación"""
+        client = FakeSupabase()
+        sm = build_manager(client)
+        with patch.object(sm._signal, 'bump', wraps=sm._signal.bump) as bump:
+            sm.write_metas_por_linea({'2026-03': {'metas': {'PETMEDICA': 1.0, 'AGROVET': 2.0, 'GENVET': 3.0},
+                                                  'metas_ipn': {}}})
+            sm.write_metas_vendedor({'petmedica': {'7': {'2026-03': {'meta': 1.0}, '2026-04': {'meta': 2.0}}}})
+
+        assert bump.call_count == 2
+        assert len(client.tables['metas_ventas_2026']) == 3
+        assert sm.read_metas_por_linea()['2026-03']['total'] == 6.0
+
+    def test_ttl_cero_desactiva_la_cache(self, supabase_env, monkeypatch):
+        """Test que con SUPABASE_CACHE_TTL_SECONDS=0 cada lectura consulta Supabase"""
+        monkeypatch.setenv('SUPABASE_CACHE_TTL_SECONDS', '0')
+        client = FakeSupabase()
+        sm = build_manager(client)
+
+        sm.read_equipos()
+        sm.read_equipos()
+
+        assert client.reads['equipos_vendedores'] == 2
+
+
+class TestSupabaseMonthScope:
+    """Suite de tests para las lecturas de metas por mes y línea"""
+
+    @pytest.fixture
+    def client(self):
+        client = FakeSupabase()
+        client.tables['metas_ventas_2026'], client.tables['metas_vendedor_2026'] = [], []
+        for año in (2024, 2025, 2026):
+            for mes in range(1, 13):
+                for linea in ('PETMEDICA', 'AGROVET'):
+                    client.tables['metas_ventas_2026'].append(
+                        {'mes': f'{año}-{mes:02d}', 'linea_comercial': linea, 'meta_total': 10.0, 'meta_ipn': None})
+                    client.tables['metas_vendedor_2026'].append(
+                        {'mes': f'{año}-{mes:02d}', 'vendedor_id': 7, 'linea_comercial': linea,
+                         'meta_total': 5.0, 'meta_ipn': 1.0})
+        return client
+
+    def test_metas_por_linea_de_un_mes(self, supabase_env, client):
+        """Test que se traen solo las metas del mes pedido, cacheadas por mes"""
+        sm = build_manager(client)
+
+        marzo = sm.read_metas_por_linea(mes_desde='2026-03-15', mes_hasta='2026-03')
+        año = sm.read_metas_por_linea('2026-01', '2026-12')
+        sm.read_metas_por_linea(mes_desde='2026-03', mes_hasta='2026-03')
+
+        assert list(marzo) == ['2026-03'] and marzo['2026-03']['total'] == 20.0
+        assert sorted(año) == [f'2026-{mes:02d}' for mes in range(1, 13)]
+        assert client.reads['metas_ventas_2026'] == 2
+        assert len(sm.read_metas_por_linea()) == 36
+
+    def test_metas_vendedor_de_un_mes_y_linea(self, supabase_env, client):
+        """Test que las metas de vendedores se filtran por mes y línea y se invalidan al guardar"""
+        sm = build_manager(client)
+
+        metas = sm.read_metas('2025-06', '2025-06', linea_comercial='agrovet')
+        assert metas == {'agrovet': {'7': {'2025-06': {'meta': 5.0, 'meta_ipn': 1.0}}}}
+
+        sm.write_metas({'agrovet': {'7': {'2025-06': {'meta': 9.0, 'meta_ipn': 1.0}}}})
+        assert sm.read_metas('2025-06', '2025-06', 'agrovet')['agrovet']['7']['2025-06']['meta'] == 9.0
+        assert client.reads['metas_vendedor_2026'] == 2
+
+
+class TestCacheSignal:
+    """Suite de tests para la señal de invalidación en archivo"""
+
+    def test_bump_cambia_la_version(self, supabase_env, tmp_path):
+        """Test que cada bump publica una versión distinta visible por otra instancia"""
+        signal = make_cache_signal('supabase')
+        other = FileCacheSignal(str(tmp_path / 'supabase.version'))
+
+        assert isinstance(signal, FileCacheSignal) and signal.version() is None
+        signal.bump()
+        first = other.version()
+        signal.bump()
+
+        assert first is not None and other.version() not in (None, first)
+        assert list(tmp_path.iterdir()) == [tmp_path / 'supabase.version']
+
+    def test_redis_caido_usa_archivo_y_reintenta_despues(self, supabase_env, tmp_path, monkeypatch):
+        """Test que sin Redis no se reintenta en cada lectura y la versión local es estable"""
+        class DownRedis:
+            calls = 0
+
+            def get(self, key):
+                DownRedis.calls += 1
+                raise ConnectionError('Redis no responde')
+
+            incr = get
+
+        clock = [100.0]
+        monkeypatch.setattr(cache_signal.time, 'monotonic', lambda: clock[0])
+        monkeypatch.setattr(cache_signal, 'redis', SimpleNamespace(
+            Redis=SimpleNamespace(from_url=lambda *args, **kwargs: DownRedis())))
+        signal = RedisCacheSignal('redis://localhost:6379/0', 'clave',
+                                  fallback=FileCacheSignal(str(tmp_path / 'supabase.version')))
+
+        versions = [signal.version() for _ in range(5)]
+        assert DownRedis.calls == 1
+        assert len(set(versions)) == 1
+
+        signal.bump()
+        assert DownRedis.calls == 1 and signal.version() != versions[0]
+
+        clock[0] += signal.retry_seconds
+        signal.version()
+        assert DownRedis.calls == 2